@@ -1,32 +1,157 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.auth.models import User
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.utils.html import format_html
-from django.urls import reverse
+from django.shortcuts import redirect
+from django.urls import path, reverse
 from django.utils.safestring import mark_safe
-from .models import Account, Transaction, BankManager, ManagerAction
+from django.views.decorators.http import require_POST
+from . import approvals, bulk_actions
+from .ledger import ZERO
+from .models import (
+    Account, Transaction, TransactionApproval, BankManager, ManagerAction, LedgerAccount, JournalEntry, Posting,
+    AccountDailyTotals, AnomalyAlert, Hold, StandingInstruction, IdempotencyKey, ApiToken, BulkJob
+)
+from .page_cache import bump_versions
+from .pagination import EstimatedCountPaginator
+from .search import customer_condition, text_condition
+from .services import PostingError, adjust
+
+
+def money(amount):
+    """₹1,234.50"""
+    return f'₹{amount:,.2f}'
+
+
+def take_bulk_action(model_admin, request, kind, queryset, done):
+    """
+    Run a bulk action on the selection now, or queue it as a BulkJob if it
+    is large (bulk_actions.py); returns the Counter of changed rows, or None
+    if queued. `done` is the message, formatted with the changed count
+    """
+    counts, job = bulk_actions.take(kind, queryset, request.user)
+    if job:
+        model_admin.message_user(request, format_html(
+            '{} rows will be processed in the background as <a href="{}">job #{}</a> '
+            '(python manage.py run_bulk_jobs).',
+            job.total, reverse('admin:bank_bulkjob_change', args=[job.pk]), job.pk,
+        ))
+        return None
+    model_admin.message_user(request, done.format(counts['changed']))
+    return counts
+
+
+def per_row(queryset, link, aggregate, default=0):
+    """
+    Annotation: `aggregate` over the rows of `queryset` whose `link` points
+    at the annotated row
+
+    A correlated subquery rather than a join with GROUP BY, so a
+    changelist page computes it for its own rows only.
+    """
+    rows = queryset.filter(**{link: OuterRef('pk')}).order_by().values(link)
+    return Coalesce(Subquery(rows.annotate(total=aggregate).values('total')), default)
+
+
+class AccountAdminForm(forms.ModelForm):
+    """
+    The account form, with a journalled balance adjustment in place of an
+    editable balance
+    """
+    adjustment = forms.DecimalField(
+        max_digits=12, decimal_places=2, required=False,
+        help_text='Amount to add to the balance (negative to take off). '
+                  'Posted as a transaction and journalled against Suspense.'
+    )
+    adjustment_reason = forms.CharField(max_length=150, required=False)
+
+    class Meta:
+        model = Account
+        fields = '__all__'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('adjustment') and not cleaned_data.get('adjustment_reason'):
+            self.add_error('adjustment_reason', 'Give a reason for the adjustment.')
+        return cleaned_data
 
 
 @admin.register(Account)
 class AccountAdmin(admin.ModelAdmin):
     """
     Customize how Account appears in Django admin panel
+    - The balances are read-only: they only move through postings, and a
+      correction is entered as an adjustment (services.adjust)
     """
-    list_display = ['account_number', 'user_link', 'balance_display', 'status_display', 'created_at', 'last_activity', 'action_buttons']
-    list_filter = ['status', 'created_at']
+    form = AccountAdminForm
+    list_display = ['account_number', 'user_link', 'balance_display', 'status_display', 'transaction_count', 'created_at', 'last_activity', 'action_buttons']
+    list_filter = ['status', 'tier', 'created_at']
     search_fields = ['account_number', 'user__username', 'user__email']
-    readonly_fields = ['account_number', 'created_at', 'last_activity', 'transaction_count', 'total_deposits', 'total_withdrawals']
+    list_select_related = ['user']
+    raw_id_fields = ['user']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    readonly_fields = ['account_number', 'balance', 'available_balance', 'created_at', 'last_activity', 'transaction_count', 'total_deposits', 'total_withdrawals',
+                       'accrued_interest', 'interest_accrued_through', 'interest_posted_through']
     
     fieldsets = (
         ('Account Information', {
-            'fields': ('account_number', 'user', 'balance', 'status')
+            'fields': ('account_number', 'user', 'balance', 'available_balance', 'status', 'tier')
+        }),
+        ('Balance Adjustment', {
+            'fields': ('adjustment', 'adjustment_reason')
         }),
         ('Statistics', {
             'fields': ('transaction_count', 'total_deposits', 'total_withdrawals')
         }),
+        ('Interest', {
+            'fields': ('accrued_interest', 'interest_accrued_through', 'interest_posted_through')
+        }),
         ('Timestamps', {
             'fields': ('created_at', 'last_activity')
         }),
     )
     
+    def get_queryset(self, request):
+        """Accounts with their transaction counts, in the same query"""
+        return super().get_queryset(request).annotate(
+            transaction_count=per_row(Transaction.objects.all(), 'account', Count('id')),
+        )
+    
+    def get_object(self, request, object_id, from_field=None):
+        """
+        The account, with its deposit and withdrawal totals annotated too
+        
+        Only the change page shows the totals; summing every listed
+        account's transactions would slow the changelist down.
+        """
+        completed = Transaction.objects.filter(status='COMPLETED')
+        queryset = self.get_queryset(request).annotate(
+            total_deposits=per_row(completed.filter(transaction_type='DEPOSIT'), 'account', Sum('amount'), ZERO),
+            total_withdrawals=per_row(completed.filter(transaction_type='WITHDRAW'), 'account', Sum('amount'), ZERO),
+        )
+        field = Account._meta.pk if from_field is None else Account._meta.get_field(from_field)
+        try:
+            return queryset.get(**{field.name: field.to_python(object_id)})
+        except (Account.DoesNotExist, ValidationError, ValueError):
+            return None
+    
+    def save_model(self, request, obj, form, change):
+        """Save the account, then post the adjustment if one was entered"""
+        super().save_model(request, obj, form, change)
+        amount = form.cleaned_data.get('adjustment')
+        if amount:
+            reason = form.cleaned_data['adjustment_reason']
+            try:
+                adjust(obj, amount, f'Balance adjustment by {request.user.username}: {reason}')
+            except PostingError as error:
+                self.message_user(request, str(error), messages.ERROR)
+            else:
+                self.message_user(request, f'Balance adjusted by {money(amount)}.')
+
     def user_link(self, obj):
         """Link to user detail page"""
         url = reverse('admin:auth_user_change', args=[obj.user.id])
@@ -35,7 +160,7 @@ class AccountAdmin(admin.ModelAdmin):
     
     def balance_display(self, obj):
         """Display balance with currency"""
-        return format_html('<strong>₹{:,.2f}</strong>', float(obj.balance))
+        return format_html('<strong>{}</strong>', money(obj.balance))
     balance_display.short_description = 'Balance'
     balance_display.admin_order_field = 'balance'
     
@@ -52,51 +177,88 @@ class AccountAdmin(admin.ModelAdmin):
     status_display.admin_order_field = 'status'
     
     def action_buttons(self, obj):
-        """Add freeze/unfreeze buttons"""
+        """
+        Add freeze/unfreeze buttons
+        - They post the changelist form (and its CSRF token) to freeze_view or
+          unfreeze_view; a plain link would change the account on a GET
+        """
         if obj.status == 'ACTIVE':
             return format_html(
-                '<a class="button" href="{}">Freeze Account</a>',
+                '<button type="submit" class="button" formmethod="post" formaction="{}">Freeze Account</button>',
                 reverse('admin:bank_account_freeze', args=[obj.pk])
             )
         else:
             return format_html(
-                '<a class="button" href="{}">Unfreeze Account</a>',
+                '<button type="submit" class="button" formmethod="post" formaction="{}">Unfreeze Account</button>',
                 reverse('admin:bank_account_unfreeze', args=[obj.pk])
             )
     action_buttons.short_description = 'Actions'
     
     def transaction_count(self, obj):
-        """Count of transactions"""
-        return obj.transactions.count()
+        """Count of transactions (annotated by get_queryset)"""
+        return obj.transaction_count
     transaction_count.short_description = 'Total Transactions'
+    transaction_count.admin_order_field = 'transaction_count'
     
     def total_deposits(self, obj):
-        """Total deposit amount"""
-        total = sum(t.amount for t in obj.transactions.filter(transaction_type='DEPOSIT', status='COMPLETED'))
-        return format_html('₹{:,.2f}', float(total))
+        """Total completed deposits (annotated by get_object)"""
+        return money(obj.total_deposits)
     total_deposits.short_description = 'Total Deposits'
     
     def total_withdrawals(self, obj):
-        """Total withdrawal amount"""
-        total = sum(t.amount for t in obj.transactions.filter(transaction_type='WITHDRAW', status='COMPLETED'))
-        return format_html('₹{:,.2f}', float(total))
+        """Total completed withdrawals (annotated by get_object)"""
+        return money(obj.total_withdrawals)
     total_withdrawals.short_description = 'Total Withdrawals'
     
     actions = ['freeze_accounts', 'unfreeze_accounts']
     
+    def get_urls(self):
+        """The Freeze/Unfreeze buttons of the Actions column (POST only)"""
+        return [
+            path('<int:account_id>/freeze/', self.admin_site.admin_view(require_POST(self.freeze_view)),
+                 name='bank_account_freeze'),
+            path('<int:account_id>/unfreeze/', self.admin_site.admin_view(require_POST(self.unfreeze_view)),
+                 name='bank_account_unfreeze'),
+        ] + super().get_urls()
+    
+    def freeze_view(self, request, account_id):
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+        self.freeze_accounts(request, Account.objects.filter(pk=account_id))
+        return redirect('admin:bank_account_changelist')
+    
+    def unfreeze_view(self, request, account_id):
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+        self.unfreeze_accounts(request, Account.objects.filter(pk=account_id))
+        return redirect('admin:bank_account_changelist')
+    
     def freeze_accounts(self, request, queryset):
-        """Bulk freeze accounts"""
-        updated = queryset.update(status='FROZEN')
-        self.message_user(request, f'{updated} account(s) have been frozen.')
+        """Bulk freeze accounts, with an audit row each"""
+        take_bulk_action(
+            self, request, BulkJob.FREEZE_ACCOUNTS, queryset.exclude(status='FROZEN'),
+            '{} account(s) have been frozen.',
+        )
     freeze_accounts.short_description = 'Freeze selected accounts'
     
     def unfreeze_accounts(self, request, queryset):
-        """Bulk unfreeze accounts"""
-        updated = queryset.update(status='ACTIVE')
-        self.message_user(request, f'{updated} account(s) have been unfrozen.')
+        """Bulk unfreeze accounts, with an audit row each"""
+        take_bulk_action(
+            self, request, BulkJob.UNFREEZE_ACCOUNTS, queryset.exclude(status='ACTIVE'),
+            '{} account(s) have been unfrozen.',
+        )
     unfreeze_accounts.short_description = 'Unfreeze selected accounts'
 
 
+class TransactionApprovalInline(admin.StackedInline):
+    """Who approved or rejected the transaction, and their note"""
+    model = TransactionApproval
+    fields = ['approved_by', 'note']
+    raw_id_fields = ['approved_by']
+    max_num = 1
+    extra = 0
+
+
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
     """
@@ -105,15 +267,19 @@ class TransactionAdmin(admin.ModelAdmin):
     list_display = ['transaction_id', 'account_link', 'user_name', 'transaction_type_display', 'amount_display', 'balance_after_display', 'status_display', 'timestamp', 'approved_by_display']
     list_filter = ['transaction_type', 'status', 'timestamp']
     search_fields = ['account__account_number', 'account__user__username', 'description']
-    readonly_fields = ['timestamp', 'transaction_details']
-    date_hierarchy = 'timestamp'
+    readonly_fields = ['timestamp', 'review_reason', 'transaction_details']
+    list_select_related = ['account__user', 'approval__approved_by']
+    raw_id_fields = ['account']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    inlines = [TransactionApprovalInline]
     
     fieldsets = (
         ('Transaction Information', {
             'fields': ('account', 'transaction_type', 'amount', 'balance_after', 'status')
         }),
         ('Details', {
-            'fields': ('description', 'approved_by', 'approval_note')
+            'fields': ('description', 'review_reason')
         }),
         ('Timestamp', {
             'fields': ('timestamp',)
@@ -124,6 +290,36 @@ class TransactionAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Customer and account through the customer index, description and
+        approval note through the full-text index (search.py), instead of
+        icontains over the whole table
+        """
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        matches = (
+            customer_condition(search_term, ['account_number', 'username'], user_path='account__user__')
+            | text_condition(Transaction, search_term)
+        )
+        return queryset.filter(matches), False
+    
+    def save_model(self, request, obj, form, change):
+        """Save, then drop the affected accounts' cached pages"""
+        super().save_model(request, obj, form, change)
+        bump_versions({obj.account_id, form.initial.get('account')} - {None})
+    
+    def delete_model(self, request, obj):
+        account_id = obj.account_id
+        super().delete_model(request, obj)
+        bump_versions([account_id])
+    
+    def delete_queryset(self, request, queryset):
+        account_ids = set(queryset.values_list('account_id', flat=True))
+        super().delete_queryset(request, queryset)
+        bump_versions(account_ids)
+    
     def transaction_id(self, obj):
         """Display transaction ID"""
         return f'#{obj.id}'
@@ -151,14 +347,14 @@ class TransactionAdmin(admin.ModelAdmin):
     def amount_display(self, obj):
         """Display amount with currency"""
         if obj.amount >= 50000:
-            return format_html('<strong style="color: #fbbf24;">₹{:,.2f} ⚠️</strong>', float(obj.amount))
-        return format_html('<strong>₹{:,.2f}</strong>', float(obj.amount))
+            return format_html('<strong style="color: #fbbf24;">{} ⚠️</strong>', money(obj.amount))
+        return format_html('<strong>{}</strong>', money(obj.amount))
     amount_display.short_description = 'Amount'
     amount_display.admin_order_field = 'amount'
     
     def balance_after_display(self, obj):
         """Display balance after transaction"""
-        return format_html('₹{:,.2f}', float(obj.balance_after))
+        return money(obj.balance_after)
     balance_after_display.short_description = 'Balance After'
     
     def status_display(self, obj):
@@ -175,13 +371,17 @@ class TransactionAdmin(admin.ModelAdmin):
     
     def approved_by_display(self, obj):
         """Display who approved"""
-        if obj.approved_by:
-            return obj.approved_by.username
+        decision = approvals.decision_of(obj)
+        if decision and decision.approved_by:
+            return decision.approved_by.username
         return '—'
     approved_by_display.short_description = 'Approved By'
     
     def transaction_details(self, obj):
         """Show detailed transaction info"""
+        decision = approvals.decision_of(obj)
+        approved_by = decision.approved_by if decision else None
+        note = decision.note if decision else ''
         html = f"""
         <div style="background: #f5f5f5; padding: 15px; border-radius: 5px;">
             <h3>Transaction Details</h3>
@@ -195,8 +395,8 @@ class TransactionAdmin(admin.ModelAdmin):
                 <tr><td><strong>Status:</strong></td><td>{obj.status}</td></tr>
                 <tr><td><strong>Date:</strong></td><td>{obj.timestamp.strftime('%B %d, %Y %H:%M')}</td></tr>
                 <tr><td><strong>Description:</strong></td><td>{obj.description or '—'}</td></tr>
-                {f'<tr><td><strong>Approved By:</strong></td><td>{obj.approved_by.username}</td></tr>' if obj.approved_by else ''}
-                {f'<tr><td><strong>Approval Note:</strong></td><td>{obj.approval_note}</td></tr>' if obj.approval_note else ''}
+                {f'<tr><td><strong>Approved By:</strong></td><td>{approved_by.username}</td></tr>' if approved_by else ''}
+                {f'<tr><td><strong>Approval Note:</strong></td><td>{note}</td></tr>' if note else ''}
             </table>
         </div>
         """
@@ -206,15 +406,25 @@ class TransactionAdmin(admin.ModelAdmin):
     actions = ['approve_transactions', 'reject_transactions']
     
     def approve_transactions(self, request, queryset):
-        """Bulk approve transactions"""
-        updated = queryset.filter(status='PENDING').update(status='APPROVED', approved_by=request.user)
-        self.message_user(request, f'{updated} transaction(s) have been approved.')
+        """Bulk approve transactions, then settle them into the account balances"""
+        counts = take_bulk_action(
+            self, request, BulkJob.APPROVE_TRANSACTIONS, queryset.filter(status='PENDING'),
+            '{} transaction(s) have been approved.',
+        )
+        if counts and counts['refused']:
+            self.message_user(
+                request,
+                f"{counts['refused']} of them were rejected at settlement (overdraw or frozen account).",
+                level=messages.WARNING,
+            )
     approve_transactions.short_description = 'Approve selected transactions'
     
     def reject_transactions(self, request, queryset):
         """Bulk reject transactions"""
-        updated = queryset.filter(status='PENDING').update(status='REJECTED', approved_by=request.user)
-        self.message_user(request, f'{updated} transaction(s) have been rejected.')
+        take_bulk_action(
+            self, request, BulkJob.REJECT_TRANSACTIONS, queryset.filter(status='PENDING'),
+            '{} transaction(s) have been rejected.',
+        )
     reject_transactions.short_description = 'Reject selected transactions'
 
 
@@ -225,6 +435,8 @@ class BankManagerAdmin(admin.ModelAdmin):
     """
     list_display = ['user_link', 'employee_id', 'phone', 'created_at', 'total_actions']
     search_fields = ['user__username', 'employee_id', 'phone']
+    list_select_related = ['user']
+    raw_id_fields = ['user']
     readonly_fields = ['created_at', 'total_actions', 'recent_actions_display']
     
     fieldsets = (
@@ -240,6 +452,12 @@ class BankManagerAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        """Managers with their action counts, in the same query"""
+        return super().get_queryset(request).annotate(
+            total_actions=per_row(ManagerAction.objects.all(), 'manager', Count('id'))
+        )
+    
     def user_link(self, obj):
         """Link to user"""
         url = reverse('admin:auth_user_change', args=[obj.user.id])
@@ -247,13 +465,14 @@ class BankManagerAdmin(admin.ModelAdmin):
     user_link.short_description = 'User'
     
     def total_actions(self, obj):
-        """Count of actions performed"""
-        return obj.actions.count()
+        """Count of actions performed (annotated by get_queryset)"""
+        return obj.total_actions
     total_actions.short_description = 'Total Actions'
+    total_actions.admin_order_field = 'total_actions'
     
     def recent_actions_display(self, obj):
         """Show recent actions"""
-        actions = obj.actions.all()[:10]
+        actions = obj.actions.select_related('target_user')[:10]
         if not actions:
             return 'No actions yet'
         
@@ -273,13 +492,34 @@ class ManagerActionAdmin(admin.ModelAdmin):
     """
     list_display = ['action_id', 'manager_name', 'action_type_display', 'target_user_link', 'target_account_link', 'timestamp']
     list_filter = ['action_type', 'timestamp']
-    search_fields = ['manager__user__username', 'target_user__username', 'note']
+    search_fields = ['manager__user__username', 'performed_by__username', 'target_user__username', 'note']
     readonly_fields = ['timestamp', 'action_details']
-    date_hierarchy = 'timestamp'
+    list_select_related = ['manager__user', 'performed_by', 'target_user', 'target_account']
+    raw_id_fields = ['performed_by', 'target_user', 'target_account', 'target_transaction']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Manager, admin and target usernames, and the note through the
+        full-text index (search.py)
+        """
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        managers = BankManager.objects.filter(user__username__icontains=search_term)
+        admins = User.objects.filter(username__icontains=search_term, is_staff=True)
+        matches = (
+            Q(manager__in=managers)
+            | Q(performed_by__in=admins)
+            | customer_condition(search_term, ['username'], user_path='target_user__')
+            | text_condition(ManagerAction, search_term)
+        )
+        return queryset.filter(matches), False
     
     fieldsets = (
         ('Action Information', {
-            'fields': ('manager', 'action_type', 'note')
+            'fields': ('manager', 'performed_by', 'action_type', 'note')
         }),
         ('Targets', {
             'fields': ('target_user', 'target_account', 'target_transaction')
@@ -299,8 +539,8 @@ class ManagerActionAdmin(admin.ModelAdmin):
     action_id.short_description = 'ID'
     
     def manager_name(self, obj):
-        """Display manager name"""
-        return obj.manager.user.username
+        """Display manager name (or the admin user behind a bulk action)"""
+        return obj.actor
     manager_name.short_description = 'Manager'
     
     def action_type_display(self, obj):
@@ -340,7 +580,7 @@ class ManagerActionAdmin(admin.ModelAdmin):
             <h3>Action Details</h3>
             <table style="width: 100%;">
                 <tr><td><strong>Action ID:</strong></td><td>#{obj.id}</td></tr>
-                <tr><td><strong>Manager:</strong></td><td>{obj.manager.user.username} (EMP: {obj.manager.employee_id})</td></tr>
+                <tr><td><strong>Manager:</strong></td><td>{f'{obj.actor} (EMP: {obj.manager.employee_id})' if obj.manager else f'{obj.actor} (admin)'}</td></tr>
                 <tr><td><strong>Action Type:</strong></td><td>{obj.action_type.replace('_', ' ').title()}</td></tr>
                 <tr><td><strong>Date & Time:</strong></td><td>{obj.timestamp.strftime('%B %d, %Y %H:%M:%S')}</td></tr>
                 {f'<tr><td><strong>Target User:</strong></td><td>{obj.target_user.username}</td></tr>' if obj.target_user else ''}
@@ -352,3 +592,167 @@ class ManagerActionAdmin(admin.ModelAdmin):
         """
         return mark_safe(html)
     action_details.short_description = 'Action Details'
+
+
+@admin.register(LedgerAccount)
+class LedgerAccountAdmin(admin.ModelAdmin):
+    """Bank-internal ledger accounts; balances are maintained by postings only"""
+    list_display = ['code', 'name', 'kind', 'balance']
+    list_filter = ['kind']
+    readonly_fields = ['balance']
+
+
+class PostingInline(admin.TabularInline):
+    model = Posting
+    fields = ['ledger_account', 'account', 'amount']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('ledger_account', 'account__user')
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(JournalEntry)
+class JournalEntryAdmin(admin.ModelAdmin):
+    """Read-only view of the append-only journal"""
+    list_display = ['id', 'entry_type', 'description', 'created_at']
+    list_filter = ['entry_type', 'created_at']
+    search_fields = ['description']
+    readonly_fields = ['entry_type', 'description', 'created_at']
+    inlines = [PostingInline]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(AccountDailyTotals)
+class AccountDailyTotalsAdmin(admin.ModelAdmin):
+    """Per-day posting counters read by the posting rules; maintained by the posting service"""
+    list_display = ['account', 'day', 'deposit_count', 'deposit_total', 'withdrawal_count', 'withdrawal_total']
+    list_filter = ['day']
+    search_fields = ['account__account_number']
+    list_select_related = ['account__user']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    readonly_fields = ['account', 'day', 'deposit_count', 'deposit_total', 'withdrawal_count', 'withdrawal_total']
+
+
+@admin.register(AnomalyAlert)
+class AnomalyAlertAdmin(admin.ModelAdmin):
+    """Alerts from the streaming anomaly detector; tick reviewed to clear them from the manager dashboard"""
+    list_display = ['id', 'account', 'kind', 'detail', 'score', 'reviewed', 'created_at']
+    list_filter = ['reviewed', 'kind', 'created_at']
+    list_editable = ['reviewed']
+    search_fields = ['account__account_number', 'detail']
+    list_select_related = ['account__user']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    readonly_fields = ['account', 'transaction', 'kind', 'score', 'detail', 'created_at']
+    actions = ['mark_reviewed']
+
+    def mark_reviewed(self, request, queryset):
+        """Bulk mark alerts as reviewed"""
+        updated = queryset.update(reviewed=True)
+        self.message_user(request, f'{updated} alert(s) marked as reviewed.')
+    mark_reviewed.short_description = 'Mark selected alerts as reviewed'
+
+
+@admin.register(Hold)
+class HoldAdmin(admin.ModelAdmin):
+    """Funds reserved for pending withdrawals (read-only: holds end through settlement, rejection or expiry)"""
+    list_display = ['id', 'account', 'transaction', 'amount', 'status', 'created_at', 'expires_at', 'released_at']
+    list_filter = ['status', 'expires_at']
+    search_fields = ['account__account_number']
+    list_select_related = ['account__user', 'transaction']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    readonly_fields = ['account', 'transaction', 'amount', 'status', 'created_at', 'expires_at', 'released_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(StandingInstruction)
+class StandingInstructionAdmin(admin.ModelAdmin):
+    """Customers' recurring payments, run by the run_scheduled_payments command"""
+    list_display = ['id', 'account', 'kind', 'to_account', 'amount', 'frequency', 'next_run_at', 'last_run_at', 'last_error', 'active']
+    list_filter = ['active', 'kind', 'frequency']
+    search_fields = ['account__account_number', 'to_account__account_number', 'description']
+    list_select_related = ['account__user', 'to_account__user']
+    raw_id_fields = ['account', 'to_account']
+    readonly_fields = ['last_run_at', 'last_error', 'claimed_by', 'claim_expires_at', 'created_at']
+
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    """Request keys that make deposits, withdrawals and batches safe to retry (read-only)"""
+    list_display = ['key', 'user', 'transaction', 'created_at', 'expires_at']
+    search_fields = ['key', 'user__username']
+    list_select_related = ['user', 'transaction']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    readonly_fields = ['user', 'key', 'request_hash', 'transaction', 'response', 'created_at', 'expires_at']
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(ApiToken)
+class ApiTokenAdmin(admin.ModelAdmin):
+    """JSON API tokens; create them with the create_api_token command, delete one to revoke it"""
+    list_display = ['prefix', 'user', 'name', 'created_at']
+    search_fields = ['user__username', 'name', 'prefix']
+    list_select_related = ['user']
+    readonly_fields = ['user', 'key_hash', 'prefix', 'created_at']
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(BulkJob)
+class BulkJobAdmin(admin.ModelAdmin):
+    """Large bulk admin actions, run in the background by the run_bulk_jobs command (read-only)"""
+    list_display = ['id', 'kind', 'status', 'requested_by', 'progress', 'changed', 'refused', 'created_at', 'finished_at']
+    list_filter = ['status', 'kind']
+    list_select_related = ['requested_by']
+    exclude = ['target_ids']
+    readonly_fields = ['kind', 'status', 'requested_by', 'total', 'processed', 'progress', 'changed', 'refused',
+                       'last_error', 'claimed_by', 'claim_expires_at', 'created_at', 'started_at', 'finished_at']
+    actions = ['retry_jobs']
+
+    def get_queryset(self, request):
+        # The selected ids can run to megabytes; the pages never show them
+        return super().get_queryset(request).defer('target_ids')
+
+    def progress(self, obj):
+        """Share of the selection processed so far"""
+        percent = 100 * obj.processed // obj.total if obj.total else 100
+        return f'{percent}% ({obj.processed:,} of {obj.total:,})'
+    progress.short_description = 'Progress'
+
+    def retry_jobs(self, request, queryset):
+        """Queue failed jobs again; they resume after their last finished chunk"""
+        updated = queryset.filter(status=BulkJob.FAILED).update(status=BulkJob.QUEUED, last_error='')
+        self.message_user(request, f'{updated} job(s) queued again.')
+    retry_jobs.short_description = 'Retry selected failed jobs'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,158 @@
+"""
+Admin dashboard
+
+The dashboard page itself is a light shell: the header, the tabs and an
+empty box per section. It runs no queries of its own, so it arrives in the
+same time however many customers there are. Each box then loads its
+section from admin_section_view as an HTML fragment:
+
+- stats: the totals (stats.py)
+- overview, transactions, actions: the most recent accounts, transactions,
+  large transactions and manager actions
+- accounts, users: every account and customer, BANK_ADMIN_SECTION_PAGE_SIZE
+  at a time, newest first
+
+The overview and stats load with the page; the other tabs load the first
+time they are opened (static/js/main.js). Each rendered section page is
+cached for BANK_ADMIN_SECTION_CACHE_SECONDS in the default cache and may be
+reused by the browser for as long, so repeated loads and tab switches do
+not query again.
+"""
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.db.models import Count
+from django.http import Http404, HttpResponse
+from django.shortcuts import redirect, render
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control
+
+from .models import Account, ManagerAction, Transaction
+from .pagination import EstimatedCountPaginator
+from .stats import dashboard_stats
+
+# Transactions of at least this amount are listed as large
+LARGE_AMOUNT = 50000
+
+
+def section_timeout():
+    return getattr(settings, 'BANK_ADMIN_SECTION_CACHE_SECONDS', 30)
+
+
+def section_page_size():
+    return getattr(settings, 'BANK_ADMIN_SECTION_PAGE_SIZE', 25)
+
+
+def _recent_transactions():
+    return Transaction.objects.select_related('account__user').order_by('-timestamp')[:20]
+
+
+def _large_transactions():
+    return (
+        Transaction.objects.filter(amount__gte=LARGE_AMOUNT)
+        .select_related('account__user').order_by('-timestamp')[:10]
+    )
+
+
+def stats_section(request):
+    """Totals, shared with the manager dashboard and reports (stats.py)"""
+    context = dict(dashboard_stats())
+    context['large_transactions'] = len(_large_transactions())
+    return context
+
+
+def overview_section(request):
+    return {
+        # Newest by id, the order they were created in: created_at has no index
+        'recent_accounts': Account.objects.select_related('user').order_by('-id')[:10],
+        'recent_transactions': _recent_transactions(),
+    }
+
+
+def transactions_section(request):
+    return {
+        'recent_transactions': _recent_transactions(),
+        'large_transactions': _large_transactions(),
+    }
+
+
+def actions_section(request):
+    return {
+        'recent_manager_actions': ManagerAction.objects.select_related(
+            'manager__user', 'performed_by', 'target_user', 'target_account'
+        ).order_by('-timestamp')[:15],
+    }
+
+
+def accounts_section(request):
+    """One page of accounts, each with its number of transactions"""
+    accounts = Account.objects.select_related('user').order_by('-id')
+    page = EstimatedCountPaginator(accounts, section_page_size()).get_page(request.GET.get('page'))
+    # One grouped count for the page, instead of one count per account
+    counts = dict(
+        Transaction.objects.filter(account_id__in=[account.id for account in page])
+        .values_list('account_id').annotate(count=Count('id')).order_by()
+    )
+    for account in page:
+        account.transaction_count = counts.get(account.id, 0)
+    return {'page': page}
+
+
+def users_section(request):
+    """One page of customers (users who are not managers) with their accounts"""
+    users = User.objects.exclude(manager_profile__isnull=False).select_related('account').order_by('-id')
+    return {'page': EstimatedCountPaginator(users, section_page_size()).get_page(request.GET.get('page'))}
+
+
+SECTIONS = {
+    'stats': stats_section,
+    'overview': overview_section,
+    'accounts': accounts_section,
+    'users': users_section,
+    'transactions': transactions_section,
+    'actions': actions_section,
+}
+
+
+@login_required
+def admin_dashboard_view(request):
+    """
+    Admin Dashboard View - Shows all system information and management features
+    Only accessible to superusers
+    - Renders the page shell; the sections load from admin_section_view
+    """
+    if not request.user.is_superuser:
+        messages.error(request, 'You do not have permission to access this page.')
+        return redirect('bank:dashboard')
+
+    return render(request, 'bank/admin_dashboard.html', {'is_admin': True})
+
+
+@login_required
+def admin_section_view(request, section):
+    """
+    One section of the admin dashboard, as an HTML fragment
+    - GET ?page=<n> picks the page of the accounts and users sections
+    - Cached per section and page for BANK_ADMIN_SECTION_CACHE_SECONDS
+    """
+    if not request.user.is_superuser:
+        raise PermissionDenied
+    if section not in SECTIONS:
+        raise Http404('No such dashboard section')
+
+    page = request.GET.get('page', '1')
+    key = f'bank:admin-section:{section}:{page if page.isdigit() else 1}'
+    html = cache.get(key)
+    if html is None:
+        context = SECTIONS[section](request)
+        # Rendered without the request, as the same copy is served to every admin
+        html = render_to_string(f'bank/admin_sections/{section}.html', context)
+        cache.set(key, html, section_timeout())
+
+    response = HttpResponse(html)
+    # Only this admin's browser may keep it, and only while it is cached here
+    patch_cache_control(response, private=True, max_age=section_timeout())
+    return response
@@ -0,0 +1,318 @@
+"""
+Streaming anomaly detection
+
+Every deposit and withdrawal is scored once it commits, against
+per-account sliding windows held in memory:
+- count and amount moved in the last minute, hour and day
+- distance from the account's typical amount, tracked as an exponentially
+  weighted mean and variance
+- bursts of the same amount within a short window
+
+Each window is a deque with its count and sum kept up to date, so scoring
+a posting is O(1) amortised: one append, and evicting whatever fell out of
+the window. Memory is bounded. Each window holds at most MAX_EVENTS
+postings, and only the BANK_ANOMALY_MAX_ACCOUNTS most recently active
+accounts are kept (least recently used are dropped).
+
+The windows are a cache of the Transaction table. An account that is not
+in memory is rebuilt from its last day of transactions on its next
+posting. Each process keeps its own windows, so with several workers a
+window also picks up the other workers' postings whenever it is rebuilt.
+The rebuild queries run outside the detector's lock, so a slow one holds up
+only its own posting.
+
+Scoring runs after the posting has committed (score_committed), so a
+failure is logged rather than turned into an error for a posting that
+succeeded.
+"""
+import logging
+import math
+import threading
+from collections import Counter, OrderedDict, deque
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .models import AnomalyAlert, Transaction
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMITS = {
+    'windows': {
+        'minute': (60, 5, '100000.00'),
+        'hour': (3600, 20, '300000.00'),
+        'day': (86400, 50, '1000000.00'),
+    },
+    'deviation': 6.0,
+    'deviation_samples': 10,
+    'repeats': 3,
+    'repeat_seconds': 600,
+}
+
+# Cap per window, so one very busy account cannot grow without bound
+MAX_EVENTS = 1000
+
+# Postings used to seed the typical amount when an account is rebuilt
+BASELINE_SAMPLE = 50
+
+# Weight of the newest posting in the typical-amount average
+SMOOTHING = 0.1
+
+
+class SlidingWindow:
+    """Postings in the last `span`, with their count and total kept up to date"""
+    __slots__ = ('span', 'events', 'total')
+
+    def __init__(self, span):
+        self.span = span
+        self.events = deque()
+        self.total = Decimal('0.00')
+
+    def push(self, ts, key, amount):
+        self.events.append((ts, key, amount))
+        self.total += amount
+        if len(self.events) > MAX_EVENTS:
+            self._drop()
+
+    def evict(self, now):
+        cutoff = now - self.span
+        while self.events and self.events[0][0] <= cutoff:
+            self._drop()
+
+    def _drop(self):
+        _, key, amount = self.events.popleft()
+        self.total -= amount
+        return key
+
+    def __len__(self):
+        return len(self.events)
+
+
+class RepeatWindow(SlidingWindow):
+    """A sliding window that also counts how often each amount appears"""
+    __slots__ = ('counts',)
+
+    def __init__(self, span):
+        super().__init__(span)
+        self.counts = Counter()
+
+    def push(self, ts, key, amount):
+        self.counts[key] += 1
+        super().push(ts, key, amount)
+
+    def _drop(self):
+        key = super()._drop()
+        self.counts[key] -= 1
+        if not self.counts[key]:
+            del self.counts[key]
+        return key
+
+
+class AccountWindows:
+    """All sliding windows and the typical-amount statistics of one account"""
+    __slots__ = ('windows', 'repeats', 'samples', 'mean', 'variance')
+
+    def __init__(self, window_spans, repeat_span):
+        self.windows = {name: SlidingWindow(span) for name, span in window_spans.items()}
+        self.repeats = RepeatWindow(repeat_span)
+        self.samples = 0
+        self.mean = 0.0
+        self.variance = 0.0
+
+    def learn(self, amount):
+        """Fold an amount into the exponentially weighted mean and variance"""
+        value = float(amount)
+        self.samples += 1
+        if self.samples == 1:
+            self.mean = value
+            return
+        diff = value - self.mean
+        increment = SMOOTHING * diff
+        self.mean += increment
+        self.variance = (1 - SMOOTHING) * (self.variance + diff * increment)
+
+    def add(self, ts, transaction_type, amount):
+        for window in self.windows.values():
+            window.push(ts, None, amount)
+        self.repeats.push(ts, (transaction_type, amount), amount)
+
+    def evict(self, now):
+        for window in self.windows.values():
+            window.evict(now)
+        self.repeats.evict(now)
+
+
+class AnomalyDetector:
+    """Per-account windows for the postings this process has seen"""
+
+    def __init__(self, limits=None, max_accounts=10000):
+        limits = limits or DEFAULT_LIMITS
+        self.window_limits = {
+            name: (timedelta(seconds=seconds), count, Decimal(amount))
+            for name, (seconds, count, amount) in limits['windows'].items()
+        }
+        self.deviation = limits['deviation']
+        self.deviation_samples = limits['deviation_samples']
+        self.repeat_limit = limits['repeats']
+        self.repeat_span = timedelta(seconds=limits['repeat_seconds'])
+        self.max_accounts = max_accounts
+        self.accounts = OrderedDict()
+        self.lock = threading.Lock()
+
+    def new_windows(self):
+        return AccountWindows(
+            {name: span for name, (span, _, _) in self.window_limits.items()},
+            self.repeat_span,
+        )
+
+    def windows_for(self, account_id, before_id, now):
+        """
+        The account's windows, rebuilt from Transaction if not in memory
+
+        Called without self.lock: the rebuild queries run unlocked, and only
+        looking up and installing the windows take the lock. If another
+        thread installs the account's windows meanwhile, those are kept.
+        """
+        with self.lock:
+            windows = self.accounts.get(account_id)
+        if windows is None:
+            windows = self.rebuild(account_id, before_id, now)
+
+        with self.lock:
+            windows = self.accounts.setdefault(account_id, windows)
+            self.accounts.move_to_end(account_id)
+            if len(self.accounts) > self.max_accounts:
+                self.accounts.popitem(last=False)
+        return windows
+
+    def rebuild(self, account_id, before_id, now):
+        """Windows for an account from its postings before `before_id`"""
+        windows = self.new_windows()
+        postings = Transaction.objects.filter(account_id=account_id, id__lt=before_id).exclude(
+            status=Transaction.REJECTED
+        )
+        baseline = list(
+            postings.order_by('-timestamp', '-id').values_list('amount', flat=True)[:BASELINE_SAMPLE]
+        )
+        for amount in reversed(baseline):
+            windows.learn(amount)
+
+        longest = max([span for span, _, _ in self.window_limits.values()] + [self.repeat_span])
+        recent = postings.filter(timestamp__gt=now - longest).order_by('timestamp', 'id')
+        for ts, transaction_type, amount in recent.values_list('timestamp', 'transaction_type', 'amount'):
+            windows.add(ts, transaction_type, amount)
+        windows.evict(now)
+        return windows
+
+    def observe(self, account_id, transaction_id, ts, transaction_type, amount):
+        """
+        Score one posting and add it to the account's windows
+
+        Returns a list of (kind, score, detail) findings; empty if nothing
+        is unusual.
+        """
+        windows = self.windows_for(account_id, transaction_id, ts)
+        with self.lock:
+            windows.evict(ts)
+            findings = []
+
+            if windows.samples >= self.deviation_samples:
+                spread = max(math.sqrt(windows.variance), windows.mean * 0.05, 1.0)
+                deviations = abs(float(amount) - windows.mean) / spread
+                if deviations > self.deviation:
+                    findings.append((
+                        AnomalyAlert.AMOUNT_DEVIATION,
+                        deviations / self.deviation,
+                        f'₹{amount} is {deviations:.1f} standard deviations from the typical ₹{windows.mean:.2f}',
+                    ))
+
+            windows.learn(amount)
+            windows.add(ts, transaction_type, amount)
+
+            # Each limit alerts once, on the posting that crosses it, rather
+            # than on every posting while the window stays over it
+            for name, (_, count_limit, amount_limit) in self.window_limits.items():
+                window = windows.windows[name]
+                if len(window) == count_limit + 1:
+                    findings.append((
+                        AnomalyAlert.VELOCITY_COUNT,
+                        len(window) / count_limit,
+                        f'{len(window)} postings in the last {name} (limit {count_limit})',
+                    ))
+                if window.total > amount_limit >= window.total - amount:
+                    findings.append((
+                        AnomalyAlert.VELOCITY_AMOUNT,
+                        window.total / amount_limit,
+                        f'₹{window.total} moved in the last {name} (limit ₹{amount_limit})',
+                    ))
+
+            repeats = windows.repeats.counts[(transaction_type, amount)]
+            if repeats == self.repeat_limit:
+                findings.append((
+                    AnomalyAlert.REPEATED_AMOUNT,
+                    repeats / self.repeat_limit,
+                    f'{repeats} postings of exactly ₹{amount} within {int(self.repeat_span.total_seconds() // 60)} minutes',
+                ))
+            return findings
+
+    def clear(self):
+        """Forget every window; they are rebuilt from Transaction on demand"""
+        with self.lock:
+            self.accounts.clear()
+
+
+_detector = None
+
+
+def get_detector():
+    global _detector
+    if _detector is None:
+        _detector = AnomalyDetector(
+            getattr(settings, 'BANK_ANOMALY_LIMITS', DEFAULT_LIMITS),
+            getattr(settings, 'BANK_ANOMALY_MAX_ACCOUNTS', 10000),
+        )
+    return _detector
+
+
+@receiver(setting_changed)
+def _reset_detector(setting, **kwargs):
+    global _detector
+    if setting in ('BANK_ANOMALY_LIMITS', 'BANK_ANOMALY_MAX_ACCOUNTS'):
+        _detector = None
+
+
+def score_posting(txn):
+    """Score a committed posting and record an alert for each finding"""
+    findings = get_detector().observe(
+        txn.account_id, txn.id, txn.timestamp, txn.transaction_type, txn.amount
+    )
+    if findings:
+        AnomalyAlert.objects.bulk_create([
+            AnomalyAlert(
+                account_id=txn.account_id,
+                transaction_id=txn.id,
+                kind=kind,
+                score=Decimal(score).quantize(Decimal('0.01')),
+                detail=detail[:200],
+            )
+            for kind, score, detail in findings
+        ])
+    return findings
+
+
+def score_committed(txn):
+    """
+    score_posting() for an on_commit callback
+
+    The posting has already committed, so an error while scoring it is
+    logged instead of failing the request (or the other callbacks) after
+    the money has moved.
+    """
+    try:
+        return score_posting(txn)
+    except Exception:
+        logger.exception('Could not score transaction #%s for anomalies', txn.id)
+        return []
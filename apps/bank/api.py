@@ -0,0 +1,340 @@
+"""
+JSON API
+
+Plain Django views for mobile and partner clients:
+- GET  api/account/        the account summary
+- GET  api/transactions/   transactions, newest first, cursor-paginated
+- POST api/deposit/ and api/withdraw/   post through the posting service;
+  an Idempotency-Key header makes retries safe (idempotency.py)
+- POST api/batch/          many postings across accounts in one call
+  (batch.py); needs a bank manager's token, and is made safe to retry
+  by an Idempotency-Key header the same way
+
+Clients authenticate with an `Authorization: Bearer <token>` header
+(ApiToken). These views never touch request.user, the session or messages,
+so an API request costs no session lookup: the one token lookup also loads
+the user and their account.
+
+GET responses carry an ETag built from the account's cache version
+(page_cache.py), which every change to the account or its transactions
+moves on. A poll that sends it back in If-None-Match gets 304 Not Modified
+after that single lookup, without reading the transactions table.
+"""
+import base64
+import binascii
+import hashlib
+import json
+import secrets
+from datetime import datetime
+from functools import wraps
+
+from django.conf import settings
+from django.db.models import Q
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from . import batch
+from .idempotency import IdempotencyError, find_key, post_once, replay, request_hash, request_key
+from .models import ApiToken, Transaction
+from .services import PostingError, deposit, parse_amount, withdraw
+
+TOKEN_PREFIX_LENGTH = 8
+
+
+def hash_token(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def create_token(user, name=''):
+    """Create an ApiToken; returns (token row, plain token). Only the hash is stored."""
+    token = secrets.token_urlsafe(32)
+    row = ApiToken.objects.create(
+        user=user, name=name, key_hash=hash_token(token), prefix=token[:TOKEN_PREFIX_LENGTH]
+    )
+    return row, token
+
+
+def _error(status, message, **headers):
+    response = JsonResponse({'error': message}, status=status)
+    for name, value in headers.items():
+        response[name.replace('_', '-')] = value
+    return response
+
+
+def _authenticate(request):
+    """(ApiToken with its user and account, None) or (None, error response)"""
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not token.strip():
+        return None, _error(401, 'Authentication required.', WWW_Authenticate='Bearer')
+
+    row = (
+        ApiToken.objects.select_related('user__account', 'user__manager_profile')
+        .filter(key_hash=hash_token(token.strip()))
+        .first()
+    )
+    if row is None or not row.user.is_active:
+        return None, _error(401, 'Invalid token.', WWW_Authenticate='Bearer error="invalid_token"')
+    return row, None
+
+
+def token_required(view):
+    """
+    Authenticate with a bearer token; sets request.api_user and request.api_account
+
+    Token-authenticated requests cannot be forged cross-site, so CSRF
+    checks are skipped.
+    """
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        row, error = _authenticate(request)
+        if error:
+            return error
+        if not hasattr(row.user, 'account'):
+            return _error(403, 'This user has no bank account.')
+
+        request.api_user = row.user
+        request.api_account = row.user.account
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def manager_token_required(view):
+    """Like token_required, for endpoints that post to other customers' accounts"""
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        row, error = _authenticate(request)
+        if error:
+            return error
+        if not hasattr(row.user, 'manager_profile'):
+            return _error(403, 'This endpoint needs a bank manager\'s token.')
+
+        request.api_user = row.user
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def account_etag(account, *extra):
+    """Validator for anything derived from `account`; `extra` adds request parameters"""
+    parts = ['api', account.pk, account.version, *extra]
+    return quote_etag(hashlib.sha256('|'.join(str(part) for part in parts).encode()).hexdigest()[:32])
+
+
+def _conditional(request, account, build, *extra):
+    """
+    304 if the client's copy is current, otherwise build() the response
+
+    Either way the response carries the ETag.
+    """
+    etag = account_etag(account, *extra)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = build()
+    response['ETag'] = etag
+    # Cache, but ask us every time: the validators make that cheap
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _account_json(account):
+    return {
+        'account_number': account.account_number,
+        'status': account.status,
+        'tier': account.tier,
+        'balance': str(account.balance),
+        'available_balance': str(account.available_balance),
+        'last_activity': account.last_activity.isoformat(),
+    }
+
+
+TRANSACTION_FIELDS = ['id', 'transaction_type', 'amount', 'balance_after', 'status',
+                      'description', 'review_reason', 'timestamp']
+
+
+def _transaction_json(row):
+    return {
+        'id': row['id'],
+        'type': row['transaction_type'],
+        'amount': str(row['amount']),
+        'balance_after': str(row['balance_after']),
+        'status': row['status'],
+        'description': row['description'] or '',
+        'review_reason': row['review_reason'],
+        'timestamp': row['timestamp'].isoformat(),
+    }
+
+
+def encode_cursor(row):
+    raw = f"{row['timestamp'].isoformat()}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(timestamp, id) of the last transaction on the previous page; ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        timestamp, txn_id = raw.split('|')
+        return datetime.fromisoformat(timestamp), int(txn_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as error:
+        raise ValueError('Invalid cursor.') from error
+
+
+@require_GET
+@token_required
+def account_view(request):
+    account = request.api_account
+    return _conditional(request, account, lambda: JsonResponse({'account': _account_json(account)}))
+
+
+@require_GET
+@token_required
+def transactions_view(request):
+    """
+    Transactions newest first, `limit` per page
+
+    Pass the returned next_cursor back as `cursor` for the next page. Pages
+    are keyset-paginated on (timestamp, id), the ledger order index, so a
+    deep page costs the same as the first.
+    """
+    account = request.api_account
+    default_size = getattr(settings, 'BANK_API_PAGE_SIZE', 50)
+    max_size = getattr(settings, 'BANK_API_MAX_PAGE_SIZE', 200)
+    cursor = request.GET.get('cursor', '')
+    try:
+        limit = int(request.GET.get('limit', default_size))
+        if cursor:
+            after_timestamp, after_id = decode_cursor(cursor)
+    except ValueError:
+        return _error(400, 'limit must be a number and cursor a value returned by this endpoint.')
+    limit = min(max(limit, 1), max_size)
+
+    def build():
+        page = Transaction.objects.filter(account=account).order_by('-timestamp', '-id')
+        if cursor:
+            page = page.filter(
+                Q(timestamp__lt=after_timestamp) | Q(timestamp=after_timestamp, id__lt=after_id)
+            )
+        rows = list(page.values(*TRANSACTION_FIELDS)[:limit + 1])
+        more = len(rows) > limit
+        rows = rows[:limit]
+        return JsonResponse({
+            'transactions': [_transaction_json(row) for row in rows],
+            'next_cursor': encode_cursor(rows[-1]) if more else None,
+        })
+
+    return _conditional(request, account, build, cursor, limit)
+
+
+def _parse_posting(request):
+    """(amount, raw amount, description) from a JSON body; ValueError with a message if invalid"""
+    try:
+        payload = json.loads(request.body or b'{}')
+    except ValueError:
+        raise ValueError('The request body must be JSON.')
+    if not isinstance(payload, dict):
+        raise ValueError('The request body must be a JSON object.')
+
+    raw_amount = str(payload.get('amount', '')).strip()
+    try:
+        amount = parse_amount(raw_amount)
+    except PostingError as error:
+        raise ValueError(str(error))
+    description = str(payload.get('description') or '').strip()[:200]
+    return amount, raw_amount, description
+
+
+def _posting_view(request, transaction_type, post):
+    account = request.api_account
+    try:
+        amount, raw_amount, description = _parse_posting(request)
+    except ValueError as error:
+        return _error(400, str(error))
+
+    try:
+        key = request_key(request)
+        fingerprint = request_hash(transaction_type, raw_amount, description)
+        previous = find_key(request.api_user, key)
+        if previous:
+            posted, replayed = replay(previous, fingerprint), True
+        else:
+            posted, replayed = post_once(
+                request.api_user, key, fingerprint, lambda: post(account, amount, description)
+            )
+    except IdempotencyError as error:
+        return _error(409, str(error))
+    except PostingError as error:
+        return _error(422, str(error))
+
+    # 201 when the money moved, 202 when it waits for a manager
+    if replayed:
+        status = 200
+    elif posted.status == Transaction.PENDING:
+        status = 202
+    else:
+        status = 201
+    row = {field: getattr(posted, field) for field in TRANSACTION_FIELDS}
+    response = JsonResponse({'transaction': _transaction_json(row)}, status=status)
+    if replayed:
+        response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+@require_POST
+@token_required
+def deposit_view(request):
+    return _posting_view(request, Transaction.DEPOSIT, deposit)
+
+
+@require_POST
+@token_required
+def withdraw_view(request):
+    return _posting_view(request, Transaction.WITHDRAW, withdraw)
+
+
+@require_POST
+@manager_token_required
+def batch_view(request):
+    """
+    Post many deposits and withdrawals across accounts (batch.py)
+
+    The body is JSON - a list of {"account_number", "type", "amount",
+    "description"} objects - or, with Content-Type text/csv, a CSV with
+    those columns. Answers 200 with a result per posting, in input order.
+
+    With an Idempotency-Key header the whole batch posts in one database
+    transaction together with the key, and a retry gets the original answer
+    back (with an Idempotent-Replayed header) instead of posting again.
+    """
+    def post():
+        if request.content_type == 'text/csv':
+            rows = batch.read_csv(request.body)
+        else:
+            rows = batch.read_json(request.body)
+        items = batch.post_batch(rows)
+        return {
+            'summary': batch.summarize(items),
+            'results': [item.as_json() for item in items],
+        }
+
+    try:
+        key = request_key(request)
+        # The body as sent, so a retry is recognised before it is parsed
+        fingerprint = request_hash('BATCH', request.content_type, hashlib.sha256(request.body).hexdigest())
+        previous = find_key(request.api_user, key)
+        if previous:
+            answer, replayed = replay(previous, fingerprint), True
+        else:
+            answer, replayed = post_once(request.api_user, key, fingerprint, post, field='response')
+    except IdempotencyError as error:
+        return _error(409, str(error))
+    except batch.BatchError as error:
+        return _error(400, str(error))
+
+    response = JsonResponse(answer)
+    if replayed:
+        response['Idempotent-Replayed'] = 'true'
+    return response
@@ -0,0 +1,57 @@
+"""
+Approval decisions
+
+Who approved or rejected a transaction, and their note, are stored in
+TransactionApproval, a one-to-one side table, instead of on the
+transaction row. Most transactions never need approval, and the queries
+that scan transactions (history pages, totals, reconciliation) never read
+these columns, so keeping them out of the row keeps it narrow.
+
+- record() stores decisions for many transactions in one upsert
+- add_notes() appends to existing notes, as settlement does when it
+  rejects an approved transaction
+- pages showing decisions load them with select_related('approval');
+  a transaction without one has no row, and reading .approval raises
+  TransactionApproval.DoesNotExist (use decision_of())
+"""
+from .bulk import BULK_CREATE_BATCH_SIZE
+from .models import TransactionApproval
+
+
+def record(transaction_ids, user, note=''):
+    """Record `user`'s decision, with `note`, on each of `transaction_ids`"""
+    TransactionApproval.objects.bulk_create(
+        [TransactionApproval(transaction_id=txn_id, approved_by=user, note=note) for txn_id in transaction_ids],
+        batch_size=BULK_CREATE_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['transaction'],
+        update_fields=['approved_by', 'note'],
+    )
+
+
+def add_notes(notes):
+    """Append notes ({transaction id: note}) to the transactions' decisions"""
+    existing = dict(
+        TransactionApproval.objects.filter(transaction_id__in=list(notes)).values_list('transaction_id', 'note')
+    )
+    TransactionApproval.objects.bulk_create(
+        [
+            TransactionApproval(
+                transaction_id=txn_id,
+                note=f'{existing[txn_id]}\n{note}' if existing.get(txn_id) else note,
+            )
+            for txn_id, note in notes.items()
+        ],
+        batch_size=BULK_CREATE_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['transaction'],
+        update_fields=['note'],
+    )
+
+
+def decision_of(txn):
+    """The TransactionApproval of `txn`, or None"""
+    try:
+        return txn.approval
+    except TransactionApproval.DoesNotExist:
+        return None
@@ -1,6 +1,23 @@
 from django.apps import AppConfig
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_migrate
+
+
+def repair_search_indexes(sender, using=DEFAULT_DB_ALIAS, verbosity=1, **kwargs):
+    """Rebuild search indexes whose triggers a table rewrite dropped (search.py)"""
+    if using != DEFAULT_DB_ALIAS:
+        return
+    from .search import repair_indexes
+    for table in repair_indexes():
+        if verbosity >= 1:
+            print(f'  Rebuilt search index {table}: a migration had dropped its triggers')
 
 
 class BankConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.bank'
+
+    def ready(self):
+        # Modules with derived tables register their ledger replay projections on import
+        from . import snapshots  # noqa: F401
+        post_migrate.connect(repair_search_indexes, sender=self)
@@ -0,0 +1,375 @@
+"""
+Batch postings
+
+post_batch() applies many deposits and withdrawals across many accounts in
+one call, e.g. a partner's payroll run, and reports a result per item.
+Each posting gets the same decisions as one made through services.py:
+posting rules, withdrawal limits, funds and holds, daily counters,
+journal entry and anomaly scoring.
+
+- every item is validated in one pass first, and account numbers are
+  resolved with a handful of IN queries; invalid items are reported and
+  skipped
+- valid items are grouped by account and applied in account-id order, in
+  database transactions of about BANK_BATCH_CHUNK_SIZE postings. An account
+  is never split across two transactions
+- within a transaction the accounts and today's counters rows are locked
+  and read once; postings are decided in memory in input order, and the
+  results written with a fixed number of bulk statements
+
+Transactions commit independently: if a later chunk fails, the earlier
+ones stay posted, and each applied item carries its transaction id. A batch
+sent with an Idempotency-Key (api.batch_view) runs inside the key's one
+transaction instead, so a retry finds it either fully posted or not at all.
+"""
+import csv
+import io
+import json
+from collections import defaultdict
+from functools import partial
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .anomaly import score_committed
+from .bulk import BULK_CREATE_BATCH_SIZE, bulk_set
+from .holds import hold_duration
+from .journal import deposit_lines, record_entries, withdrawal_lines
+from .ledger import ZERO
+from .limits import limit_error, limits_for
+from .models import Account, AccountDailyTotals, Hold, JournalEntry, Transaction
+from .rules import PostingContext, review_reason
+from .services import PostingError, parse_amount
+
+COMPLETED = 'completed'
+PENDING = 'pending'
+REFUSED = 'refused'
+INVALID = 'invalid'
+
+CSV_COLUMNS = ['account_number', 'type', 'amount', 'description']
+
+TYPES = {
+    'deposit': Transaction.DEPOSIT,
+    'withdraw': Transaction.WITHDRAW,
+    'withdrawal': Transaction.WITHDRAW,
+}
+
+FROZEN_ERROR = 'The account is frozen.'
+
+
+class BatchError(Exception):
+    """The batch as a whole cannot be read; the message is safe to show"""
+
+
+def chunk_size():
+    return getattr(settings, 'BANK_BATCH_CHUNK_SIZE', 500)
+
+
+def max_items():
+    return getattr(settings, 'BANK_BATCH_MAX_ITEMS', 10000)
+
+
+def read_json(body):
+    """Rows from a JSON body: a list of postings, or {"postings": [...]}"""
+    try:
+        payload = json.loads(body or b'null')
+    except ValueError:
+        raise BatchError('The request body must be JSON.')
+    if isinstance(payload, dict):
+        payload = payload.get('postings')
+    if not isinstance(payload, list):
+        raise BatchError('Send a list of postings, or an object with a "postings" list.')
+    return payload
+
+
+def read_csv(body):
+    """Rows from a CSV body with a header line naming CSV_COLUMNS"""
+    try:
+        text = body.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise BatchError('The CSV must be UTF-8 encoded.')
+    reader = csv.DictReader(io.StringIO(text))
+    missing = set(CSV_COLUMNS[:3]) - set(reader.fieldnames or [])
+    if missing:
+        raise BatchError(f'The CSV header must include {", ".join(CSV_COLUMNS[:3])}.')
+    return list(reader)
+
+
+class BatchItem:
+    """One posting of a batch and, once applied, its result"""
+    __slots__ = ('index', 'account_number', 'transaction_type', 'amount', 'description',
+                 'account_id', 'result', 'error', 'transaction')
+
+    def __init__(self, index, account_number='', transaction_type='', amount=None, description=''):
+        self.index = index
+        self.account_number = account_number
+        self.transaction_type = transaction_type
+        self.amount = amount
+        self.description = description
+        self.account_id = None
+        self.result = None
+        self.error = ''
+        self.transaction = None
+
+    def refuse(self, result, error):
+        self.result = result
+        self.error = error
+
+    def as_json(self):
+        data = {'index': self.index, 'account_number': self.account_number, 'result': self.result}
+        if self.transaction is not None:
+            data['transaction_id'] = self.transaction.id
+        if self.error:
+            data['error'] = self.error
+        return data
+
+
+def validate(rows):
+    """
+    BatchItems for `rows` (dicts), in order
+
+    Items that cannot be posted at all - a missing field, a bad amount, an
+    unknown account - come back already marked INVALID.
+    """
+    if len(rows) > max_items():
+        raise BatchError(f'A batch can have at most {max_items()} postings.')
+
+    items = []
+    for index, row in enumerate(rows):
+        item = BatchItem(index)
+        items.append(item)
+        if not isinstance(row, dict):
+            item.refuse(INVALID, 'Each posting must be an object.')
+            continue
+        item.account_number = str(row.get('account_number') or '').strip()
+        item.description = str(row.get('description') or '').strip()[:200]
+        item.transaction_type = TYPES.get(str(row.get('type') or '').strip().lower(), '')
+        if not item.account_number:
+            item.refuse(INVALID, 'account_number is required.')
+        elif not item.transaction_type:
+            item.refuse(INVALID, 'type must be "deposit" or "withdraw".')
+        else:
+            try:
+                item.amount = parse_amount(row.get('amount', ''))
+            except PostingError as error:
+                item.refuse(INVALID, str(error))
+
+    numbers = sorted({item.account_number for item in items if item.result is None})
+    account_ids = {}
+    for start in range(0, len(numbers), BULK_CREATE_BATCH_SIZE):
+        account_ids.update(
+            Account.objects.filter(account_number__in=numbers[start:start + BULK_CREATE_BATCH_SIZE])
+            .values_list('account_number', 'id')
+        )
+    for item in items:
+        if item.result is None:
+            item.account_id = account_ids.get(item.account_number)
+            if item.account_id is None:
+                item.refuse(INVALID, 'Unknown account number.')
+    return items
+
+
+def post_batch(rows, size=None):
+    """
+    Validate and apply `rows`; returns the BatchItems in input order
+
+    Each item ends up COMPLETED, PENDING (sent for approval, like any
+    posting that matches a rule), REFUSED (frozen account, insufficient
+    funds, over a limit) or INVALID.
+    """
+    size = size or chunk_size()
+    items = validate(rows)
+    by_account = defaultdict(list)
+    for item in items:
+        if item.result is None:
+            by_account[item.account_id].append(item)
+
+    chunk, chunk_items = [], 0
+    for account_id in sorted(by_account):
+        chunk.append(account_id)
+        chunk_items += len(by_account[account_id])
+        if chunk_items >= size:
+            _apply_accounts(chunk, by_account)
+            chunk, chunk_items = [], 0
+    if chunk:
+        _apply_accounts(chunk, by_account)
+    return items
+
+
+def summarize(items):
+    """Count of items per result"""
+    counts = {COMPLETED: 0, PENDING: 0, REFUSED: 0, INVALID: 0}
+    for item in items:
+        counts[item.result] += 1
+    return counts
+
+
+def _month_withdrawals(account_ids, today):
+    """Withdrawals so far this month before today, per account, from the counters"""
+    totals = defaultdict(lambda: ZERO)
+    rows = AccountDailyTotals.objects.filter(
+        account_id__in=account_ids, day__gte=today.replace(day=1), day__lt=today
+    ).values_list('account_id', 'withdrawal_total')
+    for account_id, total in rows:
+        totals[account_id] += total
+    return totals
+
+
+def _apply_accounts(account_ids, by_account):
+    """Apply the items of `account_ids` in one database transaction"""
+    now = timezone.now()
+    today = timezone.localdate(now)
+
+    with transaction.atomic():
+        # Creating any missing counters rows is the first statement, so on
+        # SQLite the write lock is taken before anything is read
+        AccountDailyTotals.objects.bulk_create(
+            [AccountDailyTotals(account_id=account_id, day=today) for account_id in account_ids],
+            ignore_conflicts=True,
+        )
+        # Counters rows first, then accounts, both in id order: the same
+        # order as single postings, so the two cannot deadlock
+        counters = {
+            row.account_id: row
+            for row in AccountDailyTotals.objects.select_for_update()
+            .filter(account_id__in=account_ids, day=today)
+            .order_by('account_id')
+        }
+        accounts = {
+            account.id: account
+            for account in Account.objects.select_for_update()
+            .filter(id__in=account_ids)
+            .order_by('id')
+            .only('id', 'balance', 'available_balance', 'status', 'tier', 'created_at', 'last_activity',
+                  'version')
+        }
+        month_before_today = _month_withdrawals(account_ids, today)
+
+        completed, pending = [], []
+        for account_id in account_ids:
+            _decide(
+                accounts[account_id], counters[account_id], month_before_today[account_id],
+                by_account[account_id], now, completed, pending,
+            )
+        _write(completed, pending, accounts, counters, account_ids, now)
+
+    posted = [item.transaction for item in completed + pending]
+    transaction.on_commit(partial(_score, posted))
+
+
+def _decide(account, counters, month_before_today, items, now, completed, pending):
+    """
+    Decide one account's items in order, moving the in-memory account and
+    counters as each one is accepted
+    """
+    daily_limit, monthly_limit = limits_for(account.tier)
+    for item in items:
+        amount = item.amount
+        withdrawing = item.transaction_type == Transaction.WITHDRAW
+        prefix = 'withdrawal' if withdrawing else 'deposit'
+
+        if account.status != Account.ACTIVE:
+            item.refuse(REFUSED, FROZEN_ERROR)
+            continue
+        if withdrawing:
+            daily_used = counters.withdrawal_total
+            monthly_used = month_before_today + daily_used
+            error = limit_error(amount, {
+                'daily_limit': daily_limit,
+                'daily_remaining': max(daily_limit - daily_used, ZERO),
+                'monthly_limit': monthly_limit,
+                'monthly_remaining': max(monthly_limit - monthly_used, ZERO),
+            })
+            if not error and account.available_balance < amount:
+                error = f'Insufficient funds. The available balance is ₹{account.available_balance}.'
+            if error:
+                item.refuse(REFUSED, error)
+                continue
+
+        reason = review_reason(PostingContext(
+            item.transaction_type,
+            amount,
+            account.status,
+            account.created_at,
+            now,
+            count_today=getattr(counters, f'{prefix}_count'),
+            total_today=getattr(counters, f'{prefix}_total'),
+        ))
+        if reason:
+            # The balance moves at settlement; a withdrawal reserves its amount now
+            if withdrawing:
+                account.available_balance -= amount
+            item.transaction = _transaction(account, item, Transaction.PENDING, reason[:200])
+            item.result = PENDING
+            pending.append(item)
+        else:
+            delta = -amount if withdrawing else amount
+            account.balance += delta
+            account.available_balance += delta
+            account.last_activity = now
+            item.transaction = _transaction(account, item, Transaction.COMPLETED)
+            item.result = COMPLETED
+            completed.append(item)
+
+        setattr(counters, f'{prefix}_count', getattr(counters, f'{prefix}_count') + 1)
+        setattr(counters, f'{prefix}_total', getattr(counters, f'{prefix}_total') + amount)
+
+
+def _transaction(account, item, status, reason=''):
+    default = 'Deposit' if item.transaction_type == Transaction.DEPOSIT else 'Withdrawal'
+    return Transaction(
+        account_id=account.id,
+        transaction_type=item.transaction_type,
+        amount=item.amount,
+        balance_after=account.balance,
+        status=status,
+        description=item.description or default,
+        review_reason=reason,
+    )
+
+
+def _write(completed, pending, accounts, counters, account_ids, now):
+    entries = record_entries([
+        (
+            JournalEntry.DEPOSIT, item.transaction.description,
+            deposit_lines(item.account_id, item.amount),
+        ) if item.transaction_type == Transaction.DEPOSIT else (
+            JournalEntry.WITHDRAW, item.transaction.description,
+            withdrawal_lines(item.account_id, item.amount),
+        )
+        for item in completed
+    ]) if completed else []
+    for item, entry in zip(completed, entries):
+        item.transaction.journal_entry_id = entry.id
+
+    # In input order per account, so ledger order (timestamp, id) matches it
+    created = sorted(completed + pending, key=lambda item: (item.account_id, item.index))
+    objs = [item.transaction for item in created]
+    if connection.features.can_return_rows_from_bulk_insert:
+        Transaction.objects.bulk_create(objs, batch_size=BULK_CREATE_BATCH_SIZE)
+    else:
+        # Holds and anomaly scoring need the ids, which this backend cannot
+        # return in bulk
+        for obj in objs:
+            obj.save()
+
+    expires_at = now + hold_duration()
+    Hold.objects.bulk_create([
+        Hold(account_id=item.account_id, transaction=item.transaction, amount=item.amount,
+             expires_at=expires_at)
+        for item in pending if item.transaction_type == Transaction.WITHDRAW
+    ], batch_size=BULK_CREATE_BATCH_SIZE)
+
+    # Absolute values are safe: the rows are locked until commit
+    for account_id in account_ids:
+        accounts[account_id].version += 1
+    bulk_set(Account, [accounts[account_id] for account_id in account_ids],
+             ['balance', 'available_balance', 'last_activity', 'version'])
+    bulk_set(AccountDailyTotals, [counters[account_id] for account_id in account_ids],
+             ['deposit_count', 'deposit_total', 'withdrawal_count', 'withdrawal_total'])
+
+
+def _score(posted):
+    for txn in posted:
+        score_committed(txn)
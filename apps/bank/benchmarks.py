@@ -0,0 +1,771 @@
+"""
+Benchmarks for hot paths
+
+Run with `python manage.py benchmark [scenario ...]`. A scenario is a
+function registered with @scenario that returns (label, value) rows for
+the command to print. Scenarios that write run inside a database
+transaction that is rolled back afterwards, so they can be run against a
+real database without leaving anything behind.
+"""
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count, Q, Sum
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .anomaly import MAX_EVENTS, AnomalyDetector
+from . import admin_views, stats
+from .batch import post_batch
+from .bulk import BULK_CREATE_BATCH_SIZE
+from .api import create_token
+from .models import (
+    Account, BankManager, BulkJob, ManagerAction, StandingInstruction, Transaction, TransactionApproval
+)
+from . import bulk_actions, search
+from .rules import PostingContext, compile_rules, get_rules, review_reason
+from .scheduled import batch_size, due_instructions, lease_duration, run_due
+from .services import deposit
+from .work_queue import claim_rows
+
+SCENARIOS = {}
+
+
+def scenario(name, writes=False):
+    """Register a benchmark scenario under `name`"""
+    def register(func):
+        SCENARIOS[name] = (func, writes)
+        return func
+    return register
+
+
+def per_call(func, repeat):
+    """Average wall time of func() in microseconds"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1_000_000
+
+
+class QueryCounter:
+    """
+    Counts queries via connection.execute_wrapper(); unlike
+    CaptureQueriesContext it has no cap on how many it can count
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class _Rollback(Exception):
+    pass
+
+
+def run(name, repeat):
+    """Run one scenario; returns its (label, value) rows"""
+    func, writes = SCENARIOS[name]
+    if not writes:
+        return func(repeat)
+    rows = []
+    try:
+        with transaction.atomic():
+            rows = func(repeat)
+            raise _Rollback
+    except _Rollback:
+        pass
+    return rows
+
+
+def benchmark_user(username='benchmark-user'):
+    """A throwaway customer (with its auto-created account) for write scenarios"""
+    user = User.objects.create_user(username=username, password=None)
+    return user, user.account
+
+
+@scenario('rules')
+def rules_scenario(repeat):
+    config = getattr(settings, 'BANK_POSTING_RULES', [])
+    rules = get_rules()
+    now = timezone.now()
+    opened = now - timedelta(days=365)
+    clean = PostingContext(Transaction.WITHDRAW, Decimal('1500.00'), Account.ACTIVE, opened, now,
+                           count_today=2, total_today=Decimal('4000.00'))
+    flagged = PostingContext(Transaction.WITHDRAW, Decimal('75000.00'), Account.ACTIVE, opened, now)
+
+    return [
+        ('rules configured', len(rules)),
+        ('compile rules (µs)', f'{per_call(lambda: compile_rules(config), max(repeat // 100, 1)):.2f}'),
+        ('evaluate, no rule matches (µs)', f'{per_call(lambda: review_reason(clean), repeat):.2f}'),
+        ('evaluate, first rule matches (µs)', f'{per_call(lambda: review_reason(flagged), repeat):.2f}'),
+    ]
+
+
+@scenario('posting', writes=True)
+def posting_scenario(repeat):
+    _, account = benchmark_user()
+    repeat = min(repeat, 500)
+    amount = Decimal('10.00')
+    with CaptureQueriesContext(connection) as queries:
+        deposit(account, amount)
+    per_deposit = per_call(lambda: deposit(account, amount), repeat)
+    return [
+        ('queries per deposit', len(queries)),
+        ('deposit, end to end (µs)', f'{per_deposit:.0f}'),
+    ]
+
+
+@scenario('anomaly')
+def anomaly_scenario(repeat):
+    """observe() cost with nearly empty and with full windows: both should be flat"""
+    rows = []
+    for prefilled in (0, MAX_EVENTS):
+        detector = AnomalyDetector()
+        detector.accounts[1] = detector.new_windows()
+        ts = timezone.now()
+        for _ in range(prefilled):
+            ts += timedelta(seconds=1)
+            detector.accounts[1].add(ts, Transaction.DEPOSIT, Decimal('250.00'))
+
+        amounts = [Decimal(100 + step % 997) for step in range(repeat)]
+        started = time.perf_counter()
+        for amount in amounts:
+            ts += timedelta(seconds=1)
+            detector.observe(1, 0, ts, Transaction.WITHDRAW, amount)
+        elapsed = (time.perf_counter() - started) / repeat * 1_000_000
+        rows.append((f'observe, {prefilled} postings in window (µs)', f'{elapsed:.2f}'))
+    return rows
+
+
+# Batches actually paid by the 'scheduled' scenario; the rest of the due
+# instructions only take part in claiming
+SCHEDULED_SAMPLE_BATCHES = 5
+
+
+@scenario('scheduled', writes=True)
+def scheduled_scenario(repeat):
+    """
+    `repeat` standing transfers all due at the same moment
+    (e.g. --repeat 500000). Claiming a batch should cost the same however
+    many are due; paying is timed on a sample of batches and projected.
+    """
+    _, payer = benchmark_user()
+    _, payee = benchmark_user('benchmark-payee')
+    Account.objects.filter(pk=payer.pk).update(
+        balance=Decimal('1000000000.00'),
+        available_balance=Decimal('1000000000.00'),
+        created_at=timezone.now() - timedelta(days=365),
+    )
+    payer.refresh_from_db()
+
+    now = timezone.now()
+    started = time.perf_counter()
+    for offset in range(0, repeat, BULK_CREATE_BATCH_SIZE):
+        StandingInstruction.objects.bulk_create([
+            StandingInstruction(
+                account=payer, kind=StandingInstruction.TRANSFER, to_account=payee,
+                amount=Decimal('1.00'), frequency=StandingInstruction.MONTHLY,
+                starts_at=now, next_run_at=now,
+            )
+            for _ in range(min(BULK_CREATE_BATCH_SIZE, repeat - offset))
+        ])
+    created = time.perf_counter() - started
+
+    size = batch_size()
+    started = time.perf_counter()
+    claimed = claim_rows(due_instructions(now), 'claimed_by', 'claim_expires_at', 'benchmark', size, lease_duration())
+    claim_ms = (time.perf_counter() - started) * 1000
+    StandingInstruction.objects.filter(id__in=claimed).update(claimed_by=None, claim_expires_at=None)
+
+    # One payer pays everything, so the per-day rules and limits are switched
+    # off: every payment takes the full posting path
+    with override_settings(BANK_POSTING_RULES=[], BANK_WITHDRAWAL_LIMITS={
+        Account.STANDARD: ('1000000000.00', '1000000000.00'),
+    }):
+        queries = QueryCounter()
+        with connection.execute_wrapper(queries):
+            started = time.perf_counter()
+            stats = run_due(now, size, 'benchmark', max_batches=SCHEDULED_SAMPLE_BATCHES)
+            paying = time.perf_counter() - started
+    per_instruction = paying / max(stats['instructions'], 1)
+
+    return [
+        ('instructions due', repeat),
+        ('create instructions (s)', f'{created:.1f}'),
+        (f'claim a batch of {size} (ms)', f'{claim_ms:.1f}'),
+        ('instructions paid in sample', stats['paid']),
+        ('queries per instruction', f"{queries.count / max(stats['instructions'], 1):.1f}"),
+        ('pay one instruction (ms)', f'{per_instruction * 1000:.2f}'),
+        ('projected run, one worker (s)', f'{per_instruction * repeat:.0f}'),
+    ]
+
+
+# Accounts the 'batch' scenario spreads its postings over
+BATCH_ACCOUNTS = 100
+
+
+@scenario('batch', writes=True)
+def batch_scenario(repeat):
+    """
+    The same deposits posted one request at a time through deposit_view,
+    and as one post_batch() call across BATCH_ACCOUNTS accounts
+    """
+    repeat = min(repeat, 5000)
+    user, account = benchmark_user()
+    accounts = [account] + [benchmark_user(f'benchmark-user-{n}')[1] for n in range(1, BATCH_ACCOUNTS)]
+    amount = Decimal('10.00')
+
+    hosts = [host for host in settings.ALLOWED_HOSTS if host not in ('*', '')] or ['localhost']
+    client = Client(HTTP_HOST=hosts[0].lstrip('.'))
+    client.force_login(user)
+    single = min(repeat, 500)
+    started = time.perf_counter()
+    for _ in range(single):
+        client.post(reverse('bank:deposit'), {'amount': amount, 'description': 'Benchmark'})
+    per_view = (time.perf_counter() - started) / single
+    view_completed = account.transactions.count()
+
+    rows = [
+        {'account_number': accounts[n % BATCH_ACCOUNTS].account_number, 'type': 'deposit',
+         'amount': str(amount), 'description': 'Benchmark'}
+        for n in range(repeat)
+    ]
+    queries = QueryCounter()
+    with connection.execute_wrapper(queries):
+        started = time.perf_counter()
+        items = post_batch(rows)
+        per_item = (time.perf_counter() - started) / repeat
+
+    return [
+        ('deposit_view postings completed', view_completed),
+        ('deposit_view, per posting (µs)', f'{per_view * 1_000_000:.0f}'),
+        (f'post_batch of {repeat}, per posting (µs)', f'{per_item * 1_000_000:.0f}'),
+        ('post_batch queries', queries.count),
+        ('post_batch postings completed', sum(item.transaction is not None for item in items)),
+        ('speed-up', f'{per_view / per_item:.1f}x'),
+    ]
+
+
+# Concurrent page loads in the 'stats' burst
+STATS_BURST_THREADS = 16
+
+
+@scenario('stats')
+def stats_scenario(repeat):
+    """
+    Dashboard statistics: one recomputation, a cached read, and bursts of
+    concurrent requests on a cold and on an expired cache, which should
+    each recompute once
+    """
+    queries = QueryCounter()
+    with connection.execute_wrapper(queries):
+        started = time.perf_counter()
+        stats.compute()
+        compute_ms = (time.perf_counter() - started) * 1000
+
+    stats.clear()
+    stats.dashboard_stats()
+    cached = per_call(stats.dashboard_stats, repeat)
+
+    computed = []
+    original = stats.compute
+
+    def counting_compute(*args, **kwargs):
+        computed.append(1)
+        return original(*args, **kwargs)
+
+    def burst():
+        barrier = threading.Barrier(STATS_BURST_THREADS)
+
+        def load():
+            barrier.wait()
+            try:
+                stats.dashboard_stats()
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=load) for _ in range(STATS_BURST_THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    stats.compute = counting_compute
+    try:
+        stats.clear()
+        burst()
+        cold = len(computed)
+        # Expire the numbers but keep them, as after the TTL passes
+        entry = stats.cache().get(stats.CACHE_KEY)
+        entry['fresh_until'] = 0
+        stats.cache().set(stats.CACHE_KEY, entry)
+        burst()
+        expired = len(computed) - cold
+    finally:
+        stats.compute = original
+
+    return [
+        ('queries per recomputation', queries.count),
+        ('recompute (ms)', f'{compute_ms:.1f}'),
+        ('cached read (µs)', f'{cached:.1f}'),
+        (f'recomputations, burst of {STATS_BURST_THREADS}, cold', cold),
+        (f'recomputations, burst of {STATS_BURST_THREADS}, expired', expired),
+    ]
+
+
+def view_targets(customer, manager, pending):
+    """(role, url name, args) for every page and API endpoint a GET can load"""
+    account = customer.account
+    return [
+        (None, 'users:home', []),
+        (None, 'users:login', []),
+        (None, 'users:register', []),
+        (None, 'bank:manager_login', []),
+        ('customer', 'users:home', []),
+        ('customer', 'bank:dashboard', []),
+        ('customer', 'bank:deposit', []),
+        ('customer', 'bank:withdraw', []),
+        ('customer', 'bank:transactions', []),
+        ('customer', 'bank:standing_instructions', []),
+        ('token', 'bank:api_account', []),
+        ('token', 'bank:api_transactions', []),
+        ('manager', 'users:home', []),
+        ('manager', 'bank:manager_dashboard', []),
+        ('manager', 'bank:manager_users', []),
+        ('manager', 'bank:manager_user_detail', [customer.pk]),
+        ('manager', 'bank:manager_accounts', []),
+        ('manager', 'bank:manager_search', []),
+        ('manager', 'bank:manager_account_detail', [account.pk]),
+        ('manager', 'bank:manager_freeze_account', [account.pk]),
+        ('manager', 'bank:manager_unfreeze_account', [account.pk]),
+        ('manager', 'bank:manager_transactions', []),
+        ('manager', 'bank:manager_pending_approvals', []),
+        ('manager', 'bank:manager_work_queue', []),
+        ('manager', 'bank:manager_approve_transaction', [pending.pk]),
+        ('manager', 'bank:manager_reject_transaction', [pending.pk]),
+        ('manager', 'bank:manager_reports', []),
+    ]
+
+
+@scenario('view_queries', writes=True)
+def view_queries_scenario(repeat):
+    """
+    Queries per GET of every page, with the session's user loaded by
+    Django's ModelBackend and by BankUserBackend (user and manager
+    profile in one query). Caches are cleared before each request, so both
+    columns render everything.
+    """
+    customer, account = benchmark_user()
+    for amount in ('500.00', '120.00', '75000.00'):
+        deposit(account, Decimal(amount))
+    pending = account.transactions.get(status=Transaction.PENDING)
+    manager = User.objects.create_user(username='benchmark-manager', password=None)
+    BankManager.objects.create(user=manager, employee_id='BENCH1')
+    _, token = create_token(customer, 'benchmark')
+    stats.dashboard_stats()
+
+    hosts = [host for host in settings.ALLOWED_HOSTS if host not in ('*', '')] or ['localhost']
+    backends = [('ModelBackend', 'django.contrib.auth.backends.ModelBackend'),
+                ('BankUserBackend', 'apps.users.backends.BankUserBackend')]
+    counts = {}
+    for label, backend in backends:
+        clients = {None: Client(HTTP_HOST=hosts[0].lstrip('.'))}
+        for role, user in (('customer', customer), ('manager', manager)):
+            clients[role] = Client(HTTP_HOST=hosts[0].lstrip('.'))
+            clients[role].force_login(user, backend=backend)
+        clients['token'] = Client(HTTP_HOST=hosts[0].lstrip('.'), HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        for role, name, args in view_targets(customer, manager, pending):
+            caches['default'].clear()
+            queries = QueryCounter()
+            with connection.execute_wrapper(queries):
+                response = clients[role].get(reverse(name, args=args))
+            counts.setdefault((role or 'anonymous', name), {})[label] = (queries.count, response.status_code)
+
+    rows = []
+    for (role, name), by_backend in counts.items():
+        (before, _), (after, status) = by_backend['ModelBackend'], by_backend['BankUserBackend']
+        rows.append((f'{role} {name} ({status})', f'{before} -> {after}'))
+    return rows
+
+
+# Login -> deposit -> dashboard -> logout flows per session store in 'sessions'
+SESSION_FLOWS = 200
+
+
+class SessionQueryCounter(QueryCounter):
+    """Counts all queries, and separately those on the session table"""
+
+    def __init__(self):
+        super().__init__()
+        self.session_count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if 'django_session' in sql:
+            self.session_count += 1
+        return super().__call__(execute, sql, params, many, context)
+
+
+@scenario('sessions', writes=True)
+def sessions_scenario(repeat):
+    """
+    A customer logging in, depositing, viewing the dashboard and logging
+    out, with sessions in each store settings.SESSION_ENGINES offers.
+    Passwords use a fast hasher here so the login measures the session,
+    not PBKDF2.
+    """
+    flows = min(repeat, SESSION_FLOWS)
+    hosts = [host for host in settings.ALLOWED_HOSTS if host not in ('*', '')] or ['localhost']
+    rows = []
+    with override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']):
+        user, account = benchmark_user()
+        user.set_password('benchmark-password')
+        user.save(update_fields=['password'])
+
+        for store, engine in settings.SESSION_ENGINES.items():
+            with override_settings(SESSION_ENGINE=engine):
+                client = Client(HTTP_HOST=hosts[0].lstrip('.'))
+                postings = account.transactions.count()
+                queries = SessionQueryCounter()
+                with connection.execute_wrapper(queries):
+                    started = time.perf_counter()
+                    for _ in range(flows):
+                        client.post(reverse('users:login'),
+                                    {'username': user.username, 'password': 'benchmark-password'})
+                        client.post(reverse('bank:deposit'), {'amount': '10.00', 'description': 'Benchmark'})
+                        client.get(reverse('bank:dashboard'))
+                        client.get(reverse('users:logout'))
+                    per_flow = (time.perf_counter() - started) / flows
+            rows.append((f'{store}, per flow (µs)', f'{per_flow * 1_000_000:.0f}'))
+            rows.append((f'{store}, queries per flow', f'{queries.count / flows:.1f}'))
+            rows.append((f'{store}, session queries per flow', f'{queries.session_count / flows:.1f}'))
+            rows.append((f'{store}, deposits completed', account.transactions.count() - postings))
+    return rows
+
+
+# Customers created for 'search'; surnames are shared, so common terms match many
+SEARCH_CUSTOMERS = 100000
+SEARCH_SURNAMES = ['Sharma', 'Kumar', 'Patel', 'Singh', 'Smith', 'Garcia', 'Johnson', 'Wang']
+
+
+@scenario('search', writes=True)
+def search_scenario(repeat):
+    """
+    Manager search over up to SEARCH_CUSTOMERS customers: the typeahead and
+    the users page filter, through the FTS5 index and with icontains
+    """
+    customers = min(repeat * 10, SEARCH_CUSTOMERS)
+    password = User.objects.make_random_password()
+    users = User.objects.bulk_create([
+        User(username=f'search{n}', password=password, first_name=f'First{n}',
+             last_name=SEARCH_SURNAMES[n % len(SEARCH_SURNAMES)], email=f'search{n}@example.com')
+        for n in range(customers)
+    ], batch_size=BULK_CREATE_BATCH_SIZE)
+    users = User.objects.filter(username__startswith='search').order_by('id')
+    Account.objects.bulk_create([
+        Account(user_id=user_id, account_number=f'S{n:09d}')
+        for n, user_id in enumerate(users.values_list('id', flat=True))
+    ], batch_size=BULK_CREATE_BATCH_SIZE)
+
+    terms = {'common surname': 'kumar', 'one username': f'search{customers // 2}@',
+             'account number': f'{customers // 3:09d}'}
+    calls = max(1, min(repeat // 100, 50))
+    rows = [('customers', customers)]
+    for label, term in terms.items():
+        for mode, index in (('index', True), ('icontains', False)):
+            with override_settings(BANK_SEARCH_INDEX=index):
+                found = len(search.typeahead(term))
+                typeahead = per_call(lambda: search.typeahead(term), calls)
+                page = per_call(lambda: list(search.filter_customers(User.objects.all(), term)[:20]), calls)
+            rows.append((f'{label}, {mode}: typeahead (ms)', f'{typeahead / 1000:.2f} ({found} found)'))
+            rows.append((f'{label}, {mode}: first 20 (ms)', f'{page / 1000:.2f}'))
+    return rows
+
+
+# Transactions created for 'text_search'
+TEXT_SEARCH_TRANSACTIONS = 200000
+TEXT_SEARCH_WORDS = ['salary', 'rent', 'grocery', 'atm', 'transfer', 'refund', 'coffee', 'electricity',
+                     'cheque', 'bonus', 'insurance', 'loan', 'emi', 'tuition', 'medical', 'travel']
+
+
+@scenario('text_search', writes=True)
+def text_search_scenario(repeat):
+    """
+    The manager transactions page's description search (first 100 rows)
+    over up to TEXT_SEARCH_TRANSACTIONS transactions: ranked through the
+    full-text index, and with icontains
+    """
+    count = min(repeat * 20, TEXT_SEARCH_TRANSACTIONS)
+    _, account = benchmark_user()
+    words = len(TEXT_SEARCH_WORDS)
+    Transaction.objects.bulk_create([
+        Transaction(
+            account=account, transaction_type=Transaction.DEPOSIT, amount=Decimal('1.00'),
+            balance_after=Decimal('1.00'),
+            description=' '.join(TEXT_SEARCH_WORDS[(n * step) % words] for step in (1, 3, 7)) + f' ref {n}',
+        )
+        for n in range(count)
+    ], batch_size=BULK_CREATE_BATCH_SIZE)
+
+    since = timezone.now() - timedelta(days=1)
+    terms = {'common word': 'salary', 'two words': 'refund coffee', 'one reference': f'ref {count // 2}'}
+    calls = max(1, min(repeat // 200, 20))
+    rows = [('transactions', count)]
+    for label, text in terms.items():
+        for mode, index in (('index, ranked', True), ('icontains', False)):
+            with override_settings(BANK_SEARCH_INDEX=index):
+                page = lambda: list(search.search_text(Transaction.objects.filter(timestamp__gte=since), text)[:100])
+                found = len(page())
+                rows.append((f'{label}, {mode} (ms)', f'{per_call(page, calls) / 1000:.2f} ({found} shown)'))
+    return rows
+
+
+# Transactions created for 'transaction_rows', and how many of them get a
+# manager's decision with a note
+TRANSACTION_ROWS = 200000
+DECIDED_EVERY = 20
+
+
+@scenario('transaction_rows', writes=True)
+def transaction_rows_scenario(repeat):
+    """
+    Reads that scan transaction rows - history and manager listings,
+    totals, a full pass - over up to TRANSACTION_ROWS transactions,
+    one in DECIDED_EVERY with a decision (TransactionApproval)
+    """
+    count = min(repeat * 20, TRANSACTION_ROWS)
+    user, account = benchmark_user()
+    accounts = [account] + [benchmark_user(f'benchmark-rows-{n}')[1] for n in range(9)]
+    Transaction.objects.bulk_create([
+        Transaction(
+            account=accounts[n % len(accounts)],
+            transaction_type=Transaction.DEPOSIT if n % 3 else Transaction.WITHDRAW,
+            amount=Decimal('12.50'), balance_after=Decimal('100.00'), status=Transaction.COMPLETED,
+            description=f'Card payment {n}',
+        )
+        for n in range(count)
+    ], batch_size=BULK_CREATE_BATCH_SIZE)
+    note = 'Reviewed with the customer by phone; source of funds documented and verified. ' * 2
+    ids = Transaction.objects.filter(account__in=accounts).order_by('id').values_list('id', flat=True)
+    TransactionApproval.objects.bulk_create([
+        TransactionApproval(transaction_id=txn_id, approved_by=user, note=note)
+        for n, txn_id in enumerate(ids) if n % DECIDED_EVERY == 0
+    ], batch_size=BULK_CREATE_BATCH_SIZE)
+
+    rows = [('transactions', count)]
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            try:
+                cursor.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = 'bank_transaction'")
+                rows.append(('transactions table (bytes)', cursor.fetchone()[0]))
+            except DatabaseError:
+                # SQLite built without the dbstat table
+                pass
+
+    reads = {
+        'history page, 50 rows': lambda: list(account.transactions.all()[:50]),
+        'manager listing, 100 rows': lambda: list(Transaction.objects.select_related('account__user')[:100]),
+        'sums by type': lambda: Transaction.objects.aggregate(
+            deposits=Sum('amount', filter=Q(transaction_type=Transaction.DEPOSIT)),
+            withdrawals=Sum('amount', filter=Q(transaction_type=Transaction.WITHDRAW)),
+        ),
+        'count by status': lambda: list(Transaction.objects.values('status').annotate(n=Count('id')).order_by()),
+        'dashboard numbers (stats.compute)': stats.compute,
+    }
+    calls = max(1, min(repeat // 200, 20))
+    for label, read in reads.items():
+        rows.append((f'{label} (ms)', f'{per_call(read, calls) / 1000:.2f}'))
+    full_pass = lambda: sum(1 for _ in Transaction.objects.iterator(chunk_size=2000))
+    rows.append(('every row, iterated (ms)', f'{per_call(full_pass, 1) / 1000:.2f}'))
+    return rows
+
+
+# Rows created per model for 'admin_queries', and the two page sizes compared
+ADMIN_ROWS = 30
+ADMIN_PAGE_SIZES = (5, 25)
+
+
+@scenario('admin_queries', writes=True)
+def admin_queries_scenario(repeat):
+    """
+    Queries per admin changelist page of every bank model, at two page
+    sizes. The counts should match: a column that queries per row would
+    add a query for every extra row.
+    """
+    customers = [benchmark_user(f'benchmark-admin-{n}') for n in range(ADMIN_ROWS)]
+    managers = []
+    for n, (customer, account) in enumerate(customers):
+        for amount in ('500.00', '120.00', '75000.00'):
+            deposit(account, Decimal(amount))
+        user = User.objects.create_user(username=f'benchmark-admin-manager-{n}', password=None)
+        managers.append(BankManager.objects.create(user=user, employee_id=f'BENCHADMIN{n}'))
+        ManagerAction.objects.create(
+            manager=managers[0], action_type='VIEW_ACCOUNT', target_user=customer, target_account=account
+        )
+        create_token(customer, 'benchmark')
+        StandingInstruction.objects.create(
+            account=account, kind=StandingInstruction.TRANSFER, to_account=customers[n - 1][1],
+            amount=Decimal('10.00'), frequency=StandingInstruction.DAILY,
+            starts_at=timezone.now(), next_run_at=timezone.now() + timedelta(days=1),
+        )
+    pending = Transaction.objects.filter(account__user__username__startswith='benchmark-admin-', status=Transaction.PENDING)
+    TransactionApproval.objects.bulk_create([
+        TransactionApproval(transaction=txn, approved_by=managers[0].user, note='Checked')
+        for txn in pending
+    ])
+    superuser = User.objects.create_superuser(username='benchmark-admin', email='', password=None)
+
+    hosts = [host for host in settings.ALLOWED_HOSTS if host not in ('*', '')] or ['localhost']
+    client = Client(HTTP_HOST=hosts[0].lstrip('.'))
+    client.force_login(superuser)
+    rows = []
+    for model, model_admin in admin.site._registry.items():
+        if model._meta.app_label != 'bank':
+            continue
+        url = reverse(f'admin:bank_{model._meta.model_name}_changelist')
+        counts, list_per_page = [], model_admin.list_per_page
+        try:
+            for size in ADMIN_PAGE_SIZES:
+                model_admin.list_per_page = size
+                queries = QueryCounter()
+                with connection.execute_wrapper(queries):
+                    response = client.get(url)
+                counts.append(f'{queries.count} ({response.status_code})')
+        finally:
+            model_admin.list_per_page = list_per_page
+        verdict = 'constant' if counts[0] == counts[-1] else 'GROWS WITH ROWS'
+        label = f'{model.__name__} ({model._default_manager.count()} rows), pages of {" / ".join(map(str, ADMIN_PAGE_SIZES))}'
+        rows.append((label, f'{" / ".join(counts)} {verdict}'))
+    return rows
+
+
+# Most accounts and pending transactions created for 'bulk_actions'
+BULK_ACCOUNTS = 2000
+BULK_TRANSACTIONS = 20000
+
+
+@scenario('bulk_actions', writes=True)
+def bulk_actions_scenario(repeat):
+    """
+    Bulk admin actions (bulk_actions.py) over a large selection: a freeze
+    run in chunks, an unfreeze queued as a BulkJob and run by the worker,
+    and an approval of pending transactions. Every changed row should have
+    exactly one audit row, and a chunk should take a few queries however
+    many rows it holds (the audit rows go in BULK_CREATE_BATCH_SIZE at a
+    time).
+    """
+    accounts = [benchmark_user(f'benchmark-bulk-{n}')[1] for n in range(min(repeat * 2, BULK_ACCOUNTS))]
+    for account in accounts:
+        account.balance = account.available_balance = Decimal('1000000.00')
+    Account.objects.bulk_update(accounts, ['balance', 'available_balance'], batch_size=BULK_CREATE_BATCH_SIZE)
+    count = min(repeat * 20, BULK_TRANSACTIONS)
+    Transaction.objects.bulk_create([
+        Transaction(
+            account=accounts[n % len(accounts)], transaction_type=Transaction.WITHDRAW,
+            amount=Decimal('10.00'), balance_after=Decimal('1000000.00'), status=Transaction.PENDING,
+            description=f'Bulk benchmark {n}',
+        )
+        for n in range(count)
+    ], batch_size=BULK_CREATE_BATCH_SIZE)
+    admin_user = User.objects.create_superuser(username='benchmark-bulk-admin', email='', password=None)
+    account_ids = sorted(account.id for account in accounts)
+    txn_ids = list(
+        Transaction.objects.filter(account__in=account_ids, status=Transaction.PENDING)
+        .order_by('id').values_list('id', flat=True)
+    )
+
+    rows = [('accounts', len(account_ids)), ('pending transactions', len(txn_ids))]
+    audits = ManagerAction.objects.filter(performed_by=admin_user)
+    size = bulk_actions.chunk_size()
+    for label, chunk in (('freeze', size), ('freeze, half the chunk size', size // 2)):
+        queries = QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            counts = bulk_actions.run(BulkJob.FREEZE_ACCOUNTS, account_ids, admin_user, size=chunk)
+        elapsed = time.perf_counter() - started
+        chunks = -(-len(account_ids) // chunk)
+        rows.append((f'{label}: accounts changed', counts['changed']))
+        rows.append((f'{label}: ms / queries per chunk', f'{elapsed * 1000:.1f} / {queries.count / chunks:.1f}'))
+        Account.objects.filter(id__in=account_ids).update(status=Account.ACTIVE)
+    audits.delete()
+
+    started = time.perf_counter()
+    Account.objects.filter(id__in=account_ids).update(status=Account.FROZEN)
+    job = bulk_actions.queue(BulkJob.UNFREEZE_ACCOUNTS, account_ids, admin_user)
+    bulk_actions.run_queued(worker='benchmark')
+    job.refresh_from_db()
+    rows.append(('unfreeze job: status, changed', f'{job.status}, {job.changed}'))
+    rows.append(('unfreeze job: queue and run (ms)', f'{(time.perf_counter() - started) * 1000:.1f}'))
+
+    started = time.perf_counter()
+    counts = bulk_actions.run(BulkJob.APPROVE_TRANSACTIONS, txn_ids, admin_user)
+    rows.append(('approve: changed / refused', f"{counts['changed']} / {counts['refused']}"))
+    rows.append(('approve, with settlement (ms)', f'{(time.perf_counter() - started) * 1000:.1f}'))
+    audited = audits.count()
+    expected = job.changed + counts['changed']
+    rows.append(('audit rows (expected)', f'{audited} ({expected}) {"ok" if audited == expected else "MISMATCH"}'))
+    return rows
+
+
+# Most customers created for 'admin_dashboard'
+DASHBOARD_CUSTOMERS = 100000
+
+
+@scenario('admin_dashboard', writes=True)
+def admin_dashboard_scenario(repeat):
+    """
+    The admin dashboard shell and each of its sections (admin_views.py),
+    with a tenth of up to DASHBOARD_CUSTOMERS customers and then all of
+    them. The shell should not change; the sections are timed with the
+    cache cleared (cold) and again (cached).
+    """
+    customers = min(repeat * 10, DASHBOARD_CUSTOMERS)
+    superuser = User.objects.create_superuser(username='benchmark-dashboard-admin', email='', password=None)
+    hosts = [host for host in settings.ALLOWED_HOSTS if host not in ('*', '')] or ['localhost']
+    client = Client(HTTP_HOST=hosts[0].lstrip('.'))
+    client.force_login(superuser)
+
+    def get(url):
+        queries = QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            response = client.get(url)
+        return queries.count, (time.perf_counter() - started) * 1000, response
+
+    rows, created = [], 0
+    password = User.objects.make_random_password()
+    for step in (customers // 10, customers):
+        users = User.objects.bulk_create([
+            User(username=f'dashboard{n}', password=password, email=f'dashboard{n}@example.com')
+            for n in range(created, step)
+        ], batch_size=BULK_CREATE_BATCH_SIZE)
+        Account.objects.bulk_create([
+            Account(user_id=user.id, account_number=f'D{n:09d}') for n, user in zip(range(created, step), users)
+        ], batch_size=BULK_CREATE_BATCH_SIZE)
+        created = step
+
+        caches['default'].clear()
+        stats.clear()
+        count, ms, response = get(reverse('bank:dashboard'))
+        rows.append((f'{created} customers: page shell', f'{count} queries, {ms:.1f} ms, {len(response.content)} bytes'))
+        for section in admin_views.SECTIONS:
+            for page in ('1', '50') if section in ('accounts', 'users') else ('1',):
+                url = f"{reverse('bank:admin_section', args=[section])}?page={page}"
+                cold, cold_ms, response = get(url)
+                cached, cached_ms, _ = get(url)
+                label = f'{created} customers: {section}' + (f' page {page}' if page != '1' else '')
+                rows.append((label, f'{cold} queries, {cold_ms:.1f} ms cold; {cached} queries, {cached_ms:.1f} ms cached '
+                                    f'({response.status_code})'))
+    return rows
@@ -0,0 +1,42 @@
+"""
+Helpers for chunked bulk writes used by the batch commands
+"""
+from django.db import connection
+from django.db.models import Max, Min
+
+BULK_CREATE_BATCH_SIZE = 1000
+
+
+def id_ranges(queryset, chunk_size):
+    """Yield (start, end) primary key ranges covering the queryset"""
+    bounds = queryset.aggregate(low=Min('id'), high=Max('id'))
+    if bounds['low'] is None:
+        return
+    start = bounds['low']
+    while start <= bounds['high']:
+        yield start, start + chunk_size
+        start += chunk_size
+
+
+def bulk_set(model, objs, fields):
+    """
+    Write per-row values of `fields` for `objs` with one prepared UPDATE
+
+    Same result as QuerySet.bulk_update(), but bulk_update() builds a
+    CASE WHEN expression per row and field, which costs about a millisecond
+    per row in Python alone. executemany() with one parameterised UPDATE is
+    an order of magnitude faster on large chunks.
+    """
+    if not objs:
+        return
+    meta = model._meta
+    model_fields = [meta.get_field(name) for name in fields]
+    quote = connection.ops.quote_name
+    assignments = ', '.join(f'{quote(field.column)} = %s' for field in model_fields)
+    sql = f'UPDATE {quote(meta.db_table)} SET {assignments} WHERE {quote(meta.pk.column)} = %s'
+    params = [
+        [field.get_db_prep_save(getattr(obj, field.attname), connection) for field in model_fields] + [obj.pk]
+        for obj in objs
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
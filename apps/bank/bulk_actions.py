@@ -0,0 +1,221 @@
+"""
+Bulk admin actions
+
+Freezing and unfreezing accounts and approving and rejecting transactions
+from the admin changelists, including "select all" across every page:
+- the selection is worked through in chunks of BANK_BULK_CHUNK_SIZE rows,
+  each in its own database transaction, so a large selection never holds
+  the write lock for long
+- every row that changes gets a ManagerAction audit row, like the manager
+  views write, created with bulk_create in the same transaction as the
+  change; rows already in the target state are skipped
+- selections of more than BANK_BULK_INLINE_LIMIT rows are not processed
+  during the request: they are queued as a BulkJob, which the
+  run_bulk_jobs command works through, recording its progress after every
+  chunk. The admin's Bulk Jobs page shows how far each job has got
+"""
+import os
+import socket
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import approvals
+from .bulk import BULK_CREATE_BATCH_SIZE
+from .models import Account, BulkJob, ManagerAction, Transaction
+from .services import release_rejected
+from .settlement import settle
+from .work_queue import claim_rows
+
+
+def chunk_size():
+    return getattr(settings, 'BANK_BULK_CHUNK_SIZE', 500)
+
+
+def inline_limit():
+    return getattr(settings, 'BANK_BULK_INLINE_LIMIT', 1000)
+
+
+def lease_duration():
+    return timedelta(seconds=getattr(settings, 'BANK_BULK_LEASE_SECONDS', 300))
+
+
+def default_worker():
+    """Claim owner for this process: host and process id"""
+    return f'{socket.gethostname()}:{os.getpid()}'[:100]
+
+
+class LeaseLost(Exception):
+    """Another worker took over the job; the current chunk is rolled back"""
+
+
+def _audit(user, action_type, rows, note):
+    """One ManagerAction per (account id, user id, transaction id, text) row"""
+    manager = getattr(user, 'manager_profile', None)
+    ManagerAction.objects.bulk_create(
+        [
+            ManagerAction(
+                manager=manager,
+                performed_by=user,
+                action_type=action_type,
+                target_account_id=account_id,
+                target_user_id=user_id,
+                target_transaction_id=txn_id,
+                note=f'{text} (bulk action by {user.username if user else "a deleted user"}). {note}'.strip(),
+            )
+            for account_id, user_id, txn_id, text in rows
+        ],
+        batch_size=BULK_CREATE_BATCH_SIZE,
+    )
+
+
+def _set_account_status(ids, user, note, status, action_type, verb):
+    rows = list(
+        Account.objects.filter(id__in=ids).exclude(status=status).values_list('id', 'user_id', 'account_number')
+    )
+    changed = [account_id for account_id, _, _ in rows]
+    # The version moves on with the status, so cached pages are dropped
+    Account.objects.filter(id__in=changed).update(status=status, version=F('version') + 1)
+    _audit(user, action_type, [
+        (account_id, user_id, None, f'{verb} account: {number}') for account_id, user_id, number in rows
+    ], note)
+    return Counter(changed=len(changed))
+
+
+def freeze_accounts(ids, user, note=''):
+    return _set_account_status(ids, user, note, Account.FROZEN, 'FREEZE_ACCOUNT', 'Frozen')
+
+
+def unfreeze_accounts(ids, user, note=''):
+    return _set_account_status(ids, user, note, Account.ACTIVE, 'UNFREEZE_ACCOUNT', 'Unfrozen')
+
+
+def _decide(ids, user, note, status):
+    rows = list(
+        Transaction.objects.filter(id__in=ids, status=Transaction.PENDING)
+        .values_list('id', 'account_id', 'account__user_id')
+    )
+    decided = [txn_id for txn_id, _, _ in rows]
+    Transaction.objects.filter(id__in=decided, status=Transaction.PENDING).update(
+        status=status, claimed_by=None, claim_expires_at=None
+    )
+    approvals.record(decided, user, note)
+    return rows, decided
+
+
+def approve_transactions(ids, user, note=''):
+    """Approve the pending transactions among `ids`, then settle them"""
+    rows, decided = _decide(ids, user, note, Transaction.APPROVED)
+    _, refused = settle(decided)
+    _audit(user, 'APPROVE_TRANSACTION', [
+        (account_id, user_id, txn_id, f'Approved transaction #{txn_id}') for txn_id, account_id, user_id in rows
+    ], note)
+    return Counter(changed=len(decided), refused=len(refused))
+
+
+def reject_transactions(ids, user, note=''):
+    """Reject the pending transactions among `ids`, releasing their holds"""
+    rows, decided = _decide(ids, user, note, Transaction.REJECTED)
+    release_rejected(decided)
+    _audit(user, 'REJECT_TRANSACTION', [
+        (account_id, user_id, txn_id, f'Rejected transaction #{txn_id}') for txn_id, account_id, user_id in rows
+    ], note)
+    return Counter(changed=len(decided))
+
+
+ACTIONS = {
+    BulkJob.FREEZE_ACCOUNTS: freeze_accounts,
+    BulkJob.UNFREEZE_ACCOUNTS: unfreeze_accounts,
+    BulkJob.APPROVE_TRANSACTIONS: approve_transactions,
+    BulkJob.REJECT_TRANSACTIONS: reject_transactions,
+}
+
+
+def run(kind, ids, user, note='', size=None):
+    """Apply action `kind` to `ids` now, a chunk per database transaction; returns a Counter"""
+    size = size or chunk_size()
+    totals = Counter()
+    for start in range(0, len(ids), size):
+        with transaction.atomic():
+            totals += ACTIONS[kind](ids[start:start + size], user, note)
+    return totals
+
+
+def queue(kind, ids, user):
+    """Queue action `kind` on `ids` as a BulkJob for run_bulk_jobs"""
+    return BulkJob.objects.create(kind=kind, requested_by=user, target_ids=list(ids), total=len(ids))
+
+
+def take(kind, queryset, user):
+    """
+    Apply `kind` to every row of `queryset`, now or as a queued job
+
+    Returns (Counter of the rows changed, None) or (None, the queued BulkJob).
+    """
+    ids = list(queryset.order_by('id').values_list('id', flat=True))
+    if len(ids) > inline_limit():
+        return None, queue(kind, ids, user)
+    return run(kind, ids, user), None
+
+
+def run_job(job, worker, size=None):
+    """
+    Work through `job` from where it stopped, a chunk per database transaction
+
+    Each chunk's progress is saved in its own transaction, conditional on
+    `worker` still holding the job's lease; the lease is renewed with it.
+    A failing chunk is rolled back and marks the job FAILED.
+    """
+    size = size or chunk_size()
+    mine = BulkJob.objects.filter(pk=job.pk, claimed_by=worker)
+    mine.update(status=BulkJob.RUNNING, started_at=job.started_at or timezone.now())
+    ids = job.target_ids
+    try:
+        for start in range(job.processed, len(ids), size):
+            chunk = ids[start:start + size]
+            with transaction.atomic():
+                counts = ACTIONS[job.kind](chunk, job.requested_by, '')
+                progressed = mine.update(
+                    processed=start + len(chunk),
+                    changed=F('changed') + counts['changed'],
+                    refused=F('refused') + counts['refused'],
+                    claim_expires_at=timezone.now() + lease_duration(),
+                )
+                if not progressed:
+                    raise LeaseLost
+    except LeaseLost:
+        return False
+    except Exception as error:
+        mine.update(
+            status=BulkJob.FAILED, last_error=str(error)[:200], claimed_by=None, claim_expires_at=None
+        )
+        raise
+    mine.update(status=BulkJob.DONE, finished_at=timezone.now(), claimed_by=None, claim_expires_at=None)
+    return True
+
+
+def run_queued(worker=None, size=None, max_jobs=None):
+    """
+    Run queued jobs, oldest first, one claim at a time
+
+    Jobs whose worker stopped (its lease lapsed while RUNNING) are taken
+    over and resumed. Returns a Counter of jobs done and failed.
+    """
+    worker = worker or default_worker()
+    unfinished = BulkJob.objects.filter(status__in=[BulkJob.QUEUED, BulkJob.RUNNING])
+    stats = Counter()
+    while max_jobs is None or stats['done'] + stats['failed'] < max_jobs:
+        claimed = claim_rows(unfinished, 'claimed_by', 'claim_expires_at', worker, 1, lease_duration())
+        if not claimed:
+            break
+        job = BulkJob.objects.select_related('requested_by__manager_profile').get(pk=claimed[0])
+        try:
+            if run_job(job, worker, size):
+                stats['done'] += 1
+        except Exception:
+            stats['failed'] += 1
+    return stats
@@ -1,8 +1,31 @@
+import uuid
+
 from django import forms
+from django.utils import timezone
 from decimal import Decimal
 
+from .limits import limit_error
+from .models import Account, StandingInstruction
+
+
+class IdempotentForm(forms.Form):
+    """
+    Base for posting forms: each rendered form carries a fresh idempotency
+    key, so submitting it twice posts only once (see idempotency.py)
+    """
+    idempotency_key = forms.CharField(
+        max_length=64,
+        required=False,
+        widget=forms.HiddenInput()
+    )
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not self.is_bound:
+            self.fields['idempotency_key'].initial = uuid.uuid4().hex
+
 
-class DepositForm(forms.Form):
+class DepositForm(IdempotentForm):
     """
     Deposit Form - Add money to account
     """
@@ -45,7 +68,7 @@ class DepositForm(forms.Form):
         return amount
 
 
-class WithdrawForm(forms.Form):
+class WithdrawForm(IdempotentForm):
     """
     Withdraw Form - Remove money from account
     """
@@ -75,9 +98,10 @@ class WithdrawForm(forms.Form):
     
     def __init__(self, *args, **kwargs):
         """
-        Accept account balance for validation
+        Accept the available balance (and withdrawal limit headroom) for validation
         """
         self.balance = kwargs.pop('balance', Decimal('0.00'))
+        self.headroom = kwargs.pop('headroom', None)
         super().__init__(*args, **kwargs)
     
     def clean_amount(self):
@@ -91,10 +115,112 @@ class WithdrawForm(forms.Form):
         
         if amount > self.balance:
             raise forms.ValidationError(
-                f'Insufficient funds. Your current balance is ₹{self.balance}.'
+                f'Insufficient funds. Your available balance is ₹{self.balance}.'
             )
         
         if amount > Decimal('1000000.00'):
             raise forms.ValidationError('Amount cannot exceed ₹1,000,000.00 per transaction.')
         
+        # Daily and monthly limits of the account's tier (enforced again when posting)
+        if self.headroom:
+            error = limit_error(amount, self.headroom)
+            if error:
+                raise forms.ValidationError(error)
+        
         return amount
+
+
+class StandingInstructionForm(forms.Form):
+    """
+    Standing Instruction Form - Set up a recurring transfer or withdrawal
+    """
+    kind = forms.ChoiceField(
+        choices=StandingInstruction.KIND_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        label='Type'
+    )
+    
+    to_account_number = forms.CharField(
+        max_length=10,
+        required=False,
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'Account number to pay (transfers only)'
+        }),
+        label='Pay To (Transfers Only)'
+    )
+    
+    amount = forms.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        min_value=Decimal('0.01'),
+        widget=forms.NumberInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'Amount per payment',
+            'step': '0.01',
+            'min': '0.01'
+        }),
+        label='Amount'
+    )
+    
+    frequency = forms.ChoiceField(
+        choices=StandingInstruction.FREQUENCY_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        label='Repeat'
+    )
+    
+    first_payment = forms.DateField(
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+        label='First Payment'
+    )
+    
+    description = forms.CharField(
+        max_length=150,
+        required=False,
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'Optional description (e.g., Rent, Savings)'
+        }),
+        label='Description (Optional)'
+    )
+    
+    def __init__(self, *args, **kwargs):
+        """
+        Accept the paying account, so it cannot pay itself
+        """
+        self.account = kwargs.pop('account', None)
+        super().__init__(*args, **kwargs)
+    
+    def clean_amount(self):
+        amount = self.cleaned_data.get('amount')
+        if amount > Decimal('1000000.00'):
+            raise forms.ValidationError('Amount cannot exceed ₹1,000,000.00 per payment.')
+        return amount
+    
+    def clean_first_payment(self):
+        first_payment = self.cleaned_data.get('first_payment')
+        if first_payment < timezone.localdate():
+            raise forms.ValidationError('The first payment cannot be in the past.')
+        return first_payment
+    
+    def clean(self):
+        """
+        Transfers need an existing, different account to pay
+        """
+        cleaned_data = super().clean()
+        cleaned_data['to_account'] = None
+        if cleaned_data.get('kind') != StandingInstruction.TRANSFER:
+            return cleaned_data
+        
+        number = (cleaned_data.get('to_account_number') or '').strip().upper()
+        if not number:
+            self.add_error('to_account_number', 'Enter the account number to pay.')
+            return cleaned_data
+        to_account = Account.objects.filter(account_number=number).first()
+        if to_account is None:
+            self.add_error('to_account_number', 'No account with this number exists.')
+        elif self.account is not None and to_account.pk == self.account.pk:
+            self.add_error('to_account_number', 'You cannot transfer to your own account.')
+        else:
+            cleaned_data['to_account'] = to_account
+        return cleaned_data
@@ -0,0 +1,42 @@
+"""
+SQLite FTS5 tables in the ORM
+
+An FTS5 table can be mapped by an unmanaged model whose primary key is a
+OneToOneField on `rowid`, so querysets join it like any other relation.
+Two of its hidden columns are mapped as fields:
+
+- SearchDocumentField: the column named after the table itself, which
+  takes the MATCH operator: `search_entry__document__match='...'`
+- `rank`: the bm25 relevance of each match, lower is better; only
+  meaningful in a query that uses __match
+"""
+import re
+
+from django.db import models
+from django.db.models import Lookup
+
+
+class SearchDocumentField(models.TextField):
+    """The hidden column of an FTS5 table that full-text queries go through"""
+
+
+@SearchDocumentField.register_lookup
+class Match(Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+def words_query(text):
+    """
+    FTS5 query finding rows that contain every word of `text`, or '' if it
+    has none
+
+    Each word is quoted, so characters FTS5 gives a meaning to (", *, :,
+    AND, NEAR, ...) are searched for as plain text.
+    """
+    words = re.findall(r'\w+', text)
+    return ' '.join('"' + word + '"' for word in words)
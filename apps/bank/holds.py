@@ -0,0 +1,105 @@
+"""
+Funds holds
+
+A withdrawal sent for approval reserves its amount straight away, so the
+same money cannot be spent again while a manager decides:
+- Account.balance is the ledger balance: money that has actually moved
+- Account.available_balance is the balance minus the active holds, and is
+  what withdrawals are checked against
+Both are kept up to date incrementally by UPDATE ... SET x = x + n, never
+summed on read.
+
+A hold ends in one of three ways:
+- settled: the withdrawal settles and the balance drops by the amount the
+  hold was reserving, so available_balance does not move
+- released: the withdrawal is rejected and the amount is credited back to
+  available_balance
+- expired: nobody decided within BANK_HOLD_SECONDS, and the expire_holds
+  command credits the amount back. The withdrawal stays pending; if it is
+  approved later, settlement checks it against available_balance like any
+  withdrawal without a hold
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .ledger import ZERO
+from .models import Account, Hold
+
+
+def hold_duration():
+    return timedelta(seconds=getattr(settings, 'BANK_HOLD_SECONDS', 7 * 24 * 3600))
+
+
+def place_hold(account, txn, now=None):
+    """
+    Record the hold for pending withdrawal `txn`
+
+    The caller has already taken the amount out of available_balance, in the
+    same conditional UPDATE that checked the funds.
+    """
+    now = now or timezone.now()
+    return Hold.objects.create(
+        account=account, transaction=txn, amount=txn.amount, expires_at=now + hold_duration()
+    )
+
+
+def _end_holds(holds, status, now=None):
+    """
+    Move the active holds among `holds` to `status`
+
+    Released and expired holds are credited back to available_balance with
+    one UPDATE per account. Returns the number of holds ended.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        rows = list(
+            holds.filter(status=Hold.ACTIVE)
+            .select_for_update()
+            .values_list('id', 'account_id', 'amount')
+        )
+        if not rows:
+            return 0
+        Hold.objects.filter(id__in=[hold_id for hold_id, _, _ in rows], status=Hold.ACTIVE).update(
+            status=status, released_at=now
+        )
+        if status != Hold.SETTLED:
+            credits = defaultdict(lambda: ZERO)
+            for _, account_id, amount in rows:
+                credits[account_id] += amount
+            # Sorted, so concurrent releases lock accounts in the same order
+            for account_id, amount in sorted(credits.items()):
+                Account.objects.filter(pk=account_id).update(
+                    available_balance=F('available_balance') + amount, version=F('version') + 1
+                )
+    return len(rows)
+
+
+def release_holds(transaction_ids):
+    """Give back the funds reserved for rejected transactions"""
+    return _end_holds(Hold.objects.filter(transaction_id__in=list(transaction_ids)), Hold.RELEASED)
+
+
+def settle_holds(transaction_ids):
+    """End the holds of settled withdrawals; their amount has left the balance"""
+    return _end_holds(Hold.objects.filter(transaction_id__in=list(transaction_ids)), Hold.SETTLED)
+
+
+def expire_holds(batch_size=500, now=None):
+    """
+    Expire every active hold whose expires_at has passed, `batch_size` per
+    database transaction. Returns the number of holds expired.
+    """
+    now = now or timezone.now()
+    due = Hold.objects.filter(status=Hold.ACTIVE, expires_at__lte=now).order_by('expires_at', 'id')
+    expired = 0
+    while True:
+        ids = list(due.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        expired += _end_holds(Hold.objects.filter(id__in=ids), Hold.EXPIRED, now)
+    return expired
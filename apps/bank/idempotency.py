@@ -0,0 +1,124 @@
+"""
+Idempotency keys
+
+A deposit or withdrawal request can carry a key: the Idempotency-Key
+header, or the hidden idempotency_key field every deposit and withdraw form
+is rendered with. The first request with a key posts normally and records
+the key, in the same database transaction as the posting. A repeat of the
+request - a double-submitted form, a client or proxy retry - finds the key
+and gets the original transaction back without posting again. A batch
+(api/batch/) works the same way, except that the key keeps the batch's
+JSON answer rather than one transaction.
+
+- find_key() is the only work a repeat costs: one lookup on the
+  (user, key) unique index
+- post_once() claims the key by inserting it; if two copies of a request
+  race, the unique index lets exactly one insert, and the other replays it
+- a refused posting rolls the key back with it, so the request can be
+  retried once the problem is fixed
+- keys expire after BANK_IDEMPOTENCY_TTL_SECONDS and are deleted by the
+  purge_idempotency_keys command
+"""
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+FIELD = 'idempotency_key'
+MAX_KEY_LENGTH = 64
+
+
+class IdempotencyError(Exception):
+    """A key was misused; the message is safe to show to the customer"""
+
+
+def ttl():
+    return timedelta(seconds=getattr(settings, 'BANK_IDEMPOTENCY_TTL_SECONDS', 24 * 3600))
+
+
+def request_key(request):
+    """The key a request carries (header first, then form field), or ''"""
+    key = (request.headers.get(HEADER) or request.POST.get(FIELD) or '').strip()
+    if len(key) > MAX_KEY_LENGTH:
+        raise IdempotencyError(f'{HEADER} must be at most {MAX_KEY_LENGTH} characters.')
+    return key
+
+
+def request_hash(*parts):
+    """Fingerprint of what a request asks for"""
+    return hashlib.sha256('\x1f'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def find_key(user, key):
+    """The live IdempotencyKey for (user, key), with its transaction, or None"""
+    if not key:
+        return None
+    return (
+        IdempotencyKey.objects.select_related('transaction')
+        .filter(user=user, key=key, expires_at__gt=timezone.now())
+        .first()
+    )
+
+
+def replay(record, fingerprint):
+    """
+    The original result of `record` (its transaction, or the stored response
+    of a batch), if the repeat asks for the same thing
+    """
+    if record.request_hash != fingerprint:
+        raise IdempotencyError('This request key was already used for a different request.')
+    result = record.transaction if record.transaction_id else record.response
+    if result is None:
+        raise IdempotencyError('This request is still being processed. Please check your transactions.')
+    return result
+
+
+def post_once(user, key, fingerprint, post, field='transaction'):
+    """
+    Run post() under `key`; returns (result, replayed)
+
+    Without a key, post() simply runs. With one, the key is inserted first,
+    in the same database transaction as the posting; if another request
+    holds it already, that request's result is returned instead.
+    - post() returns the Transaction, or with field='response' the
+      JSON-serializable answer to keep for a request that posts many
+    """
+    if not key:
+        return post(), False
+
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            # An expired key may be reused; deleting it first is also the
+            # transaction's first write, which on SQLite takes the write lock
+            # before anything is read
+            IdempotencyKey.objects.filter(user=user, key=key, expires_at__lte=now).delete()
+            record = IdempotencyKey.objects.create(
+                user=user, key=key, request_hash=fingerprint, expires_at=now + ttl()
+            )
+            posted = post()
+            IdempotencyKey.objects.filter(pk=record.pk).update(**{field: posted})
+    except IntegrityError:
+        # Lost the race: a copy of this request inserted the key first
+        record = find_key(user, key)
+        if record is None:
+            raise
+        return replay(record, fingerprint), True
+    return posted, False
+
+
+def purge_expired(batch_size=1000, now=None):
+    """Delete expired keys, `batch_size` per statement; returns how many"""
+    now = now or timezone.now()
+    expired = IdempotencyKey.objects.filter(expires_at__lte=now).order_by('expires_at')
+    purged = 0
+    while True:
+        ids = list(expired.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return purged
+        purged += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,220 @@
+"""
+Interest accrual and posting
+
+- Interest accrues daily on every ACTIVE account into Account.accrued_interest,
+  and into the InterestAccrual row of the day's month
+- At month end the month's accrued amount (rounded down to paisa) is
+  credited as a DEPOSIT transaction and the remainder carries over to the
+  next month. Interest accrued after the month end, if the next month's
+  accrual ran first, waits for its own month
+- Both steps are guarded by a date on the account row, so re-running a day
+  or a month is a no-op for accounts that were already processed
+- Interest posted before the month ends marks the account as posted only
+  through its last accrued day, so the month end still credits the rest
+"""
+import calendar
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal, ROUND_DOWN
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, DecimalField, Exists, F, OuterRef, Q, Subquery, Value, When
+from django.utils import timezone
+
+from .bulk import BULK_CREATE_BATCH_SIZE, bulk_set, id_ranges
+from .journal import deposit_lines, record_entries
+from .models import Account, InterestAccrual, JournalEntry, LedgerAccount, Transaction
+
+PAISA = Decimal('0.01')
+
+DEFAULT_RATE_TIERS = [
+    ('0.00', '0.0250'),
+    ('100000.00', '0.0300'),
+    ('1000000.00', '0.0350'),
+]
+
+
+def get_rate_tiers():
+    """
+    Return the configured rate table as [(minimum balance, annual rate)]
+    sorted by minimum balance
+    """
+    tiers = getattr(settings, 'BANK_INTEREST_RATE_TIERS', DEFAULT_RATE_TIERS)
+    return sorted((Decimal(minimum), Decimal(rate)) for minimum, rate in tiers)
+
+
+def daily_rate_expression(tiers=None):
+    """
+    Build a CASE expression that picks the daily rate for each row's balance
+
+    The database evaluates it for the whole chunk in one UPDATE, so the
+    per-account arithmetic never round-trips through Python.
+    """
+    tiers = tiers or get_rate_tiers()
+    days = Decimal(getattr(settings, 'BANK_INTEREST_DAYS_IN_YEAR', 365))
+    output = DecimalField(max_digits=16, decimal_places=10)
+
+    # Highest tier first so the first matching WHEN wins
+    whens = [
+        When(balance__gte=minimum, then=Value(rate / days, output_field=output))
+        for minimum, rate in reversed(tiers[1:])
+    ]
+    base_rate = Value(tiers[0][1] / days, output_field=output)
+    return Case(*whens, default=base_rate, output_field=output)
+
+
+def accrue_for_day(day, chunk_size=10000):
+    """
+    Accrue one day of interest for every ACTIVE account
+
+    Accounts already accrued for `day` (or later) are skipped.
+    Returns the number of accounts updated.
+    """
+    rate = daily_rate_expression()
+    due = Account.objects.filter(status=Account.ACTIVE).filter(
+        Q(interest_accrued_through__isnull=True) | Q(interest_accrued_through__lt=day)
+    )
+
+    updated = 0
+    for start, end in id_ranges(due, chunk_size):
+        with transaction.atomic():
+            # The account UPDATE comes first: it locks the rows (on SQLite,
+            # the database), so _accrue_month() reads the same balances
+            accrued = due.filter(id__gte=start, id__lt=end).update(
+                accrued_interest=F('accrued_interest') + F('balance') * rate,
+                interest_accrued_through=day,
+            )
+            if accrued:
+                _accrue_month(start, end, day, rate)
+            updated += accrued
+    return updated
+
+
+def _accrue_month(start, end, day, rate):
+    """
+    Add `day`'s interest to the month's InterestAccrual row of each account
+    in [start, end) just accrued for it, creating the row on the month's
+    first accrual
+    """
+    period_end = month_end(day)
+    accrued = Account.objects.filter(id__gte=start, id__lt=end, interest_accrued_through=day)
+    interest = accrued.annotate(interest=F('balance') * rate)
+
+    InterestAccrual.objects.filter(
+        account__in=accrued, period_end=period_end, accrued_through__lt=day
+    ).update(
+        amount=F('amount') + Subquery(interest.filter(pk=OuterRef('account_id')).values('interest')),
+        accrued_through=day,
+    )
+    InterestAccrual.objects.bulk_create(
+        [
+            InterestAccrual(account_id=account_id, period_end=period_end, amount=amount, accrued_through=day)
+            for account_id, amount in interest.exclude(interest_accruals__period_end=period_end)
+            .values_list('id', 'interest')
+        ],
+        batch_size=BULK_CREATE_BATCH_SIZE,
+    )
+
+
+def month_end(day):
+    """Last calendar day of the month containing `day`"""
+    return date(day.year, day.month, calendar.monthrange(day.year, day.month)[1])
+
+
+def post_for_month(period_end, chunk_size=5000):
+    """
+    Credit accrued interest for the month ending `period_end`
+
+    Only the InterestAccrual rows up to `period_end` are credited; the
+    fraction of a paisa left over stays on the month's row. An account
+    counts as posted through the last day it has accrued for
+    (at most `period_end`), not `period_end` itself, so posting before the
+    month is over leaves the remaining days to be credited at month end.
+    Each chunk is read, credited with bulk_create/bulk_set, journalled
+    against interest expense and marked as posted inside one transaction,
+    so an interrupted run resumes cleanly.
+    Returns (accounts credited, total amount credited).
+    """
+    description = f"Interest credit for {period_end.strftime('%b %Y')}"
+    owed_rows = InterestAccrual.objects.filter(period_end__lte=period_end)
+    due = Account.objects.filter(
+        Exists(owed_rows.filter(account=OuterRef('pk'))),
+        status=Account.ACTIVE,
+        accrued_interest__gte=PAISA,
+    ).filter(
+        Q(interest_posted_through__isnull=True) | Q(interest_posted_through__lt=period_end)
+    ).order_by('id')
+
+    credited = 0
+    total = Decimal('0.00')
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            accounts = list(
+                due.filter(id__gt=last_id)
+                .select_for_update()
+                .only('id', 'balance', 'available_balance', 'accrued_interest', 'interest_accrued_through',
+                      'version')[:chunk_size]
+            )
+            if not accounts:
+                break
+            last_id = accounts[-1].id
+
+            owed = defaultdict(lambda: Decimal('0'))
+            accrued_through = {}
+            rows = owed_rows.filter(account_id__in=[account.id for account in accounts])
+            for account_id, amount, through in rows.values_list('account_id', 'amount', 'accrued_through'):
+                owed[account_id] += amount
+                accrued_through[account_id] = max(through, accrued_through.get(account_id, through))
+            # Accounts whose interest so far is all in later months wait for those
+            accounts = [account for account in accounts if owed[account.id] >= PAISA]
+            if not accounts:
+                continue
+
+            now = timezone.now()
+            credits = []
+            entries = []
+            remainders = []
+            for account in accounts:
+                amount = owed[account.id].quantize(PAISA, rounding=ROUND_DOWN)
+                if owed[account.id] > amount:
+                    remainders.append(InterestAccrual(
+                        account_id=account.id, period_end=period_end, amount=owed[account.id] - amount,
+                        accrued_through=accrued_through[account.id],
+                    ))
+                account.balance += amount
+                account.available_balance += amount
+                account.accrued_interest -= amount
+                account.interest_posted_through = min(account.interest_accrued_through or period_end, period_end)
+                account.last_activity = now
+                account.version += 1
+                credits.append(Transaction(
+                    account=account,
+                    transaction_type=Transaction.DEPOSIT,
+                    amount=amount,
+                    balance_after=account.balance,
+                    status=Transaction.COMPLETED,
+                    description=description,
+                ))
+                entries.append((
+                    JournalEntry.INTEREST,
+                    description,
+                    deposit_lines(account.id, amount, source=LedgerAccount.INTEREST_EXPENSE),
+                ))
+                total += amount
+
+            for credit, entry in zip(credits, record_entries(entries)):
+                credit.journal_entry = entry
+
+            bulk_set(
+                Account, accounts,
+                ['balance', 'available_balance', 'accrued_interest', 'interest_posted_through',
+                 'last_activity', 'version'],
+            )
+            Transaction.objects.bulk_create(credits, batch_size=BULK_CREATE_BATCH_SIZE)
+            rows.filter(account_id__in=[account.id for account in accounts]).delete()
+            InterestAccrual.objects.bulk_create(remainders, batch_size=BULK_CREATE_BATCH_SIZE)
+            credited += len(accounts)
+
+    return credited, total
@@ -0,0 +1,119 @@
+"""
+Double-entry journal
+
+Every movement of money is recorded as a balanced JournalEntry: its
+postings sum to zero. A posting targets either a bank-internal
+LedgerAccount (cash, suspense, interest expense) or a customer Account.
+
+Balances are projections maintained as postings are written:
+LedgerAccount.balance here, Account.balance by the posting service in the
+same database transaction. Nothing sums postings on read.
+
+Lines are (ledger account code, customer account id, amount) tuples with
+exactly one of the first two set; amounts are debits positive, credits
+negative.
+"""
+from collections import defaultdict
+
+from django.db import connection
+from django.db.models import F
+
+from .bulk import BULK_CREATE_BATCH_SIZE
+from .models import JournalEntry, LedgerAccount, Posting
+
+_ledger_account_ids = {}
+
+
+def ledger_account_id(code):
+    """Primary key of an internal ledger account, cached for the process"""
+    if code not in _ledger_account_ids:
+        _ledger_account_ids[code] = LedgerAccount.objects.values_list('id', flat=True).get(code=code)
+    return _ledger_account_ids[code]
+
+
+def deposit_lines(account_id, amount, source=LedgerAccount.CASH):
+    """Money in: debit the source (cash by default), credit the customer"""
+    return [(source, None, amount), (None, account_id, -amount)]
+
+
+def withdrawal_lines(account_id, amount, destination=LedgerAccount.CASH):
+    """Money out: debit the customer, credit the destination (cash by default)"""
+    return [(None, account_id, amount), (destination, None, -amount)]
+
+
+def check_balanced(lines):
+    if len(lines) < 2:
+        raise ValueError('A journal entry needs at least two postings.')
+    if sum(amount for _, _, amount in lines) != 0:
+        raise ValueError('Journal entry postings do not balance to zero.')
+
+
+def _postings(entry, lines):
+    return [
+        Posting(
+            entry=entry,
+            ledger_account_id=ledger_account_id(code) if code else None,
+            account_id=account_id,
+            amount=amount,
+        )
+        for code, account_id, amount in lines
+    ]
+
+
+def _apply_ledger_balances(lines):
+    """Move the LedgerAccount.balance projections: one UPDATE per internal account"""
+    totals = defaultdict(int)
+    for code, _, amount in lines:
+        if code:
+            totals[code] += amount
+    # Fixed order, so concurrent postings always lock ledger rows the same way
+    for code in sorted(totals):
+        if totals[code]:
+            LedgerAccount.objects.filter(id=ledger_account_id(code)).update(
+                balance=F('balance') + totals[code]
+            )
+
+
+def record_entry(entry_type, description, lines):
+    """
+    Write one balanced entry and its postings
+
+    Must be called inside transaction.atomic() together with the matching
+    customer balance update.
+    """
+    check_balanced(lines)
+    entry = JournalEntry.objects.create(entry_type=entry_type, description=(description or '')[:200])
+    Posting.objects.bulk_create(_postings(entry, lines))
+    _apply_ledger_balances(lines)
+    return entry
+
+
+def record_entries(entries):
+    """
+    Bulk version of record_entry() for batch jobs
+
+    `entries` is a list of (entry_type, description, lines); returns the
+    saved JournalEntry objects in the same order.
+    """
+    for _, _, lines in entries:
+        check_balanced(lines)
+
+    objs = [
+        JournalEntry(entry_type=entry_type, description=(description or '')[:200])
+        for entry_type, description, _ in entries
+    ]
+    if connection.features.can_return_rows_from_bulk_insert:
+        JournalEntry.objects.bulk_create(objs, batch_size=BULK_CREATE_BATCH_SIZE)
+    else:
+        # Postings need the entry ids, which this backend cannot return in bulk
+        for obj in objs:
+            obj.save()
+
+    postings = []
+    all_lines = []
+    for entry, (_, _, lines) in zip(objs, entries):
+        postings.extend(_postings(entry, lines))
+        all_lines.extend(lines)
+    Posting.objects.bulk_create(postings, batch_size=BULK_CREATE_BATCH_SIZE)
+    _apply_ledger_balances(all_lines)
+    return objs
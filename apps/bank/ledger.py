@@ -0,0 +1,234 @@
+"""
+Ledger verification
+
+Streams every account's transaction history in ledger order
+(account, timestamp, id) and checks that:
+- each posted transaction's balance_after equals the previous posted
+  balance plus or minus its amount
+- Account.balance equals the net of the account's posted transactions
+
+The transaction history is treated as the source of truth, so a repair
+plan always moves balance_after values and Account.balance towards it.
+
+Accounts and transactions are read by separate queries, so each shard is
+read inside one transaction that sees a single snapshot of the database
+(consistent_read). Otherwise a posting made between the two reads would
+look like a mismatch, and a repair plan would "fix" it. Repairs are refused
+where such a snapshot cannot be had.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from decimal import Decimal
+
+import django
+from django.db import connection, connections, transaction
+from django.db.models import Case, DecimalField, F, Max, Min, When
+
+from .models import Account, Transaction
+
+ZERO = Decimal('0.00')
+
+LEDGER_ORDER = ['account_id', 'timestamp', 'id']
+
+# Column order of the tuples yielded by iter_account_histories()
+HISTORY_FIELDS = ['id', 'transaction_type', 'amount', 'balance_after', 'status', 'timestamp', 'account_id']
+
+
+def signed_amount(transaction_type, amount):
+    """Amount as it affects the balance: positive for deposits, negative for withdrawals"""
+    return amount if transaction_type == Transaction.DEPOSIT else -amount
+
+
+def to_money(value):
+    """
+    Round an aggregate back to paisa
+
+    SQLite sums decimals as floats, and Django only re-quantizes plain
+    column values, so Sum() results can come back as e.g. 379.02000000000001.
+    """
+    return (value or ZERO).quantize(ZERO)
+
+
+def signed_amount_expression():
+    """The same as signed_amount(), as an SQL expression for Sum() aggregates"""
+    return Case(
+        When(transaction_type=Transaction.DEPOSIT, then=F('amount')),
+        default=-F('amount'),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+@contextmanager
+def consistent_read():
+    """
+    Run the block in one transaction whose queries all see the same snapshot
+
+    Yields whether they do:
+    - SQLite keeps the snapshot of a transaction's first read until it ends
+      (without WAL, writers wait for it)
+    - PostgreSQL and MySQL are asked for REPEATABLE READ, which must be set
+      before the transaction's first query. Inside an outer atomic() block
+      the transaction has already started, so the snapshot is not promised
+    - other databases are not promised one either
+    """
+    nested = connection.in_atomic_block
+    with transaction.atomic():
+        if connection.vendor == 'sqlite':
+            consistent = True
+        elif connection.vendor in ('postgresql', 'mysql') and not nested:
+            with connection.cursor() as cursor:
+                cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+            consistent = True
+        else:
+            consistent = False
+        yield consistent
+
+
+def iter_account_histories(start_id, end_id, chunk_size=5000, account_fields=('id', 'balance')):
+    """
+    Yield (account, history) for every account with start_id <= id < end_id,
+    in account id order
+
+    `account` is a tuple of `account_fields` (id first) and `history` a list
+    of HISTORY_FIELDS tuples in ledger order. Accounts and transactions are
+    read as two ordered streams and merged, so only one account's history is
+    held in memory at a time. Call it inside consistent_read() so that the
+    two streams see the same postings.
+    """
+    accounts = (
+        Account.objects.filter(id__gte=start_id, id__lt=end_id)
+        .order_by('id')
+        .values_list(*account_fields)
+        .iterator(chunk_size=chunk_size)
+    )
+    rows = (
+        Transaction.objects.filter(account_id__gte=start_id, account_id__lt=end_id)
+        .order_by(*LEDGER_ORDER)
+        .values_list(*HISTORY_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+
+    row = next(rows, None)
+    for account in accounts:
+        history = []
+        while row is not None and row[-1] == account[0]:
+            history.append(row)
+            row = next(rows, None)
+        yield account, history
+
+
+def verify_account(account_id, balance, history, with_repairs=False):
+    """
+    Check one account's balance_after chain and balance
+
+    Returns None when the account is consistent, otherwise a dict describing
+    the first divergent transaction and (optionally) the repairs needed.
+    """
+    running = ZERO
+    first_divergence = None
+    repairs = []
+
+    for txn_id, txn_type, amount, balance_after, status, timestamp, _ in history:
+        if status not in Transaction.POSTED_STATUSES:
+            continue
+        running += signed_amount(txn_type, amount)
+        if balance_after != running:
+            if first_divergence is None:
+                first_divergence = {
+                    'transaction_id': txn_id,
+                    'timestamp': timestamp.isoformat(),
+                    'expected_balance_after': str(running),
+                    'actual_balance_after': str(balance_after),
+                }
+            if with_repairs:
+                repairs.append({'id': txn_id, 'balance_after': str(running)})
+
+    if first_divergence is None and balance == running:
+        return None
+
+    mismatch = {
+        'account_id': account_id,
+        'expected_balance': str(running),
+        'actual_balance': str(balance),
+        'first_divergence': first_divergence,
+    }
+    if with_repairs:
+        mismatch['repairs'] = {
+            'account': {'id': account_id, 'balance': str(running)} if balance != running else None,
+            'transactions': repairs,
+        }
+    return mismatch
+
+
+def reconcile_range(start_id, end_id, with_repairs=False, chunk_size=5000):
+    """
+    Reconcile accounts with start_id <= id < end_id
+
+    Returns (accounts checked, transactions checked, mismatches).
+    - The range is read in one consistent_read() transaction
+    - Raises ValueError for with_repairs when that read is not consistent
+    """
+    accounts_checked = 0
+    transactions_checked = 0
+    mismatches = []
+    with consistent_read() as consistent:
+        if with_repairs and not consistent:
+            raise ValueError(
+                'A repair plan needs a consistent read of the ledger, which this database '
+                'connection cannot promise here.'
+            )
+        for (account_id, balance), history in iter_account_histories(start_id, end_id, chunk_size):
+            accounts_checked += 1
+            transactions_checked += len(history)
+            mismatch = verify_account(account_id, balance, history, with_repairs)
+            if mismatch:
+                mismatches.append(mismatch)
+    return accounts_checked, transactions_checked, mismatches
+
+
+def account_shards(shard_count):
+    """Split the account id space into `shard_count` contiguous [start, end) ranges"""
+    bounds = Account.objects.aggregate(low=Min('id'), high=Max('id'))
+    if bounds['low'] is None:
+        return []
+    low, high = bounds['low'], bounds['high'] + 1
+    step = max(1, -(-(high - low) // shard_count))
+    return [(start, min(start + step, high)) for start in range(low, high, step)]
+
+
+def _init_worker():
+    """Process pool initializer: make sure Django is ready in the worker"""
+    django.setup()
+
+
+def _reconcile_shard(args):
+    start_id, end_id, with_repairs, chunk_size = args
+    try:
+        return reconcile_range(start_id, end_id, with_repairs, chunk_size)
+    finally:
+        connections.close_all()
+
+
+def reconcile(workers=1, with_repairs=False, chunk_size=5000):
+    """
+    Reconcile the whole ledger, sharded by account id range across processes
+
+    Returns (accounts checked, transactions checked, mismatches ordered by account id).
+    """
+    if workers <= 1:
+        return reconcile_range(0, 2 ** 63 - 1, with_repairs, chunk_size)
+
+    # More shards than workers evens out accounts with very long histories
+    shards = [(start, end, with_repairs, chunk_size) for start, end in account_shards(workers * 4)]
+
+    # Forked workers must not share the parent's database connection
+    connections.close_all()
+
+    accounts_checked = transactions_checked = 0
+    mismatches = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        for accounts, transactions, shard_mismatches in pool.map(_reconcile_shard, shards):
+            accounts_checked += accounts
+            transactions_checked += transactions
+            mismatches.extend(shard_mismatches)
+    return accounts_checked, transactions_checked, mismatches
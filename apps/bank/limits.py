@@ -0,0 +1,97 @@
+"""
+Withdrawal limits
+
+Daily and monthly withdrawal limits per account tier, configured in
+settings.BANK_WITHDRAWAL_LIMITS as {tier: (daily, monthly)}.
+
+Usage is read from the AccountDailyTotals counters that the posting
+service keeps up to date: today's row for the daily limit, and at most one
+row per day of the current month for the monthly limit. Transactions are
+never summed.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Account, AccountDailyTotals
+
+DEFAULT_WITHDRAWAL_LIMITS = {
+    Account.STANDARD: ('100000.00', '1000000.00'),
+}
+
+ZERO = Decimal('0.00')
+
+_limits = None
+
+
+def get_limits():
+    """{tier: (daily limit, monthly limit)} as Decimals, parsed on first use"""
+    global _limits
+    if _limits is None:
+        configured = getattr(settings, 'BANK_WITHDRAWAL_LIMITS', DEFAULT_WITHDRAWAL_LIMITS)
+        _limits = {
+            tier: (Decimal(daily), Decimal(monthly))
+            for tier, (daily, monthly) in configured.items()
+        }
+    return _limits
+
+
+@receiver(setting_changed)
+def _reset_limits(setting, **kwargs):
+    global _limits
+    if setting == 'BANK_WITHDRAWAL_LIMITS':
+        _limits = None
+
+
+def limits_for(tier):
+    """(daily, monthly) limits of a tier; unknown tiers get the Standard limits"""
+    limits = get_limits()
+    if tier in limits:
+        return limits[tier]
+    return limits.get(Account.STANDARD) or tuple(
+        Decimal(limit) for limit in DEFAULT_WITHDRAWAL_LIMITS[Account.STANDARD]
+    )
+
+
+def headroom(account, today=None, today_total=None):
+    """
+    Limits, usage and what is left for `account`
+
+    `today_total` overrides today's withdrawals when the caller already
+    holds today's counters row (the posting service does, locked).
+    """
+    today = today or timezone.localdate()
+    daily_limit, monthly_limit = limits_for(account.tier)
+    month_rows = dict(
+        AccountDailyTotals.objects.filter(
+            account=account, day__gte=today.replace(day=1), day__lte=today
+        ).values_list('day', 'withdrawal_total')
+    )
+    daily_used = month_rows.get(today, ZERO) if today_total is None else today_total
+    monthly_used = sum((total for day, total in month_rows.items() if day != today), ZERO) + daily_used
+    return {
+        'daily_limit': daily_limit,
+        'daily_used': daily_used,
+        'daily_remaining': max(daily_limit - daily_used, ZERO),
+        'monthly_limit': monthly_limit,
+        'monthly_used': monthly_used,
+        'monthly_remaining': max(monthly_limit - monthly_used, ZERO),
+    }
+
+
+def limit_error(amount, room):
+    """Message explaining why `amount` is over the headroom in `room`, or ''"""
+    if amount > room['daily_remaining']:
+        return (
+            f'This withdrawal would exceed your daily withdrawal limit of ₹{room["daily_limit"]}. '
+            f'You can withdraw up to ₹{room["daily_remaining"]} more today.'
+        )
+    if amount > room['monthly_remaining']:
+        return (
+            f'This withdrawal would exceed your monthly withdrawal limit of ₹{room["monthly_limit"]}. '
+            f'You can withdraw up to ₹{room["monthly_remaining"]} more this month.'
+        )
+    return ''
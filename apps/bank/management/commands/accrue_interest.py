@@ -0,0 +1,51 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.bank.interest import accrue_for_day, month_end, post_for_month
+
+
+class Command(BaseCommand):
+    help = 'Accrue daily interest on active accounts and credit it at month end'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date', type=str,
+            help='Day to accrue for (YYYY-MM-DD). Defaults to yesterday.'
+        )
+        parser.add_argument(
+            '--post', action='store_true',
+            help='Credit the interest accrued so far this month even if --date is not the last day '
+                 'of the month; the rest is credited at month end'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=10000,
+            help='Accounts per database transaction'
+        )
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                day = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError('--date must be in YYYY-MM-DD format')
+        else:
+            day = timezone.localdate() - timedelta(days=1)
+
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be positive')
+
+        started = timezone.now()
+        accrued = accrue_for_day(day, chunk_size=chunk_size)
+        self.stdout.write(self.style.SUCCESS(f'Accrued interest for {day} on {accrued} account(s)'))
+
+        if options['post'] or day == month_end(day):
+            credited, total = post_for_month(month_end(day), chunk_size=chunk_size)
+            self.stdout.write(self.style.SUCCESS(
+                f'Credited ₹{total} of interest to {credited} account(s) for {day.strftime("%b %Y")}'
+            ))
+
+        elapsed = (timezone.now() - started).total_seconds()
+        self.stdout.write(f'Finished in {elapsed:.1f}s')
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.bank.benchmarks import SCENARIOS, run
+
+
+class Command(BaseCommand):
+    help = 'Time hot code paths; scenarios that write are rolled back'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'scenarios', nargs='*',
+            help=f'Scenarios to run (default: all). Available: {", ".join(sorted(SCENARIOS))}'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=10000,
+            help='Iterations per measurement (write scenarios cap this)'
+        )
+
+    def handle(self, *args, **options):
+        names = options['scenarios'] or sorted(SCENARIOS)
+        unknown = [name for name in names if name not in SCENARIOS]
+        if unknown:
+            raise CommandError(f'Unknown scenario(s): {", ".join(unknown)}')
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be positive')
+
+        for name in names:
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for label, value in run(name, options['repeat']):
+                self.stdout.write(f'  {label:<40} {value}')
@@ -0,0 +1,23 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.bank.api import create_token
+
+
+class Command(BaseCommand):
+    help = 'Create a JSON API token for a customer (the token is shown only once)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', type=str, help='Customer the token acts as')
+        parser.add_argument('--name', type=str, default='', help='What the token is for, e.g. "Mobile app"')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(f'User "{options["username"]}" does not exist')
+        if not hasattr(user, 'account'):
+            raise CommandError(f'User "{user.username}" has no bank account')
+
+        _, token = create_token(user, options['name'])
+        self.stdout.write(self.style.SUCCESS(f'Token for {user.username}: {token}'))
+        self.stdout.write('Store it now: it cannot be shown again. Send it as "Authorization: Bearer <token>".')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.bank.holds import expire_holds
+
+
+class Command(BaseCommand):
+    help = 'Expire funds holds past their expiry and make the funds available again'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Holds per database transaction'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        expired = expire_holds(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Expired {expired} hold(s)'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.bank.idempotency import purge_expired
+
+
+class Command(BaseCommand):
+    help = 'Delete idempotency keys past their expiry'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Keys deleted per statement'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        purged = purge_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {purged} expired idempotency key(s)'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.bank import search
+
+
+class Command(BaseCommand):
+    help = 'Recreate the customer and full-text search indexes and refill them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=10000,
+            help='Rows indexed per statement'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        if not search.enabled():
+            raise CommandError('The search indexes need SQLite; other databases search with icontains')
+
+        indexed = search.rebuild_customers(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} user(s)'))
+        for table, count in search.rebuild_text(batch_size=options['batch_size']).items():
+            self.stdout.write(self.style.SUCCESS(f'Indexed {count} row(s) in {table}'))
@@ -0,0 +1,78 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.bank.ledger import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Check account balances and balance_after chains against the transaction history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Number of processes; accounts are sharded by id range'
+        )
+        parser.add_argument(
+            '--repair-plan', type=str,
+            help='Write a JSON repair plan for every mismatched account to this path'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=5000,
+            help='Rows fetched per database round trip'
+        )
+        parser.add_argument(
+            '--show', type=int, default=50,
+            help='Maximum number of mismatches to print'
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['chunk_size'] < 1:
+            raise CommandError('--workers and --chunk-size must be positive')
+
+        started = timezone.now()
+        try:
+            accounts, transactions, mismatches = reconcile(
+                workers=options['workers'],
+                with_repairs=bool(options['repair_plan']),
+                chunk_size=options['chunk_size'],
+            )
+        except ValueError as error:
+            raise CommandError(str(error)) from error
+        elapsed = (timezone.now() - started).total_seconds()
+
+        for mismatch in mismatches[:options['show']]:
+            line = (
+                f"Account #{mismatch['account_id']}: balance {mismatch['actual_balance']}, "
+                f"history says {mismatch['expected_balance']}"
+            )
+            divergence = mismatch['first_divergence']
+            if divergence:
+                line += (
+                    f"; chain breaks at transaction #{divergence['transaction_id']} "
+                    f"({divergence['timestamp']}): balance_after {divergence['actual_balance_after']}, "
+                    f"expected {divergence['expected_balance_after']}"
+                )
+            self.stdout.write(self.style.WARNING(line))
+        if len(mismatches) > options['show']:
+            self.stdout.write(f'... and {len(mismatches) - options["show"]} more')
+
+        if options['repair_plan']:
+            plan = {
+                'generated_at': started.isoformat(),
+                'accounts': [
+                    {'account_id': mismatch['account_id'], **mismatch['repairs']}
+                    for mismatch in mismatches
+                ],
+            }
+            with open(options['repair_plan'], 'w') as plan_file:
+                json.dump(plan, plan_file, indent=2)
+            self.stdout.write(f'Repair plan written to {options["repair_plan"]}')
+
+        self.stdout.write(
+            f'Checked {transactions} transaction(s) across {accounts} account(s) in {elapsed:.1f}s'
+        )
+        if mismatches:
+            raise CommandError(f'{len(mismatches)} account(s) do not reconcile')
+        self.stdout.write(self.style.SUCCESS('Ledger reconciles'))
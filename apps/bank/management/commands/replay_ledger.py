@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.bank.replay import Checkpoint, replay
+
+
+class Command(BaseCommand):
+    help = 'Rebuild balances, balance_after chains and derived tables from the transaction history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report what would change without writing anything'
+        )
+        parser.add_argument(
+            '--checkpoint', type=str,
+            help='Checkpoint file; an existing one resumes the replay after its last batch'
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Ignore an existing checkpoint and start from the first account'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Accounts per database transaction'
+        )
+        parser.add_argument(
+            '--show', type=int, default=50,
+            help='Maximum number of changes to print in --dry-run mode'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        checkpoint = Checkpoint(options['checkpoint']) if options['checkpoint'] else None
+        if checkpoint and options['restart']:
+            checkpoint.clear()
+        if checkpoint and checkpoint.load():
+            self.stdout.write(f'Resuming after account #{checkpoint.load()}')
+
+        started = timezone.now()
+        dry_run = options['dry_run']
+        totals = {}
+        shown = 0
+        for last_id, changes in replay(options['batch_size'], dry_run, checkpoint):
+            for name, projection_changes in changes.items():
+                totals[name] = totals.get(name, 0) + len(projection_changes)
+                if not dry_run:
+                    continue
+                for model, pk, fields in projection_changes:
+                    if shown >= options['show']:
+                        break
+                    shown += 1
+                    diff = ', '.join(f'{field}: {current} -> {rebuilt}' for field, (current, rebuilt) in fields.items())
+                    self.stdout.write(f'{model.__name__} #{pk}: {diff}')
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Replayed through account #{last_id}')
+
+        elapsed = (timezone.now() - started).total_seconds()
+        verb = 'Would change' if dry_run else 'Changed'
+        for name, count in totals.items():
+            self.stdout.write(f'{verb} {count} row(s) in {name}')
+        if checkpoint and not dry_run:
+            checkpoint.clear()
+        self.stdout.write(self.style.SUCCESS(f'Replay finished in {elapsed:.1f}s'))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.bank import bulk_actions
+
+
+class Command(BaseCommand):
+    help = 'Run bulk admin actions queued as background jobs, resuming any whose worker stopped'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=bulk_actions.chunk_size(),
+            help='Rows changed per database transaction'
+        )
+        parser.add_argument(
+            '--worker', default=None,
+            help='Name this worker claims jobs under (default: host and process id)'
+        )
+        parser.add_argument(
+            '--max-jobs', type=int, default=None,
+            help='Stop after this many jobs (default: run until the queue is empty)'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        if options['max_jobs'] is not None and options['max_jobs'] < 1:
+            raise CommandError('--max-jobs must be positive')
+
+        started = timezone.now()
+        stats = bulk_actions.run_queued(
+            worker=options['worker'], size=options['batch_size'], max_jobs=options['max_jobs']
+        )
+        elapsed = (timezone.now() - started).total_seconds()
+
+        self.stdout.write(f"Finished {stats['done']} job(s)")
+        if stats['failed']:
+            self.stdout.write(self.style.WARNING(
+                f"{stats['failed']} job(s) failed; see the Bulk Jobs page in the admin to retry them"
+            ))
+        self.stdout.write(self.style.SUCCESS(f'Finished in {elapsed:.1f}s'))
@@ -0,0 +1,60 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.bank.scheduled import batch_size, default_worker, run_due
+
+
+class Command(BaseCommand):
+    help = 'Execute standing instructions that are due, catching up missed runs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--at', type=str,
+            help='Run everything due at this past time (YYYY-MM-DD or YYYY-MM-DDTHH:MM). Defaults to now.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=batch_size(),
+            help='Instructions claimed per database transaction'
+        )
+        parser.add_argument(
+            '--max-batches', type=int,
+            help='Stop after this many batches; the rest stays due for the next run'
+        )
+        parser.add_argument(
+            '--worker', type=str, default=default_worker(),
+            help='Name this worker claims instructions under (default: host:pid)'
+        )
+
+    def handle(self, *args, **options):
+        if options['at']:
+            try:
+                at = datetime.fromisoformat(options['at'])
+            except ValueError:
+                raise CommandError('--at must be in YYYY-MM-DD or YYYY-MM-DDTHH:MM format')
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+            # Payments are real money: a future time would pay instructions early
+            if at > timezone.now():
+                raise CommandError('--at cannot be in the future')
+        else:
+            at = timezone.now()
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        if options['max_batches'] is not None and options['max_batches'] < 1:
+            raise CommandError('--max-batches must be positive')
+
+        started = timezone.now()
+        stats = run_due(at, options['batch_size'], options['worker'], options['max_batches'])
+        elapsed = (timezone.now() - started).total_seconds()
+
+        self.stdout.write(
+            f"Ran {stats['instructions']} instruction(s): {stats['paid']} payment(s) made, "
+            f"{stats['backfilled']} missed run(s) caught up"
+        )
+        if stats['failed']:
+            self.stdout.write(self.style.WARNING(
+                f"{stats['failed']} payment(s) refused (see the instructions' last error)"
+            ))
+        self.stdout.write(self.style.SUCCESS(f'Finished in {elapsed:.1f}s'))
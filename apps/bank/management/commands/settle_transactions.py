@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.bank.settlement import settle
+
+
+class Command(BaseCommand):
+    help = 'Apply approved transactions to account balances'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Accounts per database transaction'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        started = timezone.now()
+        settled, rejected = settle(batch_size=options['batch_size'])
+        elapsed = (timezone.now() - started).total_seconds()
+
+        self.stdout.write(f'Settled {len(settled)} transaction(s)')
+        if rejected:
+            self.stdout.write(self.style.WARNING(
+                f'Rejected {len(rejected)} transaction(s) that would overdraw or target a frozen account'
+            ))
+        self.stdout.write(self.style.SUCCESS(f'Finished in {elapsed:.1f}s'))
@@ -0,0 +1,47 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.bank.snapshots import snapshot_day
+
+
+class Command(BaseCommand):
+    help = 'Record end-of-day balance snapshots for accounts with activity'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date', type=str,
+            help='Day to snapshot (YYYY-MM-DD). Defaults to yesterday.'
+        )
+        parser.add_argument(
+            '--since', type=str,
+            help='Also snapshot every day from this date (YYYY-MM-DD) up to --date'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=5000,
+            help='Accounts per database transaction'
+        )
+
+    def parse_day(self, value, option):
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f'{option} must be in YYYY-MM-DD format')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive')
+
+        last_day = (
+            self.parse_day(options['date'], '--date') if options['date']
+            else timezone.localdate() - timedelta(days=1)
+        )
+        day = self.parse_day(options['since'], '--since') if options['since'] else last_day
+        if day > last_day:
+            raise CommandError('--since must not be after --date')
+
+        while day <= last_day:
+            written = snapshot_day(day, chunk_size=options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(f'{day}: wrote {written} snapshot(s)'))
+            day += timedelta(days=1)
@@ -3,12 +3,23 @@ from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Count, Q
+from django.http import JsonResponse
+from django.db import transaction as db_transaction
+from django.db.models import OuterRef, Subquery
 from django.utils import timezone
 from datetime import timedelta
 from django.contrib.auth.models import User
-from .models import Account, Transaction, BankManager, ManagerAction
+from django.conf import settings
+from . import approvals
+from .models import Account, Transaction, BankManager, ManagerAction, AnomalyAlert
 from .manager_forms import ManagerRegistrationForm
+from .services import release_rejected
+from .search import filter_customers, search_text, typeahead
+from .settlement import settle
+from .stats import dashboard_stats
+from .work_queue import (
+    available_pending, claim_pending, claimed_by, decide_batch, decide_one, held_by_other, release
+)
 
 
 def manager_required(view_func):
@@ -81,48 +92,37 @@ def manager_dashboard_view(request):
     
     # Apply search filter
     if search_query:
-        accounts = accounts.filter(
-            Q(account_number__icontains=search_query) |
-            Q(user__username__icontains=search_query) |
-            Q(user__first_name__icontains=search_query) |
-            Q(user__last_name__icontains=search_query)
+        accounts = filter_customers(
+            accounts, search_query,
+            ['account_number', 'username', 'first_name', 'last_name'], user_path='user__'
         )
     
-    # Calculate statistics
-    total_users = User.objects.exclude(manager_profile__isnull=False).count()
-    total_accounts = Account.objects.count()
-    total_balance = Account.objects.aggregate(Sum('balance'))['balance__sum'] or 0
-    total_transactions = Transaction.objects.count()
-    total_deposits = Transaction.objects.filter(transaction_type='DEPOSIT', status='COMPLETED').aggregate(Sum('amount'))['amount__sum'] or 0
-    total_withdrawals = Transaction.objects.filter(transaction_type='WITHDRAW', status='COMPLETED').aggregate(Sum('amount'))['amount__sum'] or 0
-    
-    # Pending approvals
-    pending_transactions = Transaction.objects.filter(status='PENDING').count()
-    
-    # Today's transactions
-    today = timezone.now().date()
-    today_transactions = Transaction.objects.filter(timestamp__date=today).count()
+    # Statistics, shared with the reports and admin dashboard (stats.py)
+    # Cached for a few seconds, so they may lag the latest transaction slightly
+    stats = dashboard_stats()
     
     # Get recent transactions (last 10)
     recent_transactions = Transaction.objects.select_related('account__user').all()[:10]
     
-    # Frozen accounts count
-    frozen_accounts = Account.objects.filter(status='FROZEN').count()
+    # Unreviewed alerts from the anomaly detector
+    open_alerts = AnomalyAlert.objects.filter(reviewed=False)
     
     context = {
         'manager': manager,
         'accounts': accounts[:20],  # Limit to 20 for dashboard
         'search_query': search_query,
-        'total_users': total_users,
-        'total_accounts': total_accounts,
-        'total_balance': total_balance,
-        'total_transactions': total_transactions,
-        'total_deposits': total_deposits,
-        'total_withdrawals': total_withdrawals,
-        'pending_transactions': pending_transactions,
-        'today_transactions': today_transactions,
+        'total_users': stats['total_users'],
+        'total_accounts': stats['total_accounts'],
+        'total_balance': stats['total_balance'],
+        'total_transactions': stats['total_transactions'],
+        'total_deposits': stats['total_deposits'],
+        'total_withdrawals': stats['total_withdrawals'],
+        'pending_transactions': stats['pending_transactions'],
+        'today_transactions': stats['today_transactions'],
         'recent_transactions': recent_transactions,
-        'frozen_accounts': frozen_accounts,
+        'frozen_accounts': stats['frozen_accounts'],
+        'open_alerts_count': stats['open_alerts_count'],
+        'anomaly_alerts': open_alerts.select_related('account__user')[:10],
     }
     
     return render(request, 'bank/manager_dashboard.html', context)
@@ -137,26 +137,26 @@ def manager_users_view(request):
     manager = request.user.manager_profile
     search_query = request.GET.get('search', '')
     
-    # Get all users except managers
-    users = User.objects.exclude(manager_profile__isnull=False).select_related('account')
+    # Get all users except managers, each with the time of their latest
+    # transaction (one subquery instead of a query per user)
+    latest = Transaction.objects.filter(account__user=OuterRef('pk')).order_by('-timestamp').values('timestamp')[:1]
+    users = (
+        User.objects.exclude(manager_profile__isnull=False)
+        .select_related('account')
+        .annotate(last_transaction_at=Subquery(latest))
+    )
     
     if search_query:
-        users = users.filter(
-            Q(username__icontains=search_query) |
-            Q(first_name__icontains=search_query) |
-            Q(last_name__icontains=search_query) |
-            Q(email__icontains=search_query)
-        )
+        users = filter_customers(users, search_query, ['username', 'first_name', 'last_name', 'email'])
     
     # Identify inactive users (no activity in last 30 days)
     thirty_days_ago = timezone.now() - timedelta(days=30)
     
     users_data = []
     for user in users:
-        last_transaction = Transaction.objects.filter(account__user=user).first()
         is_inactive = False
-        if last_transaction:
-            is_inactive = last_transaction.timestamp < thirty_days_ago
+        if user.last_transaction_at:
+            is_inactive = user.last_transaction_at < thirty_days_ago
         elif user.date_joined < thirty_days_ago:
             is_inactive = True
         
@@ -223,10 +223,7 @@ def manager_accounts_view(request):
     accounts = Account.objects.select_related('user').all()
     
     if search_query:
-        accounts = accounts.filter(
-            Q(account_number__icontains=search_query) |
-            Q(user__username__icontains=search_query)
-        )
+        accounts = filter_customers(accounts, search_query, ['account_number', 'username'], user_path='user__')
     
     if status_filter:
         accounts = accounts.filter(status=status_filter)
@@ -241,6 +238,24 @@ def manager_accounts_view(request):
     return render(request, 'bank/manager_accounts.html', context)
 
 
+@login_required(login_url='bank:manager_login')
+@manager_required
+def manager_search_view(request):
+    """
+    Customer typeahead (JSON)
+    - GET ?q=<text>&limit=<n>: the first customers matching q (search.py)
+    - Used by the search boxes on the users and accounts pages
+    """
+    default_limit = getattr(settings, 'BANK_SEARCH_TYPEAHEAD_LIMIT', 10)
+    try:
+        limit = int(request.GET.get('limit', default_limit))
+    except ValueError:
+        limit = default_limit
+    limit = min(max(limit, 1), 50)
+    
+    return JsonResponse({'results': typeahead(request.GET.get('q', ''), limit)})
+
+
 @login_required(login_url='bank:manager_login')
 @manager_required
 def manager_account_detail_view(request, account_id):
@@ -359,6 +374,7 @@ def manager_transactions_view(request):
     transaction_type = request.GET.get('type', '')
     status_filter = request.GET.get('status', '')
     search_query = request.GET.get('search', '')
+    text_query = request.GET.get('text', '')
     
     transactions = Transaction.objects.select_related('account__user').all()
     
@@ -372,23 +388,26 @@ def manager_transactions_view(request):
     if status_filter:
         transactions = transactions.filter(status=status_filter)
     if search_query:
-        transactions = transactions.filter(
-            Q(account__account_number__icontains=search_query) |
-            Q(account__user__username__icontains=search_query)
+        transactions = filter_customers(
+            transactions, search_query, ['account_number', 'username'], user_path='account__user__'
         )
+    if text_query:
+        # Descriptions and approval notes, most relevant first (search.py)
+        transactions = search_text(transactions, text_query)
     
     # Identify large transactions (over 50000)
     large_transactions = transactions.filter(amount__gte=50000)
     
     context = {
         'manager': manager,
-        'transactions': transactions[:100],  # Limit to 100
+        'transactions': transactions.select_related('approval')[:100],  # Limit to 100, with their notes
         'large_transactions_count': large_transactions.count(),
         'date_from': date_from,
         'date_to': date_to,
         'transaction_type': transaction_type,
         'status_filter': status_filter,
         'search_query': search_query,
+        'text_query': text_query,
     }
     
     return render(request, 'bank/manager_transactions.html', context)
@@ -401,16 +420,35 @@ def manager_pending_approvals_view(request):
     View pending transaction approvals
     """
     manager = request.user.manager_profile
-    pending_transactions = Transaction.objects.filter(status='PENDING').select_related('account__user')
+    pending_transactions = Transaction.objects.filter(status='PENDING').select_related(
+        'account__user', 'claimed_by__user'
+    )
     
     context = {
         'manager': manager,
         'pending_transactions': pending_transactions,
+        'now': timezone.now(),
     }
     
     return render(request, 'bank/manager_pending_approvals.html', context)
 
 
+def _decide(manager, transaction, user, note, status):
+    """
+    Approve or reject one transaction, if it is still ours to decide
+    - The status changes with a compare-and-set UPDATE (work_queue.decide_one),
+      so of two requests deciding at once only one goes on
+    - Returns False if the transaction was decided or claimed meanwhile
+    """
+    with db_transaction.atomic():
+        if not decide_one(manager, transaction.id, status):
+            return False
+        approvals.record([transaction.id], user, note)
+        if status == Transaction.REJECTED:
+            release_rejected([transaction.id])
+    return True
+
+
 @login_required(login_url='bank:manager_login')
 @manager_required
 def manager_approve_transaction_view(request, transaction_id):
@@ -425,11 +463,13 @@ def manager_approve_transaction_view(request, transaction_id):
         
         if transaction.status != 'PENDING':
             messages.warning(request, 'This transaction is not pending approval.')
+        elif held_by_other(transaction, manager):
+            messages.warning(request, 'This transaction is in another manager\'s work queue.')
+        elif not _decide(manager, transaction, request.user, note, Transaction.APPROVED):
+            messages.warning(request, 'This transaction was decided or claimed by someone else just now.')
         else:
-            transaction.status = 'APPROVED'
-            transaction.approved_by = request.user
-            transaction.approval_note = note
-            transaction.save()
+            # Post it to the account balance; an overdrawing withdrawal is rejected here
+            settled, rejected = settle([transaction.id])
             
             # Log the action
             ManagerAction.objects.create(
@@ -441,7 +481,14 @@ def manager_approve_transaction_view(request, transaction_id):
                 note=f'Approved transaction #{transaction.id}. Note: {note}'
             )
             
-            messages.success(request, f'Transaction #{transaction.id} has been approved.')
+            if rejected:
+                messages.warning(
+                    request,
+                    f'Transaction #{transaction.id} was approved but rejected at settlement: '
+                    f'it would overdraw the account or the account is frozen.'
+                )
+            else:
+                messages.success(request, f'Transaction #{transaction.id} has been approved and settled.')
         
         return redirect('bank:manager_pending_approvals')
     
@@ -467,12 +514,11 @@ def manager_reject_transaction_view(request, transaction_id):
         
         if transaction.status != 'PENDING':
             messages.warning(request, 'This transaction is not pending approval.')
+        elif held_by_other(transaction, manager):
+            messages.warning(request, 'This transaction is in another manager\'s work queue.')
+        elif not _decide(manager, transaction, request.user, note, Transaction.REJECTED):
+            messages.warning(request, 'This transaction was decided or claimed by someone else just now.')
         else:
-            transaction.status = 'REJECTED'
-            transaction.approved_by = request.user
-            transaction.approval_note = note
-            transaction.save()
-            
             # Log the action
             ManagerAction.objects.create(
                 manager=manager,
@@ -497,41 +543,96 @@ def manager_reject_transaction_view(request, transaction_id):
 
 @login_required(login_url='bank:manager_login')
 @manager_required
-def manager_reports_view(request):
+def manager_work_queue_view(request):
     """
-    Generate and view reports
+    Work-queue mode for pending approvals
+    - Claim a batch of pending transactions that no other manager can take while the lease lasts
+    - Approve or reject the ticked transactions of the batch in one go
     """
     manager = request.user.manager_profile
     
-    # Daily report
-    today = timezone.now().date()
-    today_transactions = Transaction.objects.filter(timestamp__date=today, status='COMPLETED')
-    today_deposits = today_transactions.filter(transaction_type='DEPOSIT').aggregate(Sum('amount'))['amount__sum'] or 0
-    today_withdrawals = today_transactions.filter(transaction_type='WITHDRAW').aggregate(Sum('amount'))['amount__sum'] or 0
+    if request.method == 'POST':
+        action = request.POST.get('action')
+        
+        if action == 'claim':
+            try:
+                size = int(request.POST.get('batch_size', ''))
+            except ValueError:
+                size = getattr(settings, 'BANK_APPROVAL_BATCH_SIZE', 20)
+            size = max(1, min(size, 100))
+            
+            claimed = claim_pending(manager, size)
+            if claimed:
+                messages.success(request, f'Claimed {len(claimed)} pending transaction(s).')
+            else:
+                messages.info(request, 'No unclaimed pending transactions. All caught up! ✓')
+        
+        elif action in ('approve', 'reject'):
+            ids = [int(value) for value in request.POST.getlist('transaction_ids') if value.isdigit()]
+            note = request.POST.get('note', '')
+            if not ids:
+                messages.warning(request, 'Select at least one transaction.')
+            else:
+                decided = decide_batch(manager, ids, approve=(action == 'approve'), note=note)
+                verb = 'Approved' if action == 'approve' else 'Rejected'
+                if decided:
+                    messages.success(request, f'{verb} {len(decided)} transaction(s).')
+                if decided and action == 'approve':
+                    settled, rejected = settle(decided)
+                    if rejected:
+                        messages.warning(
+                            request,
+                            f'{len(rejected)} approved transaction(s) were rejected at settlement '
+                            f'(overdraw or frozen account).'
+                        )
+                if len(decided) < len(ids):
+                    messages.warning(
+                        request,
+                        f'{len(ids) - len(decided)} transaction(s) were skipped because your claim on them expired.'
+                    )
+        
+        elif action == 'release':
+            released = release(manager)
+            messages.info(request, f'Released {released} transaction(s) back to the queue.')
+        
+        return redirect('bank:manager_work_queue')
+    
+    claimed_transactions = list(claimed_by(manager).select_related('account__user'))
+    
+    context = {
+        'manager': manager,
+        'claimed_transactions': claimed_transactions,
+        'lease_expires_at': min((txn.claim_expires_at for txn in claimed_transactions), default=None),
+        'unclaimed_count': available_pending().count(),
+        'batch_size': getattr(settings, 'BANK_APPROVAL_BATCH_SIZE', 20),
+    }
     
-    # Weekly report
-    week_ago = timezone.now() - timedelta(days=7)
-    week_transactions = Transaction.objects.filter(timestamp__gte=week_ago, status='COMPLETED')
-    week_deposits = week_transactions.filter(transaction_type='DEPOSIT').aggregate(Sum('amount'))['amount__sum'] or 0
-    week_withdrawals = week_transactions.filter(transaction_type='WITHDRAW').aggregate(Sum('amount'))['amount__sum'] or 0
+    return render(request, 'bank/manager_work_queue.html', context)
+
+
+@login_required(login_url='bank:manager_login')
+@manager_required
+def manager_reports_view(request):
+    """
+    Generate and view reports
+    """
+    manager = request.user.manager_profile
     
-    # Monthly report
-    month_ago = timezone.now() - timedelta(days=30)
-    month_transactions = Transaction.objects.filter(timestamp__gte=month_ago, status='COMPLETED')
-    month_deposits = month_transactions.filter(transaction_type='DEPOSIT').aggregate(Sum('amount'))['amount__sum'] or 0
-    month_withdrawals = month_transactions.filter(transaction_type='WITHDRAW').aggregate(Sum('amount'))['amount__sum'] or 0
+    # Completed transactions today, in the last 7 days and in the last 30 days,
+    # all from the shared statistics (stats.py)
+    stats = dashboard_stats()
     
     context = {
         'manager': manager,
-        'today_transactions_count': today_transactions.count(),
-        'today_deposits': today_deposits,
-        'today_withdrawals': today_withdrawals,
-        'week_transactions_count': week_transactions.count(),
-        'week_deposits': week_deposits,
-        'week_withdrawals': week_withdrawals,
-        'month_transactions_count': month_transactions.count(),
-        'month_deposits': month_deposits,
-        'month_withdrawals': month_withdrawals,
+        'today_transactions_count': stats['today_completed_count'],
+        'today_deposits': stats['today_deposits'],
+        'today_withdrawals': stats['today_withdrawals'],
+        'week_transactions_count': stats['week_completed_count'],
+        'week_deposits': stats['week_deposits'],
+        'week_withdrawals': stats['week_withdrawals'],
+        'month_transactions_count': stats['month_completed_count'],
+        'month_deposits': stats['month_deposits'],
+        'month_withdrawals': stats['month_withdrawals'],
     }
     
     return render(request, 'bank/manager_reports.html', context)
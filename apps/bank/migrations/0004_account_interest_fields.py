@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bank", "0003_account_last_activity_account_status_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="account",
+            name="accrued_interest",
+            field=models.DecimalField(decimal_places=6, default=0, max_digits=16),
+        ),
+        migrations.AddField(
+            model_name="account",
+            name="interest_accrued_through",
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="account",
+            name="interest_posted_through",
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bank", "0004_account_interest_fields"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["account", "timestamp", "id"], name="bank_txn_ledger_order_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bank", "0005_transaction_ledger_order_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BalanceSnapshotRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("as_of", models.DateField(unique=True)),
+                ("last_account_id", models.BigIntegerField(default=0)),
+                ("started_at", models.DateTimeField(auto_now_add=True)),
+                ("completed_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "ordering": ["-as_of"],
+            },
+        ),
+        migrations.CreateModel(
+            name="AccountBalanceSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("as_of", models.DateField()),
+                ("balance", models.DecimalField(decimal_places=2, max_digits=12)),
+                (
+                    "account",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="balance_snapshots",
+                        to="bank.account",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Balance Snapshot",
+                "verbose_name_plural": "Balance Snapshots",
+                "ordering": ["-as_of"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="accountbalancesnapshot",
+            constraint=models.UniqueConstraint(
+                fields=("account", "as_of"), name="bank_snapshot_account_day_uniq"
+            ),
+        ),
+    ]
@@ -0,0 +1,243 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+LEDGER_ACCOUNTS = [
+    ("CASH", "Cash", "ASSET"),
+    ("SUSPENSE", "Suspense", "LIABILITY"),
+    ("INTEREST_EXPENSE", "Interest Expense", "EXPENSE"),
+]
+
+
+def create_ledger_and_journal_history(apps, schema_editor):
+    """
+    Create the internal ledger accounts, then journal every completed
+    transaction so the books open balanced against existing balances
+    """
+    LedgerAccount = apps.get_model("bank", "LedgerAccount")
+    JournalEntry = apps.get_model("bank", "JournalEntry")
+    Posting = apps.get_model("bank", "Posting")
+    Transaction = apps.get_model("bank", "Transaction")
+
+    ledger = {}
+    for code, name, kind in LEDGER_ACCOUNTS:
+        ledger[code] = LedgerAccount.objects.create(code=code, name=name, kind=kind)
+    totals = {code: 0 for code in ledger}
+
+    last_id = 0
+    while True:
+        chunk = list(
+            Transaction.objects.filter(id__gt=last_id, status="COMPLETED").order_by(
+                "id"
+            )[:1000]
+        )
+        if not chunk:
+            break
+        last_id = chunk[-1].id
+
+        entries = []
+        for txn in chunk:
+            description = (txn.description or "")[:200]
+            if txn.transaction_type == "DEPOSIT":
+                interest = description.startswith("Interest credit for")
+                entries.append(
+                    JournalEntry(
+                        entry_type="INTEREST" if interest else "DEPOSIT",
+                        description=description,
+                    )
+                )
+            else:
+                entries.append(
+                    JournalEntry(entry_type="WITHDRAW", description=description)
+                )
+        if schema_editor.connection.features.can_return_rows_from_bulk_insert:
+            JournalEntry.objects.bulk_create(entries)
+        else:
+            for entry in entries:
+                entry.save()
+
+        postings = []
+        for txn, entry in zip(chunk, entries):
+            code = "INTEREST_EXPENSE" if entry.entry_type == "INTEREST" else "CASH"
+            # Debits positive: a deposit debits the bank side, credits the customer
+            amount = txn.amount if txn.transaction_type == "DEPOSIT" else -txn.amount
+            postings.append(
+                Posting(entry=entry, ledger_account=ledger[code], amount=amount)
+            )
+            postings.append(
+                Posting(entry=entry, account_id=txn.account_id, amount=-amount)
+            )
+            totals[code] += amount
+            txn.journal_entry = entry
+        Posting.objects.bulk_create(postings)
+        Transaction.objects.bulk_update(chunk, ["journal_entry"])
+
+    for code, total in totals.items():
+        if total:
+            LedgerAccount.objects.filter(pk=ledger[code].pk).update(balance=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bank", "0006_balance_snapshots"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="JournalEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "entry_type",
+                    models.CharField(
+                        choices=[
+                            ("DEPOSIT", "Deposit"),
+                            ("WITHDRAW", "Withdraw"),
+                            ("INTEREST", "Interest"),
+                            ("ADJUSTMENT", "Adjustment"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("description", models.CharField(blank=True, max_length=200)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Journal Entry",
+                "verbose_name_plural": "Journal Entries",
+                "ordering": ["-id"],
+            },
+        ),
+        migrations.CreateModel(
+            name="LedgerAccount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("code", models.CharField(max_length=30, unique=True)),
+                ("name", models.CharField(max_length=100)),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("ASSET", "Asset"),
+                            ("LIABILITY", "Liability"),
+                            ("EXPENSE", "Expense"),
+                            ("INCOME", "Income"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "balance",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=16),
+                ),
+            ],
+            options={
+                "verbose_name": "Ledger Account",
+                "verbose_name_plural": "Ledger Accounts",
+                "ordering": ["code"],
+            },
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="journal_entry",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="transactions",
+                to="bank.journalentry",
+            ),
+        ),
+        migrations.CreateModel(
+            name="Posting",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("amount", models.DecimalField(decimal_places=2, max_digits=14)),
+                (
+                    "account",
+                    models.ForeignKey(
+                        blank=True,
+                        db_index=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="postings",
+                        to="bank.account",
+                    ),
+                ),
+                (
+                    "entry",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="postings",
+                        to="bank.journalentry",
+                    ),
+                ),
+                (
+                    "ledger_account",
+                    models.ForeignKey(
+                        blank=True,
+                        db_index=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="postings",
+                        to="bank.ledgeraccount",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["id"],
+                "indexes": [
+                    models.Index(
+                        fields=["ledger_account", "id"], name="bank_posting_ledger_idx"
+                    ),
+                    models.Index(
+                        fields=["account", "id"], name="bank_posting_account_idx"
+                    ),
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="posting",
+            constraint=models.CheckConstraint(
+                check=models.Q(
+                    models.Q(
+                        ("account__isnull", True), ("ledger_account__isnull", False)
+                    ),
+                    models.Q(
+                        ("account__isnull", False), ("ledger_account__isnull", True)
+                    ),
+                    _connector="OR",
+                ),
+                name="bank_posting_one_target",
+            ),
+        ),
+        migrations.RunPython(
+            create_ledger_and_journal_history, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bank", "0007_double_entry_journal"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transaction",
+            name="claim_expires_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="claimed_by",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="claimed_transactions",
+                to="bank.bankmanager",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["status", "id"], name="bank_txn_status_queue_idx"
+            ),
+        ),
+    ]
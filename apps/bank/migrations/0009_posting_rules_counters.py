@@ -0,0 +1,63 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bank", "0008_transaction_claims"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transaction",
+            name="review_reason",
+            field=models.CharField(blank=True, default="", max_length=200),
+        ),
+        migrations.CreateModel(
+            name="AccountDailyTotals",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("deposit_count", models.PositiveIntegerField(default=0)),
+                (
+                    "deposit_total",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("withdrawal_count", models.PositiveIntegerField(default=0)),
+                (
+                    "withdrawal_total",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "account",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_totals",
+                        to="bank.account",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Account Daily Totals",
+                "verbose_name_plural": "Account Daily Totals",
+                "ordering": ["-day"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="accountdailytotals",
+            constraint=models.UniqueConstraint(
+                fields=("account", "day"), name="bank_daily_totals_account_day_uniq"
+            ),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bank", "0009_posting_rules_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AnomalyAlert",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("VELOCITY_COUNT", "Too many postings"),
+                            ("VELOCITY_AMOUNT", "Too much money moved"),
+                            ("AMOUNT_DEVIATION", "Unusual amount"),
+                            ("REPEATED_AMOUNT", "Repeated identical amount"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("score", models.DecimalField(decimal_places=2, max_digits=10)),
+                ("detail", models.CharField(max_length=200)),
+                ("reviewed", models.BooleanField(default=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "account",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="anomaly_alerts",
+                        to="bank.account",
+                    ),
+                ),
+                (
+                    "transaction",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="anomaly_alerts",
+                        to="bank.transaction",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Anomaly Alert",
+                "verbose_name_plural": "Anomaly Alerts",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["reviewed", "created_at"], name="bank_alert_open_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-19 17:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bank", "0010_anomaly_alerts"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="account",
+            name="tier",
+            field=models.CharField(
+                choices=[
+                    ("STANDARD", "Standard"),
+                    ("PREMIUM", "Premium"),
+                    ("BUSINESS", "Business"),
+                ],
+                default="STANDARD",
+                max_length=10,
+            ),
+        ),
+    ]
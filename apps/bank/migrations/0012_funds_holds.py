@@ -0,0 +1,120 @@
+# Generated by Django 4.2.7 on 2026-10-19 18:01
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def hold_waiting_withdrawals(apps, schema_editor):
+    """
+    Start available_balance at the balance, then place a hold for every
+    withdrawal still waiting for approval or settlement
+    """
+    Account = apps.get_model("bank", "Account")
+    Hold = apps.get_model("bank", "Hold")
+    Transaction = apps.get_model("bank", "Transaction")
+
+    Account.objects.update(available_balance=F("balance"))
+
+    expires_at = timezone.now() + timedelta(
+        seconds=getattr(settings, "BANK_HOLD_SECONDS", 7 * 24 * 3600)
+    )
+    waiting = Transaction.objects.filter(
+        transaction_type="WITHDRAW", status__in=["PENDING", "APPROVED"]
+    ).values_list("id", "account_id", "amount")
+    held = defaultdict(Decimal)
+    holds = []
+    for txn_id, account_id, amount in waiting.iterator():
+        holds.append(
+            Hold(
+                account_id=account_id,
+                transaction_id=txn_id,
+                amount=amount,
+                expires_at=expires_at,
+            )
+        )
+        held[account_id] += amount
+    Hold.objects.bulk_create(holds, batch_size=500)
+    for account_id, amount in held.items():
+        Account.objects.filter(pk=account_id).update(
+            available_balance=F("available_balance") - amount
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bank", "0011_account_tier"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="account",
+            name="available_balance",
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=12),
+        ),
+        migrations.CreateModel(
+            name="Hold",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("amount", models.DecimalField(decimal_places=2, max_digits=12)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("ACTIVE", "Active"),
+                            ("SETTLED", "Settled"),
+                            ("RELEASED", "Released"),
+                            ("EXPIRED", "Expired"),
+                        ],
+                        default="ACTIVE",
+                        max_length=10,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("expires_at", models.DateTimeField()),
+                ("released_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "account",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="holds",
+                        to="bank.account",
+                    ),
+                ),
+                (
+                    "transaction",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="hold",
+                        to="bank.transaction",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Hold",
+                "verbose_name_plural": "Holds",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "expires_at"], name="bank_hold_expiry_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(hold_waiting_withdrawals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 4.2.7 on 2026-10-19 18:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bank", "0012_funds_holds"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StandingInstruction",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("TRANSFER", "Transfer"), ("WITHDRAW", "Withdrawal")],
+                        max_length=10,
+                    ),
+                ),
+                ("amount", models.DecimalField(decimal_places=2, max_digits=12)),
+                (
+                    "frequency",
+                    models.CharField(
+                        choices=[
+                            ("DAILY", "Daily"),
+                            ("WEEKLY", "Weekly"),
+                            ("MONTHLY", "Monthly"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("description", models.CharField(blank=True, max_length=200)),
+                ("starts_at", models.DateTimeField()),
+                ("next_run_at", models.DateTimeField()),
+                ("active", models.BooleanField(default=True)),
+                ("last_run_at", models.DateTimeField(blank=True, null=True)),
+                ("last_error", models.CharField(blank=True, max_length=200)),
+                ("claimed_by", models.CharField(blank=True, max_length=100, null=True)),
+                ("claim_expires_at", models.DateTimeField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "account",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="standing_instructions",
+                        to="bank.account",
+                    ),
+                ),
+                (
+                    "to_account",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="incoming_instructions",
+                        to="bank.account",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Standing Instruction",
+                "verbose_name_plural": "Standing Instructions",
+                "ordering": ["next_run_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["active", "next_run_at"],
+                        name="bank_instruction_due_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 18:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bank", "0015_api_tokens"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="account",
+            name="version",
+            field=models.PositiveBigIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 4.2.7 on 2026-10-19 19:02
+
+from django.db import migrations
+
+TABLE = "bank_customer_search"
+FILL_BATCH_SIZE = 10000
+
+CREATE_TABLE = """
+CREATE VIRTUAL TABLE bank_customer_search USING fts5(
+    account_id UNINDEXED, account_number, username, first_name, last_name, email,
+    tokenize = 'trigram'
+)
+"""
+
+TRIGGERS = {
+    "bank_customer_search_user_insert": """
+    CREATE TRIGGER bank_customer_search_user_insert AFTER INSERT ON auth_user BEGIN
+        INSERT INTO bank_customer_search (rowid, account_id, account_number, username, first_name, last_name, email)
+        VALUES (new.id, NULL, '', new.username, new.first_name, new.last_name, new.email);
+    END
+    """,
+    "bank_customer_search_user_update": """
+    CREATE TRIGGER bank_customer_search_user_update AFTER UPDATE OF username, first_name, last_name, email ON auth_user
+    WHEN old.username IS NOT new.username OR old.first_name IS NOT new.first_name
+      OR old.last_name IS NOT new.last_name OR old.email IS NOT new.email BEGIN
+        UPDATE bank_customer_search SET username = new.username, first_name = new.first_name,
+            last_name = new.last_name, email = new.email
+        WHERE rowid = new.id;
+    END
+    """,
+    "bank_customer_search_user_delete": """
+    CREATE TRIGGER bank_customer_search_user_delete AFTER DELETE ON auth_user BEGIN
+        DELETE FROM bank_customer_search WHERE rowid = old.id;
+    END
+    """,
+    "bank_customer_search_account_insert": """
+    CREATE TRIGGER bank_customer_search_account_insert AFTER INSERT ON bank_account BEGIN
+        UPDATE bank_customer_search SET account_id = new.id, account_number = new.account_number
+        WHERE rowid = new.user_id;
+    END
+    """,
+    "bank_customer_search_account_update": """
+    CREATE TRIGGER bank_customer_search_account_update AFTER UPDATE OF account_number, user_id ON bank_account
+    WHEN old.account_number IS NOT new.account_number OR old.user_id IS NOT new.user_id BEGIN
+        UPDATE bank_customer_search SET account_id = NULL, account_number = '' WHERE rowid = old.user_id;
+        UPDATE bank_customer_search SET account_id = new.id, account_number = new.account_number
+        WHERE rowid = new.user_id;
+    END
+    """,
+    "bank_customer_search_account_delete": """
+    CREATE TRIGGER bank_customer_search_account_delete AFTER DELETE ON bank_account BEGIN
+        UPDATE bank_customer_search SET account_id = NULL, account_number = '' WHERE rowid = old.user_id;
+    END
+    """,
+}
+
+FILL = """
+INSERT OR REPLACE INTO bank_customer_search (rowid, account_id, account_number, username, first_name, last_name, email)
+SELECT u.id, a.id, COALESCE(a.account_number, ''), u.username, u.first_name, u.last_name, u.email
+FROM auth_user u LEFT JOIN bank_account a ON a.user_id = u.id
+WHERE u.id > %s AND u.id <= %s
+"""
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Create the FTS5 customer search index and the triggers that keep it in
+    step, then index every existing user. SQLite only: elsewhere searches
+    use icontains
+    """
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    User = apps.get_model("auth", "User")
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(CREATE_TABLE)
+        for sql in TRIGGERS.values():
+            cursor.execute(sql)
+        last_id = 0
+        max_id = User.objects.order_by("-id").values_list("id", flat=True).first() or 0
+        while last_id < max_id:
+            cursor.execute(FILL, [last_id, last_id + FILL_BATCH_SIZE])
+            last_id += FILL_BATCH_SIZE
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for name in TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("bank", "0016_account_version"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,144 @@
+# Generated by Django 4.2.7 on 2026-10-19 18:35
+
+import apps.bank.fts
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+TOKENIZER = "porter unicode61 remove_diacritics 2"
+FILL_BATCH_SIZE = 10000
+
+# (table, source table, indexed columns)
+INDEXES = [
+    ("bank_transaction_search", "bank_transaction", ["description", "approval_note"]),
+    ("bank_manageraction_search", "bank_manageraction", ["note"]),
+]
+
+
+def create_statements(table, source, columns):
+    """The FTS5 table and the triggers that keep it in step with `source`"""
+    listed = ", ".join(columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    changed = " OR ".join(f"old.{column} IS NOT new.{column}" for column in columns)
+    assignments = ", ".join(f"{column} = new.{column}" for column in columns)
+    return [
+        f"CREATE VIRTUAL TABLE {table} USING fts5({listed}, tokenize = '{TOKENIZER}')",
+        f"""
+        CREATE TRIGGER {table}_insert AFTER INSERT ON {source} BEGIN
+            INSERT INTO {table} (rowid, {listed}) VALUES (new.id, {new_values});
+        END
+        """,
+        f"""
+        CREATE TRIGGER {table}_update AFTER UPDATE OF {listed} ON {source}
+        WHEN {changed} BEGIN
+            UPDATE {table} SET {assignments} WHERE rowid = new.id;
+        END
+        """,
+        f"""
+        CREATE TRIGGER {table}_delete AFTER DELETE ON {source} BEGIN
+            DELETE FROM {table} WHERE rowid = old.id;
+        END
+        """,
+    ]
+
+
+def create_full_text_indexes(apps, schema_editor):
+    """
+    Create the FTS5 indexes of transaction descriptions and notes and of
+    manager action notes, with their triggers, and index existing rows.
+    SQLite only: elsewhere searches use icontains
+    """
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for table, source, columns in INDEXES:
+            for sql in create_statements(table, source, columns):
+                cursor.execute(sql)
+            cursor.execute(f"SELECT MAX(id) FROM {source}")
+            max_id = cursor.fetchone()[0] or 0
+            last_id = 0
+            while last_id < max_id:
+                cursor.execute(
+                    f"INSERT INTO {table} (rowid, {', '.join(columns)}) "
+                    f"SELECT id, {', '.join(columns)} FROM {source} WHERE id > %s AND id <= %s",
+                    [last_id, last_id + FILL_BATCH_SIZE],
+                )
+                last_id += FILL_BATCH_SIZE
+
+
+def drop_full_text_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for table, source, columns in INDEXES:
+            for action in ("insert", "update", "delete"):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {table}_{action}")
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bank", "0017_customer_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ManagerActionSearch",
+            fields=[
+                (
+                    "action",
+                    models.OneToOneField(
+                        db_column="rowid",
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        primary_key=True,
+                        related_name="search_entry",
+                        serialize=False,
+                        to="bank.manageraction",
+                    ),
+                ),
+                (
+                    "document",
+                    apps.bank.fts.SearchDocumentField(
+                        db_column="bank_manageraction_search"
+                    ),
+                ),
+                ("rank", models.FloatField()),
+                ("note", models.TextField()),
+            ],
+            options={
+                "db_table": "bank_manageraction_search",
+                "managed": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="TransactionSearch",
+            fields=[
+                (
+                    "transaction",
+                    models.OneToOneField(
+                        db_column="rowid",
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        primary_key=True,
+                        related_name="search_entry",
+                        serialize=False,
+                        to="bank.transaction",
+                    ),
+                ),
+                (
+                    "document",
+                    apps.bank.fts.SearchDocumentField(
+                        db_column="bank_transaction_search"
+                    ),
+                ),
+                ("rank", models.FloatField()),
+                ("description", models.TextField()),
+                ("approval_note", models.TextField()),
+            ],
+            options={
+                "db_table": "bank_transaction_search",
+                "managed": False,
+            },
+        ),
+        migrations.RunPython(create_full_text_indexes, drop_full_text_indexes),
+    ]
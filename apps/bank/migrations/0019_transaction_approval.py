@@ -0,0 +1,187 @@
+# Generated by Django 4.2.7 on 2026-10-19 18:43
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+COPY_BATCH_SIZE = 10000
+
+# Decisions, and notes without one, of transactions with ids in (%s, %s]
+COPY_DECISIONS = """
+INSERT INTO bank_transactionapproval (transaction_id, approved_by_id, note)
+SELECT id, approved_by_id, COALESCE(approval_note, '') FROM bank_transaction
+WHERE (approved_by_id IS NOT NULL OR COALESCE(approval_note, '') <> '')
+  AND id > %s AND id <= %s
+"""
+
+COPY_DECISIONS_BACK = """
+UPDATE bank_transaction SET
+    approved_by_id = (SELECT a.approved_by_id FROM bank_transactionapproval a WHERE a.transaction_id = bank_transaction.id),
+    approval_note = (SELECT a.note FROM bank_transactionapproval a WHERE a.transaction_id = bank_transaction.id)
+WHERE id IN (SELECT transaction_id FROM bank_transactionapproval)
+"""
+
+# Triggers of bank_transaction_search as migration 0018 created them, with
+# approval_note read from bank_transaction
+OLD_TRIGGERS = {
+    "bank_transaction_search_insert": """
+        CREATE TRIGGER bank_transaction_search_insert AFTER INSERT ON bank_transaction BEGIN
+            INSERT INTO bank_transaction_search (rowid, description, approval_note)
+            VALUES (new.id, new.description, new.approval_note);
+        END
+    """,
+    "bank_transaction_search_update": """
+        CREATE TRIGGER bank_transaction_search_update AFTER UPDATE OF description, approval_note ON bank_transaction
+        WHEN old.description IS NOT new.description OR old.approval_note IS NOT new.approval_note BEGIN
+            UPDATE bank_transaction_search SET description = new.description, approval_note = new.approval_note
+            WHERE rowid = new.id;
+        END
+    """,
+    "bank_transaction_search_delete": """
+        CREATE TRIGGER bank_transaction_search_delete AFTER DELETE ON bank_transaction BEGIN
+            DELETE FROM bank_transaction_search WHERE rowid = old.id;
+        END
+    """,
+}
+
+# The same index with approval_note read from bank_transactionapproval
+NEW_TRIGGERS = {
+    "bank_transaction_search_insert": """
+        CREATE TRIGGER bank_transaction_search_insert AFTER INSERT ON bank_transaction BEGIN
+            INSERT INTO bank_transaction_search (rowid, description, approval_note)
+            VALUES (new.id, new.description,
+                    COALESCE((SELECT note FROM bank_transactionapproval WHERE transaction_id = new.id), ''));
+        END
+    """,
+    "bank_transaction_search_update": """
+        CREATE TRIGGER bank_transaction_search_update AFTER UPDATE OF description ON bank_transaction
+        WHEN old.description IS NOT new.description BEGIN
+            UPDATE bank_transaction_search SET description = new.description WHERE rowid = new.id;
+        END
+    """,
+    "bank_transaction_search_delete": """
+        CREATE TRIGGER bank_transaction_search_delete AFTER DELETE ON bank_transaction BEGIN
+            DELETE FROM bank_transaction_search WHERE rowid = old.id;
+        END
+    """,
+    "bank_transaction_search_approval_insert": """
+        CREATE TRIGGER bank_transaction_search_approval_insert AFTER INSERT ON bank_transactionapproval BEGIN
+            UPDATE bank_transaction_search SET approval_note = new.note WHERE rowid = new.transaction_id;
+        END
+    """,
+    "bank_transaction_search_approval_update": """
+        CREATE TRIGGER bank_transaction_search_approval_update AFTER UPDATE OF note ON bank_transactionapproval
+        WHEN old.note IS NOT new.note BEGIN
+            UPDATE bank_transaction_search SET approval_note = new.note WHERE rowid = new.transaction_id;
+        END
+    """,
+    "bank_transaction_search_approval_delete": """
+        CREATE TRIGGER bank_transaction_search_approval_delete AFTER DELETE ON bank_transactionapproval BEGIN
+            UPDATE bank_transaction_search SET approval_note = '' WHERE rowid = old.transaction_id;
+        END
+    """,
+}
+
+
+def copy_decisions(apps, schema_editor):
+    """Move approved_by and approval_note of existing transactions into the side table"""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT MAX(id) FROM bank_transaction")
+        max_id = cursor.fetchone()[0] or 0
+        last_id = 0
+        while last_id < max_id:
+            cursor.execute(COPY_DECISIONS, [last_id, last_id + COPY_BATCH_SIZE])
+            last_id += COPY_BATCH_SIZE
+
+
+def copy_decisions_back(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(COPY_DECISIONS_BACK)
+
+
+def _replace_triggers(schema_editor, dropped, created):
+    """
+    Swap the search index triggers (SQLite only). The indexed text does not
+    change, so the index itself is kept
+    """
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'bank_transaction_search'")
+        if cursor.fetchone() is None:
+            return
+        for name in dropped:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        for sql in created.values():
+            cursor.execute(sql)
+
+
+def drop_old_triggers(apps, schema_editor):
+    _replace_triggers(schema_editor, OLD_TRIGGERS, {})
+
+
+def create_old_triggers(apps, schema_editor):
+    _replace_triggers(schema_editor, OLD_TRIGGERS, OLD_TRIGGERS)
+
+
+def create_new_triggers(apps, schema_editor):
+    _replace_triggers(schema_editor, NEW_TRIGGERS, NEW_TRIGGERS)
+
+
+def drop_new_triggers(apps, schema_editor):
+    _replace_triggers(schema_editor, NEW_TRIGGERS, {})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("bank", "0018_full_text_search"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TransactionApproval",
+            fields=[
+                (
+                    "transaction",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="approval",
+                        serialize=False,
+                        to="bank.transaction",
+                    ),
+                ),
+                ("note", models.TextField(blank=True, default="")),
+                (
+                    "approved_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="approved_transactions",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Transaction Approval",
+                "verbose_name_plural": "Transaction Approvals",
+            },
+        ),
+        migrations.RunPython(copy_decisions, copy_decisions_back),
+        # SQLite removes a column by rewriting the table, which would drop
+        # these triggers anyway; they come back below in their new form
+        migrations.RunPython(drop_old_triggers, create_old_triggers),
+        migrations.RemoveField(
+            model_name="transaction",
+            name="approval_note",
+        ),
+        migrations.RemoveField(
+            model_name="transaction",
+            name="approved_by",
+        ),
+        migrations.RunPython(create_new_triggers, drop_new_triggers),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 18:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bank", "0019_transaction_approval"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="manageraction",
+            index=models.Index(
+                fields=["timestamp", "id"], name="bank_action_newest_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(fields=["timestamp", "id"], name="bank_txn_newest_idx"),
+        ),
+    ]
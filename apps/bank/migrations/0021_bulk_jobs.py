@@ -0,0 +1,145 @@
+# Generated by Django 4.2.7 on 2026-10-19 19:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Triggers of bank_manageraction_search as migration 0018 created them.
+# SQLite rewrites bank_manageraction to make manager nullable, which drops
+# them, so they are created again afterwards
+TRIGGERS = {
+    "bank_manageraction_search_insert": """
+        CREATE TRIGGER bank_manageraction_search_insert AFTER INSERT ON bank_manageraction BEGIN
+            INSERT INTO bank_manageraction_search (rowid, note) VALUES (new.id, new.note);
+        END
+    """,
+    "bank_manageraction_search_update": """
+        CREATE TRIGGER bank_manageraction_search_update AFTER UPDATE OF note ON bank_manageraction
+        WHEN old.note IS NOT new.note BEGIN
+            UPDATE bank_manageraction_search SET note = new.note WHERE rowid = new.id;
+        END
+    """,
+    "bank_manageraction_search_delete": """
+        CREATE TRIGGER bank_manageraction_search_delete AFTER DELETE ON bank_manageraction BEGIN
+            DELETE FROM bank_manageraction_search WHERE rowid = old.id;
+        END
+    """,
+}
+
+
+def create_triggers(apps, schema_editor):
+    """Recreate the manager action search triggers (SQLite only)"""
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'bank_manageraction_search'")
+        if cursor.fetchone() is None:
+            return
+        for name, sql in TRIGGERS.items():
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("bank", "0020_admin_list_indexes"),
+    ]
+
+    operations = [
+        # Unapplying rewrites the table again; the triggers come back here
+        migrations.RunPython(migrations.RunPython.noop, create_triggers),
+        migrations.AddField(
+            model_name="manageraction",
+            name="performed_by",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="performed_actions",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="manageraction",
+            name="manager",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="actions",
+                to="bank.bankmanager",
+            ),
+        ),
+        migrations.RunPython(create_triggers, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name="BulkJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("FREEZE_ACCOUNTS", "Freeze accounts"),
+                            ("UNFREEZE_ACCOUNTS", "Unfreeze accounts"),
+                            ("APPROVE_TRANSACTIONS", "Approve transactions"),
+                            ("REJECT_TRANSACTIONS", "Reject transactions"),
+                        ],
+                        max_length=30,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("QUEUED", "Queued"),
+                            ("RUNNING", "Running"),
+                            ("DONE", "Done"),
+                            ("FAILED", "Failed"),
+                        ],
+                        default="QUEUED",
+                        max_length=10,
+                    ),
+                ),
+                ("target_ids", models.JSONField(default=list)),
+                ("total", models.PositiveIntegerField(default=0)),
+                ("processed", models.PositiveIntegerField(default=0)),
+                ("changed", models.PositiveIntegerField(default=0)),
+                ("refused", models.PositiveIntegerField(default=0)),
+                ("last_error", models.CharField(blank=True, max_length=200)),
+                ("claimed_by", models.CharField(blank=True, max_length=100, null=True)),
+                ("claim_expires_at", models.DateTimeField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "requested_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="bulk_jobs",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Bulk Job",
+                "verbose_name_plural": "Bulk Jobs",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(fields=["status", "id"], name="bank_bulkjob_queue_idx")
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 19:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bank", "0021_bulk_jobs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="idempotencykey",
+            name="response",
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 4.2.7 on 2026-10-19 19:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+import calendar
+from datetime import date
+
+
+def open_accruals(apps, schema_editor):
+    """
+    Interest accrued before this migration goes on the row of the month it
+    was last accrued in
+    """
+    Account = apps.get_model("bank", "Account")
+    InterestAccrual = apps.get_model("bank", "InterestAccrual")
+    accounts = (
+        Account.objects.exclude(accrued_interest=0)
+        .exclude(interest_accrued_through__isnull=True)
+        .values_list("id", "accrued_interest", "interest_accrued_through")
+        .iterator(chunk_size=1000)
+    )
+    rows = []
+    for account_id, amount, through in accounts:
+        period_end = date(through.year, through.month, calendar.monthrange(through.year, through.month)[1])
+        rows.append(
+            InterestAccrual(
+                account_id=account_id, period_end=period_end, amount=amount, accrued_through=through
+            )
+        )
+        if len(rows) >= 1000:
+            InterestAccrual.objects.bulk_create(rows)
+            rows = []
+    InterestAccrual.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bank", "0022_idempotency_key_response"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InterestAccrual",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("period_end", models.DateField()),
+                (
+                    "amount",
+                    models.DecimalField(decimal_places=6, default=0, max_digits=16),
+                ),
+                ("accrued_through", models.DateField()),
+                (
+                    "account",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="interest_accruals",
+                        to="bank.account",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Interest Accrual",
+                "verbose_name_plural": "Interest Accruals",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="interestaccrual",
+            constraint=models.UniqueConstraint(
+                fields=("account", "period_end"),
+                name="bank_interest_accrual_period_uniq",
+            ),
+        ),
+        migrations.RunPython(open_accruals, migrations.RunPython.noop),
+    ]
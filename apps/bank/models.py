@@ -4,6 +4,8 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 import random
 
+from .fts import SearchDocumentField
+
 
 class BankManager(models.Model):
     """
@@ -43,6 +45,17 @@ class Account(models.Model):
         (ACTIVE, 'Active'),
         (FROZEN, 'Frozen'),
     ]
+
+    # Account Tier Choices (withdrawal limits depend on the tier)
+    STANDARD = 'STANDARD'
+    PREMIUM = 'PREMIUM'
+    BUSINESS = 'BUSINESS'
+
+    TIER_CHOICES = [
+        (STANDARD, 'Standard'),
+        (PREMIUM, 'Premium'),
+        (BUSINESS, 'Business'),
+    ]
     
     user = models.OneToOneField(
         User, 
@@ -69,6 +82,15 @@ class Account(models.Model):
     # WHY DecimalField? For precise money calculations (not float!)
     # max_digits=12 means: up to 9,999,999,999.99 (10 digits + 2 decimals)
     # decimal_places=2 means: always 2 decimal places (cents)
+
+    available_balance = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0.00
+    )
+    # balance minus the active holds (see Hold) - what the customer can still spend
+    # WHY store it? So a withdrawal checks funds with one row lookup instead of
+    # summing holds; every posting, hold and release moves it in the same UPDATE
     
     status = models.CharField(
         max_length=10,
@@ -76,13 +98,45 @@ class Account(models.Model):
         default=ACTIVE
     )
     # Account can be ACTIVE or FROZEN by manager
+
+    tier = models.CharField(
+        max_length=10,
+        choices=TIER_CHOICES,
+        default=STANDARD
+    )
+    # Selects the daily and monthly withdrawal limits in BANK_WITHDRAWAL_LIMITS
     
     created_at = models.DateTimeField(auto_now_add=True)
     # auto_now_add=True means: automatically set when account is created
     
     last_activity = models.DateTimeField(auto_now=True)
     # Tracks last activity on account
-    
+
+    accrued_interest = models.DecimalField(
+        max_digits=16,
+        decimal_places=6,
+        default=0
+    )
+    # Interest earned but not yet credited (see accrue_interest command); the
+    # total of the account's InterestAccrual rows, one per month
+    # WHY 6 decimal places? Daily accrual is a fraction of a paisa on small balances
+
+    interest_accrued_through = models.DateField(null=True, blank=True)
+    # Last day interest was accrued for - makes daily runs idempotent
+
+    interest_posted_through = models.DateField(null=True, blank=True)
+    # Last day interest was credited through (a month end, or the last accrued
+    # day when posted early) - makes monthly posting idempotent
+
+    version = models.PositiveBigIntegerField(default=1)
+    # Cache version of the customer's pages (see page_cache.py)
+    # WHY a counter? Every write that changes what the dashboard or history
+    # shows adds 1, so cached fragments and ETags keyed on it can never be stale
+
+    # Moved only by conditional UPDATEs (services.py, holds.py, settlement.py,
+    # interest.py): a plain save() never writes them back from memory
+    LEDGER_FIELDS = ('balance', 'available_balance', 'version')
+
     def __str__(self):
         return f"{self.user.username} - {self.account_number}"
     
@@ -90,10 +144,25 @@ class Account(models.Model):
         """
         Override save method to auto-generate account number
         This runs every time we save an Account
+        - Updates leave out LEDGER_FIELDS unless update_fields names them
         """
         if not self.account_number:  # Only generate if account_number is empty
             self.account_number = self.generate_account_number()
+        
+        updating = not self._state.adding
+        if updating and not kwargs.get('update_fields'):
+            # Never write the balances or version from memory: a posting may
+            # have moved them on since this object was loaded, and writing
+            # them back would undo it (or reuse a version already cached)
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.LEDGER_FIELDS
+                and field.attname not in deferred
+            ]
         super().save(*args, **kwargs)
+        if updating:
+            Account.objects.filter(pk=self.pk).update(version=models.F('version') + 1)
     
     def generate_account_number(self):
         """
@@ -144,6 +213,11 @@ class Transaction(models.Model):
         (REJECTED, 'Rejected'),
         (COMPLETED, 'Completed'),
     ]
+
+    # Statuses whose amount has been applied to Account.balance
+    # APPROVED means approved by a manager and waiting for settlement
+    # (settlement.py), which turns it into COMPLETED or REJECTED
+    POSTED_STATUSES = [COMPLETED]
     
     account = models.ForeignKey(
         Account,
@@ -191,17 +265,32 @@ class Transaction(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     # When the transaction happened
     
-    approved_by = models.ForeignKey(
-        User,
+    # Who approved or rejected it, and their note: see TransactionApproval
+
+    journal_entry = models.ForeignKey(
+        'JournalEntry',
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='transactions'
+    )
+    # Double-entry journal entry this transaction is the customer-facing view of
+    # NULL for transactions recorded before the journal existed
+
+    claimed_by = models.ForeignKey(
+        'BankManager',
         on_delete=models.SET_NULL,
         null=True,
         blank=True,
-        related_name='approved_transactions'
+        related_name='claimed_transactions'
     )
-    # Manager who approved the transaction
-    
-    approval_note = models.TextField(blank=True, null=True)
-    # Manager's note when approving/rejecting
+    claim_expires_at = models.DateTimeField(null=True, blank=True)
+    # Work-queue lease on a PENDING transaction (see work_queue.py)
+    # WHY a lease? A manager who claims a batch and walks away must not block
+    # it forever: once claim_expires_at passes, anyone can claim it again
+
+    review_reason = models.CharField(max_length=200, blank=True, default='')
+    # Why the posting rules (rules.py) sent this transaction for approval
     
     def __str__(self):
         return f"{self.transaction_type} - ₹{self.amount} - {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
@@ -210,6 +299,52 @@ class Transaction(models.Model):
         ordering = ['-timestamp']  # Newest transactions first
         verbose_name = 'Transaction'
         verbose_name_plural = 'Transactions'
+        indexes = [
+            # Ledger order: lets reconciliation and replay stream each
+            # account's history without sorting
+            models.Index(fields=['account', 'timestamp', 'id'], name='bank_txn_ledger_order_idx'),
+            # Work queue: oldest claimable pending transactions first
+            models.Index(fields=['status', 'id'], name='bank_txn_status_queue_idx'),
+            # Newest first across all accounts: the admin and manager
+            # transaction lists read a page without sorting the table
+            models.Index(fields=['timestamp', 'id'], name='bank_txn_newest_idx'),
+        ]
+
+
+class TransactionApproval(models.Model):
+    """
+    A manager's decision on a transaction that needed approval
+    
+    Kept beside the transaction rather than on it: few transactions ever
+    need one, and the listings and totals that scan the transactions table
+    never read it, so the transaction rows stay narrow
+    """
+    transaction = models.OneToOneField(
+        Transaction,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='approval'
+    )
+    # WHY primary_key=True? At most one decision per transaction, found by its id
+    
+    approved_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='approved_transactions'
+    )
+    # Manager who approved (or rejected) the transaction
+    
+    note = models.TextField(blank=True, default='')
+    # Manager's note when approving/rejecting, and why settlement rejected it
+    
+    def __str__(self):
+        return f"Decision on transaction #{self.transaction_id}"
+    
+    class Meta:
+        verbose_name = 'Transaction Approval'
+        verbose_name_plural = 'Transaction Approvals'
 
 
 class ManagerAction(models.Model):
@@ -228,8 +363,22 @@ class ManagerAction(models.Model):
     manager = models.ForeignKey(
         BankManager,
         on_delete=models.CASCADE,
+        null=True,
+        blank=True,
         related_name='actions'
     )
+    # Empty for bulk actions taken in the Django admin by a user who is
+    # not a bank manager (see performed_by)
+    
+    performed_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='performed_actions'
+    )
+    # Who took a bulk action in the Django admin (bulk_actions.py)
+    
     action_type = models.CharField(max_length=30, choices=ACTION_TYPES)
     target_user = models.ForeignKey(
         User,
@@ -253,13 +402,653 @@ class ManagerAction(models.Model):
     note = models.TextField(blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
     
+    @property
+    def actor(self):
+        """Username of whoever took the action"""
+        if self.manager_id:
+            return self.manager.user.username
+        return self.performed_by.username if self.performed_by_id else '—'
+    
     def __str__(self):
-        return f"{self.manager.user.username} - {self.action_type} - {self.timestamp}"
+        return f"{self.actor} - {self.action_type} - {self.timestamp}"
     
     class Meta:
         ordering = ['-timestamp']
         verbose_name = 'Manager Action'
         verbose_name_plural = 'Manager Actions'
+        indexes = [
+            # Newest first: the admin's audit log pages without sorting
+            models.Index(fields=['timestamp', 'id'], name='bank_action_newest_idx'),
+        ]
+
+
+
+class TransactionSearch(models.Model):
+    """
+    Full-text index of transaction descriptions and approval notes
+
+    An SQLite FTS5 table (migration 0018), not an ordinary table: triggers
+    on bank_transaction keep it up to date, and search.py queries it
+    """
+    transaction = models.OneToOneField(
+        Transaction,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        related_name='search_entry'
+    )
+    # WHY db_column='rowid'? Each index row has the transaction's id as its rowid
+    # WHY DO_NOTHING? The delete trigger removes the index row
+    document = SearchDocumentField(db_column='bank_transaction_search')
+    rank = models.FloatField()
+    description = models.TextField()
+    approval_note = models.TextField()
+
+    class Meta:
+        managed = False
+        db_table = 'bank_transaction_search'
+
+
+class ManagerActionSearch(models.Model):
+    """Full-text index of manager action notes (same as TransactionSearch)"""
+    action = models.OneToOneField(
+        ManagerAction,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        related_name='search_entry'
+    )
+    document = SearchDocumentField(db_column='bank_manageraction_search')
+    rank = models.FloatField()
+    note = models.TextField()
+
+    class Meta:
+        managed = False
+        db_table = 'bank_manageraction_search'
+
+class AccountBalanceSnapshot(models.Model):
+    """
+    End-of-day balance of an account
+    - Written in bulk by the snapshot_balances command
+    - Only accounts with posted transactions that day get a row; an account's
+      latest snapshot stays valid until its next posting
+    - balance_at() answers historical balance queries from the nearest
+      snapshot plus the few transactions after it
+    """
+    account = models.ForeignKey(
+        Account,
+        on_delete=models.CASCADE,
+        related_name='balance_snapshots'
+    )
+    as_of = models.DateField()
+    # Balance at the end of this day (midnight in TIME_ZONE)
+
+    balance = models.DecimalField(max_digits=12, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.account.account_number} - {self.as_of} - ₹{self.balance}"
+
+    class Meta:
+        ordering = ['-as_of']
+        verbose_name = 'Balance Snapshot'
+        verbose_name_plural = 'Balance Snapshots'
+        constraints = [
+            # Also the lookup index for "latest snapshot on or before a date"
+            models.UniqueConstraint(fields=['account', 'as_of'], name='bank_snapshot_account_day_uniq'),
+        ]
+
+
+class InterestAccrual(models.Model):
+    """
+    Interest accrued on an account in one month and not yet credited
+    - The daily accrual adds each day's interest to the row of that day's month
+    - Crediting a month takes the rows up to its end, so interest accrued in
+      a later month is never paid as an earlier one's; the fraction of a
+      paisa left over stays on the month's row
+    - Account.accrued_interest is the total of the account's rows
+    """
+    account = models.ForeignKey(
+        Account,
+        on_delete=models.CASCADE,
+        related_name='interest_accruals'
+    )
+    period_end = models.DateField()
+    # Last day of the month the interest accrued in
+
+    amount = models.DecimalField(max_digits=16, decimal_places=6, default=0)
+
+    accrued_through = models.DateField()
+    # Last day added to this row - the same guard as Account.interest_accrued_through
+
+    def __str__(self):
+        return f"{self.account.account_number} - {self.period_end} - ₹{self.amount}"
+
+    class Meta:
+        verbose_name = 'Interest Accrual'
+        verbose_name_plural = 'Interest Accruals'
+        constraints = [
+            models.UniqueConstraint(fields=['account', 'period_end'], name='bank_interest_accrual_period_uniq'),
+        ]
+
+
+class AccountDailyTotals(models.Model):
+    """
+    Running per-day counters of customer postings for one account
+    - Updated in the same database transaction as every deposit and withdrawal,
+      including ones sent for approval
+    - The posting rules and withdrawal limits read these instead of counting
+      transactions, so checking them costs one small row lookup
+    """
+    account = models.ForeignKey(
+        Account,
+        on_delete=models.CASCADE,
+        related_name='daily_totals'
+    )
+    day = models.DateField()
+    # Calendar day in TIME_ZONE
+
+    deposit_count = models.PositiveIntegerField(default=0)
+    deposit_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    withdrawal_count = models.PositiveIntegerField(default=0)
+    withdrawal_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.account.account_number} - {self.day}"
+
+    class Meta:
+        ordering = ['-day']
+        verbose_name = 'Account Daily Totals'
+        verbose_name_plural = 'Account Daily Totals'
+        constraints = [
+            models.UniqueConstraint(fields=['account', 'day'], name='bank_daily_totals_account_day_uniq'),
+        ]
+
+
+class Hold(models.Model):
+    """
+    Funds reserved for a withdrawal that is waiting for approval
+    - Placed when the withdrawal is created as PENDING: it lowers
+      Account.available_balance but not Account.balance
+    - Settled when the withdrawal settles (the balance drops instead),
+      released when it is rejected, and expired by the expire_holds command
+      once expires_at passes
+    """
+    ACTIVE = 'ACTIVE'
+    SETTLED = 'SETTLED'
+    RELEASED = 'RELEASED'
+    EXPIRED = 'EXPIRED'
+
+    STATUS_CHOICES = [
+        (ACTIVE, 'Active'),
+        (SETTLED, 'Settled'),
+        (RELEASED, 'Released'),
+        (EXPIRED, 'Expired'),
+    ]
+
+    account = models.ForeignKey(
+        Account,
+        on_delete=models.CASCADE,
+        related_name='holds'
+    )
+    transaction = models.OneToOneField(
+        Transaction,
+        on_delete=models.CASCADE,
+        related_name='hold'
+    )
+    # WHY OneToOneField? A pending withdrawal reserves its funds exactly once
+
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=ACTIVE)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    released_at = models.DateTimeField(null=True, blank=True)
+    # When the hold stopped reserving funds (settled, released or expired)
+
+    def __str__(self):
+        return f"{self.account.account_number} - ₹{self.amount} ({self.status})"
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Hold'
+        verbose_name_plural = 'Holds'
+        indexes = [
+            # expire_holds: active holds past their expiry, oldest first
+            models.Index(fields=['status', 'expires_at'], name='bank_hold_expiry_idx'),
+        ]
+
+
+class StandingInstruction(models.Model):
+    """
+    A customer's recurring payment: a transfer to another account or a withdrawal
+    - Executed by the run_scheduled_payments command whenever next_run_at has passed
+    - Missed runs are caught up one by one, each as its own posting
+    - Workers claim instructions with a lease (claimed_by, claim_expires_at),
+      like the approval work queue, so several can run at once
+    """
+    TRANSFER = 'TRANSFER'
+    WITHDRAW = 'WITHDRAW'
+
+    KIND_CHOICES = [
+        (TRANSFER, 'Transfer'),
+        (WITHDRAW, 'Withdrawal'),
+    ]
+
+    DAILY = 'DAILY'
+    WEEKLY = 'WEEKLY'
+    MONTHLY = 'MONTHLY'
+
+    FREQUENCY_CHOICES = [
+        (DAILY, 'Daily'),
+        (WEEKLY, 'Weekly'),
+        (MONTHLY, 'Monthly'),
+    ]
+
+    account = models.ForeignKey(
+        Account,
+        on_delete=models.CASCADE,
+        related_name='standing_instructions'
+    )
+    # The account the money is paid from
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    to_account = models.ForeignKey(
+        Account,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='incoming_instructions'
+    )
+    # Only for transfers
+
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES)
+    description = models.CharField(max_length=200, blank=True)
+
+    starts_at = models.DateTimeField()
+    # First run; monthly instructions keep its day of the month
+
+    next_run_at = models.DateTimeField()
+    active = models.BooleanField(default=True)
+    # Cancelled instructions stay for the record but never run again
+
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    # The scheduled time of the most recent run, not when the worker ran it
+    last_error = models.CharField(max_length=200, blank=True)
+    # Why the most recent run failed (e.g. insufficient funds); empty if it succeeded
+
+    claimed_by = models.CharField(max_length=100, null=True, blank=True)
+    claim_expires_at = models.DateTimeField(null=True, blank=True)
+    # WHY a lease? A worker that crashes mid-batch must not block its
+    # instructions forever; once the lease lapses another worker takes them
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.account.account_number} - {self.get_kind_display()} ₹{self.amount} {self.get_frequency_display()}"
+
+    class Meta:
+        ordering = ['next_run_at']
+        verbose_name = 'Standing Instruction'
+        verbose_name_plural = 'Standing Instructions'
+        indexes = [
+            # run_scheduled_payments: active instructions that are due
+            models.Index(fields=['active', 'next_run_at'], name='bank_instruction_due_idx'),
+        ]
+
+
+class IdempotencyKey(models.Model):
+    """
+    A client-chosen key that makes a deposit, withdrawal or batch request safe to retry
+    - Written in the same database transaction as the posting it belongs to
+    - A request that arrives again with the same key gets the original
+      transaction (or, for a batch, the original response) back instead of
+      posting twice
+    - Kept until expires_at, then removed by the purge_idempotency_keys command
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='idempotency_keys'
+    )
+    key = models.CharField(max_length=64)
+    request_hash = models.CharField(max_length=64)
+    # SHA-256 of what was asked for, so a key reused for a different request is refused
+
+    transaction = models.ForeignKey(
+        Transaction,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='idempotency_keys'
+    )
+    # The original result; empty only while the first request is still posting
+
+    response = models.JSONField(null=True, blank=True)
+    # The original answer of a request that posts many transactions (a batch)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.user.username} - {self.key}"
+
+    class Meta:
+        verbose_name = 'Idempotency Key'
+        verbose_name_plural = 'Idempotency Keys'
+        constraints = [
+            # WHY unique? The index makes the replay check one lookup, and two
+            # concurrent requests with the same key cannot both insert it
+            models.UniqueConstraint(fields=['user', 'key'], name='bank_idempotency_user_key_uniq'),
+        ]
+        indexes = [
+            # purge_idempotency_keys: expired keys, oldest first
+            models.Index(fields=['expires_at'], name='bank_idempotency_expiry_idx'),
+        ]
+
+
+class ApiToken(models.Model):
+    """
+    Bearer token for the JSON API (api.py)
+    - Created with the create_api_token command, which shows the token once
+    - Only a SHA-256 hash is stored, so a leaked database does not leak tokens
+    - Delete the row to revoke the token
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='api_tokens'
+    )
+    name = models.CharField(max_length=100, blank=True)
+    # What the token is for, e.g. "Mobile app"
+
+    key_hash = models.CharField(max_length=64, unique=True)
+    # WHY unique? Authenticating is one lookup on this index
+
+    prefix = models.CharField(max_length=8)
+    # First characters of the token, to tell tokens apart without revealing them
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.user.username} - {self.prefix}…"
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'API Token'
+        verbose_name_plural = 'API Tokens'
+
+
+class AnomalyAlert(models.Model):
+    """
+    Unusual posting activity spotted by the streaming detector (anomaly.py)
+    - Shown to managers on the manager dashboard until reviewed
+    - score is how far past its limit the activity was (1.0 = exactly at the limit)
+    """
+    VELOCITY_COUNT = 'VELOCITY_COUNT'
+    VELOCITY_AMOUNT = 'VELOCITY_AMOUNT'
+    AMOUNT_DEVIATION = 'AMOUNT_DEVIATION'
+    REPEATED_AMOUNT = 'REPEATED_AMOUNT'
+
+    KIND_CHOICES = [
+        (VELOCITY_COUNT, 'Too many postings'),
+        (VELOCITY_AMOUNT, 'Too much money moved'),
+        (AMOUNT_DEVIATION, 'Unusual amount'),
+        (REPEATED_AMOUNT, 'Repeated identical amount'),
+    ]
+
+    account = models.ForeignKey(
+        Account,
+        on_delete=models.CASCADE,
+        related_name='anomaly_alerts'
+    )
+    transaction = models.ForeignKey(
+        Transaction,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='anomaly_alerts'
+    )
+    # The posting that tipped the window over its limit
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    score = models.DecimalField(max_digits=10, decimal_places=2)
+    detail = models.CharField(max_length=200)
+    reviewed = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} - {self.account.account_number}"
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Anomaly Alert'
+        verbose_name_plural = 'Anomaly Alerts'
+        indexes = [
+            # Dashboard: newest unreviewed alerts
+            models.Index(fields=['reviewed', 'created_at'], name='bank_alert_open_idx'),
+        ]
+
+
+class BulkJob(models.Model):
+    """
+    A bulk admin action too large to run during the request (bulk_actions.py)
+    - target_ids is the selection as it was when the action was taken
+    - processed counts the target ids done so far; each chunk commits
+      together with it, so an interrupted job resumes after its last chunk
+    - the run_bulk_jobs command works through queued jobs, holding a lease
+      on the one it runs like the other queues (work_queue.claim_rows)
+    """
+    FREEZE_ACCOUNTS = 'FREEZE_ACCOUNTS'
+    UNFREEZE_ACCOUNTS = 'UNFREEZE_ACCOUNTS'
+    APPROVE_TRANSACTIONS = 'APPROVE_TRANSACTIONS'
+    REJECT_TRANSACTIONS = 'REJECT_TRANSACTIONS'
+
+    KIND_CHOICES = [
+        (FREEZE_ACCOUNTS, 'Freeze accounts'),
+        (UNFREEZE_ACCOUNTS, 'Unfreeze accounts'),
+        (APPROVE_TRANSACTIONS, 'Approve transactions'),
+        (REJECT_TRANSACTIONS, 'Reject transactions'),
+    ]
+
+    QUEUED = 'QUEUED'
+    RUNNING = 'RUNNING'
+    DONE = 'DONE'
+    FAILED = 'FAILED'
+
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    requested_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='bulk_jobs'
+    )
+    # The admin user the audit rows name
+
+    target_ids = models.JSONField(default=list)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    changed = models.PositiveIntegerField(default=0)
+    # Rows actually changed; rows already in the target state are skipped
+    refused = models.PositiveIntegerField(default=0)
+    # Approved transactions that settlement rejected (overdraw, frozen account)
+
+    last_error = models.CharField(max_length=200, blank=True)
+    claimed_by = models.CharField(max_length=100, null=True, blank=True)
+    claim_expires_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Job #{self.id} - {self.get_kind_display()} ({self.processed}/{self.total})"
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Bulk Job'
+        verbose_name_plural = 'Bulk Jobs'
+        indexes = [
+            # run_bulk_jobs: oldest unfinished job first
+            models.Index(fields=['status', 'id'], name='bank_bulkjob_queue_idx'),
+        ]
+
+
+class BalanceSnapshotRun(models.Model):
+    """
+    Progress of one day's snapshot_balances run
+    - last_account_id lets an interrupted run resume after its last chunk
+    - Only completed runs are used as the base of later snapshots
+    """
+    as_of = models.DateField(unique=True)
+    last_account_id = models.BigIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Snapshot run {self.as_of}"
+
+    class Meta:
+        ordering = ['-as_of']
+
+
+class LedgerAccount(models.Model):
+    """
+    Bank-internal ledger account (cash, suspense, interest expense, ...)
+    - Customer accounts are not duplicated here: postings reference Account directly
+    - balance is a projection kept up to date by every posting, never summed on read
+    """
+    ASSET = 'ASSET'
+    LIABILITY = 'LIABILITY'
+    EXPENSE = 'EXPENSE'
+    INCOME = 'INCOME'
+
+    KIND_CHOICES = [
+        (ASSET, 'Asset'),
+        (LIABILITY, 'Liability'),
+        (EXPENSE, 'Expense'),
+        (INCOME, 'Income'),
+    ]
+
+    # Codes of the accounts created by migration 0007
+    CASH = 'CASH'
+    SUSPENSE = 'SUSPENSE'
+    INTEREST_EXPENSE = 'INTEREST_EXPENSE'
+
+    code = models.CharField(max_length=30, unique=True)
+    name = models.CharField(max_length=100)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    balance = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    # Net of all postings: debits positive, credits negative
+
+    def __str__(self):
+        return f"{self.code} - {self.name}"
+
+    class Meta:
+        ordering = ['code']
+        verbose_name = 'Ledger Account'
+        verbose_name_plural = 'Ledger Accounts'
+
+
+class JournalEntry(models.Model):
+    """
+    Append-only double-entry journal entry
+    - Every entry has two or more postings that sum to zero
+    - Entries are never updated or deleted; corrections are new entries
+    """
+    DEPOSIT = 'DEPOSIT'
+    WITHDRAW = 'WITHDRAW'
+    INTEREST = 'INTEREST'
+    ADJUSTMENT = 'ADJUSTMENT'
+
+    ENTRY_TYPES = [
+        (DEPOSIT, 'Deposit'),
+        (WITHDRAW, 'Withdraw'),
+        (INTEREST, 'Interest'),
+        (ADJUSTMENT, 'Adjustment'),
+    ]
+
+    entry_type = models.CharField(max_length=20, choices=ENTRY_TYPES)
+    description = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # No index on created_at: entries are appended in id order, so id ranges are time ranges
+
+    def __str__(self):
+        return f"Entry #{self.id} - {self.entry_type}"
+
+    def save(self, *args, **kwargs):
+        if self.pk and not self._state.adding:
+            raise ValueError('Journal entries are append-only and cannot be changed.')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('Journal entries are append-only and cannot be deleted.')
+
+    class Meta:
+        ordering = ['-id']
+        verbose_name = 'Journal Entry'
+        verbose_name_plural = 'Journal Entries'
+
+
+class Posting(models.Model):
+    """
+    One line of a journal entry
+    - amount is signed: debit positive, credit negative
+    - Exactly one of ledger_account (bank-internal) or account (customer) is set
+    - A customer's Account.balance is the negated sum of its postings
+      (deposits are a liability of the bank)
+    """
+    entry = models.ForeignKey(
+        JournalEntry,
+        on_delete=models.PROTECT,
+        related_name='postings'
+    )
+    ledger_account = models.ForeignKey(
+        LedgerAccount,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        db_index=False,
+        related_name='postings'
+    )
+    account = models.ForeignKey(
+        Account,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        db_index=False,
+        related_name='postings'
+    )
+    # WHY db_index=False? The composite indexes below cover these lookups,
+    # and every extra index is another write on this append-heavy table
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
+
+    def __str__(self):
+        target = self.ledger_account.code if self.ledger_account_id else self.account.account_number
+        return f"{target} {self.amount:+}"
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['ledger_account', 'id'], name='bank_posting_ledger_idx'),
+            models.Index(fields=['account', 'id'], name='bank_posting_account_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                check=(
+                    models.Q(ledger_account__isnull=False, account__isnull=True)
+                    | models.Q(ledger_account__isnull=True, account__isnull=False)
+                ),
+                name='bank_posting_one_target',
+            ),
+        ]
 
 
 # Signal to auto-create account when user registers
@@ -275,11 +1064,3 @@ def create_user_account(sender, instance, created, **kwargs):
             Account.objects.create(user=instance)
             # Creates account with default balance of 0.00
 
-
-@receiver(post_save, sender=User)
-def save_user_account(sender, instance, **kwargs):
-    """
-    Save the account whenever user is saved
-    """
-    if hasattr(instance, 'account'):  # Check if user has an account
-        instance.account.save()
@@ -0,0 +1,73 @@
+"""
+Customer page caching
+
+Each account has a cache version, Account.version. Every write that
+changes what the customer's pages show moves it on: postings, settlement,
+rejections, holds ending, interest, batch postings, freezing, replay, and
+any Account.save(). bump_versions() is the helper for writers that have
+only ids.
+
+- the dashboard and transaction history fragments are cached with the
+  {% cache %} tag under (account, version): a new version misses and is
+  rendered fresh, so there is nothing to invalidate by hand and no stale
+  balance can be served
+- the pages carry an ETag built from the same version, so a browser
+  revisiting an unchanged page gets 304 Not Modified after the one account
+  lookup. A page showing flash messages gets no ETag: the messages are
+  shown once
+"""
+import hashlib
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib import messages
+from django.db.models import F
+from django.template.loader import get_template
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+from .models import Account
+
+
+def bump_versions(account_ids):
+    """Move the cache version of `account_ids` on, in one UPDATE"""
+    return Account.objects.filter(id__in=list(account_ids)).update(version=F('version') + 1)
+
+
+def fragment_timeout():
+    return getattr(settings, 'BANK_FRAGMENT_CACHE_SECONDS', 600)
+
+
+@lru_cache(maxsize=None)
+def _templates_digest(*names):
+    """Digest of template sources, so a deploy that changes them changes the ETags"""
+    source = ''.join(get_template(name).template.source for name in names)
+    return hashlib.sha256(source.encode()).hexdigest()[:16]
+
+
+def page_etag(request, account, template_name):
+    """ETag of a customer page rendered from `template_name` for `account`"""
+    parts = [
+        _templates_digest('base.html', template_name),
+        request.user.pk, request.user.username, account.pk, account.version,
+    ]
+    return quote_etag(hashlib.sha256('|'.join(str(part) for part in parts).encode()).hexdigest()[:32])
+
+
+def conditional_page(request, account, template_name, render_page):
+    """
+    304 if the browser's copy of the page is current, otherwise render_page()
+
+    Pages with flash messages to show are always rendered, and sent without
+    an ETag.
+    """
+    # len() looks at the messages without marking them as shown
+    if len(messages.get_messages(request)):
+        response = render_page()
+    else:
+        etag = page_etag(request, account, template_name)
+        response = get_conditional_response(request, etag=etag) or render_page()
+        response['ETag'] = etag
+    # Only this user may cache it, and must check with us before reusing it
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,168 @@
+"""
+Ledger replay
+
+Rebuilds everything derived from the transaction history by streaming it
+in batches of accounts. Each batch is rewritten inside its own database
+transaction and recorded in a checkpoint file afterwards, so an interrupted
+replay resumes with the next batch.
+
+Anything derived from the history is a Projection. AccountProjection
+rebuilds Account.balance, Account.available_balance (the balance less the
+active holds), the balance_after chain and Account.last_activity;
+summary tables add their own projection with register_projection() and are
+rebuilt by the same replay.
+"""
+import json
+import os
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Sum
+
+from .bulk import bulk_set
+from .ledger import ZERO, iter_account_histories, signed_amount
+from .models import Account, Hold, Transaction
+from .page_cache import bump_versions
+
+
+class Projection:
+    """
+    A table derived from the transaction history
+
+    rebuild() receives a batch of (account, history) pairs, where account is a
+    dict of `account_fields` (plus id) and history the HISTORY_FIELDS tuples
+    in ledger order. It returns the changes needed as
+    (model, pk, {field: (current value, rebuilt value)}) tuples, which write()
+    then applies.
+    """
+    name = ''
+    account_fields = ()
+
+    def rebuild(self, batch):
+        raise NotImplementedError
+
+    def write(self, changes):
+        """Apply field changes with one bulk UPDATE per model and field set"""
+        grouped = defaultdict(list)
+        for model, pk, fields in changes:
+            values = {name: rebuilt for name, (current, rebuilt) in fields.items()}
+            grouped[(model, tuple(sorted(fields)))].append(model(pk=pk, **values))
+        for (model, field_names), objs in grouped.items():
+            bulk_set(model, objs, list(field_names))
+
+
+class AccountProjection(Projection):
+    """Account balances, Transaction.balance_after and Account.last_activity"""
+    name = 'accounts'
+    account_fields = ('balance', 'available_balance', 'last_activity', 'created_at')
+
+    def rebuild(self, batch):
+        changes = []
+        held = dict(
+            Hold.objects.filter(
+                account_id__in=[account['id'] for account, _ in batch], status=Hold.ACTIVE
+            )
+            .values('account_id')
+            .annotate(total=Sum('amount'))
+            .values_list('account_id', 'total')
+        )
+        for account, history in batch:
+            running = ZERO
+            last_activity = account['created_at']
+            for txn_id, txn_type, amount, balance_after, status, timestamp, _ in history:
+                last_activity = max(last_activity, timestamp)
+                if status not in Transaction.POSTED_STATUSES:
+                    continue
+                running += signed_amount(txn_type, amount)
+                if balance_after != running:
+                    changes.append((Transaction, txn_id, {'balance_after': (balance_after, running)}))
+
+            fields = {}
+            if account['balance'] != running:
+                fields['balance'] = (account['balance'], running)
+            available = running - held.get(account['id'], ZERO)
+            if account['available_balance'] != available:
+                fields['available_balance'] = (account['available_balance'], available)
+            if account['last_activity'] != last_activity:
+                fields['last_activity'] = (account['last_activity'], last_activity)
+            if fields:
+                changes.append((Account, account['id'], fields))
+        return changes
+
+
+PROJECTIONS = [AccountProjection()]
+
+
+def register_projection(projection):
+    """Add a projection to every subsequent replay"""
+    PROJECTIONS.append(projection)
+    return projection
+
+
+class Checkpoint:
+    """
+    Replay progress stored as JSON: the last account id whose batch committed
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path) as checkpoint_file:
+            return json.load(checkpoint_file)['last_account_id']
+
+    def save(self, last_account_id):
+        # Write then rename, so a crash never leaves a half-written checkpoint
+        temp_path = f'{self.path}.tmp'
+        with open(temp_path, 'w') as checkpoint_file:
+            json.dump({'last_account_id': last_account_id}, checkpoint_file)
+        os.replace(temp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def replay(batch_size=1000, dry_run=False, checkpoint=None, projections=None):
+    """
+    Rebuild projections batch by batch, starting after the checkpoint
+
+    Yields (last account id in batch, {projection name: changes}) per batch.
+    With dry_run=True nothing is written - not even the checkpoint.
+    """
+    projections = projections if projections is not None else PROJECTIONS
+    account_fields = ['id']
+    for projection in projections:
+        account_fields += [name for name in projection.account_fields if name not in account_fields]
+
+    last_id = checkpoint.load() if checkpoint else 0
+    while True:
+        ids = list(
+            Account.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return
+        start, end = ids[0], ids[-1] + 1
+
+        with transaction.atomic():
+            # Hold the batch's accounts so postings cannot interleave with the rewrite
+            list(Account.objects.filter(id__gte=start, id__lt=end).select_for_update().values_list('id'))
+            batch = [
+                (dict(zip(account_fields, account)), history)
+                for account, history in iter_account_histories(start, end, account_fields=account_fields)
+            ]
+            changes = {projection.name: projection.rebuild(batch) for projection in projections}
+            if not dry_run:
+                for projection in projections:
+                    projection.write(changes[projection.name])
+                if any(changes.values()):
+                    # Rebuilt rows change what customers see; a batch is
+                    # rarely rewritten, so all of it drops out of the page cache
+                    bump_versions(ids)
+
+        last_id = ids[-1]
+        if checkpoint and not dry_run:
+            checkpoint.save(last_id)
+        yield last_id, changes
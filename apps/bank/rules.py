@@ -0,0 +1,171 @@
+"""
+Posting rules
+
+Decide on the hot path whether a deposit or withdrawal completes
+immediately or waits for a manager as PENDING.
+
+Rules are configured in settings.BANK_POSTING_RULES as
+{'rule': <name>, ...options} dicts. They are compiled once into Rule
+objects, with amounts parsed and limits resolved up front, and cached until
+the setting changes. Evaluating them only looks at a PostingContext built
+from rows the posting service already holds (the account and its
+AccountDailyTotals counters), so it never runs a query.
+
+Adding a rule: subclass Rule, implement check(), and register_rule() it
+under the name used in the setting.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .models import Account, Transaction
+
+DEFAULT_POSTING_RULES = [
+    {'rule': 'amount_threshold', 'amount': '50000.00'},
+]
+
+
+class PostingContext:
+    """
+    Everything a rule may look at for one posting
+
+    count_today and total_today are the account's postings of the same
+    type so far today, not counting this one.
+    """
+    __slots__ = ('transaction_type', 'amount', 'account_status', 'account_opened',
+                 'now', 'count_today', 'total_today', 'counterparty_status')
+
+    def __init__(self, transaction_type, amount, account_status, account_opened, now,
+                 count_today=0, total_today=Decimal('0.00'), counterparty_status=None):
+        self.transaction_type = transaction_type
+        self.amount = amount
+        self.account_status = account_status
+        self.account_opened = account_opened
+        self.now = now
+        self.count_today = count_today
+        self.total_today = total_today
+        self.counterparty_status = counterparty_status
+
+
+class Rule:
+    """
+    One compiled rule
+
+    `types` limits the rule to DEPOSIT and/or WITHDRAW postings (both by
+    default). check() returns the reason for review, or None.
+    """
+
+    def __init__(self, types=None):
+        self.types = frozenset(types or (Transaction.DEPOSIT, Transaction.WITHDRAW))
+
+    def applies(self, context):
+        return context.transaction_type in self.types
+
+    def check(self, context):
+        raise NotImplementedError
+
+
+class AmountThreshold(Rule):
+    """A single posting at or above `amount`"""
+
+    def __init__(self, amount, types=None):
+        super().__init__(types)
+        self.amount = Decimal(amount)
+
+    def check(self, context):
+        if context.amount >= self.amount:
+            return f'Amount is at or above the ₹{self.amount} review threshold'
+
+
+class DailyVelocity(Rule):
+    """More than `count` postings, or more than `amount` in total, in one day"""
+
+    def __init__(self, count=None, amount=None, types=None):
+        super().__init__(types)
+        self.count = count
+        self.amount = Decimal(amount) if amount is not None else None
+
+    def check(self, context):
+        if self.count is not None and context.count_today + 1 > self.count:
+            return f'More than {self.count} postings today'
+        if self.amount is not None and context.total_today + context.amount > self.amount:
+            return f'More than ₹{self.amount} posted today'
+
+
+class NewAccount(Rule):
+    """A posting above `amount` on an account opened less than `days` ago"""
+
+    def __init__(self, days, amount, types=None):
+        super().__init__(types)
+        self.age = timedelta(days=days)
+        self.amount = Decimal(amount)
+
+    def check(self, context):
+        if context.amount > self.amount and context.now - context.account_opened < self.age:
+            return f'Above ₹{self.amount} on an account opened less than {self.age.days} days ago'
+
+
+class FrozenCounterparty(Rule):
+    """The other side of a transfer is a frozen account"""
+
+    def check(self, context):
+        if context.counterparty_status == Account.FROZEN:
+            return 'The counterparty account is frozen'
+
+
+RULE_TYPES = {
+    'amount_threshold': AmountThreshold,
+    'daily_velocity': DailyVelocity,
+    'new_account': NewAccount,
+    'frozen_counterparty': FrozenCounterparty,
+}
+
+_compiled = None
+
+
+def register_rule(name, rule_class):
+    """Make a Rule subclass available to BANK_POSTING_RULES under `name`"""
+    global _compiled
+    RULE_TYPES[name] = rule_class
+    _compiled = None
+    return rule_class
+
+
+def compile_rules(config):
+    """Build Rule objects from a BANK_POSTING_RULES-style list"""
+    rules = []
+    for options in config:
+        options = dict(options)
+        name = options.pop('rule')
+        if name not in RULE_TYPES:
+            raise ValueError(f'Unknown posting rule {name!r} in BANK_POSTING_RULES')
+        rules.append(RULE_TYPES[name](**options))
+    return rules
+
+
+def get_rules():
+    """The compiled rules from settings, built on first use"""
+    global _compiled
+    if _compiled is None:
+        _compiled = compile_rules(getattr(settings, 'BANK_POSTING_RULES', DEFAULT_POSTING_RULES))
+    return _compiled
+
+
+@receiver(setting_changed)
+def _reset_rules(setting, **kwargs):
+    global _compiled
+    if setting == 'BANK_POSTING_RULES':
+        _compiled = None
+
+
+def review_reason(context, rules=None):
+    """Reason the posting needs a manager's approval, or '' if it can complete"""
+    for rule in rules if rules is not None else get_rules():
+        if rule.applies(context):
+            reason = rule.check(context)
+            if reason:
+                return reason
+    return ''
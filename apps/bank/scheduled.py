@@ -0,0 +1,145 @@
+"""
+Standing instructions scheduler
+
+run_due() executes every active StandingInstruction whose next_run_at has
+passed:
+- due rows are found through the (active, next_run_at) index and claimed in
+  batches with a lease, through the same claim_rows() as the approval work
+  queue, so any number of workers can run at once without paying twice
+- each claimed batch is processed in one database transaction; a payment
+  that fails (insufficient funds, limits, frozen account) is recorded on
+  the instruction and does not stop the batch
+- missed runs are back-filled: an instruction that is several periods
+  behind makes one payment per missed run, oldest first, each described
+  with the date it was scheduled for
+"""
+import calendar
+import os
+import socket
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .bulk import bulk_set
+from .models import StandingInstruction
+from .services import PostingError, transfer, withdraw
+from .work_queue import claim_rows
+
+# Missed runs paid per instruction per claim. An instruction further behind
+# is released still due, and the next claim carries on where this one stopped
+CATCH_UP_PER_CLAIM = 31
+
+RUN_FIELDS = ['next_run_at', 'last_run_at', 'last_error', 'claimed_by', 'claim_expires_at']
+
+
+def batch_size():
+    return getattr(settings, 'BANK_SCHEDULED_BATCH_SIZE', 200)
+
+
+def lease_duration():
+    return timedelta(seconds=getattr(settings, 'BANK_SCHEDULED_LEASE_SECONDS', 300))
+
+
+def default_worker():
+    """Claim owner for this process: host and process id"""
+    return f'{socket.gethostname()}:{os.getpid()}'[:100]
+
+
+def advance(run_at, frequency, anchor_day):
+    """
+    The run after `run_at`
+
+    Monthly runs land on `anchor_day`, or the last day of shorter months, so
+    an instruction starting on the 31st does not drift to the 28th.
+    """
+    if frequency == StandingInstruction.DAILY:
+        return run_at + timedelta(days=1)
+    if frequency == StandingInstruction.WEEKLY:
+        return run_at + timedelta(days=7)
+    local = timezone.localtime(run_at)
+    year, month = (local.year + 1, 1) if local.month == 12 else (local.year, local.month + 1)
+    day = min(anchor_day, calendar.monthrange(year, month)[1])
+    return local.replace(year=year, month=month, day=day)
+
+
+def due_instructions(now):
+    return StandingInstruction.objects.filter(active=True, next_run_at__lte=now)
+
+
+def pay(instruction, scheduled_for):
+    """Make one payment of `instruction`; raises PostingError if it is refused"""
+    description = instruction.description or instruction.get_kind_display()
+    description = f"{description} (scheduled {timezone.localtime(scheduled_for):%d %b %Y})"
+    if instruction.kind == StandingInstruction.TRANSFER:
+        transfer(instruction.account, instruction.to_account, instruction.amount, description)
+    else:
+        withdraw(instruction.account, instruction.amount, description)
+
+
+def run_instruction(instruction, now, stats):
+    """Pay the missed runs of one instruction, up to CATCH_UP_PER_CLAIM"""
+    anchor_day = timezone.localtime(instruction.starts_at).day
+    runs = 0
+    while instruction.next_run_at <= now and runs < CATCH_UP_PER_CLAIM:
+        scheduled_for = instruction.next_run_at
+        try:
+            pay(instruction, scheduled_for)
+            instruction.last_error = ''
+            stats['paid'] += 1
+        except PostingError as error:
+            # A refused payment is skipped, not retried: the next run is the
+            # next period's payment
+            instruction.last_error = str(error)[:200]
+            stats['failed'] += 1
+        instruction.last_run_at = scheduled_for
+        instruction.next_run_at = advance(scheduled_for, instruction.frequency, anchor_day)
+        runs += 1
+    if runs > 1:
+        stats['backfilled'] += runs - 1
+
+
+def run_due(now=None, size=None, worker=None, max_batches=None):
+    """
+    Execute everything due at `now` (default: the current time)
+
+    Stops early after `max_batches` claimed batches, if given; whatever is
+    left stays due for the next run. Returns a Counter of instructions run
+    and payments paid, failed and back-filled.
+    """
+    now = now or timezone.now()
+    size = size or batch_size()
+    worker = worker or default_worker()
+    stats = Counter()
+
+    while max_batches is None or stats['batches'] < max_batches:
+        ids = claim_rows(
+            due_instructions(now), 'claimed_by', 'claim_expires_at', worker, size, lease_duration()
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            # Renewing the lease comes first: it confirms the batch is still
+            # ours, and on SQLite it takes the write lock up front - a
+            # transaction that reads first cannot upgrade to writing while
+            # another worker writes, and fails instead of waiting
+            StandingInstruction.objects.filter(id__in=ids, claimed_by=worker).update(
+                claim_expires_at=timezone.now() + lease_duration()
+            )
+            # Ordered by account, so concurrent workers lock accounts in a
+            # consistent order
+            instructions = list(
+                StandingInstruction.objects.filter(id__in=ids, claimed_by=worker)
+                .select_related('account', 'to_account')
+                .order_by('account_id', 'id')
+            )
+            for instruction in instructions:
+                run_instruction(instruction, now, stats)
+                instruction.claimed_by = None
+                instruction.claim_expires_at = None
+            bulk_set(StandingInstruction, instructions, RUN_FIELDS)
+        stats['instructions'] += len(instructions)
+        stats['batches'] += 1
+    return stats
@@ -0,0 +1,451 @@
+"""
+Customer search
+
+Managers look customers up by account number, username, name and email.
+With `icontains` every search scans auth_user joined to bank_account.
+Instead those columns are copied into bank_customer_search, an SQLite FTS5
+table with the trigram tokenizer, which finds any substring of three or
+more characters, case-insensitively, from an index.
+
+- one row per user, with the user's id as its rowid; triggers on auth_user
+  and bank_account keep it in step with every insert, update and delete,
+  including ones made outside the ORM
+- filter_customers() narrows a queryset of users, accounts or transactions
+  to the customers matching a search
+- typeahead() returns the first few matches for the JSON endpoint: exact
+  account number and username matches first, then others in the order
+  the customers joined. Matches are not ranked by relevance - ranking
+  every match of a common term like "son" costs hundreds of milliseconds
+  at a million customers, taking the first ones costs one
+- terms shorter than three characters, and databases other than SQLite,
+  fall back to icontains
+
+Free text - transaction descriptions and approval notes, manager action
+notes - has full-text indexes of its own (bank_transaction_search,
+bank_manageraction_search, migration 0018), tokenized into stemmed words
+so "refunds" finds "refund", and kept in step by triggers the same way.
+
+- search_text() narrows a queryset to the rows containing every word of
+  a search, most relevant (bm25) first; it composes with any other
+  filter, such as a date range
+- text_condition() is the unranked form, a Q that can be OR-ed with other
+  conditions, as the admin changelists do with their customer fields
+
+Approval notes live in TransactionApproval, a side table (approvals.py);
+triggers on it keep the transaction index's approval_note in step.
+
+The rebuild_search_index command recreates every index and its triggers
+and refills it, a batch of rows at a time. After each migrate,
+repair_indexes() rebuilds any index a table rewrite left without its
+triggers.
+"""
+import re
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.expressions import RawSQL
+
+from .fts import words_query
+from .models import Account, ManagerAction, Transaction
+
+TABLE = 'bank_customer_search'
+
+# Searchable columns, and the lookup from User to each
+COLUMNS = {
+    'account_number': 'account__account_number',
+    'username': 'username',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'email': 'email',
+}
+
+# The trigram tokenizer cannot use its index for shorter terms
+MIN_TERM_LENGTH = 3
+
+CREATE_TABLE = f"""
+CREATE VIRTUAL TABLE {TABLE} USING fts5(
+    account_id UNINDEXED, account_number, username, first_name, last_name, email,
+    tokenize = 'trigram'
+)
+"""
+
+# Only changes to searched columns touch the index: balance updates and
+# logins (last_login) do not
+TRIGGERS = {
+    f'{TABLE}_user_insert': f"""
+        CREATE TRIGGER {TABLE}_user_insert AFTER INSERT ON auth_user BEGIN
+            INSERT INTO {TABLE} (rowid, account_id, account_number, username, first_name, last_name, email)
+            VALUES (new.id, NULL, '', new.username, new.first_name, new.last_name, new.email);
+        END
+    """,
+    f'{TABLE}_user_update': f"""
+        CREATE TRIGGER {TABLE}_user_update AFTER UPDATE OF username, first_name, last_name, email ON auth_user
+        WHEN old.username IS NOT new.username OR old.first_name IS NOT new.first_name
+          OR old.last_name IS NOT new.last_name OR old.email IS NOT new.email BEGIN
+            UPDATE {TABLE} SET username = new.username, first_name = new.first_name,
+                last_name = new.last_name, email = new.email
+            WHERE rowid = new.id;
+        END
+    """,
+    f'{TABLE}_user_delete': f"""
+        CREATE TRIGGER {TABLE}_user_delete AFTER DELETE ON auth_user BEGIN
+            DELETE FROM {TABLE} WHERE rowid = old.id;
+        END
+    """,
+    f'{TABLE}_account_insert': f"""
+        CREATE TRIGGER {TABLE}_account_insert AFTER INSERT ON bank_account BEGIN
+            UPDATE {TABLE} SET account_id = new.id, account_number = new.account_number
+            WHERE rowid = new.user_id;
+        END
+    """,
+    f'{TABLE}_account_update': f"""
+        CREATE TRIGGER {TABLE}_account_update AFTER UPDATE OF account_number, user_id ON bank_account
+        WHEN old.account_number IS NOT new.account_number OR old.user_id IS NOT new.user_id BEGIN
+            UPDATE {TABLE} SET account_id = NULL, account_number = '' WHERE rowid = old.user_id;
+            UPDATE {TABLE} SET account_id = new.id, account_number = new.account_number
+            WHERE rowid = new.user_id;
+        END
+    """,
+    f'{TABLE}_account_delete': f"""
+        CREATE TRIGGER {TABLE}_account_delete AFTER DELETE ON bank_account BEGIN
+            UPDATE {TABLE} SET account_id = NULL, account_number = '' WHERE rowid = old.user_id;
+        END
+    """,
+}
+
+# Copies users with ids in (%s, %s] into the index. OR REPLACE: a user
+# created while a rebuild runs may already have been added by the trigger
+FILL = f"""
+INSERT OR REPLACE INTO {TABLE} (rowid, account_id, account_number, username, first_name, last_name, email)
+SELECT u.id, a.id, COALESCE(a.account_number, ''), u.username, u.first_name, u.last_name, u.email
+FROM auth_user u LEFT JOIN bank_account a ON a.user_id = u.id
+WHERE u.id > %s AND u.id <= %s
+"""
+
+
+def enabled():
+    """Whether searches go through the index (SQLite, and BANK_SEARCH_INDEX on)"""
+    return connection.vendor == 'sqlite' and getattr(settings, 'BANK_SEARCH_INDEX', True)
+
+
+def _drop(cursor):
+    for name in TRIGGERS:
+        cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+    cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+
+def rebuild_customers(batch_size=10000):
+    """
+    Recreate the customer index and its triggers, then copy every user into it;
+    returns how many users were indexed
+
+    The triggers are in place before the copy starts, so changes made while
+    it runs are not lost. Each batch is one INSERT ... SELECT, so the write
+    lock is held only briefly at a time.
+    """
+    with connection.cursor() as cursor:
+        _drop(cursor)
+        cursor.execute(CREATE_TABLE)
+        for sql in TRIGGERS.values():
+            cursor.execute(sql)
+
+        indexed, last_id = 0, 0
+        max_id = User.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        while last_id < max_id:
+            cursor.execute(FILL, [last_id, last_id + batch_size])
+            indexed += cursor.rowcount
+            last_id += batch_size
+    return indexed
+
+
+def match_expression(term, columns=None):
+    """FTS5 query matching `term` as a substring of any of `columns`"""
+    phrase = '"' + term.replace('"', '""') + '"'
+    if columns:
+        return '{' + ' '.join(columns) + '} : ' + phrase
+    return phrase
+
+
+def _matching_user_ids(term, columns):
+    return RawSQL(f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s', [match_expression(term, columns)])
+
+
+def customer_condition(term, columns=tuple(COLUMNS), user_path=''):
+    """
+    Q matching rows whose customer matches `term` in `columns`
+
+    `user_path` leads from the queryset's model to User: '' for users,
+    'user__' for accounts, 'account__user__' for transactions.
+    """
+    if enabled() and len(term) >= MIN_TERM_LENGTH:
+        return Q(**{f'{user_path}id__in': _matching_user_ids(term, columns)})
+
+    condition = Q()
+    for column in columns:
+        condition |= Q(**{f'{user_path}{COLUMNS[column]}__icontains': term})
+    return condition
+
+
+def filter_customers(queryset, term, columns=tuple(COLUMNS), user_path=''):
+    """`queryset` narrowed to rows whose customer matches `term` (see customer_condition)"""
+    term = term.strip()
+    if not term:
+        return queryset
+    return queryset.filter(customer_condition(term, columns, user_path))
+
+
+def _suggestion(user):
+    account = getattr(user, 'account', None)
+    return {
+        'user_id': user.pk,
+        'username': user.username,
+        'name': user.get_full_name(),
+        'email': user.email,
+        'account_id': account.pk if account else None,
+        'account_number': account.account_number if account else None,
+    }
+
+
+def typeahead(term, limit=10):
+    """
+    Up to `limit` customers matching `term`, exact matches first
+
+    Terms too short for the index only find exact account numbers and
+    usernames (case-sensitive, like logging in), which are looked up by
+    their unique indexes.
+    """
+    term = term.strip()
+    if not term:
+        return []
+    customers = User.objects.filter(manager_profile__isnull=True).select_related('account')
+
+    # Both sides of the OR are unique-index lookups
+    numbered = Account.objects.filter(account_number=term.upper()).values('user_id')
+    exact = list(customers.filter(Q(username=term) | Q(id__in=numbered))[:limit])
+    found = {user.pk for user in exact}
+    if len(term) < MIN_TERM_LENGTH or len(exact) >= limit:
+        return [_suggestion(user) for user in exact]
+
+    if enabled():
+        # Over-fetch by what was already found. Managers are indexed too
+        # and left out here, so a search matching them may return fewer
+        ids = RawSQL(
+            f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s LIMIT %s',
+            [match_expression(term), limit + len(found)],
+        )
+        more = customers.filter(id__in=ids).exclude(id__in=found).order_by('id')
+    else:
+        more = filter_customers(customers, term).exclude(id__in=found).order_by('id')
+    return [_suggestion(user) for user in exact + list(more[:limit - len(exact)])]
+
+
+# A full-text index over `columns` of the `source` table; `side` names
+# columns kept in a one-to-one side table of it instead
+TextIndex = namedtuple('TextIndex', 'table source columns side')
+
+# (side table, its column pointing at the source row, {index column: side
+# column}, lookup from the source model). A source row without a side row
+# indexes '' for those columns
+SideTable = namedtuple('SideTable', 'table key columns path')
+
+TEXT_INDEXES = {
+    Transaction: TextIndex(
+        'bank_transaction_search', 'bank_transaction', ['description'],
+        SideTable('bank_transactionapproval', 'transaction_id', {'approval_note': 'note'}, 'approval'),
+    ),
+    ManagerAction: TextIndex('bank_manageraction_search', 'bank_manageraction', ['note'], None),
+}
+
+# Stemmed words (porter), case and accents ignored
+TEXT_TOKENIZER = 'porter unicode61 remove_diacritics 2'
+
+
+def _index_columns(index):
+    return index.columns + (list(index.side.columns) if index.side else [])
+
+
+def _text_index_sql(index):
+    """The FTS5 table of `index`, and the triggers that keep it in step"""
+    table, source, columns, side = index
+    listed = ', '.join(columns)
+    new_values = ', '.join(f'new.{column}' for column in columns)
+    changed = ' OR '.join(f'old.{column} IS NOT new.{column}' for column in columns)
+    assignments = ', '.join(f'{column} = new.{column}' for column in columns)
+    if side:
+        listed += ''.join(f', {column}' for column in side.columns)
+        new_values += ''.join(
+            f", COALESCE((SELECT {side_column} FROM {side.table} WHERE {side.key} = new.id), '')"
+            for side_column in side.columns.values()
+        )
+    statements = {
+        table: f"CREATE VIRTUAL TABLE {table} USING fts5({listed}, tokenize = '{TEXT_TOKENIZER}')",
+        f'{table}_insert': f"""
+            CREATE TRIGGER {table}_insert AFTER INSERT ON {source} BEGIN
+                INSERT INTO {table} (rowid, {listed}) VALUES (new.id, {new_values});
+            END
+        """,
+        f'{table}_update': f"""
+            CREATE TRIGGER {table}_update AFTER UPDATE OF {', '.join(columns)} ON {source}
+            WHEN {changed} BEGIN
+                UPDATE {table} SET {assignments} WHERE rowid = new.id;
+            END
+        """,
+        f'{table}_delete': f"""
+            CREATE TRIGGER {table}_delete AFTER DELETE ON {source} BEGIN
+                DELETE FROM {table} WHERE rowid = old.id;
+            END
+        """,
+    }
+    if side:
+        side_listed = ', '.join(side.columns.values())
+        side_changed = ' OR '.join(f'old.{column} IS NOT new.{column}' for column in side.columns.values())
+        side_assignments = ', '.join(f'{column} = new.{side_column}' for column, side_column in side.columns.items())
+        side_cleared = ', '.join(f"{column} = ''" for column in side.columns)
+        statements.update({
+            f'{table}_{side.path}_insert': f"""
+                CREATE TRIGGER {table}_{side.path}_insert AFTER INSERT ON {side.table} BEGIN
+                    UPDATE {table} SET {side_assignments} WHERE rowid = new.{side.key};
+                END
+            """,
+            f'{table}_{side.path}_update': f"""
+                CREATE TRIGGER {table}_{side.path}_update AFTER UPDATE OF {side_listed} ON {side.table}
+                WHEN {side_changed} BEGIN
+                    UPDATE {table} SET {side_assignments} WHERE rowid = new.{side.key};
+                END
+            """,
+            f'{table}_{side.path}_delete': f"""
+                CREATE TRIGGER {table}_{side.path}_delete AFTER DELETE ON {side.table} BEGIN
+                    UPDATE {table} SET {side_cleared} WHERE rowid = old.{side.key};
+                END
+            """,
+        })
+    return statements
+
+
+def _text_fill_sql(index):
+    """Copies source rows with ids in (%s, %s] into the index"""
+    table, source, columns, side = index
+    selected = ', '.join(f's.{column}' for column in columns)
+    joined = ''
+    if side:
+        selected += ''.join(f", COALESCE(x.{side_column}, '')" for side_column in side.columns.values())
+        joined = f' LEFT JOIN {side.table} x ON x.{side.key} = s.id'
+    return (
+        f"INSERT OR REPLACE INTO {table} (rowid, {', '.join(_index_columns(index))}) "
+        f'SELECT s.id, {selected} FROM {source} s{joined} WHERE s.id > %s AND s.id <= %s'
+    )
+
+
+def _rebuild_text_index(cursor, index, batch_size):
+    statements = _text_index_sql(index)
+    for name in statements:
+        if name != index.table:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+    cursor.execute(f'DROP TABLE IF EXISTS {index.table}')
+    for sql in statements.values():
+        cursor.execute(sql)
+
+    cursor.execute(f'SELECT MAX(id) FROM {index.source}')
+    max_id = cursor.fetchone()[0] or 0
+    fill = _text_fill_sql(index)
+    indexed, last_id = 0, 0
+    while last_id < max_id:
+        cursor.execute(fill, [last_id, last_id + batch_size])
+        indexed += cursor.rowcount
+        last_id += batch_size
+    return indexed
+
+
+def rebuild_text(batch_size=10000):
+    """
+    Recreate the full-text indexes and their triggers, then refill them;
+    returns {index table: rows indexed}
+
+    Like rebuild_customers(): triggers first, then one INSERT ... SELECT
+    per batch of ids.
+    """
+    with connection.cursor() as cursor:
+        return {
+            index.table: _rebuild_text_index(cursor, index, batch_size)
+            for index in TEXT_INDEXES.values()
+        }
+
+
+def repair_indexes(batch_size=10000):
+    """
+    Rebuild any index whose table or triggers are missing; returns the
+    names of the rebuilt ones
+
+    On SQLite, Django applies some schema changes (removing a field,
+    changing its type) by copying the table to a new one, which drops the
+    old table's triggers. This runs after every migrate (apps.py), so such
+    a migration cannot leave an index silently going stale.
+    """
+    if connection.vendor != 'sqlite':
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        existing = {name for name, in cursor.fetchall()}
+
+        # Tables survive a rewrite, so an index without its table (or side
+        # table) is one the migrations have not created yet
+        repaired = []
+        if TABLE in existing and not set(TRIGGERS) <= existing:
+            rebuild_customers(batch_size)
+            repaired.append(TABLE)
+        for index in TEXT_INDEXES.values():
+            if index.table not in existing or (index.side and index.side.table not in existing):
+                continue
+            if not set(_text_index_sql(index)) <= existing:
+                _rebuild_text_index(cursor, index, batch_size)
+                repaired.append(index.table)
+    return repaired
+
+
+def text_condition(model, text):
+    """
+    Q matching rows of `model` whose text contains every word of `text`
+
+    Unranked, so it can be OR-ed with other conditions. Text without any
+    words matches nothing.
+    """
+    query = words_query(text)
+    if not query:
+        return Q(pk__in=[])
+    index = TEXT_INDEXES[model]
+    if enabled():
+        return Q(pk__in=RawSQL(f'SELECT rowid FROM {index.table} WHERE {index.table} MATCH %s', [query]))
+
+    lookups = list(index.columns)
+    if index.side:
+        lookups += [f'{index.side.path}__{column}' for column in index.side.columns.values()]
+    condition = Q()
+    for word in re.findall(r'\w+', text):
+        in_any_column = Q()
+        for lookup in lookups:
+            in_any_column |= Q(**{f'{lookup}__icontains': word})
+        condition &= in_any_column
+    return condition
+
+
+def search_text(queryset, text):
+    """
+    `queryset` narrowed to rows whose text contains every word of `text`,
+    most relevant first
+
+    The ranking is annotated as `search_rank` (lower is better). Without
+    the index the rows match the same way but keep the queryset's order.
+    """
+    query = words_query(text)
+    if not query:
+        return queryset.none()
+    if not enabled():
+        return queryset.filter(text_condition(queryset.model, text))
+    return (
+        queryset.filter(search_entry__document__match=query)
+        .annotate(search_rank=F('search_entry__rank'))
+        .order_by('search_rank', '-pk')
+    )
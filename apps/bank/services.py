@@ -0,0 +1,305 @@
+"""
+Posting service
+
+The one code path that moves customer money for deposits and withdrawals.
+Each posting, in a single database transaction:
+- checks the posting rules (rules.py) against the account's daily counters;
+  a posting that matches a rule is created as PENDING for a manager to
+  approve, and settles later (settlement.py). A pending withdrawal places a
+  hold on its amount (holds.py)
+- otherwise moves Account.balance and Account.available_balance with a
+  conditional UPDATE ... SET balance = balance + x, so concurrent requests
+  can neither lose an update nor overdraw, and records a balanced JournalEntry
+- writes the Transaction row customers and managers see
+- enforces the account tier's withdrawal limits (limits.py)
+- bumps the account's AccountDailyTotals counters
+- moves the account's cache version on (page_cache.py)
+A transfer is a withdrawal and a deposit posted together through the
+Suspense ledger account. So is a balance correction made in the admin
+(adjust), journalled as an ADJUSTMENT. Once committed, the posting is scored by the anomaly detector (anomaly.py).
+"""
+from decimal import Decimal, InvalidOperation
+from functools import partial
+
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .anomaly import score_committed
+from .holds import place_hold, release_holds
+from .journal import deposit_lines, record_entry, withdrawal_lines
+from .limits import headroom, limit_error
+from .models import Account, AccountDailyTotals, JournalEntry, LedgerAccount, Transaction
+from .rules import PostingContext, review_reason
+
+
+# Same per-transaction cap as the deposit and withdraw forms
+MAX_AMOUNT = Decimal('1000000.00')
+
+
+class PostingError(Exception):
+    """A posting was refused; the message is safe to show to the customer"""
+
+
+def parse_amount(raw):
+    """
+    A posting amount from untrusted text (JSON, CSV); PostingError if invalid
+
+    Same rules as the forms: positive, at most 2 decimal places, at most
+    MAX_AMOUNT.
+    """
+    try:
+        amount = Decimal(str(raw).strip())
+    except InvalidOperation:
+        raise PostingError('amount must be a decimal number, e.g. "250.00".')
+    if not amount.is_finite() or amount <= 0:
+        raise PostingError('amount must be greater than zero.')
+    if amount.as_tuple().exponent < -2:
+        raise PostingError('amount can have at most 2 decimal places.')
+    if amount > MAX_AMOUNT:
+        raise PostingError(f'amount cannot exceed ₹{MAX_AMOUNT:,} per transaction.')
+    return amount.quantize(Decimal('0.01'))
+
+
+def deposit(account, amount, description='', counterparty=None):
+    """Credit `amount` to `account`; returns the new Transaction"""
+    return _post(account, Transaction.DEPOSIT, amount, description or 'Deposit', counterparty)
+
+
+def withdraw(account, amount, description='', counterparty=None):
+    """Debit `amount` from `account`; returns the new Transaction"""
+    return _post(account, Transaction.WITHDRAW, amount, description or 'Withdrawal', counterparty)
+
+
+def transfer(source, target, amount, description=''):
+    """
+    Move `amount` from `source` to `target`; returns (withdrawal, deposit)
+
+    Both legs post in one database transaction and clear through the
+    Suspense ledger account, so no cash moves in the books. Each side is
+    the other's counterparty for the posting rules. A transfer cannot wait
+    for approval: if either leg would be sent for review, the whole transfer
+    is refused.
+    """
+    if source.pk == target.pk:
+        raise PostingError('You cannot transfer to the same account.')
+    description = description or f'Transfer to {target.account_number}'
+
+    with transaction.atomic():
+        # Both counters rows, in id order, so opposite transfers between the
+        # same two accounts cannot deadlock
+        today = timezone.localdate()
+        for account_id in sorted([source.pk, target.pk]):
+            AccountDailyTotals.objects.select_for_update().get_or_create(account_id=account_id, day=today)
+
+        sent = _post(source, Transaction.WITHDRAW, amount, description, target, LedgerAccount.SUSPENSE)
+        received = _post(
+            target, Transaction.DEPOSIT, amount, f'Transfer from {source.account_number}',
+            source, LedgerAccount.SUSPENSE,
+        )
+        pending = next((txn for txn in (sent, received) if txn.status != Transaction.COMPLETED), None)
+        if pending:
+            raise PostingError(
+                f'This transfer needs a manager\'s approval ({pending.review_reason}) '
+                f'and cannot be made automatically.'
+            )
+    return sent, received
+
+
+def adjust(account, amount, description):
+    """
+    Correct `account`'s balance by `amount` (negative to take money off);
+    returns the new Transaction
+
+    - Posted at once, like a deposit or withdrawal, against the Suspense
+      ledger account, where it stays until the difference is accounted for
+    - Not subject to the posting rules or withdrawal limits, and allowed on
+      frozen accounts, but it cannot take the available balance below zero
+    """
+    if not amount:
+        raise PostingError('An adjustment cannot be zero.')
+    size = abs(amount)
+    if amount > 0:
+        transaction_type = Transaction.DEPOSIT
+        lines = deposit_lines(account.id, size, source=LedgerAccount.SUSPENSE)
+    else:
+        transaction_type = Transaction.WITHDRAW
+        lines = withdrawal_lines(account.id, size, destination=LedgerAccount.SUSPENSE)
+
+    with transaction.atomic():
+        now = timezone.now()
+        target = Account.objects.filter(pk=account.pk)
+        if amount < 0:
+            target = target.filter(available_balance__gte=size)
+        if not target.update(
+            balance=F('balance') + amount,
+            available_balance=F('available_balance') + amount,
+            last_activity=now,
+            version=F('version') + 1,
+        ):
+            account.refresh_from_db(fields=['available_balance'])
+            raise PostingError(
+                f'The available balance is only ₹{account.available_balance}; '
+                f'an adjustment cannot take it below zero.'
+            )
+        account.refresh_from_db(fields=['balance', 'available_balance', 'last_activity'])
+        entry = record_entry(JournalEntry.ADJUSTMENT, description, lines)
+        return Transaction.objects.create(
+            account=account,
+            transaction_type=transaction_type,
+            amount=size,
+            balance_after=account.balance,
+            status=Transaction.COMPLETED,
+            description=description,
+            journal_entry=entry,
+        )
+
+
+def _counters_field(transaction_type):
+    return 'deposit' if transaction_type == Transaction.DEPOSIT else 'withdrawal'
+
+
+def _refuse(account):
+    account.refresh_from_db(fields=['balance', 'available_balance', 'status'])
+    if account.status == Account.FROZEN:
+        raise PostingError(
+            'Your account is frozen. You cannot perform transactions. Please contact the bank.'
+        )
+    raise PostingError(f'Insufficient funds. Your available balance is ₹{account.available_balance}.')
+
+
+def _post(account, transaction_type, amount, description, counterparty=None, via=LedgerAccount.CASH):
+    if amount <= 0:
+        raise PostingError('Amount must be greater than zero.')
+
+    if transaction_type == Transaction.DEPOSIT:
+        delta = amount
+        entry_type = JournalEntry.DEPOSIT
+        lines = deposit_lines(account.id, amount, source=via)
+    else:
+        delta = -amount
+        entry_type = JournalEntry.WITHDRAW
+        lines = withdrawal_lines(account.id, amount, destination=via)
+
+    with transaction.atomic():
+        now = timezone.now()
+        # Locking the counters row serialises postings per account, so two
+        # concurrent requests cannot both slip under a velocity limit
+        counters, _ = AccountDailyTotals.objects.select_for_update().get_or_create(
+            account=account, day=timezone.localdate(now)
+        )
+        prefix = _counters_field(transaction_type)
+        if transaction_type == Transaction.WITHDRAW:
+            # Checked against the locked counters row, so concurrent
+            # withdrawals cannot both fit under the same headroom
+            error = limit_error(amount, headroom(account, counters.day, counters.withdrawal_total))
+            if error:
+                raise PostingError(error)
+        reason = review_reason(PostingContext(
+            transaction_type,
+            amount,
+            account.status,
+            account.created_at,
+            now,
+            count_today=getattr(counters, f'{prefix}_count'),
+            total_today=getattr(counters, f'{prefix}_total'),
+            counterparty_status=counterparty.status if counterparty else None,
+        ))
+
+        # The status and funds checks are part of the UPDATE itself, so they
+        # hold even when two requests for the same account race. Funds held
+        # for pending withdrawals are not available to spend.
+        target = Account.objects.filter(pk=account.pk, status=Account.ACTIVE)
+        if transaction_type == Transaction.WITHDRAW:
+            target = target.filter(available_balance__gte=amount)
+
+        if reason:
+            # Sent for approval: the balance moves at settlement, but a
+            # withdrawal reserves its amount now
+            if transaction_type == Transaction.WITHDRAW:
+                reserved = target.update(
+                    available_balance=F('available_balance') - amount, version=F('version') + 1
+                )
+            else:
+                reserved = target.update(version=F('version') + 1)
+            if not reserved:
+                _refuse(account)
+            txn = Transaction.objects.create(
+                account=account,
+                transaction_type=transaction_type,
+                amount=amount,
+                balance_after=account.balance,
+                status=Transaction.PENDING,
+                description=description,
+                review_reason=reason[:200],
+            )
+            if transaction_type == Transaction.WITHDRAW:
+                place_hold(account, txn, now)
+        else:
+            if not target.update(
+                balance=F('balance') + delta,
+                available_balance=F('available_balance') + delta,
+                last_activity=now,
+                version=F('version') + 1,
+            ):
+                _refuse(account)
+            account.refresh_from_db(fields=['balance', 'available_balance', 'last_activity'])
+            entry = record_entry(entry_type, description, lines)
+            txn = Transaction.objects.create(
+                account=account,
+                transaction_type=transaction_type,
+                amount=amount,
+                balance_after=account.balance,
+                status=Transaction.COMPLETED,
+                description=description,
+                journal_entry=entry,
+            )
+
+        AccountDailyTotals.objects.filter(pk=counters.pk).update(**{
+            f'{prefix}_count': F(f'{prefix}_count') + 1,
+            f'{prefix}_total': F(f'{prefix}_total') + amount,
+        })
+        transaction.on_commit(partial(score_committed, txn))
+        return txn
+
+
+def release_daily_totals(transaction_ids):
+    """
+    Give back the counter headroom of postings that were rejected
+
+    Called wherever pending transactions are rejected, so a refused
+    withdrawal does not keep counting against the account's limits.
+    """
+    released = {}
+    rows = Transaction.objects.filter(id__in=list(transaction_ids)).values_list(
+        'account_id', 'timestamp', 'transaction_type', 'amount'
+    )
+    for account_id, timestamp, transaction_type, amount in rows:
+        key = (account_id, timezone.localdate(timestamp), _counters_field(transaction_type))
+        count, total = released.get(key, (0, 0))
+        released[key] = (count + 1, total + amount)
+
+    for (account_id, day, prefix), (count, total) in released.items():
+        # Never below zero: postings from before the counters existed were not counted
+        AccountDailyTotals.objects.filter(account_id=account_id, day=day).update(**{
+            f'{prefix}_count': Greatest(F(f'{prefix}_count') - count, Value(0)),
+            f'{prefix}_total': Greatest(F(f'{prefix}_total') - total, Value(0)),
+        })
+
+
+def release_rejected(transaction_ids):
+    """
+    Undo what rejected postings still hold on to: their counter headroom
+    and the funds reserved for them
+
+    Called wherever pending or approved transactions are rejected. The
+    accounts' cache version moves on too, so cached pages and API ETags
+    show the rejection.
+    """
+    transaction_ids = list(transaction_ids)
+    release_daily_totals(transaction_ids)
+    release_holds(transaction_ids)
+    Account.objects.filter(
+        id__in=Transaction.objects.filter(id__in=transaction_ids).values('account_id')
+    ).update(version=F('version') + 1)
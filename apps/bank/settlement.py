@@ -0,0 +1,322 @@
+"""
+Settlement engine
+
+Approving a pending transaction queues it for settlement (status APPROVED).
+settle() then applies approved transactions to Account.balance in batches
+of accounts. Each batch takes one database transaction and a fixed number
+of queries, however many transactions it settles (transactions it rejects
+give back their daily counters with one UPDATE per account and day).
+
+Within an account, approved transactions are settled in ledger order
+(timestamp, id), between the completed transactions around them:
+- a deposit is always accepted
+- a withdrawal is accepted only if the balance stays non-negative at its
+  own point in the history and at every later point; otherwise it is
+  rejected as an overdraw
+- a withdrawal whose hold has expired (or that never had one) must also fit
+  in the available balance, so it cannot spend funds held for others
+- accepted transactions become COMPLETED with a journal entry, and the
+  balance_after of every later completed transaction is recomputed
+- holds of settled withdrawals end; those of rejected ones are released
+- balance snapshots on or after the settled day are shifted to match; an
+  account with no snapshot since that day gets one for the latest completed
+  snapshot run, which later runs build on. Both take a fixed number of
+  queries too
+- the cache version of every account with a decided transaction moves on
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+from . import approvals
+from .bulk import bulk_set
+from .holds import settle_holds
+from .journal import deposit_lines, record_entries, withdrawal_lines
+from .ledger import LEDGER_ORDER, ZERO, signed_amount, signed_amount_expression, to_money
+from .models import Account, AccountBalanceSnapshot, BalanceSnapshotRun, Hold, JournalEntry, Transaction
+from .page_cache import bump_versions
+from .services import release_rejected
+from .snapshots import day_end
+
+SETTLEMENT_FIELDS = ['id', 'account_id', 'transaction_type', 'amount', 'balance_after',
+                     'status', 'timestamp', 'description']
+
+OVERDRAW_NOTE = 'Rejected at settlement: the withdrawal would overdraw the account.'
+FROZEN_NOTE = 'Rejected at settlement: the account is frozen.'
+
+
+def settle(transaction_ids=None, batch_size=500):
+    """
+    Settle approved transactions (only `transaction_ids` if given)
+
+    Returns (settled ids, rejected ids).
+    """
+    approved = Transaction.objects.filter(status=Transaction.APPROVED)
+    if transaction_ids is not None:
+        approved = approved.filter(id__in=list(transaction_ids))
+
+    settled, rejected = [], []
+    last_account_id = 0
+    while True:
+        account_ids = list(
+            approved.filter(account_id__gt=last_account_id)
+            .order_by('account_id')
+            .values_list('account_id', flat=True)
+            .distinct()[:batch_size]
+        )
+        if not account_ids:
+            break
+        batch_settled, batch_rejected = _settle_accounts(approved, account_ids)
+        settled += batch_settled
+        rejected += batch_rejected
+        last_account_id = account_ids[-1]
+    return settled, rejected
+
+
+def _settle_accounts(approved, account_ids):
+    with transaction.atomic():
+        accounts = {
+            account.id: account
+            for account in Account.objects.select_for_update()
+            .filter(id__in=account_ids)
+            .only('id', 'balance', 'available_balance', 'status', 'last_activity')
+        }
+        settling = [
+            dict(zip(SETTLEMENT_FIELDS, row))
+            for row in approved.filter(account_id__in=account_ids)
+            .order_by(*LEDGER_ORDER)
+            .values_list(*SETTLEMENT_FIELDS)
+        ]
+        if not settling:
+            return [], []
+        held = set(
+            Hold.objects.filter(
+                transaction_id__in=[txn['id'] for txn in settling], status=Hold.ACTIVE
+            ).values_list('transaction_id', flat=True)
+        )
+
+        # Completed history from the earliest settling point onwards; the
+        # balance before it is the current balance minus this window
+        window_start = min(txn['timestamp'] for txn in settling)
+        completed = Transaction.objects.filter(
+            account_id__in=account_ids,
+            status__in=Transaction.POSTED_STATUSES,
+            timestamp__gte=window_start,
+        )
+        histories = defaultdict(list)
+        for row in completed.order_by(*LEDGER_ORDER).values_list(*SETTLEMENT_FIELDS):
+            histories[row[1]].append(dict(zip(SETTLEMENT_FIELDS, row)))
+        pending_by_account = defaultdict(list)
+        for txn in settling:
+            pending_by_account[txn['account_id']].append(txn)
+
+        accepted, refused, rechained, balances, available = [], [], [], {}, {}
+        for account_id, pending in pending_by_account.items():
+            account = accounts[account_id]
+            history = histories[account_id]
+            if account.status != Account.ACTIVE:
+                refused += [(txn, FROZEN_NOTE) for txn in pending]
+                continue
+
+            opening = account.balance - sum(
+                (signed_amount(txn['transaction_type'], txn['amount']) for txn in history), ZERO
+            )
+            merged = sorted(history + pending, key=lambda txn: (txn['timestamp'], txn['id']))
+            account_accepted, account_refused, account_available = _apply_in_order(
+                opening, merged, account.available_balance, held
+            )
+            accepted += account_accepted
+            refused += [(txn, OVERDRAW_NOTE) for txn in account_refused]
+
+            accepted_ids = {txn['id'] for txn in account_accepted}
+            running = opening
+            for txn in merged:
+                if txn['status'] in Transaction.POSTED_STATUSES or txn['id'] in accepted_ids:
+                    running += signed_amount(txn['transaction_type'], txn['amount'])
+                    if txn['status'] in Transaction.POSTED_STATUSES and txn['balance_after'] != running:
+                        rechained.append(Transaction(pk=txn['id'], balance_after=running))
+                    txn['balance_after'] = running
+            if running != account.balance:
+                balances[account_id] = running
+            if account_available != account.available_balance:
+                available[account_id] = account_available
+
+        _write(accepted, refused, rechained, balances, available, held)
+    return [txn['id'] for txn in accepted], [txn['id'] for txn, _ in refused]
+
+
+def _apply_in_order(opening, merged, available, held):
+    """
+    Decide the approved transactions of one account's merged history
+
+    `available` is the account's available balance and `held` the ids of
+    transactions with an active hold. Returns (accepted, refused) lists of
+    the approved transaction dicts, and the available balance once the
+    accepted ones settle.
+    """
+    deltas = [
+        signed_amount(txn['transaction_type'], txn['amount'])
+        if txn['status'] in Transaction.POSTED_STATUSES else ZERO
+        for txn in merged
+    ]
+    accepted, refused = [], []
+    for position, txn in enumerate(merged):
+        if txn['status'] in Transaction.POSTED_STATUSES:
+            continue
+        if txn['transaction_type'] == Transaction.WITHDRAW:
+            # Lowest balance from this point on, before this withdrawal
+            running = opening + sum(deltas[:position], ZERO)
+            lowest = running
+            for delta in deltas[position:]:
+                running += delta
+                lowest = min(lowest, running)
+            if lowest < txn['amount']:
+                refused.append(txn)
+                continue
+            if txn['id'] not in held and available < txn['amount']:
+                refused.append(txn)
+                continue
+        deltas[position] = signed_amount(txn['transaction_type'], txn['amount'])
+        # A held withdrawal was taken out of the available balance already
+        if txn['id'] not in held:
+            available += deltas[position]
+        accepted.append(txn)
+    return accepted, refused, available
+
+
+def _write(accepted, refused, rechained, balances, available, held):
+    now = timezone.now()
+
+    entries = record_entries([
+        (
+            JournalEntry.DEPOSIT if txn['transaction_type'] == Transaction.DEPOSIT else JournalEntry.WITHDRAW,
+            txn['description'],
+            deposit_lines(txn['account_id'], txn['amount'])
+            if txn['transaction_type'] == Transaction.DEPOSIT
+            else withdrawal_lines(txn['account_id'], txn['amount']),
+        )
+        for txn in accepted
+    ]) if accepted else []
+
+    bulk_set(Transaction, [
+        Transaction(
+            pk=txn['id'],
+            status=Transaction.COMPLETED,
+            balance_after=txn['balance_after'],
+            journal_entry_id=entry.id,
+        )
+        for txn, entry in zip(accepted, entries)
+    ], ['status', 'balance_after', 'journal_entry'])
+
+    bulk_set(Transaction, [
+        Transaction(pk=txn['id'], status=Transaction.REJECTED) for txn, _ in refused
+    ], ['status'])
+    if refused:
+        approvals.add_notes({txn['id']: note for txn, note in refused})
+
+    bulk_set(Transaction, rechained, ['balance_after'])
+
+    bulk_set(Account, [
+        Account(pk=account_id, balance=balance, last_activity=now)
+        for account_id, balance in balances.items()
+    ], ['balance', 'last_activity'])
+    bulk_set(Account, [
+        Account(pk=account_id, available_balance=amount)
+        for account_id, amount in available.items()
+    ], ['available_balance'])
+
+    # After the absolute writes above: releasing holds credits
+    # available_balance with UPDATE ... SET x = x + n
+    settle_holds([txn['id'] for txn in accepted if txn['id'] in held])
+    release_rejected([txn['id'] for txn, _ in refused])
+
+    _shift_snapshots(accepted)
+    bump_versions({txn['account_id'] for txn in accepted} | {txn['account_id'] for txn, _ in refused})
+
+
+def _shift_snapshots(accepted):
+    """
+    Move end-of-day snapshots taken after a back-dated settlement
+
+    One read of the snapshots since the earliest settled day and one
+    bulk_set, however many accounts and days settled. The accounts are
+    locked by the settlement, so absolute values are safe to write.
+    """
+    if not accepted:
+        return
+    deltas = defaultdict(lambda: ZERO)
+    for txn in accepted:
+        day = timezone.localdate(txn['timestamp'])
+        deltas[(txn['account_id'], day)] += signed_amount(txn['transaction_type'], txn['amount'])
+    settled_days = defaultdict(list)
+    for (account_id, day), delta in deltas.items():
+        settled_days[account_id].append((day, delta))
+
+    shifted = []
+    snapshots = AccountBalanceSnapshot.objects.filter(
+        account_id__in=list(settled_days), as_of__gte=min(day for _, day in deltas)
+    ).values_list('id', 'account_id', 'as_of', 'balance')
+    for snapshot_id, account_id, as_of, balance in snapshots:
+        shift = sum((delta for day, delta in settled_days[account_id] if day <= as_of), ZERO)
+        if shift:
+            shifted.append(AccountBalanceSnapshot(pk=snapshot_id, balance=balance + shift))
+    bulk_set(AccountBalanceSnapshot, shifted, ['balance'])
+    _fill_snapshot_gaps(deltas)
+
+
+def _fill_snapshot_gaps(deltas):
+    """
+    Snapshot accounts whose settled day is already covered by a completed run
+
+    snapshot_day() builds on the account's latest snapshot plus the postings
+    after the previous run, so a posting settled after the runs for its day
+    would otherwise never be counted. An account whose latest snapshot is
+    older than its latest settled day gets a snapshot for the latest
+    completed run, computed after the settlement was written: its latest
+    snapshot plus its postings on later days, up to the end of the run's
+    day. Three queries and a bulk_create for all the accounts.
+    """
+    run = BalanceSnapshotRun.objects.filter(completed_at__isnull=False).order_by('-as_of').first()
+    if run is None:
+        return
+    last_days = {}
+    for account_id, day in deltas:
+        if day <= run.as_of:
+            last_days[account_id] = max(day, last_days.get(account_id, day))
+    if not last_days:
+        return
+
+    latest = AccountBalanceSnapshot.objects.filter(account=OuterRef('pk')).order_by('-as_of')
+    gaps = {
+        account_id: balance or ZERO
+        for account_id, as_of, balance in Account.objects.filter(id__in=list(last_days))
+        .annotate(as_of=Subquery(latest.values('as_of')[:1]), snapshot_balance=Subquery(latest.values('balance')[:1]))
+        .order_by()
+        .values_list('id', 'as_of', 'snapshot_balance')
+        if as_of is None or as_of < last_days[account_id]
+    }
+    if not gaps:
+        return
+
+    # Postings after each account's latest snapshot, up to the end of the run's day
+    latest_day = AccountBalanceSnapshot.objects.filter(account=OuterRef('account_id')).order_by('-as_of')
+    postings = (
+        Transaction.objects.filter(
+            account_id__in=list(gaps),
+            status__in=Transaction.POSTED_STATUSES,
+            timestamp__lt=day_end(run.as_of),
+        )
+        .alias(snapshot_day=Subquery(latest_day.values('as_of')[:1]))
+        .filter(Q(snapshot_day__isnull=True) | Q(timestamp__date__gt=F('snapshot_day')))
+        .values('account_id')
+        .annotate(delta=Sum(signed_amount_expression()))
+        .order_by()
+    )
+    for row in postings:
+        gaps[row['account_id']] += to_money(row['delta'])
+    AccountBalanceSnapshot.objects.bulk_create([
+        AccountBalanceSnapshot(account_id=account_id, as_of=run.as_of, balance=balance)
+        for account_id, balance in sorted(gaps.items())
+    ])
@@ -0,0 +1,192 @@
+"""
+Point-in-time balances
+
+snapshot_day() records end-of-day balances for the accounts that had
+postings since the previous completed run, building each snapshot from the
+account's previous snapshot plus that window's transactions rather than
+from the full history. balance_at() and balances_at() then answer "what was
+the balance at time X" from the nearest snapshot plus the transactions
+after it, which is at most about a day's worth per account.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Sum
+from django.utils import timezone
+
+from .bulk import BULK_CREATE_BATCH_SIZE
+from .ledger import ZERO, signed_amount, signed_amount_expression, to_money
+from .models import Account, AccountBalanceSnapshot, BalanceSnapshotRun, Transaction
+from .replay import Projection, register_projection
+
+
+def day_end(day):
+    """Exclusive cutoff of a day's snapshot: the following midnight in TIME_ZONE"""
+    return timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+
+def _posted_transactions():
+    return Transaction.objects.filter(status__in=Transaction.POSTED_STATUSES)
+
+
+def _latest_completed_run(before):
+    """Latest completed snapshot run for a day before `before`, or None"""
+    return (
+        BalanceSnapshotRun.objects.filter(as_of__lt=before, completed_at__isnull=False)
+        .order_by('-as_of')
+        .first()
+    )
+
+
+def _latest_snapshot(through):
+    """Subquery over Account rows: the newest snapshot on or before `through`"""
+    return (
+        AccountBalanceSnapshot.objects.filter(account=OuterRef('pk'), as_of__lte=through)
+        .order_by('-as_of')
+        .values('balance')[:1]
+    )
+
+
+def snapshot_day(day, chunk_size=5000):
+    """
+    Write end-of-day snapshots for `day`
+
+    Runs in chunks of accounts, each committed together with the run's
+    progress, so rerunning an interrupted day resumes after the last chunk
+    and rerunning a completed day does nothing. Returns the rows written.
+    """
+    run, _ = BalanceSnapshotRun.objects.get_or_create(as_of=day)
+    if run.completed_at:
+        return 0
+
+    base = _latest_completed_run(before=day)
+    activity = _posted_transactions().filter(timestamp__lt=day_end(day))
+    if base:
+        activity = activity.filter(timestamp__gte=day_end(base.as_of))
+
+    written = 0
+    while True:
+        deltas = list(
+            activity.filter(account_id__gt=run.last_account_id)
+            .values('account_id')
+            .annotate(delta=Sum(signed_amount_expression()))
+            .order_by('account_id')[:chunk_size]
+        )
+        if not deltas:
+            break
+
+        ids = [row['account_id'] for row in deltas]
+        previous = {}
+        if base:
+            previous = dict(
+                Account.objects.filter(id__in=ids)
+                .annotate(snapshot_balance=Subquery(_latest_snapshot(base.as_of)))
+                .order_by()
+                .values_list('id', 'snapshot_balance')
+            )
+
+        with transaction.atomic():
+            AccountBalanceSnapshot.objects.bulk_create(
+                [
+                    AccountBalanceSnapshot(
+                        account_id=row['account_id'],
+                        as_of=day,
+                        balance=(previous.get(row['account_id']) or ZERO) + to_money(row['delta']),
+                    )
+                    for row in deltas
+                ],
+                batch_size=BULK_CREATE_BATCH_SIZE,
+            )
+            run.last_account_id = ids[-1]
+            run.save(update_fields=['last_account_id'])
+        written += len(deltas)
+
+    run.completed_at = timezone.now()
+    run.save(update_fields=['completed_at'])
+    return written
+
+
+def balance_at(account, ts):
+    """
+    Balance of `account` at `ts` (transactions up to and including ts)
+
+    Uses the latest snapshot that ends on or before ts plus a delta scan of
+    the account's transactions after that snapshot.
+    """
+    snapshot = (
+        AccountBalanceSnapshot.objects.filter(account=account, as_of__lt=timezone.localdate(ts))
+        .order_by('-as_of')
+        .values_list('as_of', 'balance')
+        .first()
+    )
+    deltas = _posted_transactions().filter(account=account, timestamp__lte=ts)
+    balance = ZERO
+    if snapshot:
+        as_of, balance = snapshot
+        deltas = deltas.filter(timestamp__gte=day_end(as_of))
+    return balance + to_money(deltas.aggregate(total=Sum(signed_amount_expression()))['total'])
+
+
+def balances_at(ts, accounts=None):
+    """
+    Balances of many accounts at `ts` as {account id: balance}
+
+    Defaults to every account opened by ts. Costs two queries: the latest
+    snapshot per account as of the last completed run, and one grouped
+    aggregate over the transactions since that run.
+    """
+    if accounts is None:
+        accounts = Account.objects.filter(created_at__lte=ts)
+    accounts = accounts.order_by()
+
+    base = _latest_completed_run(before=timezone.localdate(ts))
+    deltas = _posted_transactions().filter(account__in=accounts, timestamp__lte=ts)
+    if base:
+        balances = {
+            account_id: snapshot_balance or ZERO
+            for account_id, snapshot_balance in accounts.annotate(
+                snapshot_balance=Subquery(_latest_snapshot(base.as_of))
+            ).values_list('id', 'snapshot_balance')
+        }
+        deltas = deltas.filter(timestamp__gte=day_end(base.as_of))
+    else:
+        balances = dict.fromkeys(accounts.values_list('id', flat=True), ZERO)
+
+    for row in deltas.values('account_id').annotate(delta=Sum(signed_amount_expression())).order_by():
+        if row['account_id'] in balances:
+            balances[row['account_id']] += to_money(row['delta'])
+    return balances
+
+
+class SnapshotProjection(Projection):
+    """Recomputes existing AccountBalanceSnapshot rows from the history"""
+    name = 'balance snapshots'
+
+    def rebuild(self, batch):
+        snapshots = defaultdict(list)
+        rows = (
+            AccountBalanceSnapshot.objects.filter(account_id__in=[account['id'] for account, _ in batch])
+            .order_by('account_id', 'as_of')
+            .values_list('id', 'account_id', 'as_of', 'balance')
+        )
+        for snapshot_id, account_id, as_of, balance in rows:
+            snapshots[account_id].append((snapshot_id, as_of, balance))
+
+        changes = []
+        for account, history in batch:
+            running = ZERO
+            position = 0
+            for snapshot_id, as_of, balance in snapshots.get(account['id'], []):
+                cutoff = day_end(as_of)
+                while position < len(history) and history[position][5] < cutoff:
+                    txn_id, txn_type, amount, _, status, _, _ = history[position]
+                    if status in Transaction.POSTED_STATUSES:
+                        running += signed_amount(txn_type, amount)
+                    position += 1
+                if balance != running:
+                    changes.append((AccountBalanceSnapshot, snapshot_id, {'balance': (balance, running)}))
+        return changes
+
+
+register_projection(SnapshotProjection())
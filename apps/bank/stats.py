@@ -0,0 +1,141 @@
+"""
+Dashboard statistics
+
+The manager dashboard, the admin dashboard and the reports page show
+overlapping totals. They all come from here: one conditional-aggregation
+query per table (users, accounts, transactions, alerts) computes every
+number at once, and the result is cached for BANK_STATS_TTL_SECONDS in the
+BANK_STATS_CACHE cache.
+
+Recomputing is single-flight. When the numbers expire, the first request
+takes a lock (cache.add) and recomputes; requests arriving meanwhile keep
+getting the previous numbers instead of running the same queries, so a
+burst of page loads costs one recomputation. Only a cold cache makes other
+requests wait, briefly, for the first one to finish.
+
+With the default per-process local-memory cache, each server process has
+its own copy and its own lock.
+"""
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .ledger import ZERO
+from .models import Account, AnomalyAlert, Transaction
+
+CACHE_KEY = 'bank:stats'
+
+# How long a recomputation may hold the lock before another request may try
+LOCK_SECONDS = 30
+
+# How long a request waits for another one to fill a cold cache
+WAIT_SECONDS = 5
+WAIT_STEP = 0.05
+
+# Expired numbers are kept this many TTLs longer, to serve while refreshing
+STALE_TTLS = 10
+
+
+def cache():
+    return caches[getattr(settings, 'BANK_STATS_CACHE', 'default')]
+
+
+def ttl():
+    return getattr(settings, 'BANK_STATS_TTL_SECONDS', 30)
+
+
+def _completed(transaction_type, since=None):
+    condition = Q(status=Transaction.COMPLETED, transaction_type=transaction_type)
+    if since is not None:
+        condition &= Q(timestamp__gte=since)
+    return condition
+
+
+def compute(now=None):
+    """Every dashboard number, from one query per table"""
+    now = now or timezone.now()
+    today = timezone.make_aware(datetime.combine(timezone.localdate(now), datetime.min.time()))
+    periods = {'today': today, 'week': now - timedelta(days=7), 'month': now - timedelta(days=30)}
+
+    stats = User.objects.aggregate(
+        total_users=Count('id', filter=Q(manager_profile__isnull=True)),
+        total_managers=Count('manager_profile'),
+    )
+    stats.update(Account.objects.aggregate(
+        total_accounts=Count('id'),
+        total_balance=Sum('balance'),
+        active_accounts=Count('id', filter=Q(status=Account.ACTIVE)),
+        frozen_accounts=Count('id', filter=Q(status=Account.FROZEN)),
+    ))
+
+    aggregates = {
+        'total_transactions': Count('id'),
+        'pending_transactions': Count('id', filter=Q(status=Transaction.PENDING)),
+        'completed_transactions': Count('id', filter=Q(status=Transaction.COMPLETED)),
+        'today_transactions': Count('id', filter=Q(timestamp__gte=today)),
+        'total_deposits': Sum('amount', filter=_completed(Transaction.DEPOSIT)),
+        'total_withdrawals': Sum('amount', filter=_completed(Transaction.WITHDRAW)),
+    }
+    # Report figures: completed transactions per period
+    for name, since in periods.items():
+        aggregates[f'{name}_completed_count'] = Count(
+            'id', filter=Q(status=Transaction.COMPLETED, timestamp__gte=since)
+        )
+        aggregates[f'{name}_deposits'] = Sum('amount', filter=_completed(Transaction.DEPOSIT, since))
+        aggregates[f'{name}_withdrawals'] = Sum('amount', filter=_completed(Transaction.WITHDRAW, since))
+    stats.update(Transaction.objects.aggregate(**aggregates))
+
+    stats['open_alerts_count'] = AnomalyAlert.objects.filter(reviewed=False).count()
+
+    # Sums over no rows are None
+    for name, value in stats.items():
+        if value is None:
+            stats[name] = ZERO
+    stats['computed_at'] = now
+    return stats
+
+
+def dashboard_stats():
+    """The cached numbers, recomputing them at most once at a time"""
+    store = cache()
+    entry = store.get(CACHE_KEY)
+    if entry and entry['fresh_until'] > time.time():
+        return entry['stats']
+
+    if store.add(f'{CACHE_KEY}:lock', True, LOCK_SECONDS):
+        try:
+            return _refresh(store)
+        finally:
+            store.delete(f'{CACHE_KEY}:lock')
+
+    # Someone else is recomputing: their previous numbers will do
+    if entry:
+        return entry['stats']
+    deadline = time.monotonic() + WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_STEP)
+        entry = store.get(CACHE_KEY)
+        if entry:
+            return entry['stats']
+    # The other request is stuck or gone; do not keep the page waiting
+    return _refresh(store)
+
+
+def _refresh(store):
+    stats = compute()
+    store.set(
+        CACHE_KEY,
+        {'stats': stats, 'fresh_until': time.time() + ttl()},
+        ttl() * STALE_TTLS,
+    )
+    return stats
+
+
+def clear():
+    """Forget the cached numbers; the next request recomputes them"""
+    cache().delete(CACHE_KEY)
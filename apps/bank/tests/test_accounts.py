@@ -0,0 +1,33 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from apps.bank.models import Account
+from apps.bank.services import deposit
+
+
+class AccountSaveTests(TestCase):
+    """A full save() of an account loaded before a posting"""
+
+    def setUp(self):
+        self.account = User.objects.create_user(username='customer', password=None).account
+
+    def test_save_keeps_postings_made_since_loading(self):
+        stale = Account.objects.get(pk=self.account.pk)
+        deposit(self.account, Decimal('100.00'))
+        version = Account.objects.get(pk=self.account.pk).version
+
+        stale.status = Account.FROZEN
+        stale.save()
+
+        saved = Account.objects.get(pk=self.account.pk)
+        self.assertEqual(saved.status, Account.FROZEN)
+        self.assertEqual((saved.balance, saved.available_balance), (Decimal('100.00'), Decimal('100.00')))
+        self.assertEqual(saved.version, version + 1)
+
+    def test_named_update_fields_are_written(self):
+        self.account.balance = self.account.available_balance = Decimal('5.00')
+        self.account.save(update_fields=['balance', 'available_balance'])
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('5.00'))
@@ -0,0 +1,264 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.bank.api import create_token
+from apps.bank.bulk_actions import run_queued
+from apps.bank.holds import place_hold
+from apps.bank.models import (
+    Account, AnomalyAlert, BankManager, BulkJob, IdempotencyKey, JournalEntry, LedgerAccount, ManagerAction,
+    StandingInstruction, Transaction, TransactionApproval,
+)
+from apps.bank.services import deposit, withdraw
+
+
+class AccountFreezeButtonTests(TestCase):
+    """The Freeze/Unfreeze buttons of the account changelist"""
+
+    def setUp(self):
+        self.account = User.objects.create_user(username='customer', password=None).account
+        self.admin = User.objects.create_superuser(username='admin', email='', password=None)
+        self.client = Client(enforce_csrf_checks=True)
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:bank_account_freeze', args=[self.account.pk])
+
+    def status(self):
+        return Account.objects.get(pk=self.account.pk).status
+
+    def test_get_does_not_freeze(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(self.status(), Account.ACTIVE)
+
+    def test_post_without_csrf_token_is_refused(self):
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.status(), Account.ACTIVE)
+
+    def test_button_posts_the_changelist_form(self):
+        changelist = self.client.get(reverse('admin:bank_account_changelist'))
+        self.assertContains(changelist, f'formmethod="post" formaction="{self.url}"')
+        token = changelist.cookies['csrftoken'].value
+        response = self.client.post(self.url, {'csrfmiddlewaretoken': token})
+        self.assertRedirects(response, reverse('admin:bank_account_changelist'))
+        self.assertEqual(self.status(), Account.FROZEN)
+
+        self.client.post(
+            reverse('admin:bank_account_unfreeze', args=[self.account.pk]), {'csrfmiddlewaretoken': token}
+        )
+        self.assertEqual(self.status(), Account.ACTIVE)
+
+
+@override_settings(BANK_BULK_CHUNK_SIZE=2, BANK_BULK_INLINE_LIMIT=3)
+class BulkAdminActionTests(TestCase):
+    """Changelist actions run now or as a queued job, with audit rows"""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', email='', password=None)
+        self.client.force_login(self.admin)
+        self.accounts = [
+            User.objects.create_user(username=f'customer{n}', password=None).account for n in range(4)
+        ]
+
+    def act(self, model, action, ids, select_across=False):
+        return self.client.post(reverse(f'admin:bank_{model}_changelist'), {
+            'action': action,
+            '_selected_action': ids,
+            'select_across': '1' if select_across else '0',
+            'index': '0',
+        }, follow=True)
+
+    def statuses(self):
+        return [Account.objects.get(pk=account.pk).status for account in self.accounts]
+
+    def test_selection_is_frozen_and_audited(self):
+        ids = [self.accounts[0].pk, self.accounts[1].pk]
+        response = self.act('account', 'freeze_accounts', ids)
+
+        self.assertContains(response, '2 account(s) have been frozen.')
+        self.assertEqual(self.statuses(), [Account.FROZEN, Account.FROZEN, Account.ACTIVE, Account.ACTIVE])
+        audit = ManagerAction.objects.filter(action_type='FREEZE_ACCOUNT')
+        self.assertEqual(sorted(audit.values_list('target_account_id', flat=True)), sorted(ids))
+        self.assertTrue(all(action.performed_by == self.admin for action in audit))
+
+        # Already frozen accounts are skipped
+        response = self.act('account', 'freeze_accounts', ids)
+        self.assertContains(response, '0 account(s) have been frozen.')
+        self.assertEqual(audit.count(), 2)
+
+    def test_select_all_across_pages_is_queued(self):
+        response = self.act('account', 'freeze_accounts', [self.accounts[0].pk], select_across=True)
+
+        job = BulkJob.objects.get()
+        self.assertContains(response, f'job #{job.pk}')
+        # Every account, the admin's own included, not just the ticked one
+        self.assertEqual(job.total, Account.objects.count())
+        self.assertEqual(self.statuses(), [Account.ACTIVE] * 4)
+
+        run_queued(worker='worker-1')
+        self.assertEqual(self.statuses(), [Account.FROZEN] * 4)
+        self.assertContains(self.client.get(reverse('admin:bank_bulkjob_changelist')), '100%')
+
+    def test_approval_reports_settlement_refusals(self):
+        deposit(self.accounts[0], Decimal('20000.00'))
+        deposit(self.accounts[0], Decimal('20000.00'))
+        # Above the new account limit: both wait for approval
+        refused = withdraw(self.accounts[0], Decimal('30000.00'))
+        settled = deposit(self.accounts[1], Decimal('25000.00'))
+        Account.objects.filter(pk=self.accounts[0].pk).update(status=Account.FROZEN)
+
+        response = self.act('transaction', 'approve_transactions', [refused.pk, settled.pk])
+
+        self.assertContains(response, '2 transaction(s) have been approved.')
+        self.assertContains(response, '1 of them were rejected at settlement')
+        self.assertEqual(Transaction.objects.get(pk=settled.pk).status, Transaction.COMPLETED)
+        self.assertEqual(Transaction.objects.get(pk=refused.pk).status, Transaction.REJECTED)
+        self.assertEqual(ManagerAction.objects.filter(action_type='APPROVE_TRANSACTION').count(), 2)
+
+    def test_failed_job_can_be_retried(self):
+        job = BulkJob.objects.create(
+            kind=BulkJob.FREEZE_ACCOUNTS, status=BulkJob.FAILED, requested_by=self.admin,
+            target_ids=[self.accounts[0].pk], total=1, last_error='database went away',
+        )
+        response = self.act('bulkjob', 'retry_jobs', [job.pk])
+        self.assertContains(response, '1 job(s) queued again.')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.last_error), (BulkJob.QUEUED, ''))
+        self.assertEqual(run_queued(worker='worker-1'), {'done': 1})
+
+
+class AccountBalanceAdminTests(TestCase):
+    """The balance on the account change form"""
+
+    def setUp(self):
+        self.account = User.objects.create_user(username='customer', password=None).account
+        deposit(self.account, Decimal('100.00'))
+        self.admin = User.objects.create_superuser(username='admin', email='', password=None)
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:bank_account_change', args=[self.account.pk])
+
+    def post(self, follow=False, **changes):
+        data = {
+            'user': self.account.user_id, 'status': Account.ACTIVE, 'tier': Account.STANDARD,
+            'adjustment': '', 'adjustment_reason': '', **changes,
+        }
+        return self.client.post(self.url, data, follow=follow)
+
+    def balances(self):
+        account = Account.objects.get(pk=self.account.pk)
+        return account.balance, account.available_balance
+
+    def test_balance_is_not_editable(self):
+        form = self.client.get(self.url).context['adminform'].form
+        self.assertNotIn('balance', form.fields)
+        self.assertEqual(self.post(balance='999.00').status_code, 302)
+        self.assertEqual(self.balances(), (Decimal('100.00'), Decimal('100.00')))
+
+    def test_other_changes_keep_a_deposit_posted_meanwhile(self):
+        self.client.get(self.url)
+        deposit(self.account, Decimal('50.00'))
+        self.post(tier=Account.PREMIUM)
+        self.assertEqual(Account.objects.get(pk=self.account.pk).tier, Account.PREMIUM)
+        self.assertEqual(self.balances(), (Decimal('150.00'), Decimal('150.00')))
+
+    def test_adjustment_is_posted_and_journalled(self):
+        response = self.post(adjustment='-30.00', adjustment_reason='Duplicate deposit')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.balances(), (Decimal('70.00'), Decimal('70.00')))
+
+        txn = Transaction.objects.filter(account=self.account).latest('id')
+        self.assertEqual((txn.transaction_type, txn.amount, txn.status),
+                         (Transaction.WITHDRAW, Decimal('30.00'), Transaction.COMPLETED))
+        self.assertIn('Duplicate deposit', txn.description)
+        entry = txn.journal_entry
+        self.assertEqual(entry.entry_type, JournalEntry.ADJUSTMENT)
+        self.assertEqual(sum(posting.amount for posting in entry.postings.all()), 0)
+        self.assertEqual(LedgerAccount.objects.get(code=LedgerAccount.SUSPENSE).balance, Decimal('-30.00'))
+
+    def test_adjustment_needs_a_reason(self):
+        response = self.post(adjustment='10.00')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.balances(), (Decimal('100.00'), Decimal('100.00')))
+
+    def test_adjustment_cannot_overdraw(self):
+        response = self.post(follow=True, adjustment='-500.00', adjustment_reason='Too much')
+        self.assertContains(response, 'cannot take it below zero')
+        self.assertEqual(self.balances(), (Decimal('100.00'), Decimal('100.00')))
+
+
+class ChangelistQueryTests(TestCase):
+    """
+    Every bank changelist runs the same number of queries however many rows
+    it shows, so a column that queries per row (an N+1) fails here
+    """
+
+    def setUp(self):
+        self.customers = []
+        self.admin = User.objects.create_superuser(username='admin', email='', password=None)
+        self.client.force_login(self.admin)
+
+    def add_rows(self, count):
+        """`count` more customers, each with a row in every bank table"""
+        for _ in range(count):
+            n = len(self.customers)
+            customer = User.objects.create_user(username=f'customer{n}', password=None)
+            account = customer.account
+            deposit(account, Decimal('500.00'))
+            withdrawal = withdraw(account, Decimal('20.00'))
+            large = deposit(account, Decimal('75000.00'))
+            TransactionApproval.objects.create(transaction=large, approved_by=self.admin, note='Checked')
+            place_hold(account, large)
+            manager = BankManager.objects.create(
+                user=User.objects.create_user(username=f'manager{n}', password=None), employee_id=f'EMP{n}'
+            )
+            ManagerAction.objects.create(
+                manager=manager, action_type='VIEW_ACCOUNT', target_user=customer, target_account=account
+            )
+            ManagerAction.objects.create(
+                performed_by=self.admin, action_type='FREEZE_ACCOUNT', target_user=customer, target_account=account
+            )
+            AnomalyAlert.objects.create(
+                account=account, transaction=withdrawal, kind=AnomalyAlert.KIND_CHOICES[0][0],
+                score=Decimal('3.00'), detail='Test',
+            )
+            IdempotencyKey.objects.create(
+                user=customer, key=f'key{n}', request_hash='hash', transaction=withdrawal,
+                expires_at=timezone.now() + timedelta(days=1),
+            )
+            StandingInstruction.objects.create(
+                account=account, kind=StandingInstruction.TRANSFER,
+                to_account=self.customers[-1].account if self.customers else account,
+                amount=Decimal('10.00'), frequency=StandingInstruction.DAILY,
+                starts_at=timezone.now(), next_run_at=timezone.now() + timedelta(days=1),
+            )
+            create_token(customer, 'test')
+            BulkJob.objects.create(kind=BulkJob.FREEZE_ACCOUNTS, requested_by=self.admin, target_ids=[account.id])
+            self.customers.append(customer)
+
+    def changelist_queries(self):
+        counts = {}
+        for model in admin.site._registry:
+            if model._meta.app_label != 'bank':
+                continue
+            url = reverse(f'admin:bank_{model._meta.model_name}_changelist')
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            counts[model.__name__] = len(queries)
+        return counts
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.add_rows(2)
+        few = self.changelist_queries()
+        self.add_rows(8)
+        many = self.changelist_queries()
+        for model, count in few.items():
+            with self.subTest(model=model):
+                self.assertEqual(many[model], count)
@@ -0,0 +1,73 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.bank.admin_views import SECTIONS
+from apps.bank.models import BankManager
+from apps.bank.services import deposit
+
+
+@override_settings(BANK_ADMIN_SECTION_PAGE_SIZE=2)
+class AdminDashboardTests(TestCase):
+    """The dashboard shell and the sections it loads"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.admin = User.objects.create_superuser(username='admin', email='', password=None)
+        self.client.force_login(self.admin)
+        self.customers = [User.objects.create_user(username=f'customer{n}', password=None) for n in range(3)]
+        manager = User.objects.create_user(username='manager', password=None)
+        BankManager.objects.create(user=manager, employee_id='EMP1')
+        for _ in range(2):
+            deposit(self.customers[0].account, Decimal('10.00'))
+
+    def section(self, name, **params):
+        return self.client.get(reverse('bank:admin_section', args=[name]), params)
+
+    def test_shell_runs_no_queries_of_its_own(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('bank:dashboard'))
+        self.assertContains(response, reverse('bank:admin_section', args=['accounts']))
+        # Loading the admin only; the session comes from its cache
+        self.assertEqual(len(queries), 1)
+
+    def test_every_section_renders(self):
+        for name in SECTIONS:
+            response = self.section(name)
+            self.assertEqual(response.status_code, 200, name)
+            self.assertIn('private', response['Cache-Control'])
+
+    def test_accounts_are_paged_newest_first_with_their_transaction_counts(self):
+        newest = self.section('accounts')
+        self.assertEqual([account.user.username for account in newest.context['page']], ['manager', 'customer2'])
+
+        accounts = list(self.section('accounts', page=2).context['page'])
+        self.assertEqual([account.user.username for account in accounts], ['customer1', 'customer0'])
+        self.assertEqual([account.transaction_count for account in accounts], [0, 2])
+
+    def test_users_leave_out_managers(self):
+        usernames = [
+            user.username
+            for page in (1, 2)
+            for user in self.section('users', page=page).context['page']
+        ]
+        self.assertEqual(usernames, ['customer2', 'customer1', 'customer0', 'admin'])
+
+    def test_sections_are_cached(self):
+        first = self.section('transactions')
+        with CaptureQueriesContext(connection) as queries:
+            again = self.section('transactions')
+        self.assertEqual(again.content, first.content)
+        # Only loading the admin; the section comes from the cache
+        self.assertEqual(len(queries), 1)
+
+    def test_sections_need_a_superuser(self):
+        self.assertEqual(self.section('nothing').status_code, 404)
+        self.client.force_login(self.customers[0])
+        self.assertEqual(self.section('stats').status_code, 403)
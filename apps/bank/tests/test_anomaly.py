@@ -0,0 +1,96 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from apps.bank import anomaly
+from apps.bank.models import AnomalyAlert, Transaction
+from apps.bank.services import deposit
+
+LIMITS = {
+    'windows': {'minute': (60, 3, '1000.00')},
+    'deviation': 6.0,
+    'deviation_samples': 5,
+    'repeats': 3,
+    'repeat_seconds': 600,
+}
+
+
+class AnomalyScoringTests(TestCase):
+
+    def setUp(self):
+        self.account = User.objects.create_user(username='customer', password=None).account
+        anomaly.get_detector().clear()
+
+    def test_rebuild_queries_run_without_the_lock(self):
+        detector = anomaly.get_detector()
+        rebuild = detector.rebuild
+        held = []
+
+        def watched_rebuild(*args):
+            held.append(detector.lock.locked())
+            return rebuild(*args)
+
+        with mock.patch.object(detector, 'rebuild', side_effect=watched_rebuild):
+            with self.captureOnCommitCallbacks(execute=True):
+                deposit(self.account, Decimal('100.00'))
+            with self.captureOnCommitCallbacks(execute=True):
+                deposit(self.account, Decimal('100.00'))
+        # Rebuilt once, for the first posting, and not under the lock
+        self.assertEqual(held, [False])
+        self.assertIn(self.account.id, detector.accounts)
+
+    def test_scoring_error_is_logged_not_raised(self):
+        with mock.patch.object(anomaly, 'score_posting', side_effect=RuntimeError('scoring down')):
+            with self.assertLogs('apps.bank.anomaly', 'ERROR') as logs:
+                with self.captureOnCommitCallbacks(execute=True):
+                    txn = deposit(self.account, Decimal('100.00'))
+        self.assertIn(f'#{txn.id}', logs.output[0])
+        self.assertEqual(Transaction.objects.get(pk=txn.pk).status, Transaction.COMPLETED)
+
+
+@override_settings(BANK_ANOMALY_LIMITS=LIMITS)
+class AnomalyAlertTests(TestCase):
+    """score_committed() raises an alert for an unusual posting, and only then"""
+
+    def setUp(self):
+        self.account = User.objects.create_user(username='customer', password=None).account
+        anomaly.get_detector().clear()
+
+    def post(self, amount):
+        with self.captureOnCommitCallbacks(execute=True):
+            txn = deposit(self.account, Decimal(amount))
+        return list(AnomalyAlert.objects.filter(transaction=txn).values_list('kind', flat=True))
+
+    def test_normal_postings_raise_nothing(self):
+        for amount in ('100.00', '120.00', '90.00'):
+            self.assertEqual(self.post(amount), [])
+
+    def test_burst_alerts_once_on_the_posting_over_the_limit(self):
+        for amount in ('100.00', '110.00', '120.00'):
+            self.assertEqual(self.post(amount), [])
+        self.assertEqual(self.post('130.00'), [AnomalyAlert.VELOCITY_COUNT])
+        self.assertEqual(self.post('140.00'), [])
+
+    def test_amount_moved_over_the_limit(self):
+        self.assertEqual(self.post('600.00'), [])
+        self.assertEqual(self.post('500.00'), [AnomalyAlert.VELOCITY_AMOUNT])
+
+    def test_repeated_amount(self):
+        self.post('250.00')
+        self.post('250.00')
+        self.assertEqual(self.post('250.00'), [AnomalyAlert.REPEATED_AMOUNT])
+
+    @override_settings(BANK_ANOMALY_LIMITS=dict(LIMITS, windows={'minute': (60, 100, '100000.00')}))
+    def test_amount_far_from_the_typical_one(self):
+        for amount in ('100.00', '105.00', '95.00', '102.00', '98.00'):
+            self.assertEqual(self.post(amount), [])
+        self.assertEqual(self.post('5000.00'), [AnomalyAlert.AMOUNT_DEVIATION])
+
+    def test_windows_are_rebuilt_from_the_database(self):
+        self.post('250.00')
+        self.post('250.00')
+        # As in a freshly started process
+        anomaly.get_detector().clear()
+        self.assertEqual(self.post('250.00'), [AnomalyAlert.REPEATED_AMOUNT])
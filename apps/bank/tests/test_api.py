@@ -0,0 +1,158 @@
+import json
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from apps.bank.api import create_token
+from apps.bank.models import Account, Transaction
+from apps.bank.services import deposit
+
+
+class ApiTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='customer', password=None)
+        self.account = self.user.account
+        _, token = create_token(self.user)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def get(self, name, params=None, **headers):
+        return self.client.get(reverse(name), params or {}, **self.auth, **headers)
+
+    def post(self, name, body, **headers):
+        if not isinstance(body, (str, bytes)):
+            body = json.dumps(body)
+        return self.client.post(reverse(name), body, content_type='application/json', **self.auth, **headers)
+
+
+class AuthenticationTests(ApiTestCase):
+    """Bearer tokens"""
+
+    def test_missing_and_invalid_tokens(self):
+        response = self.client.get(reverse('bank:api_account'))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Bearer')
+
+        response = self.client.get(reverse('bank:api_account'), HTTP_AUTHORIZATION='Bearer nope')
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('invalid_token', response['WWW-Authenticate'])
+
+    def test_inactive_user_is_refused(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.get('bank:api_account').status_code, 401)
+
+    def test_batch_needs_a_manager(self):
+        response = self.post('bank:api_batch', [])
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json(), {'error': 'This endpoint needs a bank manager\'s token.'})
+
+
+class ConditionalGetTests(ApiTestCase):
+    """ETags built from the account version"""
+
+    def test_unchanged_account_is_not_modified(self):
+        first = self.get('bank:api_account')
+        self.assertEqual(first.json()['account']['account_number'], self.account.account_number)
+        self.assertEqual(first['Cache-Control'], 'private, no-cache')
+
+        again = self.get('bank:api_account', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.content, b'')
+        self.assertEqual(again['ETag'], first['ETag'])
+
+    def test_posting_changes_the_etag(self):
+        first = self.get('bank:api_transactions')
+        deposit(self.account, Decimal('10.00'))
+
+        changed = self.get('bank:api_transactions', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], first['ETag'])
+        self.assertEqual(len(changed.json()['transactions']), 1)
+
+    def test_each_page_has_its_own_etag(self):
+        first = self.get('bank:api_transactions', {'limit': 1})
+        other = self.get('bank:api_transactions', {'limit': 2}, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(other.status_code, 200)
+
+
+class TransactionListTests(ApiTestCase):
+    """Cursor pagination of api/transactions/"""
+
+    def test_pages_follow_the_cursor(self):
+        ids = [deposit(self.account, Decimal(f'{n}.00')).pk for n in range(1, 6)]
+        seen, cursor = [], None
+        while True:
+            params = {'limit': 2, **({'cursor': cursor} if cursor else {})}
+            body = self.get('bank:api_transactions', params).json()
+            seen += [row['id'] for row in body['transactions']]
+            cursor = body['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, ids[::-1])
+
+    def test_bad_parameters(self):
+        for params in ({'limit': 'ten'}, {'cursor': '!!'}, {'cursor': 'bm90LWEtY3Vyc29y'}):
+            response = self.get('bank:api_transactions', params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('cursor', response.json()['error'])
+
+
+class PostingTests(ApiTestCase):
+    """api/deposit/ and api/withdraw/"""
+
+    def test_deposit_and_pending_deposit(self):
+        response = self.post('bank:api_deposit', {'amount': '250.5', 'description': 'Cash'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['transaction']['amount'], '250.50')
+
+        # Above the new account limit: waits for a manager
+        response = self.post('bank:api_deposit', {'amount': '25000.00'})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['transaction']['status'], Transaction.PENDING)
+
+    def test_invalid_amounts(self):
+        cases = [
+            ({'amount': 'abc'}, 'must be a decimal number'),
+            ({}, 'must be a decimal number'),
+            ({'amount': '0'}, 'greater than zero'),
+            ({'amount': '-5'}, 'greater than zero'),
+            ({'amount': 'NaN'}, 'greater than zero'),
+            ({'amount': '1.001'}, 'at most 2 decimal places'),
+            ({'amount': '1e12'}, 'cannot exceed'),
+        ]
+        for body, message in cases:
+            response = self.post('bank:api_deposit', body)
+            self.assertEqual(response.status_code, 400, body)
+            self.assertIn(message, response.json()['error'])
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_malformed_bodies(self):
+        self.assertEqual(self.post('bank:api_deposit', 'not json').json(), {'error': 'The request body must be JSON.'})
+        self.assertEqual(
+            self.post('bank:api_deposit', ['250.00']).json(), {'error': 'The request body must be a JSON object.'}
+        )
+
+    def test_refused_withdrawal(self):
+        response = self.post('bank:api_withdraw', {'amount': '10.00'})
+        self.assertEqual(response.status_code, 422)
+        self.assertIn('error', response.json())
+
+    def test_frozen_account(self):
+        Account.objects.filter(pk=self.account.pk).update(status=Account.FROZEN)
+        self.assertEqual(self.post('bank:api_deposit', {'amount': '10.00'}).status_code, 422)
+
+    def test_idempotent_retry(self):
+        first = self.post('bank:api_deposit', {'amount': '10.00'}, HTTP_IDEMPOTENCY_KEY='k1')
+        again = self.post('bank:api_deposit', {'amount': '10.00'}, HTTP_IDEMPOTENCY_KEY='k1')
+
+        self.assertEqual((first.status_code, again.status_code), (201, 200))
+        self.assertEqual(again['Idempotent-Replayed'], 'true')
+        self.assertEqual(again.json(), first.json())
+        self.assertEqual(Transaction.objects.count(), 1)
+
+        conflict = self.post('bank:api_deposit', {'amount': '20.00'}, HTTP_IDEMPOTENCY_KEY='k1')
+        self.assertEqual(conflict.status_code, 409)
+        too_long = self.post('bank:api_deposit', {'amount': '20.00'}, HTTP_IDEMPOTENCY_KEY='k' * 65)
+        self.assertEqual(too_long.status_code, 409)
@@ -0,0 +1,84 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.bank import approvals
+from apps.bank.models import BankManager, Transaction, TransactionApproval
+from apps.bank.services import deposit
+
+
+class ApprovalRecordTests(TestCase):
+    """Decisions live in the TransactionApproval side table"""
+
+    def setUp(self):
+        self.account = User.objects.create_user(username='customer', password=None).account
+        self.first, self.second = (
+            User.objects.create_user(username=f'manager{n}', password=None) for n in (1, 2)
+        )
+        self.txn = deposit(self.account, Decimal('10.00'))
+
+    def test_no_decision(self):
+        self.assertIsNone(approvals.decision_of(self.txn))
+
+    def test_record_replaces_an_earlier_decision(self):
+        approvals.record([self.txn.pk], self.first, 'Looks fine')
+        approvals.record([self.txn.pk], self.second, 'Second look')
+
+        decision = approvals.decision_of(Transaction.objects.get(pk=self.txn.pk))
+        self.assertEqual((decision.approved_by, decision.note), (self.second, 'Second look'))
+        self.assertEqual(TransactionApproval.objects.count(), 1)
+
+    def test_add_notes_appends(self):
+        other = deposit(self.account, Decimal('20.00'))
+        approvals.record([self.txn.pk], self.first, 'Approved')
+        approvals.add_notes({self.txn.pk: 'Rejected at settlement', other.pk: 'Rejected at settlement'})
+
+        notes = dict(TransactionApproval.objects.values_list('transaction_id', 'note'))
+        self.assertEqual(notes, {self.txn.pk: 'Approved\nRejected at settlement', other.pk: 'Rejected at settlement'})
+        # The decision itself is kept
+        self.assertEqual(TransactionApproval.objects.get(pk=self.txn.pk).approved_by, self.first)
+
+
+class ApprovalPageTests(TestCase):
+    """Manager pages write and show decisions"""
+
+    def setUp(self):
+        self.account = User.objects.create_user(username='customer', password=None).account
+        self.user = User.objects.create_user(username='manager', password=None)
+        BankManager.objects.create(user=self.user, employee_id='EMP1')
+        self.client.force_login(self.user)
+
+    def pending(self):
+        # Above the new account limit: waits for approval
+        txn = deposit(self.account, Decimal('25000.00'))
+        self.assertEqual(txn.status, Transaction.PENDING)
+        return txn
+
+    def test_approval_is_recorded_with_its_note(self):
+        txn = self.pending()
+        self.client.post(reverse('bank:manager_approve_transaction', args=[txn.pk]), {'note': 'Payslip seen'})
+
+        decision = TransactionApproval.objects.get(pk=txn.pk)
+        self.assertEqual((decision.approved_by, decision.note), (self.user, 'Payslip seen'))
+        self.assertEqual(Transaction.objects.get(pk=txn.pk).status, Transaction.COMPLETED)
+
+    def test_transaction_list_loads_notes_with_the_rows(self):
+        def page_queries():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('bank:manager_transactions'))
+            return response, len(queries)
+
+        for n in range(2):
+            approvals.record([self.pending().pk], self.user, f'note-{n}')
+        response, few = page_queries()
+        self.assertContains(response, 'note-1')
+
+        for n in range(2, 6):
+            approvals.record([self.pending().pk], self.user, f'note-{n}')
+        response, more = page_queries()
+        self.assertContains(response, 'note-5')
+        self.assertEqual(more, few)
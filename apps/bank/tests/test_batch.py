@@ -0,0 +1,65 @@
+import json
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from apps.bank.api import create_token
+from apps.bank.models import Account, BankManager, IdempotencyKey, Transaction
+
+
+class BatchRetryTests(TestCase):
+    """A batch sent again with the same Idempotency-Key"""
+
+    def setUp(self):
+        self.accounts = [
+            User.objects.create_user(username=f'customer{n}', password=None).account for n in range(3)
+        ]
+        manager = User.objects.create_user(username='manager', password=None)
+        BankManager.objects.create(user=manager, employee_id='EMP1')
+        _, token = create_token(manager)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+        self.rows = [
+            {'account_number': account.account_number, 'type': 'deposit', 'amount': '100.00',
+             'description': 'Payroll'}
+            for account in self.accounts
+        ]
+
+    def post(self, rows, key='payroll-2026-10'):
+        headers = dict(self.auth, HTTP_IDEMPOTENCY_KEY=key) if key else self.auth
+        return self.client.post(
+            reverse('bank:api_batch'), json.dumps(rows), content_type='application/json', **headers
+        )
+
+    def balances(self):
+        return [Account.objects.get(pk=account.pk).balance for account in self.accounts]
+
+    def test_retry_gets_the_original_answer_without_posting_again(self):
+        first = self.post(self.rows)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json()['summary']['completed'], 3)
+
+        retry = self.post(self.rows)
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(self.balances(), [Decimal('100.00')] * 3)
+        self.assertEqual(Transaction.objects.count(), 3)
+
+    def test_key_reused_for_a_different_batch_is_refused(self):
+        self.post(self.rows)
+        response = self.post(self.rows[:1])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.balances(), [Decimal('100.00')] * 3)
+
+    def test_unreadable_batch_does_not_keep_the_key(self):
+        response = self.post({'postings': 'nope'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.post(self.rows).status_code, 200)
+
+    def test_without_a_key_every_request_posts(self):
+        self.post(self.rows, key=None)
+        self.post(self.rows, key=None)
+        self.assertEqual(self.balances(), [Decimal('200.00')] * 3)
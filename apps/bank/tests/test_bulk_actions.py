@@ -0,0 +1,104 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.bank import bulk_actions
+from apps.bank.bulk_actions import freeze_accounts, run_queued, take
+from apps.bank.models import Account, BulkJob, ManagerAction
+
+
+@override_settings(BANK_BULK_CHUNK_SIZE=2, BANK_BULK_INLINE_LIMIT=3)
+class BulkActionTests(TestCase):
+    """Bulk freezes, inline and queued"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', password=None, is_staff=True)
+        self.accounts = [
+            User.objects.create_user(username=f'customer{n}', password=None).account for n in range(5)
+        ]
+        # Not the admin's own account
+        self.selection = Account.objects.filter(pk__in=[account.pk for account in self.accounts])
+
+    def frozen(self):
+        return set(Account.objects.filter(status=Account.FROZEN).values_list('id', flat=True))
+
+    def spy(self, side_effect=None):
+        """Patch the freeze action; the mock records each chunk it is given"""
+        calls = mock.Mock(side_effect=side_effect or freeze_accounts)
+        return mock.patch.dict(bulk_actions.ACTIONS, {BulkJob.FREEZE_ACCOUNTS: calls}), calls
+
+    def test_inline_selection_is_worked_in_chunks(self):
+        Account.objects.filter(pk=self.accounts[0].pk).update(status=Account.FROZEN)
+        patch, calls = self.spy()
+        with patch:
+            changed, job = take(
+                BulkJob.FREEZE_ACCOUNTS, self.selection.filter(pk__lte=self.accounts[2].pk), self.admin
+            )
+
+        self.assertIsNone(job)
+        self.assertEqual([len(call.args[0]) for call in calls.call_args_list], [2, 1])
+        # The account already frozen is skipped and not audited
+        self.assertEqual(changed['changed'], 2)
+        self.assertEqual(ManagerAction.objects.filter(action_type='FREEZE_ACCOUNT').count(), 2)
+        self.assertEqual(self.frozen(), {a.pk for a in self.accounts[:3]})
+
+    def test_large_selection_is_queued(self):
+        changed, job = take(BulkJob.FREEZE_ACCOUNTS, self.selection, self.admin)
+
+        self.assertIsNone(changed)
+        self.assertEqual((job.status, job.total, job.processed), (BulkJob.QUEUED, 5, 0))
+        self.assertEqual(self.frozen(), set())
+
+        self.assertEqual(run_queued(worker='worker-1'), {'done': 1})
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed, job.changed), (BulkJob.DONE, 5, 5))
+        self.assertIsNone(job.claimed_by)
+        self.assertEqual(len(self.frozen()), 5)
+
+    def test_job_resumes_after_a_lost_lease(self):
+        _, job = take(BulkJob.FREEZE_ACCOUNTS, self.selection, self.admin)
+
+        def taken_over_on_second_chunk(ids, user, note):
+            counts = freeze_accounts(ids, user, note)
+            if len(calls.call_args_list) == 2:
+                BulkJob.objects.filter(pk=job.pk).update(claimed_by='worker-2')
+            return counts
+
+        patch, calls = self.spy(taken_over_on_second_chunk)
+        with patch:
+            self.assertEqual(run_queued(worker='worker-1'), {})
+
+        # The first chunk stands; the second is rolled back with the lost lease
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed), (BulkJob.RUNNING, 2))
+        self.assertEqual(self.frozen(), {a.pk for a in self.accounts[:2]})
+
+        # Once the lease lapses, another worker takes over where it stopped
+        BulkJob.objects.filter(pk=job.pk).update(claim_expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(run_queued(worker='worker-3'), {'done': 1})
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed, job.changed), (BulkJob.DONE, 5, 5))
+        self.assertEqual(ManagerAction.objects.filter(action_type='FREEZE_ACCOUNT').count(), 5)
+
+    def test_failing_chunk_fails_the_job(self):
+        _, job = take(BulkJob.FREEZE_ACCOUNTS, self.selection, self.admin)
+
+        def fails_on_second_chunk(ids, user, note):
+            counts = freeze_accounts(ids, user, note)
+            if len(calls.call_args_list) == 2:
+                raise RuntimeError('database went away')
+            return counts
+
+        patch, calls = self.spy(fails_on_second_chunk)
+        with patch:
+            self.assertEqual(run_queued(worker='worker-1'), {'failed': 1})
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed, job.last_error), (BulkJob.FAILED, 2, 'database went away'))
+        self.assertIsNone(job.claimed_by)
+        self.assertEqual(len(self.frozen()), 2)
+        # A failed job is not picked up again
+        self.assertEqual(run_queued(worker='worker-1'), {})
@@ -0,0 +1,74 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.bank.holds import expire_holds
+from apps.bank.models import Account, AccountDailyTotals, Hold, Transaction
+from apps.bank.services import PostingError, deposit, release_rejected, withdraw
+from apps.bank.settlement import settle
+
+
+class HoldTests(TestCase):
+    """A pending withdrawal reserves its amount until it is decided"""
+
+    def setUp(self):
+        self.account = User.objects.create_user(username='customer', password=None).account
+        deposit(self.account, Decimal('20000.00'))
+        deposit(self.account, Decimal('20000.00'))
+        # Above the new account limit: sent for approval
+        self.pending = withdraw(self.account, Decimal('30000.00'))
+
+    def assertBalances(self, balance, available):
+        self.account.refresh_from_db()
+        self.assertEqual(
+            (self.account.balance, self.account.available_balance), (Decimal(balance), Decimal(available))
+        )
+
+    def hold(self):
+        return Hold.objects.get(transaction=self.pending)
+
+    def test_pending_withdrawal_reduces_only_the_available_balance(self):
+        self.assertEqual(self.pending.status, Transaction.PENDING)
+        self.assertBalances('40000.00', '10000.00')
+        self.assertEqual((self.hold().status, self.hold().amount), (Hold.ACTIVE, Decimal('30000.00')))
+
+    def test_held_funds_cannot_be_spent(self):
+        with self.assertRaises(PostingError):
+            withdraw(self.account, Decimal('15000.00'))
+        withdraw(self.account, Decimal('10000.00'))
+        self.assertBalances('30000.00', '0.00')
+        with self.assertRaises(PostingError):
+            withdraw(self.account, Decimal('0.01'))
+
+    def test_approval_settles_the_hold(self):
+        Transaction.objects.filter(pk=self.pending.pk).update(status=Transaction.APPROVED)
+        self.assertEqual(settle([self.pending.pk]), ([self.pending.pk], []))
+        self.assertBalances('10000.00', '10000.00')
+        self.assertEqual(self.hold().status, Hold.SETTLED)
+
+    def test_rejection_releases_the_hold(self):
+        Transaction.objects.filter(pk=self.pending.pk).update(status=Transaction.REJECTED)
+        release_rejected([self.pending.pk])
+        self.assertBalances('40000.00', '40000.00')
+        self.assertEqual(self.hold().status, Hold.RELEASED)
+        counters = AccountDailyTotals.objects.get(account=self.account, day=timezone.localdate())
+        self.assertEqual((counters.withdrawal_count, counters.withdrawal_total), (0, Decimal('0.00')))
+
+        # Released once only
+        release_rejected([self.pending.pk])
+        self.assertBalances('40000.00', '40000.00')
+
+    def test_expired_hold_is_given_back_and_settlement_checks_the_funds(self):
+        self.assertEqual(expire_holds(now=timezone.now() + timedelta(days=8)), 1)
+        self.assertBalances('40000.00', '40000.00')
+        self.assertEqual(self.hold().status, Hold.EXPIRED)
+
+        # The money is spent while the withdrawal still waits
+        withdraw(self.account, Decimal('20000.00'))
+        Transaction.objects.filter(pk=self.pending.pk).update(status=Transaction.APPROVED)
+        settled, rejected = settle([self.pending.pk])
+        self.assertEqual((settled, rejected), ([], [self.pending.pk]))
+        self.assertBalances('20000.00', '20000.00')
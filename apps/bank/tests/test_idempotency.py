@@ -0,0 +1,112 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.bank.idempotency import IdempotencyError, post_once, replay, request_hash
+from apps.bank.models import IdempotencyKey, Transaction
+from apps.bank.services import PostingError, deposit
+
+
+class IdempotencyKeyTests(TestCase):
+    """A deposit or withdrawal sent twice with the same key posts once"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='customer', password=None)
+        self.account = self.user.account
+        self.client.force_login(self.user)
+
+    def post(self, name, amount, key='form-1'):
+        response = self.client.post(
+            reverse(name), {'amount': amount, 'description': '', 'idempotency_key': key}
+        )
+        return [str(message) for message in get_messages(response.wsgi_request)]
+
+    def postings(self):
+        return Transaction.objects.filter(account=self.account).count()
+
+    def test_repeated_deposit_is_replayed(self):
+        self.post('bank:deposit', '100.00')
+        messages = self.post('bank:deposit', '100.00')
+
+        self.assertIn('already received', messages[-1])
+        self.assertEqual(self.postings(), 1)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('100.00'))
+
+    def test_key_reused_for_a_different_request_is_refused(self):
+        self.post('bank:deposit', '100.00')
+        messages = self.post('bank:deposit', '250.00')
+
+        self.assertIn('different request', messages[-1])
+        self.assertEqual(self.postings(), 1)
+
+    def test_repeat_of_a_withdrawal_that_emptied_the_account(self):
+        deposit(self.account, Decimal('100.00'))
+        self.post('bank:withdraw', '100.00')
+        # The form would refuse 100.00 from an empty account; the repeat
+        # must get the original withdrawal instead
+        messages = self.post('bank:withdraw', '100.00')
+
+        self.assertIn('already received', messages[-1])
+        self.assertEqual(self.postings(), 2)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('0.00'))
+
+    def test_refused_posting_does_not_keep_the_key(self):
+        deposit(self.account, Decimal('100.00'))
+        # Refused by the posting service, as when a concurrent withdrawal
+        # spent the money after the form was checked
+        with mock.patch('apps.bank.views.withdraw', side_effect=PostingError('Insufficient funds.')):
+            self.post('bank:withdraw', '50.00')
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        # Sent again, the same request goes through
+        self.post('bank:withdraw', '50.00')
+        self.assertEqual(IdempotencyKey.objects.get().transaction.amount, Decimal('50.00'))
+
+
+class PostOnceTests(TestCase):
+    """post_once() and replay()"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='customer', password=None)
+        self.account = self.user.account
+        self.fingerprint = request_hash('DEPOSIT', '100.00', '')
+
+    def post(self):
+        return deposit(self.account, Decimal('100.00'))
+
+    def test_losing_the_race_replays_the_winner(self):
+        winner = self.post()
+        IdempotencyKey.objects.create(
+            user=self.user, key='k', request_hash=self.fingerprint, transaction=winner,
+            expires_at=timezone.now() + timedelta(hours=1),
+        )
+        post = mock.Mock()
+
+        self.assertEqual(post_once(self.user, 'k', self.fingerprint, post), (winner, True))
+        post.assert_not_called()
+
+    def test_expired_key_can_be_used_again(self):
+        IdempotencyKey.objects.create(
+            user=self.user, key='k', request_hash='old', transaction=self.post(),
+            expires_at=timezone.now() - timedelta(seconds=1),
+        )
+        posted, replayed = post_once(self.user, 'k', self.fingerprint, self.post)
+
+        self.assertFalse(replayed)
+        self.assertEqual(IdempotencyKey.objects.get().transaction, posted)
+
+    def test_replay_checks_the_fingerprint(self):
+        posted, _ = post_once(self.user, 'k', self.fingerprint, self.post)
+        record = IdempotencyKey.objects.get()
+
+        self.assertEqual(replay(record, self.fingerprint), posted)
+        with self.assertRaises(IdempotencyError):
+            replay(record, request_hash('DEPOSIT', '100.01', ''))
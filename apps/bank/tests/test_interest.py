@@ -0,0 +1,61 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from apps.bank.interest import accrue_for_day, post_for_month
+from apps.bank.models import Account, Transaction
+
+PERIOD_END = date(2026, 1, 31)
+
+
+class EarlyInterestPostingTests(TestCase):
+    """Interest posted with --post before the month is over"""
+
+    def setUp(self):
+        self.account = User.objects.create_user(username='customer', password=None).account
+        Account.objects.filter(pk=self.account.pk).update(
+            balance=Decimal('100000.00'), available_balance=Decimal('100000.00')
+        )
+
+    def accrue(self, first, last):
+        for day in range(first, last + 1):
+            accrue_for_day(date(2026, 1, day))
+
+    def test_month_end_credits_the_days_after_an_early_post(self):
+        self.accrue(1, 15)
+        credited, early_total = post_for_month(PERIOD_END)
+        self.assertEqual(credited, 1)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.interest_posted_through, date(2026, 1, 15))
+
+        self.accrue(16, 31)
+        credited, late_total = post_for_month(PERIOD_END)
+        self.assertEqual(credited, 1)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.interest_posted_through, PERIOD_END)
+        self.assertGreater(late_total, early_total)
+
+        # The month is now fully posted
+        self.assertEqual(post_for_month(PERIOD_END), (0, Decimal('0.00')))
+        credits = Transaction.objects.filter(account=self.account, description__startswith='Interest')
+        self.assertEqual(credits.count(), 2)
+
+    def test_interest_accrued_after_the_period_waits_for_its_month(self):
+        # February's first day accrues before January is credited
+        self.accrue(1, 31)
+        accrue_for_day(PERIOD_END + timedelta(days=1))
+
+        # 31 days of 3% a year on 100,000.00, not 32
+        self.assertEqual(post_for_month(PERIOD_END), (1, Decimal('254.79')))
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.interest_posted_through, PERIOD_END)
+
+        for day in range(2, 29):
+            accrue_for_day(date(2026, 2, day))
+        # February 1st on 100,000.00, the other 27 days on 100,254.79, plus
+        # the fraction of a paisa January left over
+        self.assertEqual(post_for_month(date(2026, 2, 28)), (1, Decimal('230.70')))
+        self.account.refresh_from_db()
+        self.assertLess(self.account.accrued_interest, Decimal('0.01'))
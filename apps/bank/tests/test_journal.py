@@ -0,0 +1,105 @@
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db.models import Sum
+from django.test import TestCase
+
+from apps.bank.interest import accrue_for_day, post_for_month
+from apps.bank.journal import check_balanced, record_entry
+from apps.bank.models import Account, JournalEntry, LedgerAccount, Posting, Transaction
+from apps.bank.services import adjust, deposit, transfer, withdraw
+from apps.bank.settlement import settle
+
+ZERO = Decimal('0.00')
+
+
+class JournalTests(TestCase):
+    """Every posting path writes a balanced journal entry"""
+
+    def setUp(self):
+        self.account = User.objects.create_user(username='customer', password=None).account
+        self.other = User.objects.create_user(username='other', password=None).account
+
+    def assertBooksBalance(self):
+        """Each entry sums to zero and every balance is the sum of its postings"""
+        unbalanced = (
+            JournalEntry.objects.annotate(total=Sum('postings__amount')).exclude(total=0)
+            .values_list('id', 'total')
+        )
+        self.assertEqual(list(unbalanced), [])
+        for account in Account.objects.all():
+            posted = Posting.objects.filter(account=account).aggregate(total=Sum('amount'))['total'] or ZERO
+            # Customer money is a liability: credits are negative
+            self.assertEqual(account.balance, -posted, account.account_number)
+        for ledger in LedgerAccount.objects.all():
+            posted = Posting.objects.filter(ledger_account=ledger).aggregate(total=Sum('amount'))['total'] or ZERO
+            self.assertEqual(ledger.balance, posted, ledger.code)
+
+    def assertJournaled(self, txn, entry_type):
+        txn.refresh_from_db()
+        self.assertEqual(txn.status, Transaction.COMPLETED)
+        self.assertEqual(txn.journal_entry.entry_type, entry_type)
+        self.assertEqual(
+            sorted(txn.journal_entry.postings.values_list('amount', flat=True)), [-txn.amount, txn.amount]
+        )
+
+    def test_deposit_and_withdrawal(self):
+        self.assertJournaled(deposit(self.account, Decimal('500.00')), JournalEntry.DEPOSIT)
+        self.assertJournaled(withdraw(self.account, Decimal('120.00')), JournalEntry.WITHDRAW)
+        self.assertEqual(LedgerAccount.objects.get(code=LedgerAccount.CASH).balance, Decimal('380.00'))
+        self.assertBooksBalance()
+
+    def test_transfer_clears_through_suspense(self):
+        deposit(self.account, Decimal('500.00'))
+        sent, received = transfer(self.account, self.other, Decimal('200.00'))
+        self.assertJournaled(sent, JournalEntry.WITHDRAW)
+        self.assertJournaled(received, JournalEntry.DEPOSIT)
+        self.assertEqual(LedgerAccount.objects.get(code=LedgerAccount.SUSPENSE).balance, ZERO)
+        self.assertEqual(LedgerAccount.objects.get(code=LedgerAccount.CASH).balance, Decimal('500.00'))
+        self.assertBooksBalance()
+
+    def test_settlement(self):
+        deposit(self.account, Decimal('20000.00'))
+        deposit(self.account, Decimal('20000.00'))
+        # Above the new account limit: both wait for approval
+        pending = [deposit(self.account, Decimal('25000.00')), withdraw(self.account, Decimal('30000.00'))]
+        self.assertTrue(all(txn.status == Transaction.PENDING and txn.journal_entry_id is None for txn in pending))
+        self.assertBooksBalance()
+
+        ids = [txn.pk for txn in pending]
+        Transaction.objects.filter(pk__in=ids).update(status=Transaction.APPROVED)
+        self.assertEqual(settle(ids), (ids, []))
+
+        self.assertJournaled(pending[0], JournalEntry.DEPOSIT)
+        self.assertJournaled(pending[1], JournalEntry.WITHDRAW)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('35000.00'))
+        self.assertBooksBalance()
+
+    def test_interest(self):
+        deposit(self.account, Decimal('10000.00'))
+        for day in range(1, 32):
+            accrue_for_day(date(2026, 1, day))
+        credited, total = post_for_month(date(2026, 1, 31))
+        self.assertEqual(credited, 1)
+
+        credit = Transaction.objects.get(account=self.account, journal_entry__entry_type=JournalEntry.INTEREST)
+        self.assertEqual(credit.amount, total)
+        self.assertEqual(LedgerAccount.objects.get(code=LedgerAccount.INTEREST_EXPENSE).balance, total)
+        self.assertBooksBalance()
+
+    def test_adjustment(self):
+        deposit(self.account, Decimal('100.00'))
+        self.assertJournaled(adjust(self.account, Decimal('-30.00'), 'Correction'), JournalEntry.ADJUSTMENT)
+        self.assertEqual(LedgerAccount.objects.get(code=LedgerAccount.SUSPENSE).balance, Decimal('-30.00'))
+        self.assertBooksBalance()
+
+    def test_unbalanced_entry_is_refused(self):
+        with self.assertRaises(ValueError):
+            record_entry(JournalEntry.DEPOSIT, '', [(LedgerAccount.CASH, None, Decimal('1.00'))])
+        with self.assertRaises(ValueError):
+            check_balanced([
+                (LedgerAccount.CASH, None, Decimal('1.00')), (None, self.account.id, Decimal('-0.99')),
+            ])
+        self.assertFalse(JournalEntry.objects.exists())
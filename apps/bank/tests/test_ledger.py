@@ -0,0 +1,47 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+
+from apps.bank.ledger import consistent_read, reconcile_range
+from apps.bank.models import Account
+from apps.bank.services import deposit
+
+EVERY_ACCOUNT = (0, 2 ** 63 - 1)
+
+
+class ReconcileReadTests(TestCase):
+    """Repair plans only come from a consistent read of the ledger"""
+
+    def setUp(self):
+        self.account = User.objects.create_user(username='customer', password=None).account
+        deposit(self.account, Decimal('100.00'))
+        Account.objects.filter(pk=self.account.pk).update(balance=Decimal('90.00'))
+
+    def test_repairs_from_a_consistent_read(self):
+        accounts, transactions, mismatches = reconcile_range(*EVERY_ACCOUNT, with_repairs=True)
+        self.assertEqual((accounts, transactions), (1, 1))
+        self.assertEqual(
+            mismatches[0]['repairs']['account'], {'id': self.account.id, 'balance': '100.00'}
+        )
+
+    def test_repairs_refused_without_a_snapshot(self):
+        with mock.patch.object(connection, 'vendor', 'other'):
+            with self.assertRaises(ValueError):
+                reconcile_range(*EVERY_ACCOUNT, with_repairs=True)
+            # Checking alone is still allowed
+            self.assertEqual(len(reconcile_range(*EVERY_ACCOUNT)[2]), 1)
+
+    def test_no_snapshot_promised_inside_an_outer_transaction(self):
+        # TestCase already holds a transaction open, too late to pick the isolation level
+        with mock.patch.object(connection, 'vendor', 'postgresql'):
+            with consistent_read() as consistent:
+                self.assertFalse(consistent)
+
+    def test_command_refuses_the_repair_plan(self):
+        with mock.patch.object(connection, 'vendor', 'other'):
+            with self.assertRaisesMessage(CommandError, 'consistent read'):
+                call_command('reconcile_ledger', repair_plan='/nonexistent/plan.json', stdout=mock.Mock())
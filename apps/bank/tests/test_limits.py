@@ -0,0 +1,106 @@
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.bank import services
+from apps.bank.limits import headroom, limit_error, limits_for
+from apps.bank.models import Account, AccountDailyTotals
+from apps.bank.services import PostingError, deposit, withdraw
+
+LIMITS = {
+    'STANDARD': ('300.00', '1000.00'),
+    'PREMIUM': ('600.00', '2000.00'),
+}
+
+
+@override_settings(BANK_WITHDRAWAL_LIMITS=LIMITS)
+class HeadroomTests(TestCase):
+    """Daily and monthly headroom from the counters rows"""
+
+    def setUp(self):
+        self.account = User.objects.create_user(username='customer', password=None).account
+
+    def used(self, day, total):
+        AccountDailyTotals.objects.create(account=self.account, day=day, withdrawal_total=Decimal(total))
+
+    def test_counts_today_and_the_rest_of_this_month_only(self):
+        self.used(date(2026, 2, 28), '900.00')
+        self.used(date(2026, 3, 1), '400.00')
+        self.used(date(2026, 3, 9), '150.00')
+        self.used(date(2026, 3, 10), '100.00')
+
+        room = headroom(self.account, today=date(2026, 3, 10))
+        self.assertEqual(room['daily_used'], Decimal('100.00'))
+        self.assertEqual(room['daily_remaining'], Decimal('200.00'))
+        self.assertEqual(room['monthly_used'], Decimal('650.00'))
+        self.assertEqual(room['monthly_remaining'], Decimal('350.00'))
+
+        # The caller's locked row stands in for today's
+        room = headroom(self.account, today=date(2026, 3, 10), today_total=Decimal('250.00'))
+        self.assertEqual((room['daily_used'], room['monthly_used']), (Decimal('250.00'), Decimal('800.00')))
+
+    def test_remaining_never_goes_below_zero(self):
+        self.used(date(2026, 3, 10), '1200.00')
+        room = headroom(self.account, today=date(2026, 3, 10))
+        self.assertEqual((room['daily_remaining'], room['monthly_remaining']), (Decimal('0.00'), Decimal('0.00')))
+
+    def test_limit_error_names_the_limit_hit(self):
+        self.used(date(2026, 3, 1), '800.00')
+        room = headroom(self.account, today=date(2026, 3, 10))
+        self.assertEqual(limit_error(Decimal('200.00'), room), '')
+        self.assertIn('monthly withdrawal limit', limit_error(Decimal('250.00'), room))
+        self.assertIn('daily withdrawal limit', limit_error(Decimal('300.01'), room))
+
+    def test_tiers(self):
+        self.assertEqual(limits_for(Account.PREMIUM), (Decimal('600.00'), Decimal('2000.00')))
+        # Unknown tiers get the Standard limits
+        self.assertEqual(limits_for('UNKNOWN'), (Decimal('300.00'), Decimal('1000.00')))
+
+
+@override_settings(BANK_WITHDRAWAL_LIMITS=LIMITS)
+class WithdrawalLimitTests(TestCase):
+    """The posting service enforces the limits"""
+
+    def setUp(self):
+        self.account = User.objects.create_user(username='customer', password=None).account
+        deposit(self.account, Decimal('5000.00'))
+
+    def test_withdrawals_stop_at_the_daily_limit(self):
+        withdraw(self.account, Decimal('200.00'))
+        with self.assertRaisesMessage(PostingError, 'daily withdrawal limit'):
+            withdraw(self.account, Decimal('100.01'))
+        withdraw(self.account, Decimal('100.00'))
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('4700.00'))
+
+    def test_withdrawals_stop_at_the_monthly_limit(self):
+        today = timezone.localdate()
+        if today.day == 1:
+            self.skipTest('no earlier day this month')
+        AccountDailyTotals.objects.create(
+            account=self.account, day=today.replace(day=1), withdrawal_total=Decimal('950.00')
+        )
+        with self.assertRaisesMessage(PostingError, 'monthly withdrawal limit'):
+            withdraw(self.account, Decimal('50.01'))
+        withdraw(self.account, Decimal('50.00'))
+
+    def test_limit_is_checked_against_the_locked_counters_row(self):
+        # A concurrent withdrawal committed after this request last read the counters
+        stale = headroom(self.account)
+        withdraw(self.account, Decimal('250.00'))
+        self.assertEqual(limit_error(Decimal('100.00'), stale), '')
+
+        with mock.patch.object(services, 'headroom', wraps=headroom) as check:
+            with self.assertRaisesMessage(PostingError, 'daily withdrawal limit'):
+                withdraw(self.account, Decimal('100.00'))
+        # Today's usage came from the row the posting locked
+        self.assertEqual(check.call_args.args[2], Decimal('250.00'))
+
+    def test_premium_tier_has_more_room(self):
+        Account.objects.filter(pk=self.account.pk).update(tier=Account.PREMIUM)
+        self.account.refresh_from_db()
+        withdraw(self.account, Decimal('500.00'))
@@ -0,0 +1,49 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from apps.bank import manager_views
+from apps.bank.models import BankManager, ManagerAction, Transaction
+from apps.bank.services import deposit
+
+
+class SingleDecisionTests(TestCase):
+    """Approving or rejecting one transaction from the manager pages"""
+
+    def setUp(self):
+        self.account = User.objects.create_user(username='customer', password=None).account
+        deposit(self.account, Decimal('1000.00'))
+        self.pending = deposit(self.account, Decimal('60000.00'))
+        self.assertEqual(self.pending.status, Transaction.PENDING)
+        user = User.objects.create_user(username='manager', password=None)
+        self.manager = BankManager.objects.create(user=user, employee_id='EMP1')
+        self.client.force_login(user)
+
+    def test_double_submitted_approval_settles_once(self):
+        url = reverse('bank:manager_approve_transaction', args=[self.pending.pk])
+        self.client.post(url, {'note': 'ok'})
+        self.client.post(url, {'note': 'ok'})
+
+        self.pending.refresh_from_db()
+        self.account.refresh_from_db()
+        self.assertEqual(self.pending.status, Transaction.COMPLETED)
+        self.assertEqual(self.account.balance, Decimal('61000.00'))
+        self.assertEqual(ManagerAction.objects.filter(action_type='APPROVE_TRANSACTION').count(), 1)
+
+    def test_concurrent_decisions_only_one_goes_on(self):
+        # Both requests loaded the transaction while it was still pending
+        stale = Transaction.objects.get(pk=self.pending.pk)
+        with mock.patch.object(manager_views, 'release_rejected') as release:
+            self.assertTrue(manager_views._decide(self.manager, stale, self.manager.user, '', Transaction.REJECTED))
+            self.assertFalse(manager_views._decide(self.manager, stale, self.manager.user, '', Transaction.APPROVED))
+        release.assert_called_once_with([self.pending.pk])
+        self.assertEqual(Transaction.objects.get(pk=self.pending.pk).status, Transaction.REJECTED)
+
+    def test_completed_transaction_is_not_put_back(self):
+        stale = Transaction.objects.get(pk=self.pending.pk)
+        Transaction.objects.filter(pk=self.pending.pk).update(status=Transaction.COMPLETED)
+        self.assertFalse(manager_views._decide(self.manager, stale, self.manager.user, '', Transaction.APPROVED))
+        self.assertEqual(Transaction.objects.get(pk=self.pending.pk).status, Transaction.COMPLETED)
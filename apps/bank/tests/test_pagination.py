@@ -0,0 +1,54 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from apps.bank import approvals
+from apps.bank.models import ManagerAction, TransactionApproval
+from apps.bank.pagination import EstimatedCountPaginator
+from apps.bank.services import deposit
+
+
+@override_settings(BANK_ADMIN_EXACT_COUNT_LIMIT=3)
+class EstimatedCountTests(TestCase):
+    """Large unfiltered lists are estimated, everything else counted"""
+
+    def setUp(self):
+        actions = [ManagerAction.objects.create(action_type='FREEZE_ACCOUNT', note=f'{n}') for n in range(6)]
+        # Gaps in the ids make the estimate visibly differ from the count
+        ManagerAction.objects.filter(pk__in=[actions[0].pk, actions[1].pk]).delete()
+        self.max_id = actions[-1].pk
+
+    def count(self, queryset):
+        with CaptureQueriesContext(connection) as queries:
+            count = EstimatedCountPaginator(queryset, 2).count
+        return count, [query['sql'] for query in queries]
+
+    def test_large_unfiltered_list_is_estimated(self):
+        count, queries = self.count(ManagerAction.objects.all())
+        self.assertEqual(count, self.max_id)
+        self.assertEqual(len(queries), 1)
+        self.assertIn('MAX(', queries[0])
+
+    def test_filtered_list_is_counted(self):
+        count, queries = self.count(ManagerAction.objects.filter(note__in=['2', '3', '4', '5']))
+        self.assertEqual(count, 4)
+        self.assertIn('COUNT(', queries[-1])
+
+    def test_distinct_list_is_counted(self):
+        self.assertEqual(self.count(ManagerAction.objects.distinct())[0], 4)
+
+    def test_small_table_is_counted(self):
+        with override_settings(BANK_ADMIN_EXACT_COUNT_LIMIT=self.max_id):
+            self.assertEqual(self.count(ManagerAction.objects.all())[0], 4)
+
+    def test_table_without_an_auto_id_is_counted(self):
+        user = User.objects.create_user(username='customer', password=None)
+        ids = [deposit(user.account, Decimal('10.00')).pk for _ in range(5)]
+        approvals.record(ids[1:], user)
+        self.assertEqual(self.count(TransactionApproval.objects.order_by('pk'))[0], 4)
+
+    def test_plain_lists_are_counted(self):
+        self.assertEqual(EstimatedCountPaginator(list(range(7)), 2).count, 7)
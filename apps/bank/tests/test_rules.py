@@ -0,0 +1,107 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.bank.models import Account, Transaction
+from apps.bank.rules import (
+    RULE_TYPES, PostingContext, Rule, compile_rules, get_rules, register_rule, review_reason,
+)
+from apps.bank.services import PostingError, deposit, transfer, withdraw
+
+
+class PostingRuleTests(TestCase):
+    """Each rule sends a matching posting for approval"""
+
+    def setUp(self):
+        self.account = User.objects.create_user(username='customer', password=None).account
+        self.other = User.objects.create_user(username='other', password=None).account
+        # Old enough for the new account rule not to apply
+        Account.objects.filter(pk__in=[self.account.pk, self.other.pk]).update(
+            created_at=timezone.now() - timedelta(days=30),
+            balance=Decimal('100000.00'), available_balance=Decimal('100000.00'),
+        )
+        self.account.refresh_from_db()
+
+    def assertPending(self, txn, reason):
+        self.assertEqual(txn.status, Transaction.PENDING)
+        self.assertIn(reason, txn.review_reason)
+
+    @override_settings(BANK_POSTING_RULES=[{'rule': 'amount_threshold', 'amount': '1000.00'}])
+    def test_amount_threshold(self):
+        self.assertEqual(deposit(self.account, Decimal('999.99')).status, Transaction.COMPLETED)
+        self.assertPending(deposit(self.account, Decimal('1000.00')), 'review threshold')
+
+    @override_settings(BANK_POSTING_RULES=[
+        {'rule': 'daily_velocity', 'types': ['WITHDRAW'], 'count': 2, 'amount': '500.00'},
+    ])
+    def test_daily_velocity(self):
+        withdraw(self.account, Decimal('100.00'))
+        withdraw(self.account, Decimal('100.00'))
+        self.assertPending(withdraw(self.account, Decimal('100.00')), 'More than 2 postings today')
+        # Deposits are not counted by a withdrawal rule
+        self.assertEqual(deposit(self.account, Decimal('900.00')).status, Transaction.COMPLETED)
+
+    @override_settings(BANK_POSTING_RULES=[
+        {'rule': 'daily_velocity', 'types': ['WITHDRAW'], 'amount': '500.00'},
+    ])
+    def test_daily_velocity_total(self):
+        withdraw(self.account, Decimal('400.00'))
+        self.assertPending(withdraw(self.account, Decimal('100.01')), 'More than ₹500.00 posted today')
+
+    @override_settings(BANK_POSTING_RULES=[{'rule': 'new_account', 'days': 7, 'amount': '200.00'}])
+    def test_new_account(self):
+        self.assertEqual(deposit(self.account, Decimal('500.00')).status, Transaction.COMPLETED)
+        Account.objects.filter(pk=self.account.pk).update(created_at=timezone.now() - timedelta(days=2))
+        self.account.refresh_from_db()
+        self.assertEqual(deposit(self.account, Decimal('200.00')).status, Transaction.COMPLETED)
+        self.assertPending(deposit(self.account, Decimal('200.01')), 'opened less than 7 days ago')
+
+    @override_settings(BANK_POSTING_RULES=[{'rule': 'frozen_counterparty'}])
+    def test_frozen_counterparty(self):
+        Account.objects.filter(pk=self.other.pk).update(status=Account.FROZEN)
+        self.other.refresh_from_db()
+        self.assertPending(withdraw(self.account, Decimal('10.00'), counterparty=self.other), 'frozen')
+        # A transfer cannot wait, so it is refused outright
+        with self.assertRaises(PostingError):
+            transfer(self.account, self.other, Decimal('10.00'))
+        self.assertEqual(Transaction.objects.count(), 1)
+
+    def test_first_matching_rule_gives_the_reason(self):
+        rules = compile_rules([
+            {'rule': 'amount_threshold', 'amount': '100.00', 'types': ['DEPOSIT']},
+            {'rule': 'daily_velocity', 'count': 0},
+        ])
+        context = PostingContext(
+            Transaction.WITHDRAW, Decimal('500.00'), Account.ACTIVE, timezone.now(), timezone.now()
+        )
+        self.assertEqual(review_reason(context, rules), 'More than 0 postings today')
+        context.transaction_type = Transaction.DEPOSIT
+        self.assertIn('review threshold', review_reason(context, rules))
+        self.assertEqual(review_reason(context, []), '')
+
+
+class RuleConfigurationTests(TestCase):
+    """Compiling BANK_POSTING_RULES"""
+
+    def tearDown(self):
+        RULE_TYPES.pop('weekend', None)
+
+    def test_unknown_rule_is_refused(self):
+        with self.assertRaises(ValueError):
+            compile_rules([{'rule': 'no_such_rule'}])
+
+    def test_registered_rule_is_used(self):
+        class Weekend(Rule):
+            def check(self, context):
+                return 'Posted at the weekend'
+
+        register_rule('weekend', Weekend)
+        with override_settings(BANK_POSTING_RULES=[{'rule': 'weekend', 'types': ['DEPOSIT']}]):
+            self.assertIsInstance(get_rules()[0], Weekend)
+            account = User.objects.create_user(username='customer', password=None).account
+            self.assertEqual(deposit(account, Decimal('1.00')).review_reason, 'Posted at the weekend')
+        # Back to the settings' rules
+        self.assertNotIsInstance(get_rules()[0], Weekend)
@@ -0,0 +1,153 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.bank.models import Account, StandingInstruction, Transaction
+from apps.bank.scheduled import advance, run_due
+
+
+def at(year, month, day):
+    return datetime(year, month, day, 9, 0, tzinfo=dt_timezone.utc)
+
+
+class AdvanceTests(TestCase):
+    """The next run of each frequency"""
+
+    def test_daily_and_weekly(self):
+        self.assertEqual(advance(at(2026, 1, 31), StandingInstruction.DAILY, 31), at(2026, 2, 1))
+        self.assertEqual(advance(at(2026, 1, 31), StandingInstruction.WEEKLY, 31), at(2026, 2, 7))
+
+    def test_monthly_keeps_the_anchor_day(self):
+        february = advance(at(2026, 1, 31), StandingInstruction.MONTHLY, 31)
+        self.assertEqual(february, at(2026, 2, 28))
+        # Back to the 31st after a short month, not stuck on the 28th
+        self.assertEqual(advance(february, StandingInstruction.MONTHLY, 31), at(2026, 3, 31))
+        self.assertEqual(advance(at(2026, 12, 15), StandingInstruction.MONTHLY, 15), at(2027, 1, 15))
+
+
+class RunDueTests(TestCase):
+    """Paying due standing instructions"""
+
+    def setUp(self):
+        self.account = User.objects.create_user(username='payer', password=None).account
+        self.payee = User.objects.create_user(username='payee', password=None).account
+        self.fund(self.account, Decimal('1000.00'))
+
+    def fund(self, account, amount):
+        Account.objects.filter(pk=account.pk).update(balance=amount, available_balance=amount)
+
+    def instruction(self, starts_at, **fields):
+        fields.setdefault('kind', StandingInstruction.TRANSFER)
+        fields.setdefault('to_account', self.payee)
+        fields.setdefault('amount', Decimal('100.00'))
+        fields.setdefault('frequency', StandingInstruction.DAILY)
+        return StandingInstruction.objects.create(
+            account=self.account, starts_at=starts_at, next_run_at=starts_at, **fields
+        )
+
+    def test_due_instruction_is_paid_and_advanced(self):
+        instruction = self.instruction(at(2026, 3, 1))
+        future = self.instruction(at(2026, 3, 5))
+
+        stats = run_due(at(2026, 3, 1))
+
+        self.assertEqual((stats['instructions'], stats['paid'], stats['failed']), (1, 1, 0))
+        self.account.refresh_from_db()
+        self.payee.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('900.00'))
+        self.assertEqual(self.payee.balance, Decimal('100.00'))
+        instruction.refresh_from_db()
+        self.assertEqual(instruction.last_run_at, at(2026, 3, 1))
+        self.assertEqual(instruction.next_run_at, at(2026, 3, 2))
+        self.assertIsNone(instruction.claimed_by)
+        future.refresh_from_db()
+        self.assertIsNone(future.last_run_at)
+
+        # Nothing is due again until the next run
+        self.assertEqual(run_due(at(2026, 3, 1))['paid'], 0)
+
+    def test_missed_runs_are_caught_up_oldest_first(self):
+        instruction = self.instruction(
+            at(2026, 3, 1), kind=StandingInstruction.WITHDRAW, to_account=None,
+            description='Rent',
+        )
+
+        stats = run_due(at(2026, 3, 3))
+
+        self.assertEqual((stats['paid'], stats['backfilled']), (3, 2))
+        descriptions = list(
+            Transaction.objects.filter(account=self.account).order_by('id').values_list('description', flat=True)
+        )
+        self.assertEqual(descriptions, [
+            'Rent (scheduled 01 Mar 2026)',
+            'Rent (scheduled 02 Mar 2026)',
+            'Rent (scheduled 03 Mar 2026)',
+        ])
+        instruction.refresh_from_db()
+        self.assertEqual(instruction.next_run_at, at(2026, 3, 4))
+
+    def test_refused_payment_is_recorded_and_skipped(self):
+        self.fund(self.account, Decimal('50.00'))
+        failing = self.instruction(at(2026, 3, 1))
+        other = User.objects.create_user(username='other', password=None).account
+        self.fund(other, Decimal('500.00'))
+        paying = StandingInstruction.objects.create(
+            account=other, kind=StandingInstruction.WITHDRAW, amount=Decimal('20.00'),
+            frequency=StandingInstruction.WEEKLY, starts_at=at(2026, 3, 1), next_run_at=at(2026, 3, 1),
+        )
+
+        stats = run_due(at(2026, 3, 1))
+
+        # The refusal does not stop the batch
+        self.assertEqual((stats['paid'], stats['failed']), (1, 1))
+        failing.refresh_from_db()
+        self.assertTrue(failing.last_error)
+        self.assertEqual(failing.next_run_at, at(2026, 3, 2))
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('50.00'))
+        paying.refresh_from_db()
+        self.assertEqual(paying.last_error, '')
+        self.assertEqual(paying.next_run_at, at(2026, 3, 8))
+
+        # A later success clears the error
+        self.fund(self.account, Decimal('500.00'))
+        run_due(at(2026, 3, 2))
+        failing.refresh_from_db()
+        self.assertEqual(failing.last_error, '')
+
+    def test_cancelled_and_claimed_instructions_are_left_alone(self):
+        self.instruction(at(2026, 3, 1), active=False)
+        self.instruction(
+            at(2026, 3, 1), claimed_by='other-worker', claim_expires_at=timezone.now() + timedelta(minutes=5)
+        )
+
+        self.assertEqual(run_due(at(2026, 3, 1), worker='this-worker')['instructions'], 0)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('1000.00'))
+
+
+class RunScheduledPaymentsCommandTests(TestCase):
+    """The run_scheduled_payments command's --at"""
+
+    def test_future_at_is_refused(self):
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        with self.assertRaisesMessage(CommandError, 'future'):
+            call_command('run_scheduled_payments', at=tomorrow.isoformat(), stdout=StringIO())
+
+    def test_past_at_runs_what_was_due_then(self):
+        account = User.objects.create_user(username='payer', password=None).account
+        Account.objects.filter(pk=account.pk).update(
+            balance=Decimal('100.00'), available_balance=Decimal('100.00')
+        )
+        StandingInstruction.objects.create(
+            account=account, kind=StandingInstruction.WITHDRAW, amount=Decimal('10.00'),
+            frequency=StandingInstruction.MONTHLY, starts_at=at(2026, 3, 1), next_run_at=at(2026, 3, 1),
+        )
+        out = StringIO()
+        call_command('run_scheduled_payments', at='2026-03-01T10:00', stdout=out)
+        self.assertIn('1 payment(s) made', out.getvalue())
@@ -0,0 +1,193 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.bank import approvals, search
+from apps.bank.models import Account, BankManager, ManagerAction, Transaction, TransactionApproval
+from apps.bank.services import deposit
+
+
+class CustomerIndexTests(TestCase):
+    """Triggers keep the customer index in step with auth_user and bank_account"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='jsmith', password=None, first_name='Jane', last_name='Smithson', email='jane@example.com'
+        )
+        self.account = self.user.account
+
+    def indexed(self, user_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT account_id, account_number, username, first_name, last_name, email '
+                f'FROM {search.TABLE} WHERE rowid = %s',
+                [user_id],
+            )
+            return cursor.fetchone()
+
+    def found(self, term):
+        return set(search.filter_customers(User.objects.all(), term).values_list('username', flat=True))
+
+    def test_insert(self):
+        self.assertEqual(
+            self.indexed(self.user.id),
+            (self.account.id, self.account.account_number, 'jsmith', 'Jane', 'Smithson', 'jane@example.com'),
+        )
+        self.assertEqual(self.found('mithso'), {'jsmith'})
+        self.assertEqual(self.found(self.account.account_number[-4:].lower()), {'jsmith'})
+
+    def test_update(self):
+        User.objects.filter(pk=self.user.pk).update(last_name='Brown')
+        self.assertEqual(self.found('mithso'), set())
+        self.assertEqual(self.found('BROWN'), {'jsmith'})
+
+        # Made outside the ORM, like any other writer of the table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'UPDATE bank_account SET account_number = %s WHERE id = %s', ['ACCZZ9988', self.account.id]
+            )
+        self.assertEqual(self.indexed(self.user.id)[:2], (self.account.id, 'ACCZZ9988'))
+        self.assertEqual(self.found('zz99'), {'jsmith'})
+
+    def test_delete(self):
+        self.account.delete()
+        self.assertEqual(self.indexed(self.user.id)[:2], (None, ''))
+        self.assertEqual(self.found('mithso'), {'jsmith'})
+
+        self.user.delete()
+        self.assertIsNone(self.indexed(self.user.id))
+        self.assertEqual(self.found('mithso'), set())
+
+    def test_unrelated_updates_leave_the_index_alone(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'UPDATE {search.TABLE} SET email = %s WHERE rowid = %s', ['stale', self.user.id])
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        Account.objects.filter(pk=self.account.pk).update(balance=10)
+        self.assertEqual(self.indexed(self.user.id)[5], 'stale')
+
+    def test_rebuild_restores_missing_triggers(self):
+        with connection.cursor() as cursor:
+            for name in search.TRIGGERS:
+                cursor.execute(f'DROP TRIGGER {name}')
+        self.assertEqual(search.repair_indexes(), [search.TABLE])
+        self.assertEqual(search.repair_indexes(), [])
+
+        User.objects.create_user(username='amorrison', password=None)
+        self.assertEqual(self.found('morris'), {'amorrison'})
+
+
+class CustomerSearchTests(TestCase):
+    """filter_customers() and typeahead()"""
+
+    def setUp(self):
+        for username, last_name in [('ann', 'Hudson'), ('bob', 'Anderson'), ('carl', 'Jones')]:
+            User.objects.create_user(username=username, password=None, last_name=last_name)
+        manager = User.objects.create_user(username='manson', password=None)
+        BankManager.objects.create(user=manager, employee_id='EMP1')
+
+    def usernames(self, queryset):
+        return set(queryset.values_list('username', flat=True))
+
+    def test_index_and_fallback_agree(self):
+        for term in ('son', 'ANDER', 'an', 'x'):
+            indexed = self.usernames(search.filter_customers(User.objects.all(), term))
+            with override_settings(BANK_SEARCH_INDEX=False):
+                scanned = self.usernames(search.filter_customers(User.objects.all(), term))
+            self.assertEqual(indexed, scanned, term)
+        self.assertEqual(indexed, set())
+
+    def test_filters_accounts_through_their_user(self):
+        accounts = search.filter_customers(Account.objects.all(), 'hudso', user_path='user__')
+        self.assertEqual(list(accounts.values_list('user__username', flat=True)), ['ann'])
+
+    def test_typeahead_puts_exact_matches_first_and_leaves_out_managers(self):
+        bob = User.objects.get(username='bob')
+        User.objects.filter(pk=bob.pk).update(username='son')
+        self.assertEqual([row['username'] for row in search.typeahead('son')], ['son', 'ann'])
+
+        # Too short for the index: exact account numbers and usernames only
+        self.assertEqual(search.typeahead('an'), [])
+        number = bob.account.account_number
+        self.assertEqual([row['username'] for row in search.typeahead(number.lower())], ['son'])
+
+
+class TextIndexTests(TestCase):
+    """Full-text search over transaction descriptions, approval notes and action notes"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='customer', password=None)
+        self.account = self.user.account
+
+    def post(self, description):
+        return deposit(self.account, Decimal('10.00'), description).pk
+
+    def found(self, text, model=Transaction):
+        return set(search.search_text(model.objects.all(), text).values_list('pk', flat=True))
+
+    def test_transaction_insert_update_delete(self):
+        txn_id = self.post('Refunds for March')
+        # Stemmed: "refund" finds "Refunds"
+        self.assertEqual(self.found('refund'), {txn_id})
+
+        Transaction.objects.filter(pk=txn_id).update(description='Salary')
+        self.assertEqual(self.found('refund'), set())
+        self.assertEqual(self.found('salary'), {txn_id})
+
+        Transaction.objects.filter(pk=txn_id).delete()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM bank_transaction_search')
+            self.assertEqual(cursor.fetchone(), (0,))
+
+    def test_approval_notes_follow_the_side_table(self):
+        txn_id = self.post('Deposit')
+        approvals.record([txn_id], self.user, 'Checked the payslip')
+        self.assertEqual(self.found('payslip'), {txn_id})
+
+        approvals.add_notes({txn_id: 'Rejected at settlement'})
+        self.assertEqual(self.found('payslip settlement'), {txn_id})
+
+        TransactionApproval.objects.filter(transaction_id=txn_id).delete()
+        self.assertEqual(self.found('payslip'), set())
+        self.assertEqual(self.found('deposit'), {txn_id})
+
+    def test_manager_action_notes(self):
+        action = ManagerAction.objects.create(action_type='FREEZE_ACCOUNT', note='Suspected fraud')
+        self.assertEqual(self.found('fraud', ManagerAction), {action.pk})
+        ManagerAction.objects.filter(pk=action.pk).update(note='Customer request')
+        self.assertEqual(self.found('fraud', ManagerAction), set())
+        action.delete()
+        self.assertEqual(self.found('customer', ManagerAction), set())
+
+    def test_ranked_and_filtered_by_date(self):
+        once = self.post('Rent paid')
+        twice = self.post('Rent and rent arrears')
+        self.post('Groceries')
+        ranked = search.search_text(Transaction.objects.all(), 'rent')
+        self.assertEqual(list(ranked.values_list('pk', flat=True)), [twice, once])
+
+        Transaction.objects.filter(pk=twice).update(timestamp=timezone.now() - timedelta(days=40))
+        recent = Transaction.objects.filter(timestamp__gte=timezone.now() - timedelta(days=30))
+        self.assertEqual(list(search.search_text(recent, 'rent').values_list('pk', flat=True)), [once])
+
+    def test_index_and_fallback_agree(self):
+        rent = self.post('Rent paid')
+        approvals.record([self.post('Deposit')], self.user, 'rent deposit')
+        self.post('Groceries')
+        for text in ('rent', 'RENT paid', 'nothing', '"*'):
+            indexed = self.found(text)
+            with override_settings(BANK_SEARCH_INDEX=False):
+                self.assertEqual(self.found(text), indexed, text)
+        self.assertEqual(self.found('rent paid'), {rent})
+
+    def test_repair_rebuilds_an_index_without_triggers(self):
+        txn_id = self.post('Refund')
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER bank_transaction_search_update')
+        self.assertEqual(search.repair_indexes(), ['bank_transaction_search'])
+
+        Transaction.objects.filter(pk=txn_id).update(description='Salary')
+        self.assertEqual(self.found('salary'), {txn_id})
@@ -0,0 +1,75 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.bank.models import AccountBalanceSnapshot, BalanceSnapshotRun, Transaction
+from apps.bank.services import deposit
+from apps.bank.settlement import settle
+from apps.bank.snapshots import snapshot_day
+
+
+class SettlementQueryTests(TestCase):
+    """Settling back-dated postings takes the same queries for any number of accounts"""
+
+    def setUp(self):
+        today = timezone.localdate()
+        self.days = {n: today - timedelta(days=6 - n) for n in range(1, 6)}
+        self.run = 0
+
+    def deposit_on(self, account, day, amount):
+        txn = deposit(account, Decimal(amount))
+        noon = timezone.make_aware(datetime.combine(self.days[day], time(12)))
+        Transaction.objects.filter(pk=txn.pk).update(timestamp=noon)
+        return txn
+
+    def settle_accounts(self, count):
+        """
+        Settle a day-2 deposit on `count` new accounts after the snapshots
+        of days 2 to 4; every other account also posted on day 3, so it has
+        snapshots to shift, and the rest need one filled in. Returns the
+        accounts and the queries settle() ran.
+        """
+        self.run += 1
+        accounts, pending = [], []
+        for n in range(count):
+            account = User.objects.create_user(username=f'customer{self.run}-{n}', password=None).account
+            accounts.append(account)
+            self.deposit_on(account, 1, '1000.00')
+            pending.append(self.deposit_on(account, 2, '60000.00'))
+            if n % 2 == 0:
+                self.deposit_on(account, 3, '10.00')
+        # Snapshot every account again, including those of an earlier call
+        AccountBalanceSnapshot.objects.all().delete()
+        BalanceSnapshotRun.objects.all().delete()
+        for day in range(1, 5):
+            snapshot_day(self.days[day])
+
+        ids = [txn.pk for txn in pending]
+        self.assertTrue(all(txn.status == Transaction.PENDING for txn in pending))
+        Transaction.objects.filter(pk__in=ids).update(status=Transaction.APPROVED)
+        with CaptureQueriesContext(connection) as queries:
+            settled, rejected = settle(ids)
+        self.assertEqual((sorted(settled), rejected), (sorted(ids), []))
+        return accounts, len(queries)
+
+    def snapshot(self, account, day):
+        return AccountBalanceSnapshot.objects.get(account=account, as_of=self.days[day]).balance
+
+    def test_queries_do_not_grow_with_accounts(self):
+        _, few = self.settle_accounts(2)
+        accounts, many = self.settle_accounts(6)
+        self.assertEqual(few, many)
+
+        for n, account in enumerate(accounts):
+            with self.subTest(account=n):
+                if n % 2 == 0:
+                    # Shifted: the day-3 snapshot includes the settled deposit
+                    self.assertEqual(self.snapshot(account, 3), Decimal('61010.00'))
+                else:
+                    # Filled in for the latest run
+                    self.assertEqual(self.snapshot(account, 4), Decimal('61000.00'))
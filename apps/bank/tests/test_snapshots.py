@@ -0,0 +1,51 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.bank.models import AccountBalanceSnapshot, Transaction
+from apps.bank.services import deposit
+from apps.bank.settlement import settle
+from apps.bank.snapshots import balance_at, balances_at, snapshot_day
+
+
+class LateSettlementSnapshotTests(TestCase):
+    """A posting settled after the snapshot runs for its day"""
+
+    def setUp(self):
+        self.account = User.objects.create_user(username='customer', password=None).account
+        today = timezone.localdate()
+        self.days = {n: today - timedelta(days=6 - n) for n in range(1, 6)}
+
+    def deposit_on(self, day, amount):
+        txn = deposit(self.account, Decimal(amount))
+        noon = timezone.make_aware(datetime.combine(self.days[day], time(12)))
+        Transaction.objects.filter(pk=txn.pk).update(timestamp=noon)
+        return txn
+
+    def test_later_snapshots_include_the_settled_posting(self):
+        self.deposit_on(1, '1000.00')
+        snapshot_day(self.days[1])
+
+        pending = self.deposit_on(3, '60000.00')
+        self.assertEqual(Transaction.objects.get(pk=pending.pk).status, Transaction.PENDING)
+        snapshot_day(self.days[3])
+        snapshot_day(self.days[4])
+
+        Transaction.objects.filter(pk=pending.pk).update(status=Transaction.APPROVED)
+        settled, rejected = settle([pending.pk])
+        self.assertEqual((settled, rejected), ([pending.pk], []))
+
+        self.deposit_on(5, '10.00')
+        snapshot_day(self.days[5])
+
+        expected = Decimal('61010.00')
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, expected)
+        self.assertEqual(
+            AccountBalanceSnapshot.objects.get(account=self.account, as_of=self.days[5]).balance, expected
+        )
+        self.assertEqual(balance_at(self.account, timezone.now()), expected)
+        self.assertEqual(balances_at(timezone.now())[self.account.id], expected)
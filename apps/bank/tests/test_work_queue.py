@@ -0,0 +1,62 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.bank.models import BankManager, Transaction
+from apps.bank.services import deposit
+from apps.bank.work_queue import claim_pending, claimed_by, decide_batch, decide_one
+
+
+class ClaimTests(TestCase):
+    """Managers lease pending transactions without overlapping"""
+
+    def setUp(self):
+        account = User.objects.create_user(username='customer', password=None).account
+        # Above the new account limit: each waits for approval
+        self.pending = [deposit(account, Decimal('25000.00')).pk for _ in range(4)]
+        self.first, self.second = (
+            BankManager.objects.create(
+                user=User.objects.create_user(username=f'manager{n}', password=None), employee_id=f'EMP{n}'
+            )
+            for n in (1, 2)
+        )
+
+    def lapse(self, ids):
+        Transaction.objects.filter(pk__in=ids).update(claim_expires_at=timezone.now() - timedelta(seconds=1))
+
+    def test_claims_do_not_overlap(self):
+        self.assertEqual(claim_pending(self.first, 3), self.pending[:3])
+        self.assertEqual(claim_pending(self.second, 3), self.pending[3:])
+        self.assertEqual(claim_pending(self.second, 3), [])
+        self.assertEqual(list(claimed_by(self.first).values_list('id', flat=True)), self.pending[:3])
+
+    def test_lapsed_lease_can_be_taken_over(self):
+        claim_pending(self.first, 2)
+        self.lapse(self.pending[:1])
+
+        self.assertEqual(claim_pending(self.second, 2), self.pending[:1] + self.pending[2:3])
+        self.assertEqual(list(claimed_by(self.first).values_list('id', flat=True)), self.pending[1:2])
+
+        # The first manager can no longer decide the row they lost
+        self.assertEqual(decide_batch(self.first, self.pending[:2], approve=False), self.pending[1:2])
+        self.assertEqual(Transaction.objects.get(pk=self.pending[0]).status, Transaction.PENDING)
+
+    def test_lapsed_lease_no_longer_blocks_a_decision(self):
+        claim_pending(self.first, 1)
+        self.lapse(self.pending[:1])
+        self.assertEqual(list(claimed_by(self.first)), [])
+        self.assertTrue(decide_one(self.second, self.pending[0], Transaction.REJECTED))
+
+    def test_decide_one_respects_a_live_lease_and_decides_once(self):
+        claim_pending(self.first, 1)
+        txn_id = self.pending[0]
+
+        self.assertFalse(decide_one(self.second, txn_id, Transaction.APPROVED))
+        self.assertTrue(decide_one(self.first, txn_id, Transaction.APPROVED))
+        # A double submit finds it no longer pending
+        self.assertFalse(decide_one(self.first, txn_id, Transaction.APPROVED))
+        txn = Transaction.objects.get(pk=txn_id)
+        self.assertEqual((txn.status, txn.claimed_by_id), (Transaction.APPROVED, None))
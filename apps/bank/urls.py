@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views, manager_views
+from . import admin_views, api, views, manager_views
 
 app_name = 'bank'
 
@@ -9,6 +9,18 @@ urlpatterns = [
     path('deposit/', views.deposit_view, name='deposit'),
     path('withdraw/', views.withdraw_view, name='withdraw'),
     path('transactions/', views.transactions_view, name='transactions'),
+    path('standing-instructions/', views.standing_instructions_view, name='standing_instructions'),
+    path('standing-instructions/<int:instruction_id>/cancel/', views.cancel_standing_instruction_view, name='cancel_standing_instruction'),
+    
+    # Admin dashboard sections, loaded by the dashboard page (see admin_views.py)
+    path('dashboard/admin/<slug:section>/', admin_views.admin_section_view, name='admin_section'),
+    
+    # JSON API (token authentication, see api.py)
+    path('api/account/', api.account_view, name='api_account'),
+    path('api/transactions/', api.transactions_view, name='api_transactions'),
+    path('api/deposit/', api.deposit_view, name='api_deposit'),
+    path('api/withdraw/', api.withdraw_view, name='api_withdraw'),
+    path('api/batch/', api.batch_view, name='api_batch'),
     
     # Manager authentication
     path('manager/login/', manager_views.manager_login_view, name='manager_login'),
@@ -24,6 +36,7 @@ urlpatterns = [
     
     # Account monitoring
     path('manager/accounts/', manager_views.manager_accounts_view, name='manager_accounts'),
+    path('manager/search/', manager_views.manager_search_view, name='manager_search'),
     path('manager/account/<int:account_id>/', manager_views.manager_account_detail_view, name='manager_account_detail'),
     path('manager/account/<int:account_id>/freeze/', manager_views.manager_freeze_account_view, name='manager_freeze_account'),
     path('manager/account/<int:account_id>/unfreeze/', manager_views.manager_unfreeze_account_view, name='manager_unfreeze_account'),
@@ -31,6 +44,7 @@ urlpatterns = [
     # Transaction monitoring
     path('manager/transactions/', manager_views.manager_transactions_view, name='manager_transactions'),
     path('manager/approvals/', manager_views.manager_pending_approvals_view, name='manager_pending_approvals'),
+    path('manager/approvals/queue/', manager_views.manager_work_queue_view, name='manager_work_queue'),
     path('manager/transaction/<int:transaction_id>/approve/', manager_views.manager_approve_transaction_view, name='manager_approve_transaction'),
     path('manager/transaction/<int:transaction_id>/reject/', manager_views.manager_reject_transaction_view, name='manager_reject_transaction'),
     
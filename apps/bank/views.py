@@ -1,9 +1,16 @@
-from django.shortcuts import render, redirect
+from datetime import datetime, time
+
+from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db import transaction
-from .forms import DepositForm, WithdrawForm
-from .models import Transaction
+from django.utils import timezone
+from .admin_views import admin_dashboard_view
+from .forms import DepositForm, StandingInstructionForm, WithdrawForm
+from .idempotency import IdempotencyError, find_key, post_once, replay, request_hash, request_key
+from .limits import headroom
+from .models import StandingInstruction
+from .page_cache import conditional_page, fragment_timeout
+from .services import PostingError, deposit, withdraw
 
 
 @login_required
@@ -11,6 +18,8 @@ def dashboard_view(request):
     """
     Dashboard View - Shows account information
     @login_required ensures only logged-in users can access
+    The page is cached by account version (see page_cache.py): an unchanged
+    dashboard costs one account lookup
     """
     # If user is a manager, redirect to manager dashboard
     if hasattr(request.user, 'manager_profile'):
@@ -26,97 +35,45 @@ def dashboard_view(request):
     if account.status == 'FROZEN':
         messages.warning(request, 'Your account has been frozen. Please contact the bank for assistance.')
     
-    recent_transactions = account.transactions.all()[:5]  # Last 5 transactions
+    # Last 5 transactions; only queried when the cached fragment is missing
+    recent_transactions = account.transactions.all()[:5]
     
     context = {
         'account': account,
         'recent_transactions': recent_transactions,
+        'fragment_timeout': fragment_timeout(),
     }
-    return render(request, 'bank/dashboard.html', context)
+    return conditional_page(
+        request, account, 'bank/dashboard.html',
+        lambda: render(request, 'bank/dashboard.html', context),
+    )
 
 
-@login_required
-def admin_dashboard_view(request):
+def _idempotency(request, transaction_type):
     """
-    Admin Dashboard View - Shows all system information and management features
-    Only accessible to superusers
+    The request's idempotency key and a fingerprint of what it asks for
+
+    The fingerprint uses the submitted values as sent, so it can be checked
+    before the form is validated.
     """
-    from django.contrib.auth.models import User
-    from django.db.models import Sum, Count, Q
-    from .models import Account, Transaction, BankManager, ManagerAction
-    
-    if not request.user.is_superuser:
-        messages.error(request, 'You do not have permission to access this page.')
-        return redirect('bank:dashboard')
-    
-    # Get all statistics
-    total_users = User.objects.exclude(manager_profile__isnull=False).count()
-    total_accounts = Account.objects.count()
-    total_balance = Account.objects.aggregate(Sum('balance'))['balance__sum'] or 0
-    total_transactions = Transaction.objects.count()
-    
-    # Transaction statistics
-    total_deposits = Transaction.objects.filter(
-        transaction_type='DEPOSIT', 
-        status='COMPLETED'
-    ).aggregate(Sum('amount'))['amount__sum'] or 0
-    
-    total_withdrawals = Transaction.objects.filter(
-        transaction_type='WITHDRAW', 
-        status='COMPLETED'
-    ).aggregate(Sum('amount'))['amount__sum'] or 0
-    
-    # Account statistics
-    active_accounts = Account.objects.filter(status='ACTIVE').count()
-    frozen_accounts = Account.objects.filter(status='FROZEN').count()
-    
-    # Transaction status
-    pending_transactions = Transaction.objects.filter(status='PENDING').count()
-    completed_transactions = Transaction.objects.filter(status='COMPLETED').count()
-    
-    # Recent data
-    recent_users = User.objects.exclude(manager_profile__isnull=False).order_by('-date_joined')[:10]
-    recent_accounts = Account.objects.select_related('user').order_by('-created_at')[:10]
-    recent_transactions = Transaction.objects.select_related('account__user').order_by('-timestamp')[:20]
-    
-    # Large transactions (>= 50000)
-    large_transactions = Transaction.objects.filter(amount__gte=50000).order_by('-timestamp')[:10]
-    
-    # Manager statistics
-    total_managers = BankManager.objects.count()
-    recent_manager_actions = ManagerAction.objects.select_related(
-        'manager__user', 'target_user', 'target_account'
-    ).order_by('-timestamp')[:15]
-    
-    # Get all accounts for management
-    all_accounts = Account.objects.select_related('user').all()
-    
-    # Get all users for management
-    all_users = User.objects.exclude(manager_profile__isnull=False).select_related('account')
-    
-    context = {
-        'is_admin': True,
-        'total_users': total_users,
-        'total_accounts': total_accounts,
-        'total_balance': total_balance,
-        'total_transactions': total_transactions,
-        'total_deposits': total_deposits,
-        'total_withdrawals': total_withdrawals,
-        'active_accounts': active_accounts,
-        'frozen_accounts': frozen_accounts,
-        'pending_transactions': pending_transactions,
-        'completed_transactions': completed_transactions,
-        'recent_users': recent_users,
-        'recent_accounts': recent_accounts,
-        'recent_transactions': recent_transactions,
-        'large_transactions': large_transactions,
-        'total_managers': total_managers,
-        'recent_manager_actions': recent_manager_actions,
-        'all_accounts': all_accounts,
-        'all_users': all_users,
-    }
-    
-    return render(request, 'bank/admin_dashboard.html', context)
+    key = request_key(request)
+    fingerprint = request_hash(
+        transaction_type,
+        request.POST.get('amount', '').strip(),
+        request.POST.get('description', '').strip(),
+    )
+    return key, fingerprint
+
+
+def _replayed(request, posted):
+    """Answer a repeated deposit or withdrawal with the original transaction"""
+    messages.info(
+        request,
+        f'This request was already received: {"deposit" if posted.transaction_type == "DEPOSIT" else "withdrawal"} of '
+        f'₹{posted.amount}, transaction #{posted.id} ({posted.get_status_display().lower()}). '
+        f'It was not made again.'
+    )
+    return redirect('bank:dashboard')
 
 
 @login_required
@@ -133,26 +90,42 @@ def deposit_view(request):
         return redirect('bank:dashboard')
     
     if request.method == 'POST':
+        # A repeated request (double submit, client retry) gets the original
+        # result back; checking costs one indexed lookup
+        try:
+            key, fingerprint = _idempotency(request, 'DEPOSIT')
+            previous = find_key(request.user, key)
+            if previous:
+                return _replayed(request, replay(previous, fingerprint))
+        except IdempotencyError as error:
+            messages.error(request, str(error))
+            return redirect('bank:dashboard')
+        
         form = DepositForm(request.POST)
         
         if form.is_valid():
             amount = form.cleaned_data['amount']
             description = form.cleaned_data.get('description', 'Deposit')
             
-            # Use atomic transaction to ensure all-or-nothing operation
-            with transaction.atomic():
-                # Update account balance
-                account.balance += amount
-                account.save()
-                
-                # Create transaction record
-                Transaction.objects.create(
-                    account=account,
-                    transaction_type='DEPOSIT',
-                    amount=amount,
-                    balance_after=account.balance,
-                    description=description or 'Deposit'
+            # The posting service updates balance, journal and history atomically
+            try:
+                posted, replayed = post_once(
+                    request.user, key, fingerprint, lambda: deposit(account, amount, description)
+                )
+            except (PostingError, IdempotencyError) as error:
+                messages.error(request, str(error))
+                return redirect('bank:dashboard')
+            if replayed:
+                return _replayed(request, posted)
+            
+            # Large or unusual postings wait for a manager (see rules.py)
+            if posted.status == 'PENDING':
+                messages.info(
+                    request,
+                    f'Your deposit of ₹{amount} is awaiting approval by a bank manager. '
+                    f'Reason: {posted.review_reason}.'
                 )
+                return redirect('bank:dashboard')
             
             # Show success message
             messages.success(
@@ -185,35 +158,47 @@ def withdraw_view(request):
         messages.error(request, 'Your account is frozen. You cannot perform transactions. Please contact the bank.')
         return redirect('bank:dashboard')
     
+    # Daily and monthly withdrawal limits, read from the running counters
+    limits = headroom(account)
+    
     if request.method == 'POST':
-        form = WithdrawForm(request.POST, balance=account.balance)
+        # Checked before the form: a repeat of a withdrawal that emptied the
+        # account must get the original result, not an insufficient funds error
+        try:
+            key, fingerprint = _idempotency(request, 'WITHDRAW')
+            previous = find_key(request.user, key)
+            if previous:
+                return _replayed(request, replay(previous, fingerprint))
+        except IdempotencyError as error:
+            messages.error(request, str(error))
+            return redirect('bank:withdraw')
+        
+        form = WithdrawForm(request.POST, balance=account.available_balance, headroom=limits)
         
         if form.is_valid():
             amount = form.cleaned_data['amount']
             description = form.cleaned_data.get('description', 'Withdrawal')
             
-            # Double-check balance (extra safety)
-            if amount > account.balance:
-                messages.error(
-                    request,
-                    f'Insufficient funds. Your current balance is ₹{account.balance}.'
+            # The posting service re-checks funds inside the same UPDATE that
+            # debits them, so a concurrent withdrawal cannot overdraw the account
+            try:
+                posted, replayed = post_once(
+                    request.user, key, fingerprint, lambda: withdraw(account, amount, description)
                 )
+            except (PostingError, IdempotencyError) as error:
+                messages.error(request, str(error))
                 return redirect('bank:withdraw')
+            if replayed:
+                return _replayed(request, posted)
             
-            # Use atomic transaction to ensure all-or-nothing operation
-            with transaction.atomic():
-                # Update account balance
-                account.balance -= amount
-                account.save()
-                
-                # Create transaction record
-                Transaction.objects.create(
-                    account=account,
-                    transaction_type='WITHDRAW',
-                    amount=amount,
-                    balance_after=account.balance,
-                    description=description or 'Withdrawal'
+            # Large or unusual postings wait for a manager (see rules.py)
+            if posted.status == 'PENDING':
+                messages.info(
+                    request,
+                    f'Your withdrawal of ₹{amount} is awaiting approval by a bank manager. '
+                    f'Reason: {posted.review_reason}.'
                 )
+                return redirect('bank:dashboard')
             
             # Show success message
             messages.success(
@@ -224,23 +209,89 @@ def withdraw_view(request):
             # Redirect to dashboard
             return redirect('bank:dashboard')
     else:
-        form = WithdrawForm(balance=account.balance)
+        form = WithdrawForm(balance=account.available_balance, headroom=limits)
     
     context = {
         'form': form,
         'account': account,
+        'limits': limits,
     }
     return render(request, 'bank/withdraw.html', context)
 
 
 @login_required
 def transactions_view(request):
-    """Transaction History View - Shows all transactions"""
+    """
+    Transaction History View - Shows all transactions
+    Cached by account version like the dashboard
+    """
     account = request.user.account
     transactions = account.transactions.all()
     
     context = {
         'transactions': transactions,
         'account': account,
+        'fragment_timeout': fragment_timeout(),
     }
-    return render(request, 'bank/transactions.html', context)
+    return conditional_page(
+        request, account, 'bank/transactions.html',
+        lambda: render(request, 'bank/transactions.html', context),
+    )
+
+
+@login_required
+def standing_instructions_view(request):
+    """
+    Standing Instructions View - Set up and list recurring payments
+    Payments are made by the run_scheduled_payments command, not by this view
+    """
+    account = request.user.account
+    
+    if request.method == 'POST':
+        form = StandingInstructionForm(request.POST, account=account)
+        
+        if form.is_valid():
+            # Due from the start of the chosen day
+            starts_at = timezone.make_aware(datetime.combine(form.cleaned_data['first_payment'], time.min))
+            instruction = StandingInstruction.objects.create(
+                account=account,
+                kind=form.cleaned_data['kind'],
+                to_account=form.cleaned_data['to_account'],
+                amount=form.cleaned_data['amount'],
+                frequency=form.cleaned_data['frequency'],
+                description=form.cleaned_data.get('description', ''),
+                starts_at=starts_at,
+                next_run_at=starts_at,
+            )
+            messages.success(
+                request,
+                f'{instruction.get_frequency_display()} {instruction.get_kind_display().lower()} of '
+                f'₹{instruction.amount} set up. The first payment is on {form.cleaned_data["first_payment"]:%d %b %Y}.'
+            )
+            return redirect('bank:standing_instructions')
+    else:
+        form = StandingInstructionForm(account=account, initial={'first_payment': timezone.localdate()})
+    
+    instructions = account.standing_instructions.select_related('to_account').order_by('-active', 'next_run_at')
+    
+    context = {
+        'form': form,
+        'account': account,
+        'instructions': instructions,
+    }
+    return render(request, 'bank/standing_instructions.html', context)
+
+
+@login_required
+def cancel_standing_instruction_view(request, instruction_id):
+    """Cancel one of the customer's standing instructions (POST only)"""
+    instruction = get_object_or_404(
+        StandingInstruction, id=instruction_id, account=request.user.account
+    )
+    
+    if request.method == 'POST' and instruction.active:
+        instruction.active = False
+        instruction.save(update_fields=['active'])
+        messages.success(request, 'The standing instruction has been cancelled.')
+    
+    return redirect('bank:standing_instructions')
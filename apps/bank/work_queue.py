@@ -0,0 +1,179 @@
+"""
+Approval work queue
+
+Managers claim pending transactions in batches instead of racing on the
+same rows. A claim is a lease: Transaction.claimed_by plus
+claim_expires_at. Once the lease lapses, the rows can be claimed again.
+
+Claims never overlap:
+- On databases with SELECT ... FOR UPDATE SKIP LOCKED (PostgreSQL, MySQL 8,
+  Oracle), candidates are locked with skip_locked, so concurrent claimers
+  get different rows without waiting on each other
+- SQLite has no row locks. There, the claim is a compare-and-set UPDATE that
+  only takes rows still unclaimed (or expired) when it runs. SQLite
+  serialises writers, so two claimers can never both win the same row
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import approvals
+from .bulk import BULK_CREATE_BATCH_SIZE
+from .models import ManagerAction, Transaction
+from .page_cache import bump_versions
+from .services import release_rejected
+
+# Compare-and-set rounds before settling for a smaller batch
+CLAIM_ATTEMPTS = 3
+
+
+def lease_duration():
+    return timedelta(seconds=getattr(settings, 'BANK_APPROVAL_LEASE_SECONDS', 300))
+
+
+def claimable(queryset, owner_field, expires_field, now):
+    """Rows of `queryset` nobody holds a live lease on"""
+    return queryset.filter(
+        Q(**{f'{owner_field}__isnull': True}) | Q(**{f'{expires_field}__lte': now})
+    )
+
+
+def claim_rows(queryset, owner_field, expires_field, owner, size, lease):
+    """
+    Lease up to `size` rows of `queryset` to `owner`, oldest id first
+
+    Returns the claimed ids. Works for any model with an owner field and an
+    expiry field, so other queues can reuse it.
+    """
+    now = timezone.now()
+    lease_values = {owner_field: owner, expires_field: now + lease}
+    available = claimable(queryset, owner_field, expires_field, now).order_by('id')
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(
+                available.select_for_update(skip_locked=True).values_list('id', flat=True)[:size]
+            )
+            queryset.model.objects.filter(id__in=ids).update(**lease_values)
+        return ids
+
+    claimed = []
+    for _ in range(CLAIM_ATTEMPTS):
+        candidates = list(
+            available.exclude(id__in=claimed).values_list('id', flat=True)[:size - len(claimed)]
+        )
+        if not candidates:
+            break
+        with transaction.atomic():
+            # The availability condition is repeated inside the UPDATE, so rows
+            # another manager claimed since the SELECT are left alone
+            available.filter(id__in=candidates).update(**lease_values)
+            claimed += queryset.filter(id__in=candidates, **lease_values).values_list('id', flat=True)
+        if len(claimed) >= size:
+            break
+    return sorted(claimed)
+
+
+def available_pending():
+    """Pending transactions no manager currently holds"""
+    pending = Transaction.objects.filter(status=Transaction.PENDING)
+    return claimable(pending, 'claimed_by', 'claim_expires_at', timezone.now())
+
+
+def claim_pending(manager, size):
+    """Claim a batch of pending transactions for `manager`; returns their ids"""
+    pending = Transaction.objects.filter(status=Transaction.PENDING)
+    return claim_rows(pending, 'claimed_by', 'claim_expires_at', manager, size, lease_duration())
+
+
+def claimed_by(manager):
+    """Pending transactions `manager` holds a live lease on, oldest first"""
+    return Transaction.objects.filter(
+        status=Transaction.PENDING,
+        claimed_by=manager,
+        claim_expires_at__gt=timezone.now(),
+    ).order_by('id')
+
+
+def held_by_other(txn, manager):
+    """True while another manager's lease on `txn` is live"""
+    return (
+        txn.claimed_by_id is not None
+        and txn.claimed_by_id != manager.id
+        and txn.claim_expires_at is not None
+        and txn.claim_expires_at > timezone.now()
+    )
+
+
+def decide_one(manager, txn_id, status):
+    """
+    Move one pending transaction to `status` (APPROVED or REJECTED)
+
+    A compare-and-set UPDATE, like the claims: it only changes the row if it
+    is still pending and not under another manager's live lease. Returns
+    True only for the one request that made the change, so a double submit
+    or two managers deciding at once cannot both go on to settle or release
+    the transaction.
+    """
+    pending = Transaction.objects.filter(id=txn_id, status=Transaction.PENDING)
+    free = claimable(pending, 'claimed_by', 'claim_expires_at', timezone.now()) | pending.filter(claimed_by=manager)
+    return free.update(status=status, claimed_by=None, claim_expires_at=None) == 1
+
+
+def release(manager, ids=None):
+    """Give back claimed transactions (all of them by default)"""
+    claims = claimed_by(manager)
+    if ids is not None:
+        claims = claims.filter(id__in=ids)
+    return claims.update(claimed_by=None, claim_expires_at=None)
+
+
+def decide_batch(manager, ids, approve, note=''):
+    """
+    Approve or reject the manager's claimed transactions among `ids`
+
+    Everything happens in one database transaction, with one ManagerAction
+    per transaction written through bulk_create. Rows whose lease lapsed
+    (and may belong to another manager by now) are skipped. Returns the ids
+    that were decided.
+    """
+    status = Transaction.APPROVED if approve else Transaction.REJECTED
+    action_type = 'APPROVE_TRANSACTION' if approve else 'REJECT_TRANSACTION'
+    verb = 'Approved' if approve else 'Rejected'
+    label = 'Note' if approve else 'Reason'
+
+    with transaction.atomic():
+        # Conditional on the lease, like the claim itself: a lapsed lease
+        # means the row is not ours to decide any more
+        claimed_by(manager).filter(id__in=ids).update(status=status)
+        decided = list(
+            Transaction.objects.filter(id__in=ids, status=status, claimed_by=manager)
+            .values_list('id', 'account_id', 'account__user_id')
+            .order_by('id')
+        )
+        decided_ids = [txn_id for txn_id, _, _ in decided]
+        approvals.record(decided_ids, manager.user, note)
+        Transaction.objects.filter(id__in=decided_ids).update(claimed_by=None, claim_expires_at=None)
+        if approve:
+            bump_versions({account_id for _, account_id, _ in decided})
+        else:
+            release_rejected(decided_ids)
+
+        ManagerAction.objects.bulk_create(
+            [
+                ManagerAction(
+                    manager=manager,
+                    action_type=action_type,
+                    target_transaction_id=txn_id,
+                    target_account_id=account_id,
+                    target_user_id=user_id,
+                    note=f'{verb} transaction #{txn_id} in a batch of {len(decided)}. {label}: {note}',
+                )
+                for txn_id, account_id, user_id in decided
+            ],
+            batch_size=BULK_CREATE_BATCH_SIZE,
+        )
+    return decided_ids
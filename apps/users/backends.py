@@ -0,0 +1,54 @@
+"""
+Authentication backend
+
+Django's ModelBackend, except that the user is loaded together with their
+manager profile (select_related). Nearly every page asks
+hasattr(request.user, 'manager_profile'); with this backend the answer
+comes from the one query that loads the session's user, instead of a lazy
+query of its own.
+
+The bank account is not loaded with the user. Its balances move under the
+user's feet (a posting can commit between loading the user and using it),
+so request.user.account is read where a page needs it, as late as possible.
+
+The role is not copied into the session: it is already free on the loaded
+user, and a copy would outlive a manager profile being removed.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+# Reverse one-to-ones every page may touch; a missing one is cached as
+# missing, so hasattr() on it does not query either
+USER_RELATED = ('manager_profile',)
+
+
+def users():
+    return get_user_model()._default_manager.select_related(*USER_RELATED)
+
+
+class BankUserBackend(ModelBackend):
+    """ModelBackend that loads the user with their manager profile"""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = users().get(**{UserModel.USERNAME_FIELD: username})
+        except UserModel.DoesNotExist:
+            # Hash anyway, so a missing user takes as long as a wrong password
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    def get_user(self, user_id):
+        """Called once per request by AuthenticationMiddleware, for request.user"""
+        try:
+            user = users().get(pk=user_id)
+        except get_user_model().DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
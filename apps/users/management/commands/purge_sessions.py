@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.users.sessions import purge_expired
+
+
+class Command(BaseCommand):
+    help = 'Delete expired sessions from the database, a batch at a time'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Sessions deleted per statement'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        purged = purge_expired(batch_size=options['batch_size'])
+        if purged is None:
+            self.stdout.write(f'Sessions are not stored in the database ({settings.SESSION_ENGINE}); nothing to delete')
+            return
+        self.stdout.write(self.style.SUCCESS(f'Deleted {purged} expired session(s)'))
@@ -0,0 +1,49 @@
+"""
+Session housekeeping
+
+Where sessions live is chosen by BANK_SESSION_STORE in settings.py. With
+'db' and 'cached_db' every session is also a django_session row, and rows
+of sessions that were never logged out of stay there after they expire.
+
+purge_expired() deletes them `batch_size` rows per statement, so on SQLite
+each DELETE holds the write lock only briefly and postings can interleave.
+Django's clearsessions does the same in a single statement. With
+'cached_db' the purged sessions' cache entries go too, so the cache does
+not keep serving a session the database has dropped. With 'signed_cookies'
+there is nothing on the server to delete.
+"""
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedStore
+from django.contrib.sessions.backends.db import SessionStore as DatabaseStore
+from django.core.cache import caches
+from django.utils import timezone
+
+
+def session_model():
+    """The model sessions are stored in, or None if they are not in the database"""
+    store = import_module(settings.SESSION_ENGINE).SessionStore
+    if not issubclass(store, DatabaseStore):
+        return None
+    return store.get_model_class()
+
+
+def purge_expired(batch_size=1000, now=None):
+    """Delete expired sessions, `batch_size` per statement; returns how many, or None"""
+    model = session_model()
+    if model is None:
+        return None
+    store = import_module(settings.SESSION_ENGINE).SessionStore
+    cache = caches[settings.SESSION_CACHE_ALIAS] if issubclass(store, CachedStore) else None
+
+    now = now or timezone.now()
+    expired = model.objects.filter(expire_date__lt=now).order_by('expire_date')
+    purged = 0
+    while True:
+        keys = list(expired.values_list('session_key', flat=True)[:batch_size])
+        if not keys:
+            return purged
+        purged += model.objects.filter(session_key__in=keys).delete()[0]
+        if cache is not None:
+            cache.delete_many([store.cache_key_prefix + key for key in keys])
@@ -0,0 +1,128 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.bank import stats
+from apps.bank.api import create_token
+from apps.bank.models import Account, BankManager, Transaction
+from apps.bank.services import deposit
+
+MODEL_BACKEND = 'django.contrib.auth.backends.ModelBackend'
+BANK_BACKEND = 'apps.users.backends.BankUserBackend'
+
+# (role, url name, queries with BankUserBackend) for every page a logged-in
+# GET can load, with the page and statistics caches empty. The first query
+# of each loads the user together with their manager profile.
+VIEW_QUERIES = [
+    ('customer', 'users:home', 1),
+    ('customer', 'bank:dashboard', 3),
+    ('customer', 'bank:deposit', 2),
+    ('customer', 'bank:withdraw', 3),
+    ('customer', 'bank:transactions', 3),
+    ('customer', 'bank:standing_instructions', 3),
+    ('manager', 'users:home', 1),
+    ('manager', 'bank:manager_dashboard', 7),
+    ('manager', 'bank:manager_users', 2),
+    ('manager', 'bank:manager_user_detail', 5),
+    ('manager', 'bank:manager_accounts', 3),
+    ('manager', 'bank:manager_search', 1),
+    ('manager', 'bank:manager_account_detail', 5),
+    ('manager', 'bank:manager_freeze_account', 3),
+    ('manager', 'bank:manager_unfreeze_account', 3),
+    ('manager', 'bank:manager_transactions', 4),
+    ('manager', 'bank:manager_pending_approvals', 3),
+    ('manager', 'bank:manager_work_queue', 3),
+    ('manager', 'bank:manager_approve_transaction', 4),
+    ('manager', 'bank:manager_reject_transaction', 4),
+    ('manager', 'bank:manager_reports', 5),
+    ('admin', 'bank:dashboard', 1),
+]
+
+
+class ViewQueryTests(TestCase):
+    """Queries per page with BankUserBackend, and what it saves over ModelBackend"""
+
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password=None)
+        for amount in ('500.00', '120.00', '75000.00'):
+            deposit(self.customer.account, Decimal(amount))
+        self.pending = self.customer.account.transactions.get(status=Transaction.PENDING)
+        self.manager = User.objects.create_user(username='manager', password=None)
+        BankManager.objects.create(user=self.manager, employee_id='EMP1')
+        self.admin = User.objects.create_superuser(username='admin', email='', password=None)
+        self.users = {'customer': self.customer, 'manager': self.manager, 'admin': self.admin}
+
+    def url(self, name):
+        args = {
+            'bank:manager_user_detail': [self.customer.pk],
+            'bank:manager_account_detail': [self.customer.account.pk],
+            'bank:manager_freeze_account': [self.customer.account.pk],
+            'bank:manager_unfreeze_account': [self.customer.account.pk],
+            'bank:manager_approve_transaction': [self.pending.pk],
+            'bank:manager_reject_transaction': [self.pending.pk],
+        }
+        return reverse(name, args=args.get(name, []))
+
+    def queries(self, backend, role, name):
+        client = Client()
+        client.force_login(self.users[role], backend=backend)
+        caches['default'].clear()
+        stats.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(self.url(name))
+        self.assertIn(response.status_code, (200, 302))
+        return len(queries)
+
+    def test_queries_per_view(self):
+        for role, name, expected in VIEW_QUERIES:
+            with self.subTest(role=role, view=name):
+                self.assertEqual(self.queries(BANK_BACKEND, role, name), expected)
+
+    def test_manager_profile_comes_with_the_user(self):
+        for role, name, _ in VIEW_QUERIES:
+            if role == 'admin':
+                continue
+            with self.subTest(role=role, view=name):
+                self.assertLess(self.queries(BANK_BACKEND, role, name), self.queries(MODEL_BACKEND, role, name))
+
+    def test_admin_dashboard_sections(self):
+        client = Client()
+        client.force_login(self.admin, backend=BANK_BACKEND)
+        for section, expected in (('stats', 6), ('overview', 3), ('accounts', 5), ('users', 3),
+                                  ('transactions', 3), ('actions', 2)):
+            with self.subTest(section=section):
+                caches['default'].clear()
+                stats.clear()
+                with self.assertNumQueries(expected):
+                    client.get(reverse('bank:admin_section', args=[section]))
+                # Cached: only the user is loaded
+                with self.assertNumQueries(1):
+                    client.get(reverse('bank:admin_section', args=[section]))
+
+
+class LoginTests(TestCase):
+
+    def test_login_keeps_a_deposit_posted_while_logging_in(self):
+        user = User.objects.create_user(username='customer', password='pw123456')
+        check_password = User.check_password
+        posted = []
+
+        def slow_check_password(user, raw_password):
+            # Another request deposits while the password is being hashed
+            posted.append(deposit(Account.objects.get(user=user), Decimal('100.00')))
+            return check_password(user, raw_password)
+
+        with mock.patch.object(User, 'check_password', slow_check_password):
+            response = self.client.post(reverse('users:login'), {'username': 'customer', 'password': 'pw123456'})
+        self.assertEqual(response.status_code, 302)
+
+        account = Account.objects.get(user=user)
+        self.assertTrue(all(txn.status == Transaction.COMPLETED for txn in posted))
+        total = Decimal('100.00') * len(posted)
+        self.assertEqual((account.balance, account.available_balance), (total, total))
@@ -0,0 +1,72 @@
+from datetime import timedelta
+from importlib import import_module
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.users.sessions import purge_expired
+
+CACHES = {
+    **settings.CACHES,
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test-sessions',
+    },
+}
+
+
+@override_settings(CACHES=CACHES)
+class PurgeExpiredTests(TestCase):
+    """purge_sessions deletes expired sessions and keeps live ones"""
+
+    def create_sessions(self):
+        """A live and an expired session; returns (store class, live key, expired key)"""
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        keys = []
+        for name in ('live', 'expired'):
+            session = store()
+            session['name'] = name
+            session.create()
+            keys.append(session.session_key)
+        Session.objects.filter(session_key=keys[1]).update(expire_date=timezone.now() - timedelta(minutes=1))
+        return store, keys[0], keys[1]
+
+    def cached(self, store, key):
+        return store.cache_key_prefix + key in caches[settings.SESSION_CACHE_ALIAS]
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+    def test_cached_db_purges_the_database_and_the_cache(self):
+        store, live, expired = self.create_sessions()
+        self.assertTrue(self.cached(store, expired))
+
+        out = StringIO()
+        call_command('purge_sessions', batch_size=1, stdout=out)
+
+        self.assertIn('Deleted 1 expired session(s)', out.getvalue())
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), [live])
+        self.assertTrue(self.cached(store, live))
+        self.assertFalse(self.cached(store, expired))
+        self.assertEqual(store(session_key=live)['name'], 'live')
+        self.assertNotIn('name', store(session_key=expired))
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db')
+    def test_db_purges_in_batches(self):
+        store, live, expired = self.create_sessions()
+        for _ in range(2):
+            session = store()
+            session.create()
+        Session.objects.exclude(session_key=live).update(expire_date=timezone.now() - timedelta(minutes=1))
+
+        self.assertEqual(purge_expired(batch_size=2), 3)
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), [live])
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_signed_cookies_have_nothing_to_purge(self):
+        out = StringIO()
+        call_command('purge_sessions', stdout=out)
+        self.assertIn('nothing to delete', out.getvalue())
@@ -85,6 +85,31 @@ DATABASES = {
 }
 
 
+# Caches
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# 'stats' holds the dashboard statistics (apps/bank/stats.py); local memory
+# is per process, so use a shared backend (Redis, Memcached) to share it.
+# 'sessions' holds cached sessions; it is a file cache so that every server
+# process on this machine sees the same copy - a per-process cache would
+# keep a logged-out session alive in the other processes
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "bank-default",
+    },
+    "stats": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "bank-stats",
+    },
+    "sessions": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "cache" / "sessions",
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -128,7 +153,144 @@ STATICFILES_DIRS = [BASE_DIR / "static"]  # Point to our static folder
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Authentication
+# BankUserBackend loads each request's user with their manager profile in
+# one query (apps/users/backends.py). ModelBackend stays listed
+# so sessions started before the switch remain valid until they expire
+AUTHENTICATION_BACKENDS = [
+    'apps.users.backends.BankUserBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+# Sessions and flash messages
+# BANK_SESSION_STORE picks where sessions are kept:
+# - 'db': the django_session table, read on every logged-in request
+# - 'cached_db': read from the 'sessions' cache and only written through to
+#   django_session, so page loads stop competing with postings for SQLite
+# - 'signed_cookies': in the browser's cookie, signed with SECRET_KEY; no
+#   server storage at all, but logging out cannot revoke a copied cookie
+# Expired sessions are deleted by the purge_sessions command
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+BANK_SESSION_STORE = 'cached_db'
+SESSION_ENGINE = SESSION_ENGINES[BANK_SESSION_STORE]
+SESSION_CACHE_ALIAS = 'sessions'
+
+# Flash messages are left on Django's default storage, which keeps them in a
+# cookie and only falls back to the session for messages too large for it,
+# so messages.success() after a posting does not write the session
+
 # Login/Logout redirect URLs
 LOGIN_REDIRECT_URL = 'bank:dashboard'  # After login, go to dashboard
 LOGOUT_REDIRECT_URL = 'users:login'  # After logout, go to login page
 LOGIN_URL = 'users:login'  # If not logged in, redirect here
+
+# Interest accrual (python manage.py accrue_interest)
+# Annual interest rate by balance tier: (minimum balance, annual rate)
+# The highest tier whose minimum the balance reaches is applied to the whole balance
+BANK_INTEREST_RATE_TIERS = [
+    ('0.00', '0.0250'),        # 2.50% p.a. below ₹1,00,000
+    ('100000.00', '0.0300'),   # 3.00% p.a. from ₹1,00,000
+    ('1000000.00', '0.0350'),  # 3.50% p.a. from ₹10,00,000
+]
+BANK_INTEREST_DAYS_IN_YEAR = 365
+
+# Approval work queue: a claimed batch of pending transactions stays
+# reserved for the claiming manager this long
+BANK_APPROVAL_LEASE_SECONDS = 300
+BANK_APPROVAL_BATCH_SIZE = 20
+
+# Posting rules: a deposit or withdrawal matching any rule is created as
+# PENDING and waits for a manager instead of completing immediately
+# Each rule is {'rule': <name>, ...options}; see apps/bank/rules.py
+BANK_POSTING_RULES = [
+    {'rule': 'amount_threshold', 'amount': '50000.00'},
+    {'rule': 'daily_velocity', 'types': ['WITHDRAW'], 'count': 10, 'amount': '200000.00'},
+    {'rule': 'new_account', 'days': 7, 'amount': '20000.00'},
+    {'rule': 'frozen_counterparty'},
+]
+
+# Streaming anomaly detection on postings (apps/bank/anomaly.py)
+# A posting raises an alert when its account goes past a window limit
+BANK_ANOMALY_LIMITS = {
+    'windows': {
+        # window: (seconds, max postings, max amount moved)
+        'minute': (60, 5, '100000.00'),
+        'hour': (3600, 20, '300000.00'),
+        'day': (86400, 50, '1000000.00'),
+    },
+    'deviation': 6.0,        # amount this many standard deviations from the account's typical amount
+    'deviation_samples': 10,  # ... once the account has at least this many postings
+    'repeats': 3,            # identical amounts within the repeat window
+    'repeat_seconds': 600,
+}
+BANK_ANOMALY_MAX_ACCOUNTS = 10000  # accounts kept in memory per process
+
+# Withdrawal limits per account tier: (daily, monthly)
+# Checked against the AccountDailyTotals counters on every withdrawal,
+# including withdrawals waiting for approval
+BANK_WITHDRAWAL_LIMITS = {
+    'STANDARD': ('100000.00', '1000000.00'),
+    'PREMIUM': ('500000.00', '5000000.00'),
+    'BUSINESS': ('2000000.00', '20000000.00'),
+}
+
+# Funds holds: a withdrawal waiting for approval reserves its amount out of
+# the available balance until it settles, is rejected, or the hold expires
+# (python manage.py expire_holds)
+BANK_HOLD_SECONDS = 7 * 24 * 3600
+
+# Standing instructions (python manage.py run_scheduled_payments)
+# Instructions are claimed in batches; a claim lapses after the lease so a
+# crashed worker's batch is picked up by the next run
+BANK_SCHEDULED_BATCH_SIZE = 200
+BANK_SCHEDULED_LEASE_SECONDS = 300
+
+# Idempotency keys: a deposit or withdrawal retried with the same key within
+# this time returns the original transaction instead of posting again
+# (python manage.py purge_idempotency_keys removes expired keys)
+BANK_IDEMPOTENCY_TTL_SECONDS = 24 * 3600
+
+# JSON API (apps/bank/api.py): page size of the transactions endpoint
+BANK_API_PAGE_SIZE = 50
+BANK_API_MAX_PAGE_SIZE = 200
+
+# Batch postings (POST api/batch/ with a manager's token): postings per
+# database transaction, and the most one batch may hold
+BANK_BATCH_CHUNK_SIZE = 500
+BANK_BATCH_MAX_ITEMS = 10000
+
+# Customer dashboard and history fragments are cached per account version
+# (apps/bank/page_cache.py); entries for old versions simply age out
+BANK_FRAGMENT_CACHE_SECONDS = 600
+
+# Dashboard statistics (apps/bank/stats.py): cache alias and how long the
+# numbers are reused before one request recomputes them
+BANK_STATS_CACHE = 'stats'
+BANK_STATS_TTL_SECONDS = 30
+
+# Customer search (apps/bank/search.py): search through the SQLite FTS5
+# index instead of icontains, and how many matches the typeahead returns
+BANK_SEARCH_INDEX = True
+BANK_SEARCH_TYPEAHEAD_LIMIT = 10
+
+# Admin changelists of large tables (apps/bank/pagination.py): unfiltered
+# lists of tables estimated to hold more rows than this show an estimated
+# count instead of running COUNT(*) on every page
+BANK_ADMIN_EXACT_COUNT_LIMIT = 10000
+
+# Bulk admin actions (apps/bank/bulk_actions.py): rows changed per database
+# transaction, selections larger than the inline limit are queued for
+# python manage.py run_bulk_jobs, and how long a worker holds a job
+BANK_BULK_CHUNK_SIZE = 500
+BANK_BULK_INLINE_LIMIT = 1000
+BANK_BULK_LEASE_SECONDS = 300
+
+# Admin dashboard sections (apps/bank/admin_views.py): how long each
+# rendered section is reused, and rows per page of the account and user
+# tables
+BANK_ADMIN_SECTION_CACHE_SECONDS = 30
+BANK_ADMIN_SECTION_PAGE_SIZE = 25
@@ -48,8 +48,79 @@ document.addEventListener('DOMContentLoaded', function() {
             }, 500);
         }, 5000);
     });
+    
+    // Customer typeahead on manager search boxes (data-typeahead-url)
+    const searchInputs = document.querySelectorAll('input[data-typeahead-url]');
+    
+    searchInputs.forEach(function(input) {
+        const list = document.getElementById(input.getAttribute('list'));
+        const field = input.dataset.typeaheadField || 'username';
+        let timer = null;
+        
+        input.addEventListener('input', function() {
+            clearTimeout(timer);
+            const query = input.value.trim();
+            if (query.length < 3 || !list) {
+                return;
+            }
+            // Wait for a pause in typing before asking the server
+            timer = setTimeout(function() {
+                fetch(input.dataset.typeaheadUrl + '?q=' + encodeURIComponent(query))
+                    .then(function(response) { return response.json(); })
+                    .then(function(data) {
+                        list.innerHTML = '';
+                        data.results.forEach(function(result) {
+                            if (!result[field]) {
+                                return;
+                            }
+                            const option = document.createElement('option');
+                            option.value = result[field];
+                            option.label = result.name || result.username;
+                            list.appendChild(option);
+                        });
+                    })
+                    .catch(function() {});
+            }, 200);
+        });
+    });
+    
+    // Page sections loaded after the page (data-section-url); sections
+    // marked data-section-lazy wait until something asks for them
+    document.querySelectorAll('[data-section-url]:not([data-section-lazy])').forEach(function(section) {
+        loadSection(section, section.dataset.sectionUrl);
+    });
+    
+    // Page links inside a section load into the same section
+    document.addEventListener('click', function(event) {
+        const link = event.target.closest('a[data-section-link]');
+        const section = link && link.closest('[data-section-url]');
+        if (section) {
+            event.preventDefault();
+            loadSection(section, link.href);
+        }
+    });
 });
 
+// Fill a page section with the HTML fragment at url
+function loadSection(section, url) {
+    section.dataset.sectionLoaded = 'true';
+    fetch(url)
+        .then(function(response) {
+            // A redirect means the login has expired
+            if (!response.ok || response.redirected) {
+                throw new Error(response.status);
+            }
+            return response.text();
+        })
+        .then(function(html) {
+            section.innerHTML = html;
+        })
+        .catch(function() {
+            delete section.dataset.sectionLoaded;
+            section.innerHTML = '<p style="color: #ef4444;">This section could not be loaded. Reload the page to try again.</p>';
+        });
+}
+
 // Confirm before withdrawal
 function confirmWithdraw() {
     return confirm('Are you sure you want to withdraw this amount?');